@@ -0,0 +1,41 @@
+create or replace function handle_notification() returns trigger as $$
+begin
+  if tg_op = 'UPDATE' then
+    delete from notification_inbox where notification_id = new.id;
+  end if;
+
+  -- add the notification to the inbox of every recipient,
+  -- already seen if a later view exists (e.g. a notification indexed late)
+  insert into notification_inbox
+    (user_id, notification_id, group_id, timestamp, seen_at)
+  select
+    recipients.user_id,
+    new.id,
+    new.group_id,
+    new.timestamp,
+    coalesce(
+      (
+        select min(notification_seen.seen_at)
+        from notification_seen
+        where notification_seen.user_id = recipients.user_id
+          and notification_seen.seen_at >= new.timestamp
+      ),
+      'infinity'
+    )
+  from unnest(new.user_ids) as recipients(user_id)
+  on conflict do nothing;
+
+  return null;
+exception
+  when others then return null;
+end;
+$$ language plpgsql;
+
+
+do $$ begin
+  create trigger on_notification
+    after insert or update of user_ids, group_id, timestamp on notification
+    for each row execute procedure handle_notification();
+exception
+  when others then null;
+end $$;
@@ -0,0 +1,30 @@
+create or replace function handle_notification_seen() returns trigger as $$
+declare
+  prev_seen_at timestamp;
+begin
+  select max(seen_at) into prev_seen_at
+  from notification_seen
+  where user_id = new.user_id and seen_at < new.seen_at;
+
+  -- notifications since the previous view are seen as of this view
+  update notification_inbox
+  set seen_at = new.seen_at
+  where user_id = new.user_id
+    and timestamp <= new.seen_at
+    and (prev_seen_at is null or timestamp > prev_seen_at)
+    and seen_at > new.seen_at;
+
+  return null;
+exception
+  when others then return null;
+end;
+$$ language plpgsql;
+
+
+do $$ begin
+  create trigger on_notification_seen
+    after insert on notification_seen
+    for each row execute procedure handle_notification_seen();
+exception
+  when others then null;
+end $$;
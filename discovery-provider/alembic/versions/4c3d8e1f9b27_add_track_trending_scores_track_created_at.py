@@ -0,0 +1,28 @@
+"""add track_created_at to track_trending_scores
+
+Revision ID: 4c3d8e1f9b27
+Revises: a62b4e92b733
+Create Date: 2026-10-18 16:45:12.301846
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4c3d8e1f9b27"
+down_revision = "a62b4e92b733"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Scores are stored without time decay, which is applied at read time
+    # from the track's created_at. Rows without it are read as already decayed.
+    op.add_column(
+        "track_trending_scores",
+        sa.Column("track_created_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("track_trending_scores", "track_created_at")
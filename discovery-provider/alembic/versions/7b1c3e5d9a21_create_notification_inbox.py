@@ -0,0 +1,86 @@
+"""create notification inbox
+
+Revision ID: 7b1c3e5d9a21
+Revises: 4c3d8e1f9b27
+Create Date: 2026-10-18 18:12:40.518207
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from src.utils.alembic_helpers import build_sql
+
+# revision identifiers, used by Alembic.
+revision = "7b1c3e5d9a21"
+down_revision = "4c3d8e1f9b27"
+branch_labels = None
+depends_on = None
+
+inner_sql = build_sql(
+    ["handle_notification.sql", "handle_notification_seen.sql"], raw_sql=True
+)
+
+up_sql = sa.text(
+    f"""
+begin;
+
+create table if not exists notification_inbox (
+  user_id integer not null,
+  notification_id integer not null references notification(id) on delete cascade,
+  group_id varchar not null,
+  timestamp timestamp not null,
+  seen_at timestamp not null default 'infinity',
+  primary key (user_id, notification_id)
+);
+-- notification pages are keyset paginated over (seen_at, group_id)
+create index if not exists ix_notification_inbox_user_seen_group
+  on notification_inbox (user_id, seen_at desc, group_id desc);
+-- views mark the user's notifications in a timestamp range as seen
+create index if not exists ix_notification_inbox_user_timestamp
+  on notification_inbox (user_id, timestamp);
+
+{inner_sql}
+
+insert into notification_inbox
+  (user_id, notification_id, group_id, timestamp, seen_at)
+select
+  recipients.user_id,
+  notification.id,
+  notification.group_id,
+  notification.timestamp,
+  coalesce(
+    (
+      select min(notification_seen.seen_at)
+      from notification_seen
+      where notification_seen.user_id = recipients.user_id
+        and notification_seen.seen_at >= notification.timestamp
+    ),
+    'infinity'
+  )
+from notification, unnest(notification.user_ids) as recipients(user_id)
+on conflict do nothing;
+
+commit;
+"""
+)
+
+down_sql = sa.text(
+    """
+begin;
+drop trigger if exists on_notification on notification;
+drop trigger if exists on_notification_seen on notification_seen;
+drop function if exists handle_notification();
+drop function if exists handle_notification_seen();
+drop table if exists notification_inbox;
+commit;
+"""
+)
+
+
+def upgrade():
+    connection = op.get_bind()
+    connection.execute(up_sql)
+
+
+def downgrade():
+    connection = op.get_bind()
+    connection.execute(down_sql)
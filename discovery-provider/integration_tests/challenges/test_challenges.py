@@ -487,3 +487,51 @@ def test_catches_exceptions_in_single_processor(app):
         # Make sure broken manager didn't do anything
         challenge_2_state = broken_manager.get_user_challenge_state(session, ["1"])
         assert len(challenge_2_state) == 0
+
+
+def test_process_events_across_event_types(app):
+    """Ensure a manager listening to several event types sees its own updates
+    from earlier event types in the same batch"""
+    setup_challenges(app)
+    with app.app_context():
+        db = get_db()
+
+    redis_conn = redis.Redis.from_url(url=REDIS_URL)
+
+    bus = ChallengeEventBus(redis_conn)
+    with db.scoped_session() as session:
+        mgr = ChallengeManager("test_challenge_1", TestUpdater())
+        TEST_EVENT = "TEST_EVENT"
+        TEST_EVENT_2 = "TEST_EVENT_2"
+        bus.register_listener(TEST_EVENT, mgr)
+        bus.register_listener(TEST_EVENT_2, mgr)
+
+        with bus.use_scoped_dispatch_queue():
+            # user 1 is in progress, user 6 has no challenge yet
+            bus.dispatch(TEST_EVENT, 101, 1)
+            bus.dispatch(TEST_EVENT, 101, 6)
+            bus.dispatch(TEST_EVENT_2, 102, 1)
+            bus.dispatch(TEST_EVENT_2, 102, 6)
+        (count, did_error) = bus.process_events(session)
+        assert count == 4
+        assert did_error == False
+
+        state = mgr.get_user_challenge_state(session, ["1", "6"])
+        assert [model_to_dictionary(user_challenge) for user_challenge in state] == [
+            {
+                "challenge_id": "test_challenge_1",
+                "user_id": 1,
+                "specifier": "1",
+                "is_complete": True,
+                "current_step_count": 3,
+                "completed_blocknumber": 102,
+            },
+            {
+                "challenge_id": "test_challenge_1",
+                "user_id": 6,
+                "specifier": "6",
+                "is_complete": False,
+                "current_step_count": 2,
+                "completed_blocknumber": None,
+            },
+        ]
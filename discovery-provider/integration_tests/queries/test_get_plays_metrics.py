@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 
 from integration_tests.utils import populate_mock_db
 from src.queries.get_plays_metrics import GetPlayMetricsArgs, _get_plays_metrics
-from src.tasks.index_hourly_play_counts import _index_hourly_play_counts
+from src.tasks.index_play_rollups import _index_play_rollups
 from src.utils.db_session import get_db
 
 DAYS_IN_A_YEAR = 365
@@ -47,7 +47,7 @@ def test_get_plays_metrics(app):
     )
 
     with db.scoped_session() as session:
-        _index_hourly_play_counts(session)
+        _index_play_rollups(session)
         metrics = _get_plays_metrics(session, args)
 
     assert len(metrics) == 2
@@ -93,7 +93,7 @@ def test_get_plays_metrics_with_weekly_buckets(app):
     )
 
     with db.scoped_session() as session:
-        _index_hourly_play_counts(session)
+        _index_play_rollups(session)
         metrics = _get_plays_metrics(session, args)
 
     assert len(metrics) == 1
@@ -138,7 +138,7 @@ def test_get_plays_metrics_with_yearly_buckets(app):
     )
 
     with db.scoped_session() as session:
-        _index_hourly_play_counts(session)
+        _index_play_rollups(session)
         metrics = _get_plays_metrics(session, args)
 
     assert len(metrics) == 4
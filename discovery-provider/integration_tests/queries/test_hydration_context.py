@@ -0,0 +1,125 @@
+import logging
+
+from integration_tests.utils import populate_mock_db
+from src.models.social.repost import RepostType
+from src.models.social.save import SaveType
+from src.queries import response_name_constants
+from src.queries.hydration_context import (
+    get_hydration_context,
+    get_request_hydration_query_count,
+)
+from src.queries.query_helpers import (
+    populate_playlist_metadata,
+    populate_track_metadata,
+    populate_user_metadata,
+)
+from src.utils.db_session import get_db
+
+logger = logging.getLogger(__name__)
+
+test_entities = {
+    "tracks": [
+        {"track_id": 1, "owner_id": 1},
+        {"track_id": 2, "owner_id": 2},
+    ],
+    "playlists": [
+        {
+            "playlist_id": 1,
+            "playlist_owner_id": 2,
+            "playlist_contents": {"track_ids": [{"track": 1}, {"track": 2}]},
+        },
+    ],
+    "users": [
+        {"user_id": 1, "handle": "user1"},
+        {"user_id": 2, "handle": "user2"},
+        {"user_id": 3, "handle": "user3"},
+    ],
+    "reposts": [
+        {"repost_item_id": 1, "repost_type": "track", "user_id": 3},
+        {"repost_item_id": 1, "repost_type": "playlist", "user_id": 2},
+    ],
+    "saves": [
+        {"save_item_id": 2, "save_type": "track", "user_id": 3},
+        {"save_item_id": 1, "save_type": "playlist", "user_id": 3},
+    ],
+    "follows": [
+        {"follower_user_id": 3, "followee_user_id": 2},
+        {"follower_user_id": 1, "followee_user_id": 3},
+    ],
+}
+
+
+def test_hydration_context_reuses_request_results(app):
+    """Tests that populating the same entities again in a request does not query"""
+    with app.test_request_context():
+        db = get_db()
+        populate_mock_db(db, test_entities)
+
+        with db.scoped_session() as session:
+            get_hydration_context(3).prefetch(
+                session,
+                user_ids=[1, 2],
+                track_ids=[1, 2],
+                playlists=[
+                    {
+                        "playlist_id": 1,
+                        "playlist_contents": {
+                            "track_ids": [{"track": 1}, {"track": 2}]
+                        },
+                    }
+                ],
+                playlist_repost_types=[RepostType.playlist],
+                playlist_save_types=[SaveType.playlist],
+            )
+            prefetch_query_count = get_request_hydration_query_count()
+            assert prefetch_query_count > 0
+
+            tracks = populate_track_metadata(
+                session,
+                [1, 2],
+                [
+                    {"track_id": 1, "is_premium": False},
+                    {"track_id": 2, "is_premium": False},
+                ],
+                3,
+            )
+            playlists = populate_playlist_metadata(
+                session,
+                [1],
+                [
+                    {
+                        "playlist_id": 1,
+                        "playlist_contents": {
+                            "track_ids": [{"track": 1}, {"track": 2}]
+                        },
+                    }
+                ],
+                [RepostType.playlist],
+                [SaveType.playlist],
+                3,
+            )
+            users = populate_user_metadata(
+                session,
+                [1, 2],
+                [
+                    {"user_id": 1, "wallet": "user1wallet"},
+                    {"user_id": 2, "wallet": "user2wallet"},
+                ],
+                3,
+            )
+
+            # only the user banks were not prefetched
+            assert get_request_hydration_query_count() == prefetch_query_count + 1
+
+        assert tracks[0][response_name_constants.has_current_user_reposted]
+        assert not tracks[0][response_name_constants.has_current_user_saved]
+        assert tracks[1][response_name_constants.has_current_user_saved]
+        assert tracks[0][response_name_constants.repost_count] == 1
+
+        assert playlists[0][response_name_constants.has_current_user_saved]
+        assert len(playlists[0][response_name_constants.followee_reposts]) == 1
+
+        assert not users[0][response_name_constants.does_current_user_follow]
+        assert users[0][response_name_constants.does_follow_current_user]
+        assert users[1][response_name_constants.does_current_user_follow]
+        assert not users[1][response_name_constants.does_follow_current_user]
@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta
+
+from integration_tests.utils import populate_mock_db
+from sqlalchemy import func
+from src.models.notifications.notification import NotificationInbox
+from src.queries.get_notifications import get_notification_groups, get_notifications
+from src.utils.db_session import get_db
+
+t1 = datetime(2020, 10, 10, 10, 35, 0)
+t2 = t1 - timedelta(hours=1)
+t3 = t1 - timedelta(hours=2)
+t4 = t1 - timedelta(hours=3)
+
+
+def test_notification_inbox(app):
+    """Tests that views mark the inbox as seen whichever is indexed first"""
+    with app.app_context():
+        db_mock = get_db()
+
+    populate_mock_db(
+        db_mock,
+        {
+            "users": [{"user_id": i + 1} for i in range(6)],
+            "notification_seens": [
+                {"user_id": 1, "seen_at": t3},
+                {"user_id": 1, "seen_at": t1},
+            ],
+        },
+    )
+    # notifications indexed after the views that saw them
+    populate_mock_db(
+        db_mock,
+        {
+            "follows": [
+                {"follower_user_id": 2, "followee_user_id": 1, "created_at": t4},
+                {"follower_user_id": 3, "followee_user_id": 1, "created_at": t2},
+            ],
+        },
+    )
+    populate_mock_db(
+        db_mock,
+        {
+            "follows": [
+                {
+                    "follower_user_id": 4,
+                    "followee_user_id": 1,
+                    "created_at": t1 + timedelta(hours=1),
+                }
+            ],
+        },
+    )
+
+    with db_mock.scoped_session() as session:
+        inbox = (
+            session.query(
+                NotificationInbox.timestamp,
+                func.isfinite(NotificationInbox.seen_at),
+            )
+            .filter(NotificationInbox.user_id == 1)
+            .order_by(NotificationInbox.timestamp)
+            .all()
+        )
+        assert inbox == [(t4, True), (t2, True), (t1 + timedelta(hours=1), False)]
+
+        groups = get_notification_groups(session, {"user_id": 1, "limit": 10})
+        assert [
+            (group["group_id"], group["is_seen"], group["prev_seen_at"])
+            for group in groups
+        ] == [("follow:1", False, t1), ("follow:1", True, t3), ("follow:1", True, None)]
+        assert [group["seen_at"] for group in groups[1:]] == [t1, t3]
+
+        # keyset pages continue after the last group
+        groups = get_notification_groups(
+            session,
+            {"user_id": 1, "limit": 10, "timestamp": t1, "group_id": "follow:1"},
+        )
+        assert [group["seen_at"] for group in groups] == [t3]
+
+    # a new view marks only the notifications since the previous view as seen
+    populate_mock_db(
+        db_mock,
+        {"notification_seens": [{"user_id": 1, "seen_at": t1 + timedelta(hours=2)}]},
+    )
+    with db_mock.scoped_session() as session:
+        groups = get_notification_groups(session, {"user_id": 1, "limit": 10})
+        assert [
+            (group["seen_at"], group["prev_seen_at"], group["count"])
+            for group in groups
+        ] == [(t1 + timedelta(hours=2), t1, 1), (t1, t3, 1), (t3, None, 1)]
+
+
+def test_unseen_notifications_with_timestamp_offset(app):
+    """Tests that unseen notifications are returned when paging by timestamp,
+    as the API always sends one"""
+    with app.app_context():
+        db_mock = get_db()
+
+    populate_mock_db(
+        db_mock,
+        {
+            "users": [{"user_id": i + 1} for i in range(4)],
+            "follows": [
+                {"follower_user_id": 2, "followee_user_id": 1, "created_at": t3},
+                {"follower_user_id": 3, "followee_user_id": 1, "created_at": t2},
+                {"follower_user_id": 4, "followee_user_id": 2, "created_at": t2},
+            ],
+            "notification_seens": [{"user_id": 2, "seen_at": t3}],
+        },
+    )
+
+    with db_mock.scoped_session() as session:
+        # user 1 never viewed their notifications
+        notifications = get_notifications(
+            session, {"user_id": 1, "limit": 10, "timestamp": datetime.now()}
+        )
+        assert [
+            (notification["group_id"], notification["is_seen"])
+            for notification in notifications
+        ] == [("follow:1", False)]
+        assert len(notifications[0]["actions"]) == 2
+
+        # unseen groups are paged by their latest notification and never split
+        notifications = get_notifications(
+            session,
+            {"user_id": 1, "limit": 10, "timestamp": t2, "group_id": "follow:1"},
+        )
+        assert notifications == []
+
+        # user 2 has an unseen notification after their last view
+        notifications = get_notifications(
+            session, {"user_id": 2, "limit": 10, "timestamp": datetime.now()}
+        )
+        assert [
+            (notification["group_id"], notification["is_seen"])
+            for notification in notifications
+        ] == [("follow:2", False)]
+        notifications = get_notifications(
+            session,
+            {"user_id": 2, "limit": 10, "timestamp": t2, "group_id": "follow:2"},
+        )
+        assert notifications == []
+
+
+def test_notification_pages(app):
+    """Tests that consecutive pages through unseen and seen groups sharing
+    timestamps have no overlap and no gaps"""
+    with app.app_context():
+        db_mock = get_db()
+
+    populate_mock_db(
+        db_mock,
+        {
+            "users": [{"user_id": i + 1} for i in range(3)],
+            "tracks": [{"track_id": i + 1, "owner_id": 1} for i in range(5)],
+            "notification_seens": [
+                {"user_id": 1, "seen_at": t3 + timedelta(minutes=30)}
+            ],
+        },
+    )
+    populate_mock_db(
+        db_mock,
+        {
+            "reposts": [
+                # seen
+                {"user_id": 3, "repost_item_id": 1, "created_at": t3},
+                {"user_id": 3, "repost_item_id": 2, "created_at": t3},
+                # unseen, all at the same time
+                *[
+                    {"user_id": 2, "repost_item_id": i + 1, "created_at": t2}
+                    for i in range(5)
+                ],
+            ],
+        },
+    )
+
+    with db_mock.scoped_session() as session:
+        all_groups = get_notifications(session, {"user_id": 1, "limit": 10})
+        assert [(group["group_id"], group["is_seen"]) for group in all_groups] == [
+            ("repost:5:type:track", False),
+            ("repost:4:type:track", False),
+            ("repost:3:type:track", False),
+            ("repost:2:type:track", False),
+            ("repost:1:type:track", False),
+            ("repost:2:type:track", True),
+            ("repost:1:type:track", True),
+        ]
+
+        pages = []
+        args = {"user_id": 1, "limit": 2, "timestamp": datetime.now()}
+        while True:
+            page = get_notifications(session, args)
+            if not page:
+                break
+            pages.append(page)
+            last_group = page[-1]
+            args = {
+                "user_id": 1,
+                "limit": 2,
+                # the seen time of seen groups, the latest notification of
+                # unseen ones
+                "timestamp": last_group["seen_at"]
+                if last_group["is_seen"]
+                else max(action["timestamp"] for action in last_group["actions"]),
+                "group_id": last_group["group_id"],
+            }
+
+        assert [len(page) for page in pages] == [2, 2, 2, 1]
+        assert [
+            (group["group_id"], group["is_seen"], group["notification_ids"])
+            for page in pages
+            for group in page
+        ] == [
+            (group["group_id"], group["is_seen"], group["notification_ids"])
+            for group in all_groups
+        ]
@@ -36,7 +36,9 @@ def test_get_transaction_batches_to_process_single_batch(app):
         cid_metadata_client_mock,
     )
     anchor_program_indexer.get_latest_slot = MagicMock(return_value=0)
-    anchor_program_indexer.is_tx_in_db = MagicMock(return_value=True)
+    anchor_program_indexer.get_indexed_tx_sigs = MagicMock(
+        side_effect=lambda session, tx_sigs: set(tx_sigs)
+    )
 
     mock_transactions_history = {
         "result": [
@@ -100,7 +102,9 @@ def test_get_transaction_batches_to_process_interslot_batch(app):
         cid_metadata_client_mock,
     )
     anchor_program_indexer.get_latest_slot = MagicMock(return_value=0)
-    anchor_program_indexer.is_tx_in_db = MagicMock(return_value=True)
+    anchor_program_indexer.get_indexed_tx_sigs = MagicMock(
+        side_effect=lambda session, tx_sigs: set(tx_sigs)
+    )
 
     mock_first_transactions_history = {
         "result": [{"slot": 3, "signature": "sig3"}] * 500
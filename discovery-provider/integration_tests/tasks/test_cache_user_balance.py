@@ -0,0 +1,114 @@
+from unittest import mock
+
+from integration_tests.utils import populate_mock_db
+from src.models.users.user_balance import UserBalance
+from src.models.users.user_balance_change import UserBalanceChange
+from src.queries.get_balances import IMMEDIATE_REFRESH_REDIS_PREFIX
+from src.solana.solana_client_manager import SolanaClientManager
+from src.tasks.cache_user_balance import refresh_user_ids
+from src.utils.db_session import get_db
+from src.utils.multi_provider import MultiProvider
+from src.utils.redis_connection import get_redis
+from web3 import Web3
+
+USER_1_WALLET = "0x1111111111111111111111111111111111111111"
+USER_2_WALLET = "0x2222222222222222222222222222222222222222"
+ASSOCIATED_WALLET = "0x3333333333333333333333333333333333333333"
+USER_1_BANK_ACCOUNT = "7CyoHxibpPrTVc2AsmoSq7gRoDwnwN7LRnHDcR4yWVf9"
+
+# balances keyed by the fake calldata "<function>:<wallet>"
+ETH_BALANCES = {
+    f"balanceOf:{Web3.toChecksumAddress(USER_1_WALLET)}": 1,
+    f"balanceOf:{Web3.toChecksumAddress(ASSOCIATED_WALLET)}": 2,
+    f"getTotalDelegatorStake:{Web3.toChecksumAddress(ASSOCIATED_WALLET)}": 3,
+    f"totalStakedFor:{Web3.toChecksumAddress(ASSOCIATED_WALLET)}": 4,
+}
+
+
+def make_contract():
+    contract = mock.Mock()
+    contract.encodeABI.side_effect = lambda fn_name, args: f"{fn_name}:{args[0]}"
+    return contract
+
+
+def eth_batch_responses(batch):
+    """Fakes an eth node that fails reads for wallets it has no balance for"""
+    responses = []
+    for request in batch:
+        data = request["params"][0]["data"]
+        if data in ETH_BALANCES:
+            responses.append({"id": request["id"], "result": hex(ETH_BALANCES[data])})
+        else:
+            responses.append({"id": request["id"], "error": {"code": -32000}})
+    return responses
+
+
+def test_refresh_user_ids(app):
+    """Tests that balances are fetched in batches and failed users stay queued"""
+    with app.app_context():
+        db = get_db()
+        redis = get_redis()
+    redis.delete(IMMEDIATE_REFRESH_REDIS_PREFIX)
+
+    populate_mock_db(
+        db,
+        {
+            "users": [
+                {"user_id": 1, "wallet": USER_1_WALLET},
+                {"user_id": 2, "wallet": USER_2_WALLET},
+            ],
+            "associated_wallets": [
+                {"user_id": 1, "wallet": ASSOCIATED_WALLET, "chain": "eth"},
+            ],
+            "user_bank_accounts": [
+                {
+                    "ethereum_address": USER_1_WALLET,
+                    "bank_account": USER_1_BANK_ACCOUNT,
+                },
+            ],
+        },
+    )
+    redis.sadd(IMMEDIATE_REFRESH_REDIS_PREFIX, 1, 2)
+
+    eth_web3 = mock.Mock()
+    eth_web3.toChecksumAddress = Web3.toChecksumAddress
+    eth_web3.eth.block_number = 10
+    eth_web3.provider = mock.create_autospec(MultiProvider, instance=True)
+    eth_web3.provider.make_batch_request.side_effect = eth_batch_responses
+
+    solana_client_manager = mock.create_autospec(SolanaClientManager, instance=True)
+    solana_client_manager.get_multiple_accounts.return_value = [
+        {"data": {"parsed": {"info": {"tokenAmount": {"amount": "5"}}}}}
+    ]
+
+    refresh_user_ids(
+        redis,
+        db,
+        make_contract(),
+        make_contract(),
+        make_contract(),
+        eth_web3,
+        solana_client_manager,
+    )
+
+    # every eth read of both users goes out in one batch
+    assert eth_web3.provider.make_batch_request.call_count == 1
+    assert len(eth_web3.provider.make_batch_request.call_args.args[0]) == 5
+    assert solana_client_manager.get_multiple_accounts.call_count == 1
+
+    with db.scoped_session() as session:
+        balances = {
+            balance.user_id: balance for balance in session.query(UserBalance).all()
+        }
+        assert balances[1].balance == "1"
+        assert balances[1].associated_wallets_balance == "9"
+        assert balances[1].waudio == "5"
+        # user 2's read failed, so their balance was not touched
+        assert balances[2].balance == "0"
+
+        balance_changes = session.query(UserBalanceChange).all()
+        assert [change.user_id for change in balance_changes] == [1]
+        assert balance_changes[0].blocknumber == 10
+
+    # only the user whose reads failed is left to refresh
+    assert redis.smembers(IMMEDIATE_REFRESH_REDIS_PREFIX) == {b"2"}
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from integration_tests.utils import populate_mock_db
+from src.eth_indexing.event_scanner import EventScanner
+from src.eth_indexing.wallet_index import KnownWalletIndex
+from src.queries.get_balances import IMMEDIATE_REFRESH_REDIS_PREFIX
+from src.utils.db_session import get_db
+from src.utils.redis_connection import get_redis
+
+USER_1_WALLET = "0xA1b2c3d4e5F6a7b8C9d0e1f2A3b4C5d6E7f8A9b0"
+USER_2_WALLET = "0xb1b2c3d4e5f6a7b8c9d0e1f2a3b4c5d6e7f8a9b0"
+ASSOCIATED_WALLET = "0xC1b2c3d4e5F6a7b8C9d0e1f2A3b4C5d6E7f8A9b0"
+UNKNOWN_WALLET = "0xD1b2c3d4e5F6a7b8C9d0e1f2A3b4C5d6E7f8A9b0"
+
+
+def make_transfer(from_wallet, to_wallet, log_index):
+    return {
+        "logIndex": log_index,
+        "transactionHash": bytes([log_index]),
+        "blockNumber": 1,
+        "args": {"from": from_wallet, "to": to_wallet, "value": 1},
+    }
+
+
+def test_enqueue_balance_refreshes(app):
+    """Tests that a chunk of transfers is resolved to users in one pass"""
+    with app.app_context():
+        db = get_db()
+        redis = get_redis()
+    redis.delete(IMMEDIATE_REFRESH_REDIS_PREFIX)
+
+    populate_mock_db(
+        db,
+        {
+            "users": [
+                {"user_id": 1, "wallet": USER_1_WALLET},
+                # stored lower cased
+                {"user_id": 2, "wallet": USER_2_WALLET},
+                {"user_id": 3, "wallet": "0xuser3"},
+                {"user_id": 4, "wallet": "0xuser4"},
+            ],
+            "associated_wallets": [
+                {"user_id": 3, "wallet": ASSOCIATED_WALLET, "chain": "eth"},
+                {
+                    "user_id": 4,
+                    "wallet": UNKNOWN_WALLET,
+                    "chain": "eth",
+                    "is_delete": True,
+                },
+            ],
+        },
+    )
+
+    wallet_index = KnownWalletIndex()
+    scanner = EventScanner(
+        db=db,
+        redis=redis,
+        web3=mock.Mock(),
+        contract=mock.Mock(),
+        event_type=mock.Mock(),
+        filters={},
+        wallet_index=wallet_index,
+    )
+
+    transfers = [
+        make_transfer(USER_1_WALLET, UNKNOWN_WALLET, 0),
+        make_transfer(UNKNOWN_WALLET, USER_2_WALLET.upper().replace("0X", "0x"), 1),
+        make_transfer(ASSOCIATED_WALLET, UNKNOWN_WALLET, 2),
+    ]
+    with mock.patch(
+        "src.eth_indexing.event_scanner.enqueue_immediate_balance_refresh"
+    ) as enqueue:
+        scanner.enqueue_balance_refreshes(transfers)
+        # one enqueue for the whole chunk
+        assert enqueue.call_count == 1
+        assert sorted(enqueue.call_args.args[1]) == [1, 2, 3]
+
+    assert len(wallet_index) == 5
+    assert wallet_index.filter_known([UNKNOWN_WALLET, USER_1_WALLET.lower()]) == [
+        USER_1_WALLET.lower()
+    ]
+
+    # transfers between wallets no user owns do not touch the database
+    with mock.patch("src.eth_indexing.event_scanner.union") as user_ids_query:
+        scanner.enqueue_balance_refreshes(
+            [make_transfer(UNKNOWN_WALLET, UNKNOWN_WALLET, 3)]
+        )
+        assert user_ids_query.call_count == 0
+
+    # wallets indexed after the first refresh are picked up incrementally
+    populate_mock_db(
+        db,
+        {"users": [{"user_id": 5, "wallet": UNKNOWN_WALLET}]},
+        block_offset=100,
+    )
+    scanner.enqueue_balance_refreshes([make_transfer(UNKNOWN_WALLET, "0x0", 4)])
+    assert redis.smembers(IMMEDIATE_REFRESH_REDIS_PREFIX) == {b"5"}
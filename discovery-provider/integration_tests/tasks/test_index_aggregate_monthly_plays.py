@@ -5,9 +5,9 @@ from typing import List
 from integration_tests.utils import populate_mock_db
 from src.models.indexing.indexing_checkpoints import IndexingCheckpoint
 from src.models.social.aggregate_monthly_plays import AggregateMonthlyPlay
-from src.tasks.index_aggregate_monthly_plays import (
-    AGGREGATE_MONTHLY_PLAYS_TABLE_NAME,
-    _index_aggregate_monthly_plays,
+from src.tasks.index_play_rollups import (
+    PLAY_ROLLUPS_CHECKPOINT_NAME,
+    _index_play_rollups,
 )
 from src.utils.db_session import get_db
 
@@ -49,7 +49,7 @@ def test_index_aggregate_monthly_plays_populate(app):
     populate_mock_db(db, entities)
 
     with db.scoped_session() as session:
-        _index_aggregate_monthly_plays(session)
+        _index_play_rollups(session)
 
         results: List[AggregateMonthlyPlay] = (
             session.query(AggregateMonthlyPlay)
@@ -79,7 +79,7 @@ def test_index_aggregate_monthly_plays_populate(app):
 
         new_checkpoint: IndexingCheckpoint = (
             session.query(IndexingCheckpoint.last_checkpoint)
-            .filter(IndexingCheckpoint.tablename == AGGREGATE_MONTHLY_PLAYS_TABLE_NAME)
+            .filter(IndexingCheckpoint.tablename == PLAY_ROLLUPS_CHECKPOINT_NAME)
             .scalar()
         )
         assert new_checkpoint == 6
@@ -135,7 +135,7 @@ def test_index_aggregate_monthly_plays_update(app):
     populate_mock_db(db, entities)
 
     with db.scoped_session() as session:
-        _index_aggregate_monthly_plays(session)
+        _index_play_rollups(session)
 
         results: List[AggregateMonthlyPlay] = (
             session.query(AggregateMonthlyPlay)
@@ -168,7 +168,7 @@ def test_index_aggregate_monthly_plays_update(app):
 
         new_checkpoint: IndexingCheckpoint = (
             session.query(IndexingCheckpoint.last_checkpoint)
-            .filter(IndexingCheckpoint.tablename == AGGREGATE_MONTHLY_PLAYS_TABLE_NAME)
+            .filter(IndexingCheckpoint.tablename == PLAY_ROLLUPS_CHECKPOINT_NAME)
             .scalar()
         )
         assert new_checkpoint == 9
@@ -203,7 +203,7 @@ def test_index_aggregate_monthly_plays_same_checkpoint(app):
         ],
         "indexing_checkpoints": [
             {
-                "tablename": "aggregate_monthly_plays",
+                "tablename": PLAY_ROLLUPS_CHECKPOINT_NAME,
                 "last_checkpoint": 9,
             }
         ],
@@ -216,7 +216,7 @@ def test_index_aggregate_monthly_plays_same_checkpoint(app):
     populate_mock_db(db, entities)
 
     with db.scoped_session() as session:
-        _index_aggregate_monthly_plays(session)
+        _index_play_rollups(session)
 
     results: List[AggregateMonthlyPlay] = (
         session.query(AggregateMonthlyPlay)
@@ -228,7 +228,7 @@ def test_index_aggregate_monthly_plays_same_checkpoint(app):
 
     new_checkpoint: IndexingCheckpoint = (
         session.query(IndexingCheckpoint.last_checkpoint)
-        .filter(IndexingCheckpoint.tablename == AGGREGATE_MONTHLY_PLAYS_TABLE_NAME)
+        .filter(IndexingCheckpoint.tablename == PLAY_ROLLUPS_CHECKPOINT_NAME)
         .scalar()
     )
     assert new_checkpoint == 9
@@ -246,4 +246,4 @@ def test_index_aggregate_monthly_plays_no_plays(app):
     populate_mock_db(db, entities)
 
     with db.scoped_session() as session:
-        _index_aggregate_monthly_plays(session)
+        _index_play_rollups(session)
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from integration_tests.utils import populate_mock_db
+from src.models.indexing.indexing_checkpoints import IndexingCheckpoint
+from src.models.social.aggregate_monthly_plays import AggregateMonthlyPlay
+from src.models.social.hourly_play_counts import HourlyPlayCount
+from src.tasks.index_play_rollups import (
+    AGGREGATE_MONTHLY_PLAYS_TABLE_NAME,
+    HOURLY_PLAY_COUNTS_TABLE_NAME,
+    PLAY_ROLLUPS_CHECKPOINT_NAME,
+    _index_play_rollups,
+)
+from src.utils.db_session import get_db
+
+TIMESTAMP = datetime(2022, 1, 20, 10)
+
+
+def test_index_play_rollups_from_table_checkpoints(app):
+    """Tests that the first run continues each rollup from its own checkpoint"""
+    with app.app_context():
+        db = get_db()
+
+    populate_mock_db(
+        db,
+        {
+            "tracks": [{"track_id": 1}, {"track_id": 2}],
+            "plays": [
+                {"id": 1, "item_id": 1, "created_at": TIMESTAMP},
+                {"id": 2, "item_id": 1, "created_at": TIMESTAMP},
+                {"id": 3, "item_id": 2, "created_at": TIMESTAMP},
+                {"id": 4, "item_id": 2, "created_at": TIMESTAMP},
+                {"id": 5, "item_id": 2, "created_at": TIMESTAMP},
+            ],
+            # hourly counts were rolled up to play 4, monthly counts to play 2
+            "hourly_play_counts": [{"hourly_timestamp": TIMESTAMP, "play_count": 4}],
+            "aggregate_monthly_plays": [
+                {
+                    "play_item_id": 1,
+                    "timestamp": TIMESTAMP.date().replace(day=1),
+                    "count": 2,
+                }
+            ],
+            "indexing_checkpoints": [
+                {"tablename": HOURLY_PLAY_COUNTS_TABLE_NAME, "last_checkpoint": 4},
+                {
+                    "tablename": AGGREGATE_MONTHLY_PLAYS_TABLE_NAME,
+                    "last_checkpoint": 2,
+                },
+            ],
+        },
+    )
+
+    with db.scoped_session() as session:
+        _index_play_rollups(session)
+
+    populate_mock_db(
+        db,
+        {
+            "plays": [
+                {"id": 6, "item_id": 1, "created_at": TIMESTAMP + timedelta(hours=1)}
+            ]
+        },
+    )
+
+    with db.scoped_session() as session:
+        _index_play_rollups(session)
+
+        hourly_play_counts = (
+            session.query(HourlyPlayCount.hourly_timestamp, HourlyPlayCount.play_count)
+            .order_by(HourlyPlayCount.hourly_timestamp)
+            .all()
+        )
+        assert hourly_play_counts == [
+            (TIMESTAMP, 5),
+            (TIMESTAMP + timedelta(hours=1), 1),
+        ]
+
+        monthly_plays = (
+            session.query(AggregateMonthlyPlay.play_item_id, AggregateMonthlyPlay.count)
+            .order_by(AggregateMonthlyPlay.play_item_id)
+            .all()
+        )
+        assert monthly_plays == [(1, 3), (2, 3)]
+
+        checkpoint = (
+            session.query(IndexingCheckpoint.last_checkpoint)
+            .filter(IndexingCheckpoint.tablename == PLAY_ROLLUPS_CHECKPOINT_NAME)
+            .scalar()
+        )
+        assert checkpoint == 6
@@ -0,0 +1,61 @@
+from integration_tests.utils import populate_mock_db
+from src.models.indexing.block import Block
+from src.models.tracks.track import Track
+from src.queries.get_random_tracks import get_random_track_ids
+from src.tasks.index_random_tracks import index_random_tracks_pool
+from src.utils.db_session import get_db
+from src.utils.redis_connection import get_redis
+from src.utils.redis_constants import random_tracks_pool_redis_key
+
+
+def get_pool(redis):
+    return {int(track_id) for track_id in redis.smembers(random_tracks_pool_redis_key)}
+
+
+def test_index_random_tracks_pool(app):
+    """Tests that the random tracks pool follows track updates and reverts"""
+    with app.app_context():
+        db = get_db()
+        redis = get_redis()
+
+    populate_mock_db(
+        db,
+        {
+            "tracks": [
+                {"track_id": 1},
+                {"track_id": 2},
+                {"track_id": 3, "is_unlisted": True},
+                {"track_id": 4, "is_delete": True},
+            ]
+        },
+    )
+
+    with db.scoped_session() as session:
+        assert index_random_tracks_pool(session, redis) == (2, 0)
+        assert get_pool(redis) == {1, 2}
+        # nothing new
+        assert index_random_tracks_pool(session, redis) is None
+
+    populate_mock_db(
+        db, {"tracks": [{"track_id": 5}, {"track_id": 1, "is_delete": True}]}
+    )
+
+    with db.scoped_session() as session:
+        # only the tracks written since the last run are read
+        assert index_random_tracks_pool(session, redis) == (1, 1)
+        assert get_pool(redis) == {2, 5}
+        assert sorted(get_random_track_ids(redis, 10)) == [2, 5]
+        assert len(get_random_track_ids(redis, 1)) == 1
+
+    # revert the block that deleted track 1
+    with db.scoped_session() as session:
+        session.query(Track).filter(Track.blocknumber == 5).delete()
+        session.query(Track).filter(Track.track_id == 1, Track.blocknumber == 0).update(
+            {"is_current": True}
+        )
+        session.query(Block).filter(Block.number == 5).delete()
+        session.query(Block).filter(Block.number == 4).update({"is_current": True})
+
+    with db.scoped_session() as session:
+        assert index_random_tracks_pool(session, redis) == (3, 0)
+        assert get_pool(redis) == {1, 2, 5}
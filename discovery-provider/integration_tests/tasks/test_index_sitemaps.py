@@ -0,0 +1,59 @@
+import gzip
+from unittest import mock
+
+from integration_tests.utils import populate_mock_db
+from src.models.users.user import User
+from src.queries.get_sitemap import (
+    get_cached_sitemap_index,
+    get_cached_sitemap_page,
+    get_user_page,
+    get_user_slugs,
+)
+from src.tasks.index_sitemaps import build_sitemap
+from src.utils.db_session import get_db
+from src.utils.redis_connection import get_redis
+
+
+@mock.patch("src.queries.get_sitemap.get_client_base_url")
+@mock.patch("src.queries.get_sitemap.set_base_url")
+def test_build_sitemap(mock_set_base_url, mock_get_client_base_url, app):
+    """Tests that sitemaps are pre-rendered and only changed pages are rebuilt"""
+    with app.app_context():
+        db = get_db()
+        redis = get_redis()
+
+    mock_set_base_url.return_value = "https://discoveryprovider.audius.co"
+    mock_get_client_base_url.return_value = "https://audius.co"
+
+    populate_mock_db(
+        db, {"users": [{"user_id": i, "handle": f"user_{i}"} for i in range(20)]}
+    )
+
+    with db.scoped_session() as session:
+        assert build_sitemap(session, redis, "user", 8) == (3, 3)
+
+        # keyset pages match the offset pages
+        for page_number in range(1, 4):
+            assert gzip.decompress(
+                get_cached_sitemap_page(redis, "user", page_number)
+            ) == get_user_page(session, page_number, 8)
+        assert (
+            gzip.decompress(get_cached_sitemap_index(redis, "user"))
+            == b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n  <sitemap>\n    <loc>https://discoveryprovider.audius.co/sitemaps/user/1.xml</loc>\n  </sitemap>\n  <sitemap>\n    <loc>https://discoveryprovider.audius.co/sitemaps/user/2.xml</loc>\n  </sitemap>\n  <sitemap>\n    <loc>https://discoveryprovider.audius.co/sitemaps/user/3.xml</loc>\n  </sitemap>\n</urlset>\n'
+        )
+
+        # nothing changed
+        assert build_sitemap(session, redis, "user", 8) == (3, 0)
+
+    with db.scoped_session() as session:
+        session.query(User).filter(User.user_id == 10).update({"handle_lc": "renamed"})
+        session.query(User).filter(User.user_id >= 16).update({"is_deactivated": True})
+
+    with db.scoped_session() as session:
+        # only the page with the renamed user is rebuilt, the last page is gone
+        assert build_sitemap(session, redis, "user", 8) == (2, 1)
+        assert "renamed" in get_user_slugs(session, 8, 8)
+        assert gzip.decompress(
+            get_cached_sitemap_page(redis, "user", 2)
+        ) == get_user_page(session, 2, 8)
+        assert get_cached_sitemap_page(redis, "user", 3) is None
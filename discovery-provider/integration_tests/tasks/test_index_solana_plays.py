@@ -1,11 +1,11 @@
 import json
 
 from src.solana.solana_transaction_types import ConfirmedSignatureForAddressResult
-from src.tasks.index_solana_plays import (
-    REDIS_TX_CACHE_QUEUE_PREFIX,
+from src.solana.solana_traversal import (
     cache_traversed_tx,
     fetch_traversed_tx_from_cache,
 )
+from src.tasks.index_solana_plays import REDIS_TX_CACHE_QUEUE_PREFIX
 from src.utils.redis_connection import get_redis
 
 mock_tx_result_1: ConfirmedSignatureForAddressResult = {
@@ -41,7 +41,7 @@ def test_cache_traversed_tx(app):
     with app.app_context():
         redis = get_redis()
 
-    cache_traversed_tx(redis, mock_tx_result_1)
+    cache_traversed_tx(redis, REDIS_TX_CACHE_QUEUE_PREFIX, mock_tx_result_1)
     assert_cache_array_length(redis, 1)
     cached_val_array = redis.lrange(REDIS_TX_CACHE_QUEUE_PREFIX, 0, 100)
     cached_first_entry = json.loads(cached_val_array[0])
@@ -62,22 +62,26 @@ def test_fetch_traversed_tx_from_cache(app):
         "memo": None,
     }
 
-    cache_traversed_tx(redis, first_mock_tx)
+    cache_traversed_tx(redis, REDIS_TX_CACHE_QUEUE_PREFIX, first_mock_tx)
     # Confirm that if the latest db slot is greater than the cached value, it is removed from redis
     latest_db_slot = tx_slot + 10
-    fetched_tx = fetch_traversed_tx_from_cache(redis, latest_db_slot)
+    fetched_tx = fetch_traversed_tx_from_cache(
+        redis, REDIS_TX_CACHE_QUEUE_PREFIX, latest_db_slot
+    )
     assert fetched_tx == None
 
     # Confirm the values have been removed from redis queue
     assert_cache_array_length(redis, 0)
 
     # Now, populate 2 entries into redis
-    cache_traversed_tx(redis, first_mock_tx)
-    cache_traversed_tx(redis, mock_tx_result_2)
+    cache_traversed_tx(redis, REDIS_TX_CACHE_QUEUE_PREFIX, first_mock_tx)
+    cache_traversed_tx(redis, REDIS_TX_CACHE_QUEUE_PREFIX, mock_tx_result_2)
 
     assert_cache_array_length(redis, 2)
 
-    fetched_tx = fetch_traversed_tx_from_cache(redis, latest_db_slot)
+    fetched_tx = fetch_traversed_tx_from_cache(
+        redis, REDIS_TX_CACHE_QUEUE_PREFIX, latest_db_slot
+    )
     assert fetched_tx == mock_tx_result_2["signature"]
 
     # Confirm the values have been removed from redis queue
@@ -327,3 +327,63 @@ def test_index_user_listening_history_no_update(app):
         )
 
         assert new_checkpoint == 6
+
+
+def test_index_user_listening_history_chunks(app):
+    """Tests merging plays a chunk at a time dedupes across chunks"""
+
+    # setup
+    with app.app_context():
+        db = get_db()
+
+    # run
+    entities = {
+        "tracks": [
+            {"track_id": 1, "title": "track 1"},
+            {"track_id": 2, "title": "track 2"},
+        ],
+        "users": [
+            {"user_id": 1, "handle": "user-1"},
+            {"user_id": 2, "handle": "user-2"},
+        ],
+        "plays": [
+            {"item_id": 1, "user_id": 1, "created_at": TIMESTAMP_1},
+            {"item_id": 2, "user_id": 1, "created_at": TIMESTAMP_2},
+            {"item_id": 1, "user_id": None, "created_at": TIMESTAMP_2},
+            {"item_id": 2, "user_id": 2, "created_at": TIMESTAMP_3},
+            {"item_id": 1, "user_id": 1, "created_at": TIMESTAMP_4},
+        ],
+    }
+
+    populate_mock_db(db, entities)
+
+    play_counts = []
+    for _ in range(3):
+        with db.scoped_session() as session:
+            play_counts.append(_index_user_listening_history(session, chunk_size=2))
+
+    assert play_counts == [2, 2, 0]
+
+    with db.scoped_session() as session:
+        results: List[UserListeningHistory] = (
+            session.query(UserListeningHistory)
+            .order_by(UserListeningHistory.user_id)
+            .all()
+        )
+
+        assert len(results) == 2
+        assert results[0].listening_history == [
+            {"track_id": 1, "timestamp": str(TIMESTAMP_4)},
+            {"track_id": 2, "timestamp": str(TIMESTAMP_2)},
+        ]
+        assert results[1].listening_history == [
+            {"track_id": 2, "timestamp": str(TIMESTAMP_3)},
+        ]
+
+        new_checkpoint: IndexingCheckpoint = (
+            session.query(IndexingCheckpoint.last_checkpoint)
+            .filter(IndexingCheckpoint.tablename == USER_LISTENING_HISTORY_TABLE_NAME)
+            .scalar()
+        )
+
+        assert new_checkpoint == 5
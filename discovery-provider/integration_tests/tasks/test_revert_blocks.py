@@ -0,0 +1,548 @@
+from unittest import mock
+
+from integration_tests.utils import populate_mock_db
+from sqlalchemy import or_
+from src.models.indexing.block import Block
+from src.models.indexing.ursm_content_node import UrsmContentNode
+from src.models.playlists.playlist import Playlist
+from src.models.social.follow import Follow
+from src.models.social.repost import Repost
+from src.models.social.save import Save
+from src.models.social.subscription import Subscription
+from src.models.tracks.track import Track
+from src.models.tracks.track_route import TrackRoute
+from src.models.users.associated_wallet import AssociatedWallet
+from src.models.users.user import User
+from src.models.users.user_events import UserEvent
+from src.tasks.index import (
+    default_config_start_hash,
+    default_padded_start_hash,
+    revert_blocks,
+)
+from src.tasks.revert_entities import REVERTED_ENTITIES
+from src.utils.db_session import get_db
+
+
+def test_revert_blocks(app):
+    """Tests that reverting several blocks restores the versions before them"""
+    with app.app_context():
+        db = get_db()
+
+    populate_mock_db(
+        db,
+        {
+            # one version per block
+            "tracks": [
+                {"track_id": 1},
+                {"track_id": 1},
+                {"track_id": 1},
+                {"track_id": 2},
+            ],
+            "users": [
+                {"user_id": 1, "is_current": False},
+                {"user_id": 1},
+                {"user_id": 2},
+            ],
+            # reverting a save restores the version before it, unlike the
+            # per-row revert which restored the reverted row itself
+            "saves": [
+                {"user_id": 1, "save_item_id": 1, "is_current": False},
+                {"user_id": 2, "save_item_id": 1},
+                {"user_id": 1, "save_item_id": 1, "is_delete": True},
+            ],
+            # two routes written in block 1, the first slug is restored
+            "track_routes": [
+                {"slug": "c", "track_id": 1, "blocknumber": 1, "is_current": False},
+                {"slug": "b", "track_id": 1, "is_current": False},
+                {"slug": "d", "track_id": 1},
+            ],
+            "associated_wallets": [
+                {"user_id": 1, "wallet": "0x1", "blockhash": hex(0), "blocknumber": 0},
+                {"user_id": 1, "wallet": "0x2", "blockhash": hex(0), "blocknumber": 0},
+                {"user_id": 1, "wallet": "0x3", "blockhash": hex(3), "blocknumber": 3},
+            ],
+        },
+        block_offset=0,
+    )
+
+    with db.scoped_session() as session:
+        session.query(AssociatedWallet).filter(
+            AssociatedWallet.blocknumber == 0
+        ).update({"is_current": False})
+        for block in session.query(Block).filter(Block.number > 0).all():
+            block.parenthash = hex(block.number - 1)
+
+    with db.scoped_session() as session:
+        # newest block first, as built by update_task
+        revert_blocks_list = (
+            session.query(Block)
+            .filter(Block.number >= 2)
+            .order_by(Block.number.desc())
+            .all()
+        )
+        session.expunge_all()
+
+    revert_blocks(mock.Mock(), db, revert_blocks_list)
+
+    with db.scoped_session() as session:
+        blocks = session.query(Block).order_by(Block.number).all()
+        assert [(block.number, block.is_current) for block in blocks] == [
+            (0, False),
+            (1, True),
+        ]
+
+        tracks = session.query(Track).order_by(Track.blocknumber).all()
+        assert [
+            (track.track_id, track.blocknumber, track.is_current) for track in tracks
+        ] == [(1, 0, False), (1, 1, True)]
+
+        users = session.query(User).order_by(User.blocknumber).all()
+        assert [
+            (user.user_id, user.blocknumber, user.is_current) for user in users
+        ] == [
+            (1, 0, False),
+            (1, 1, True),
+        ]
+
+        saves = session.query(Save).order_by(Save.blocknumber).all()
+        assert [
+            (save.user_id, save.blocknumber, save.is_current, save.is_delete)
+            for save in saves
+        ] == [(1, 0, True, False), (2, 1, True, False)]
+
+        routes = session.query(TrackRoute).order_by(TrackRoute.slug).all()
+        assert [(route.slug, route.is_current) for route in routes] == [
+            ("b", True),
+            ("c", False),
+        ]
+
+        wallets = session.query(AssociatedWallet).order_by(AssociatedWallet.wallet)
+        assert [(wallet.wallet, wallet.is_current) for wallet in wallets] == [
+            ("0x1", True),
+            ("0x2", True),
+        ]
+
+
+def revert_blocks_per_row(session, revert_blocks_list):
+    """The revert of revert_blocks before revert_entities, reverting each row of
+    each block with a lookup of its previous version"""
+    for revert_block in revert_blocks_list:
+        # Cache relevant information about current block
+        revert_hash = revert_block.blockhash
+        revert_block_number = revert_block.number
+        parent_hash = revert_block.parenthash
+
+        # Special case for default start block value of 0x0 / 0x0...0
+        if revert_block.parenthash == default_padded_start_hash:
+            parent_hash = default_config_start_hash
+
+        # Update newly current block row and outdated row (indicated by current block's parent hash)
+        session.query(Block).filter(Block.blockhash == revert_hash).update(
+            {"is_current": False}
+        )
+        session.query(Block).filter(Block.blockhash == parent_hash).update(
+            {"is_current": True}
+        )
+
+        # aggregate all transactions in current block
+        revert_save_entries = (
+            session.query(Save).filter(Save.blockhash == revert_hash).all()
+        )
+        revert_repost_entries = (
+            session.query(Repost).filter(Repost.blockhash == revert_hash).all()
+        )
+        revert_follow_entries = (
+            session.query(Follow).filter(Follow.blockhash == revert_hash).all()
+        )
+        revert_subscription_entries = (
+            session.query(Subscription)
+            .filter(Subscription.blockhash == revert_hash)
+            .all()
+        )
+        revert_playlist_entries = (
+            session.query(Playlist).filter(Playlist.blockhash == revert_hash).all()
+        )
+        revert_track_entries = (
+            session.query(Track).filter(Track.blockhash == revert_hash).all()
+        )
+        revert_user_entries = (
+            session.query(User).filter(User.blockhash == revert_hash).all()
+        )
+        revert_ursm_content_node_entries = (
+            session.query(UrsmContentNode)
+            .filter(UrsmContentNode.blockhash == revert_hash)
+            .all()
+        )
+        revert_associated_wallets = (
+            session.query(AssociatedWallet)
+            .filter(AssociatedWallet.blockhash == revert_hash)
+            .all()
+        )
+        revert_user_events_entries = (
+            session.query(UserEvent).filter(UserEvent.blockhash == revert_hash).all()
+        )
+        revert_track_routes = (
+            session.query(TrackRoute).filter(TrackRoute.blockhash == revert_hash).all()
+        )
+
+        # Revert all of above transactions
+        for save_to_revert in revert_save_entries:
+            previous_save_entry = (
+                session.query(Save)
+                .filter(Save.user_id == save_to_revert.user_id)
+                .filter(Save.save_item_id == save_to_revert.save_item_id)
+                .filter(Save.save_type == save_to_revert.save_type)
+                .order_by(Save.blocknumber.desc())
+                .first()
+            )
+            if previous_save_entry:
+                previous_save_entry.is_current = True
+            session.delete(save_to_revert)
+
+        for repost_to_revert in revert_repost_entries:
+            previous_repost_entry = (
+                session.query(Repost)
+                .filter(Repost.user_id == repost_to_revert.user_id)
+                .filter(Repost.repost_item_id == repost_to_revert.repost_item_id)
+                .filter(Repost.repost_type == repost_to_revert.repost_type)
+                .order_by(Repost.blocknumber.desc())
+                .first()
+            )
+            if previous_repost_entry:
+                previous_repost_entry.is_current = True
+            session.delete(repost_to_revert)
+
+        for follow_to_revert in revert_follow_entries:
+            previous_follow_entry = (
+                session.query(Follow)
+                .filter(Follow.follower_user_id == follow_to_revert.follower_user_id)
+                .filter(Follow.followee_user_id == follow_to_revert.followee_user_id)
+                .order_by(Follow.blocknumber.desc())
+                .first()
+            )
+            if previous_follow_entry:
+                previous_follow_entry.is_current = True
+            session.delete(follow_to_revert)
+
+        for subscription_to_revert in revert_subscription_entries:
+            previous_subscription_entry = (
+                session.query(Subscription)
+                .filter(
+                    Subscription.subscriber_id == subscription_to_revert.subscriber_id
+                )
+                .filter(Subscription.user_id == subscription_to_revert.user_id)
+                .filter(Subscription.blocknumber < revert_block_number)
+                .order_by(Subscription.blocknumber.desc())
+                .first()
+            )
+            if previous_subscription_entry:
+                previous_subscription_entry.is_current = True
+            session.delete(subscription_to_revert)
+
+        for playlist_to_revert in revert_playlist_entries:
+            previous_playlist_entry = (
+                session.query(Playlist)
+                .filter(Playlist.playlist_id == playlist_to_revert.playlist_id)
+                .filter(Playlist.blocknumber < revert_block_number)
+                .order_by(Playlist.blocknumber.desc())
+                .first()
+            )
+            if previous_playlist_entry:
+                previous_playlist_entry.is_current = True
+            session.delete(playlist_to_revert)
+
+        for track_to_revert in revert_track_entries:
+            previous_track_entry = (
+                session.query(Track)
+                .filter(Track.track_id == track_to_revert.track_id)
+                .filter(Track.blocknumber < revert_block_number)
+                .order_by(Track.blocknumber.desc())
+                .first()
+            )
+            if previous_track_entry:
+                previous_track_entry.is_current = True
+            session.delete(track_to_revert)
+
+        for ursm_content_node_to_revert in revert_ursm_content_node_entries:
+            previous_ursm_content_node_entry = (
+                session.query(UrsmContentNode)
+                .filter(
+                    UrsmContentNode.cnode_sp_id
+                    == ursm_content_node_to_revert.cnode_sp_id
+                )
+                .filter(UrsmContentNode.blocknumber < revert_block_number)
+                .order_by(UrsmContentNode.blocknumber.desc())
+                .first()
+            )
+            if previous_ursm_content_node_entry:
+                previous_ursm_content_node_entry.is_current = True
+            session.delete(ursm_content_node_to_revert)
+
+        for user_to_revert in revert_user_entries:
+            previous_user_entry = (
+                session.query(User)
+                .filter(
+                    User.user_id == user_to_revert.user_id,
+                    User.blocknumber < revert_block_number,
+                    or_(User.is_current == True, User.is_current == False),
+                )
+                .order_by(User.blocknumber.desc())
+                .first()
+            )
+            if previous_user_entry:
+                previous_user_entry.is_current = True
+            session.delete(user_to_revert)
+
+        for associated_wallets_to_revert in revert_associated_wallets:
+            user_id = associated_wallets_to_revert.user_id
+            previous_associated_wallet_entry = (
+                session.query(AssociatedWallet)
+                .filter(AssociatedWallet.user_id == user_id)
+                .filter(AssociatedWallet.blocknumber < revert_block_number)
+                .order_by(AssociatedWallet.blocknumber.desc())
+                .first()
+            )
+            if previous_associated_wallet_entry:
+                session.query(AssociatedWallet).filter(
+                    AssociatedWallet.user_id == user_id
+                ).filter(
+                    AssociatedWallet.blocknumber
+                    == previous_associated_wallet_entry.blocknumber
+                ).update(
+                    {"is_current": True}
+                )
+            session.delete(associated_wallets_to_revert)
+
+        for user_events_to_revert in revert_user_events_entries:
+            user_id = user_events_to_revert.user_id
+            previous_user_events_entry = (
+                session.query(UserEvent)
+                .filter(UserEvent.user_id == user_id)
+                .filter(UserEvent.blocknumber < revert_block_number)
+                .order_by(UserEvent.blocknumber.desc())
+                .first()
+            )
+            if previous_user_events_entry:
+                session.query(UserEvent).filter(UserEvent.user_id == user_id).filter(
+                    UserEvent.blocknumber == previous_user_events_entry.blocknumber
+                ).update({"is_current": True})
+            session.delete(user_events_to_revert)
+
+        for track_route_to_revert in revert_track_routes:
+            previous_track_route_entry = (
+                session.query(TrackRoute)
+                .filter(
+                    TrackRoute.track_id == track_route_to_revert.track_id,
+                    TrackRoute.blocknumber < revert_block_number,
+                )
+                .order_by(TrackRoute.blocknumber.desc(), TrackRoute.slug.asc())
+                .first()
+            )
+            if previous_track_route_entry:
+                previous_track_route_entry.is_current = True
+            session.delete(track_route_to_revert)
+
+        # Remove outdated block entry
+        session.query(Block).filter(Block.blockhash == revert_hash).delete()
+
+
+# Saves, reposts and follows get their previous version restored by
+# revert_entities, the per-row lookup had no blocknumber bound so it found
+# the reverted row itself and left the entity without a current version
+RESTORED_PREVIOUS_VERSION_TABLES = {"saves", "reposts", "follows"}
+
+
+def get_table_contents(session):
+    """Returns the rows of the block table and of every reverted entity table"""
+    tables = [Block.__table__] + [
+        entity.model.__table__ for entity in REVERTED_ENTITIES
+    ]
+    return {
+        table.name: sorted(
+            (dict(row) for row in session.execute(table.select())), key=repr
+        )
+        for table in tables
+    }
+
+
+def get_current_versions(table_name, rows):
+    """Returns the key and blocknumber of the current rows of a table"""
+    entity = next(
+        entity
+        for entity in REVERTED_ENTITIES
+        if entity.model.__tablename__ == table_name
+    )
+    return {
+        (*[row[column] for column in entity.key_columns], row["blocknumber"])
+        for row in rows
+        if row["is_current"]
+    }
+
+
+def without_is_current(rows):
+    return sorted(
+        ({k: v for k, v in row.items() if k != "is_current"} for row in rows),
+        key=repr,
+    )
+
+
+def test_revert_blocks_matches_per_row_revert(app):
+    """Tests that reverting several blocks of every entity table leaves the same
+    rows as the per-row revert, other than the restored previous versions"""
+    with app.app_context():
+        db = get_db()
+
+    populate_mock_db(
+        db,
+        {
+            # track 1 is rewritten in reverted blocks, track 2 is created in one
+            "tracks": [
+                {"track_id": 1},
+                {"track_id": 1},
+                {"track_id": 1},
+                {"track_id": 1},
+                {"track_id": 2},
+            ],
+            "users": [
+                {"user_id": 1, "is_current": False},
+                {"user_id": 2},
+                {"user_id": 1, "is_current": False},
+                {"user_id": 1},
+                {"user_id": 3},
+            ],
+            "playlists": [
+                {"playlist_id": 1, "is_current": False},
+                {"playlist_id": 1, "is_current": False},
+                {"playlist_id": 1, "is_current": False},
+                {"playlist_id": 1},
+                {"playlist_id": 2},
+            ],
+            "saves": [
+                {"user_id": 1, "save_item_id": 1, "is_current": False},
+                {"user_id": 2, "save_item_id": 1},
+                {"user_id": 1, "save_item_id": 1, "is_current": False},
+                {"user_id": 1, "save_item_id": 1, "is_delete": True},
+                {"user_id": 3, "save_item_id": 2},
+            ],
+            "reposts": [
+                {"user_id": 1, "repost_item_id": 1, "is_current": False},
+                {"user_id": 1, "repost_item_id": 1, "is_current": False},
+                {"user_id": 1, "repost_item_id": 1, "is_delete": True},
+                {"user_id": 2, "repost_item_id": 1},
+                {"user_id": 3, "repost_item_id": 1},
+            ],
+            "follows": [
+                {"follower_user_id": 2, "followee_user_id": 3, "is_current": False},
+                {"follower_user_id": 1, "followee_user_id": 2},
+                {"follower_user_id": 1, "followee_user_id": 3},
+                {"follower_user_id": 2, "followee_user_id": 3},
+                {"follower_user_id": 3, "followee_user_id": 1},
+            ],
+            "subscriptions": [
+                {"subscriber_id": 2, "user_id": 3},
+                {"subscriber_id": 1, "user_id": 2, "is_current": False},
+                {"subscriber_id": 3, "user_id": 3},
+                {"subscriber_id": 1, "user_id": 2, "is_delete": True},
+                {"subscriber_id": 3, "user_id": 2},
+            ],
+            # two routes in block 1, the first slug is restored
+            "track_routes": [
+                {"slug": "c", "track_id": 1, "blocknumber": 1, "is_current": False},
+                {"slug": "b", "track_id": 1, "is_current": False},
+                {"slug": "d", "track_id": 1, "is_current": False},
+                {"slug": "e", "track_id": 1},
+                {"slug": "f", "track_id": 2},
+            ],
+            # wallets of one version are restored together
+            "associated_wallets": [
+                {"user_id": 1, "wallet": "0x1", "blockhash": hex(1), "blocknumber": 1},
+                {"user_id": 1, "wallet": "0x2", "blockhash": hex(1), "blocknumber": 1},
+                {"user_id": 1, "wallet": "0x3", "blockhash": hex(3), "blocknumber": 3},
+                {"user_id": 2, "wallet": "0x4", "blockhash": hex(4), "blocknumber": 4},
+            ],
+            "ursm_content_nodes": [
+                {"cnode_sp_id": 1, "blockhash": hex(0), "blocknumber": 0},
+                {"cnode_sp_id": 1, "blockhash": hex(2), "blocknumber": 2},
+                {"cnode_sp_id": 2, "blockhash": hex(4), "blocknumber": 4},
+            ],
+        },
+        block_offset=0,
+    )
+
+    with db.scoped_session() as session:
+        # versions of a subscription differ by txhash
+        session.query(Subscription).update(
+            {"txhash": Subscription.blockhash}, synchronize_session=False
+        )
+        session.query(AssociatedWallet).filter(
+            AssociatedWallet.blocknumber == 1
+        ).update({"is_current": False})
+        session.query(UrsmContentNode).filter(
+            UrsmContentNode.cnode_sp_id == 1, UrsmContentNode.blocknumber == 0
+        ).update({"is_current": False})
+        session.add_all(
+            [
+                UserEvent(
+                    id=1, blockhash=hex(0), blocknumber=0, is_current=False, user_id=1
+                ),
+                UserEvent(
+                    id=2, blockhash=hex(2), blocknumber=2, is_current=False, user_id=1
+                ),
+                UserEvent(
+                    id=3, blockhash=hex(3), blocknumber=3, is_current=True, user_id=1
+                ),
+                UserEvent(
+                    id=4, blockhash=hex(4), blocknumber=4, is_current=True, user_id=2
+                ),
+            ]
+        )
+        for block in session.query(Block).filter(Block.number > 0).all():
+            block.parenthash = hex(block.number - 1)
+
+    with db.scoped_session() as session:
+        # newest block first, as built by update_task
+        revert_blocks_list = (
+            session.query(Block)
+            .filter(Block.number >= 2)
+            .order_by(Block.number.desc())
+            .all()
+        )
+        session.expunge_all()
+
+    # run the per-row revert on the fixture, then roll it back
+    session = db.session()
+    try:
+        revert_blocks_per_row(session, revert_blocks_list)
+        session.flush()
+        per_row_contents = get_table_contents(session)
+    finally:
+        session.rollback()
+        session.close()
+
+    revert_blocks(mock.Mock(), db, revert_blocks_list)
+
+    with db.scoped_session() as session:
+        contents = get_table_contents(session)
+
+    assert contents.keys() == per_row_contents.keys()
+    for table_name, rows in contents.items():
+        per_row_rows = per_row_contents[table_name]
+        assert rows, table_name
+        if table_name not in RESTORED_PREVIOUS_VERSION_TABLES:
+            assert rows == per_row_rows, table_name
+            continue
+
+        assert without_is_current(rows) == without_is_current(per_row_rows), table_name
+        # the only difference is the previous versions restored after the
+        # reverted rows
+        per_row_current_versions = get_current_versions(table_name, per_row_rows)
+        current_versions = get_current_versions(table_name, rows)
+        assert per_row_current_versions <= current_versions, table_name
+        assert (
+            current_versions - per_row_current_versions
+            == {
+                "saves": {(1, 1, "track", 0)},
+                "reposts": {(1, 1, "track", 1)},
+                "follows": {(2, 3, 0)},
+            }[table_name]
+        )
@@ -0,0 +1,120 @@
+from unittest.mock import create_autospec
+
+import pytest
+from src.solana.solana_backfill import SolanaBackfill
+from src.solana.solana_client_manager import SolanaClientManager
+from src.utils.db_session import get_db
+from src.utils.redis_connection import get_redis
+
+PAGE_SIZE = 10
+
+# Newest first, like getSignaturesForAddress
+transactions = [{"slot": slot, "signature": f"sig{slot}"} for slot in range(35, 0, -1)]
+
+
+def get_signatures_for_address(program, before=None, limit=None):
+    start = 0
+    if before:
+        start = [tx["signature"] for tx in transactions].index(before) + 1
+    return {"result": transactions[start : start + PAGE_SIZE]}
+
+
+class MockIndexer:
+    """Indexes transactions into a set of signatures"""
+
+    def __init__(self, indexed_slot):
+        self.indexed_tx_sigs = {
+            tx["signature"] for tx in transactions if tx["slot"] <= indexed_slot
+        }
+        self.processed_tx_sigs = []
+        self.fail = False
+
+    def get_indexed_tx_sigs(self, tx_sigs):
+        return self.indexed_tx_sigs.intersection(tx_sigs)
+
+    def process_segment(self, txs):
+        if self.fail:
+            raise Exception("Failed to process segment")
+        tx_sigs = [tx["signature"] for tx in txs]
+        self.processed_tx_sigs.extend(tx_sigs)
+        self.indexed_tx_sigs.update(tx_sigs)
+
+
+def get_backfill(app, indexer):
+    with app.app_context():
+        db = get_db()
+        redis = get_redis()
+
+    solana_client_manager_mock = create_autospec(SolanaClientManager)
+    solana_client_manager_mock.get_signatures_for_address.side_effect = (
+        get_signatures_for_address
+    )
+    return SolanaBackfill(
+        db,
+        redis,
+        solana_client_manager_mock,
+        "program",
+        "test",
+        indexer.get_indexed_tx_sigs,
+        indexer.process_segment,
+        max_workers=2,
+    )
+
+
+def test_backfill_commits_missing_segments(app):
+    indexer = MockIndexer(indexed_slot=8)
+    backfill = get_backfill(app, indexer)
+
+    assert backfill.should_run(8, None) == False
+    assert backfill.run(8) == True
+    assert sorted(indexer.processed_tx_sigs) == sorted(
+        tx["signature"] for tx in transactions if tx["slot"] > 8
+    )
+    # hands off to the tail following loop
+    assert not backfill.is_in_progress()
+    assert not backfill.redis.exists(backfill.segments_key)
+
+
+def test_backfill_resumes_from_checkpoints(app):
+    indexer = MockIndexer(indexed_slot=8)
+    backfill = get_backfill(app, indexer)
+
+    # only the newest page is discovered in the first run
+    assert backfill.run(8, max_pages=1) == False
+    assert indexer.processed_tx_sigs == [f"sig{slot}" for slot in range(35, 25, -1)]
+    assert backfill.should_run(35, None)
+
+    # the discovered segment stays checkpointed when it fails
+    indexer.fail = True
+    with pytest.raises(Exception):
+        backfill.run(35, max_pages=1)
+    assert backfill.redis.hlen(backfill.segments_key) == 1
+
+    # the backfill resumes from the slot it started at and
+    # every missing transaction is processed once
+    indexer.fail = False
+    assert backfill.run(35) == True
+    assert sorted(indexer.processed_tx_sigs) == sorted(
+        tx["signature"] for tx in transactions if tx["slot"] > 8
+    )
+    assert not backfill.is_in_progress()
+
+
+def test_backfill_survives_lost_redis_state(app):
+    indexer = MockIndexer(indexed_slot=8)
+    backfill = get_backfill(app, indexer)
+
+    # the newest segments are committed, moving the latest indexed slot to the tail
+    assert backfill.run(8, max_pages=2) == False
+    assert len(indexer.processed_tx_sigs) == 20
+
+    backfill.redis.flushall()
+
+    # the backfill is still in progress and walks back from the tail again
+    # to the slot it started from, so no segment is skipped
+    assert backfill.should_run(35, None)
+    assert backfill.run(35) == True
+    assert sorted(indexer.processed_tx_sigs) == sorted(
+        tx["signature"] for tx in transactions if tx["slot"] > 8
+    )
+    assert not backfill.should_run(35, None)
@@ -5,27 +5,29 @@ from integration_tests.utils import populate_mock_db
 from src.models.tracks.track import Track
 from src.tasks.update_track_is_available import (
     ALL_UNAVAILABLE_TRACKS_REDIS_KEY,
-    _get_redis_set_members_as_list,
-    check_track_is_available,
+    bitset_to_track_ids,
     fetch_unavailable_track_ids,
     fetch_unavailable_track_ids_in_network,
+    get_unavailable_track_ids,
     get_unavailable_tracks_redis_key,
     query_replica_set_by_track_id,
-    query_tracks_by_track_ids,
+    track_ids_to_bitset,
     update_tracks_is_available_status,
 )
 from src.utils.db_session import get_db
 from src.utils.redis_connection import get_redis
+from src.utils.redis_constants import UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY
 
 logger = logging.getLogger(__name__)
 
 
-def _mock_response(json_data, status=200, raise_for_status=None):
+def _mock_response(json_data, status=200, raise_for_status=None, headers=None):
     """Mock out request.get response"""
     mock_resp = mock.Mock()
 
     mock_resp.json = mock.Mock(return_value=json_data)
     mock_resp.status_code = status
+    mock_resp.headers = headers or {}
 
     mock_resp.raise_for_status = mock.Mock()
     if raise_for_status:
@@ -53,37 +55,171 @@ def test_fetch_unavailable_track_ids_in_network(
 
     spID_1_unavailable_tracks = [1, 2, 3, 4]
     spID_2_unavailable_tracks = [4, 5, 6, 7]
-    mock_fetch_unavailable_track_ids.side_effect = [
-        spID_1_unavailable_tracks,
-        spID_2_unavailable_tracks,
-    ]
+
+    def mock_fetch(endpoint, etag=None):
+        if endpoint == "http://content_node.com":
+            return spID_1_unavailable_tracks, "etag1"
+        return spID_2_unavailable_tracks, None
+
+    mock_fetch_unavailable_track_ids.side_effect = mock_fetch
 
     with app.app_context():
         redis = get_redis()
         db = get_db()
 
+    _seed_db_with_data(db)
+
     with db.scoped_session() as session:
         fetch_unavailable_track_ids_in_network(session, redis, None, None)
 
     # Check that redis adds track ids as expected
+    assert (
+        bitset_to_track_ids(redis.get(get_unavailable_tracks_redis_key(1)))
+        == spID_1_unavailable_tracks
+    )
+    assert (
+        bitset_to_track_ids(redis.get(get_unavailable_tracks_redis_key(2)))
+        == spID_2_unavailable_tracks
+    )
+    assert bitset_to_track_ids(redis.get(ALL_UNAVAILABLE_TRACKS_REDIS_KEY)) == [
+        1,
+        2,
+        3,
+        4,
+        5,
+        6,
+        7,
+    ]
 
-    spID_1_unavailable_tracks_redis = set(
-        _get_redis_set_members_as_list(redis, get_unavailable_tracks_redis_key(1))
+    # The ETag of the last response is sent with the next request
+    mock_fetch_unavailable_track_ids.reset_mock()
+    mock_fetch_unavailable_track_ids.side_effect = lambda endpoint, etag=None: (
+        None,
+        etag,
     )
-    for id in spID_1_unavailable_tracks:
-        assert id in spID_1_unavailable_tracks_redis
+    with db.scoped_session() as session:
+        fetch_unavailable_track_ids_in_network(session, redis, None, None)
 
-    spID_2_unavailable_tracks_redis = set(
-        _get_redis_set_members_as_list(redis, get_unavailable_tracks_redis_key(2))
+    mock_fetch_unavailable_track_ids.assert_any_call("http://content_node.com", "etag1")
+    mock_fetch_unavailable_track_ids.assert_any_call("http://content_node2.com", None)
+    assert redis.hget(UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY, 1) == b"etag1"
+
+    # Unchanged blacklists are kept
+    assert (
+        bitset_to_track_ids(redis.get(get_unavailable_tracks_redis_key(1)))
+        == spID_1_unavailable_tracks
     )
-    for id in spID_2_unavailable_tracks:
-        assert id in spID_2_unavailable_tracks_redis
+    assert bitset_to_track_ids(redis.get(ALL_UNAVAILABLE_TRACKS_REDIS_KEY)) == [
+        1,
+        2,
+        3,
+        4,
+        5,
+        6,
+        7,
+    ]
+
+
+@mock.patch("src.tasks.update_track_is_available.query_registered_content_node_info")
+@mock.patch("src.tasks.update_track_is_available.fetch_unavailable_track_ids")
+def test_fetch_unavailable_track_ids_in_network_malformed_blacklist(
+    mock_fetch_unavailable_track_ids, mock_query_registered_content_node_info, app
+):
+    mock_query_registered_content_node_info.return_value = [
+        {
+            "endpoint": "http://content_node.com",
+            "spID": 1,
+        },
+        {
+            "endpoint": "http://content_node2.com",
+            "spID": 2,
+        },
+    ]
+
+    def mock_fetch(endpoint, etag=None):
+        if endpoint == "http://content_node.com":
+            # Negative, non int and out of range ids are dropped
+            return [5, -3, 10**12, 11, "7", None, True, 2.0, 10], None
+        # A blacklist of only invalid ids does not abort the task
+        return [-1, -2], None
+
+    mock_fetch_unavailable_track_ids.side_effect = mock_fetch
+
+    with app.app_context():
+        redis = get_redis()
+        db = get_db()
+
+    _seed_db_with_data(db)
+
+    with db.scoped_session() as session:
+        fetch_unavailable_track_ids_in_network(session, redis, None, None)
+
+    assert bitset_to_track_ids(redis.get(get_unavailable_tracks_redis_key(1))) == [
+        5,
+        10,
+    ]
+    assert bitset_to_track_ids(redis.get(get_unavailable_tracks_redis_key(2))) == []
+    assert bitset_to_track_ids(redis.get(ALL_UNAVAILABLE_TRACKS_REDIS_KEY)) == [5, 10]
+
+
+@mock.patch("src.tasks.update_track_is_available.query_registered_content_node_info")
+@mock.patch("src.tasks.update_track_is_available.fetch_unavailable_track_ids")
+def test_fetch_unavailable_track_ids_in_network_unindexed_tracks(
+    mock_fetch_unavailable_track_ids, mock_query_registered_content_node_info, app
+):
+    mock_query_registered_content_node_info.return_value = [
+        {
+            "endpoint": "http://content_node.com",
+            "spID": 1,
+        },
+    ]
+
+    def mock_fetch(endpoint, etag=None):
+        # 304 Not Modified when the ETag of the blacklist is sent
+        if etag == "etag1":
+            return None, etag
+        return [5, 11], "etag1"
+
+    mock_fetch_unavailable_track_ids.side_effect = mock_fetch
+
+    with app.app_context():
+        redis = get_redis()
+        db = get_db()
+
+    _seed_db_with_data(db)
+
+    # Track 11 is not indexed yet, so the ETag is not kept
+    with db.scoped_session() as session:
+        fetch_unavailable_track_ids_in_network(session, redis, None, None)
+
+    assert bitset_to_track_ids(redis.get(get_unavailable_tracks_redis_key(1))) == [5]
+    assert redis.hget(UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY, 1) is None
+
+    populate_mock_db(db, {"tracks": [{"track_id": 11}]})
 
-    all_unavailable_tracks_redis = set(
-        _get_redis_set_members_as_list(redis, ALL_UNAVAILABLE_TRACKS_REDIS_KEY)
+    # The whole blacklist is fetched again once track 11 is indexed
+    with db.scoped_session() as session:
+        fetch_unavailable_track_ids_in_network(session, redis, None, None)
+
+    mock_fetch_unavailable_track_ids.assert_called_with("http://content_node.com", None)
+    assert bitset_to_track_ids(redis.get(get_unavailable_tracks_redis_key(1))) == [
+        5,
+        11,
+    ]
+    assert redis.hget(UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY, 1) == b"etag1"
+
+    # The next fetch is not modified and keeps the bitset
+    with db.scoped_session() as session:
+        fetch_unavailable_track_ids_in_network(session, redis, None, None)
+
+    mock_fetch_unavailable_track_ids.assert_called_with(
+        "http://content_node.com", "etag1"
     )
-    for id in [*spID_1_unavailable_tracks, *spID_2_unavailable_tracks]:
-        assert id in all_unavailable_tracks_redis
+    assert bitset_to_track_ids(redis.get(get_unavailable_tracks_redis_key(1))) == [
+        5,
+        11,
+    ]
+    assert bitset_to_track_ids(redis.get(ALL_UNAVAILABLE_TRACKS_REDIS_KEY)) == [5, 11]
 
 
 @mock.patch("src.tasks.update_track_is_available.requests")
@@ -101,15 +237,24 @@ def test_fetch_unavailable_track_ids(mock_requests, app):
         "signature": "signature",
     }
 
-    mock_requests.get.return_value = _mock_response(mock_return, mock_return)
+    mock_requests.get.return_value = _mock_response(
+        mock_return, headers={"ETag": "etag"}
+    )
 
     fetch_response = fetch_unavailable_track_ids("http://content_node.com")
 
-    assert fetch_response == track_ids
+    assert fetch_response == (track_ids, "etag")
+
+    # Not modified since the ETag
+    mock_requests.get.return_value = _mock_response(None, status=304)
 
+    fetch_response = fetch_unavailable_track_ids("http://content_node.com", "etag")
 
-@mock.patch("src.tasks.update_track_is_available.check_track_is_available")
-def test_update_tracks_is_available_status(mock_check_track_is_available, app):
+    assert fetch_response == (None, "etag")
+    assert mock_requests.get.call_args.kwargs["headers"] == {"If-None-Match": "etag"}
+
+
+def test_update_tracks_is_available_status(app):
     with app.app_context():
         db = get_db()
         redis = get_redis()
@@ -117,8 +262,14 @@ def test_update_tracks_is_available_status(mock_check_track_is_available, app):
     # Setup
     mock_unavailable_tracks = [1, 2, 3, 4, 5, 6, 7]
     _seed_db_with_data(db)
-    redis.sadd(ALL_UNAVAILABLE_TRACKS_REDIS_KEY, *mock_unavailable_tracks)
-    mock_check_track_is_available.return_value = False
+    for spID in [7, 9, 10, 11, 12, 13]:
+        redis.set(
+            get_unavailable_tracks_redis_key(spID),
+            track_ids_to_bitset(mock_unavailable_tracks),
+        )
+    redis.set(
+        ALL_UNAVAILABLE_TRACKS_REDIS_KEY, track_ids_to_bitset(mock_unavailable_tracks)
+    )
 
     update_tracks_is_available_status(db, redis)
 
@@ -146,6 +297,10 @@ def test_update_tracks_is_available_status(mock_check_track_is_available, app):
         for track in tracks:
             assert track[1] == True
 
+    # Tracks that are already unavailable are not queried again
+    with db.scoped_session() as session:
+        assert query_replica_set_by_track_id(session, mock_unavailable_tracks) == []
+
 
 def test_query_replica_set_by_track_id(app):
     """Test that the query returns a mapping of track id, user id, and replica set"""
@@ -164,75 +319,46 @@ def test_query_replica_set_by_track_id(app):
         assert sorted_actual_results == expected_query_results
 
 
-def test_check_track_is_available__return_is_not_available(app):
-    with app.app_context():
-        redis = get_redis()
-
-    spID_2_key = get_unavailable_tracks_redis_key(2)
-    spID_3_key = get_unavailable_tracks_redis_key(3)
-    spID_4_key = get_unavailable_tracks_redis_key(4)
-
-    # Seed redis some initialized data
-    # (1, 2, [3, 4])
-    redis.sadd(spID_2_key, 1)
-    redis.sadd(spID_3_key, 1)
-    redis.sadd(spID_4_key, 1)
-
-    assert False == check_track_is_available(redis, 1, [2, 3, 4])
-
-
-def test_check_track_is_available__return_is_available_1(app):
-    with app.app_context():
-        redis = get_redis()
-
-    spID_2_key = get_unavailable_tracks_redis_key(2)
-    spID_3_key = get_unavailable_tracks_redis_key(3)
+def test_get_unavailable_track_ids__return_is_not_available():
+    # Unavailable on spID = 2, 3, 4
+    unavailable_track_bitsets = {
+        2: track_ids_to_bitset([1]),
+        3: track_ids_to_bitset([1]),
+        4: track_ids_to_bitset([1, 20]),
+    }
 
-    redis.sadd(spID_2_key, 1)
-    redis.sadd(spID_3_key, 1)
-    # Available on spID = 4
+    assert get_unavailable_track_ids([(1, 2, [3, 4])], unavailable_track_bitsets) == [1]
 
-    assert True == check_track_is_available(redis, 1, [2, 3, 4])
 
+def test_get_unavailable_track_ids__return_is_available_1():
+    unavailable_track_bitsets = {
+        2: track_ids_to_bitset([1]),
+        3: track_ids_to_bitset([1]),
+        # Available on spID = 4
+        4: track_ids_to_bitset([2, 20]),
+    }
 
-def test_check_track_is_available__return_is_available_2(app):
-    with app.app_context():
-        redis = get_redis()
+    assert get_unavailable_track_ids([(1, 2, [3, 4])], unavailable_track_bitsets) == []
 
-    spID_2_key = get_unavailable_tracks_redis_key(2)
 
-    redis.sadd(spID_2_key, 1)
-    # Available on spID = 3
-    # Available on spID = 4
+def test_get_unavailable_track_ids__return_is_available_2():
+    unavailable_track_bitsets = {
+        2: track_ids_to_bitset([1]),
+        # Available on spID = 3
+        # Available on spID = 4
+    }
 
-    assert True == check_track_is_available(redis, 1, [2, 3, 4])
+    assert get_unavailable_track_ids([(1, 2, [3, 4])], unavailable_track_bitsets) == []
 
 
-def test_check_track_is_available__return_is_available_3(app):
-    with app.app_context():
-        redis = get_redis()
-
+def test_get_unavailable_track_ids__return_is_available_3():
     # Available on spID = 2
     # Available on spID = 3
     # Available on spID = 4
-
-    assert True == check_track_is_available(redis, 1, [2, 3, 4])
-
-
-def test_query_tracks_by_track_id(app):
-    with app.app_context():
-        db = get_db()
-
-    _seed_db_with_data(db)
-
-    with db.scoped_session() as session:
-        track_ids = [1, 2, 3, 4, 5, 6, 7]
-        tracks = query_tracks_by_track_ids(session, track_ids)
-
-        sorted_track_ids = list(map(lambda track: track.track_id, tracks))
-        sorted_track_ids.sort()
-        assert len(sorted_track_ids) == len(track_ids)
-        assert sorted_track_ids == track_ids
+    # Tracks of users without a replica set are available
+    assert (
+        get_unavailable_track_ids([(1, 2, [3, 4]), (2, None, [None, None])], {}) == []
+    )
 
 
 @mock.patch("src.tasks.update_track_is_available.query_registered_content_node_info")
@@ -275,13 +401,13 @@ def test_update_track_is_available(
         endpoint = args[0]
         spID = int(endpoint.split("content_node")[1].split(".com")[0])
         if spID == 7 or spID == 9 or spID == 13:
-            return [1, 2]
+            return [1, 2], None
         elif spID == 10 or spID == 11:
-            return [3, 4]
+            return [3, 4], None
         elif spID == 12:
-            return [3, 4, 5, 6, 7]
+            return [3, 4, 5, 6, 7], None
         else:
-            return []
+            return [], None
 
     mocker.patch(
         "src.tasks.update_track_is_available.fetch_unavailable_track_ids",
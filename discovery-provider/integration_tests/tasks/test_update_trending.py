@@ -1,10 +1,17 @@
 import logging
 from datetime import datetime, timedelta
 
+import pytest
 from integration_tests.utils import populate_mock_db
+from sqlalchemy.sql import text
 from src.models.social.aggregate_interval_plays import t_aggregate_interval_plays
 from src.models.tracks.track_trending_score import TrackTrendingScore
 from src.models.tracks.trending_param import t_trending_params
+from src.queries.get_trending_tracks import (
+    generate_all_unpopulated_trending_from_mat_views,
+    generate_unpopulated_trending_from_mat_views,
+)
+from src.trending_strategies import EJ57D_trending_tracks_strategy
 from src.trending_strategies.EJ57D_trending_tracks_strategy import (
     TrendingTracksStrategyEJ57D,
 )
@@ -14,7 +21,7 @@ logger = logging.getLogger(__name__)
 
 
 # Setup trending from simplified metadata
-def setup_trending(db):
+def setup_trending(db, genres=None):
     # Test data
 
     # test tracks
@@ -260,6 +267,10 @@ def setup_trending(db):
             ],
         ],
     }
+    # spread the tracks across genres, all tracks have no genre by default
+    if genres:
+        for track in test_entities["tracks"]:
+            track["genre"] = genres[track["track_id"] % len(genres)]
 
     populate_mock_db(db, test_entities)
 
@@ -376,3 +387,255 @@ def test_update_track_score_query(app):
         for score in scores:
             assert score.type == udpated_strategy.trending_type.name
             assert score.version == udpated_strategy.version.name
+
+
+def test_update_track_score_query_is_incremental(app):
+    """Test that unchanged scores are not rewritten and decay is applied on read"""
+    with app.app_context():
+        db = get_db()
+
+    # setup
+    setup_trending(db)
+    udpated_strategy = TrendingTracksStrategyEJ57D()
+
+    with db.scoped_session() as session:
+        session.execute("REFRESH MATERIALIZED VIEW aggregate_interval_plays")
+        session.execute("REFRESH MATERIALIZED VIEW trending_params")
+        udpated_strategy.update_track_score_query(session)
+        first_scores = {
+            (score.track_id, score.time_range): score.created_at
+            for score in session.query(TrackTrendingScore).all()
+        }
+
+        udpated_strategy.update_track_score_query(session)
+        second_scores = {
+            (score.track_id, score.time_range): score.created_at
+            for score in session.query(TrackTrendingScore).all()
+        }
+        assert second_scores == first_scores
+
+        # track 3 is two weeks old, so its weekly score decays to the floor
+        stored_score, decayed_score = (
+            session.query(
+                TrackTrendingScore.score,
+                udpated_strategy.get_score_expression("week"),
+            )
+            .filter(
+                TrackTrendingScore.track_id == 3,
+                TrackTrendingScore.time_range == "week",
+            )
+            .one()
+        )
+        assert stored_score > 0
+        assert decayed_score == pytest.approx(stored_score / 100000.0)
+
+
+def test_generate_all_unpopulated_trending_from_mat_views(app):
+    """Test that ranking all slices at once matches ranking each slice"""
+    with app.app_context():
+        db = get_db()
+
+    # setup
+    setup_trending(db)
+    udpated_strategy = TrendingTracksStrategyEJ57D()
+
+    with db.scoped_session() as session:
+        session.execute("REFRESH MATERIALIZED VIEW aggregate_interval_plays")
+        session.execute("REFRESH MATERIALIZED VIEW trending_params")
+        udpated_strategy.update_track_score_query(session)
+
+        genres = ["", "Electronic", None]
+        time_ranges = ["week", "month", "year"]
+        trending = generate_all_unpopulated_trending_from_mat_views(
+            session, genres, time_ranges, udpated_strategy, limit=4
+        )
+
+        assert len(trending) == len(genres) * len(time_ranges)
+        for genre in genres:
+            for time_range in time_ranges:
+                assert trending[
+                    (genre, time_range)
+                ] == generate_unpopulated_trending_from_mat_views(
+                    session, genre, time_range, udpated_strategy, limit=4
+                )
+        # only the first four tracks across all genres are kept
+        assert len(trending[("", "week")][1]) == 4
+        assert trending[("Electronic", "week")] == ([], [])
+
+
+# update_track_score_query before time decay moved to get_score_expression,
+# storing scores with the decay at the time of the update
+baked_decay_track_score_query = text(
+    """
+    begin;
+        DELETE FROM track_trending_scores WHERE type=:type AND version=:version;
+        INSERT INTO track_trending_scores
+            (track_id, genre, type, version, time_range, score, created_at)
+            select
+                tp.track_id,
+                tp.genre,
+                :type,
+                :version,
+                :week_time_range,
+                CASE
+                WHEN tp.owner_follower_count < :y
+                    THEN 0
+                WHEN EXTRACT(DAYS from now() - aip.created_at) > :week
+                    THEN greatest(1.0/:q, pow(:q, greatest(-10, 1.0 - 1.0*EXTRACT(DAYS from now() - aip.created_at)/:week))) * (:N * aip.week_listen_counts + :F * tp.repost_week_count + :O * tp.save_week_count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
+                ELSE (:N * aip.week_listen_counts + :F * tp.repost_week_count + :O * tp.save_week_count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
+                END as week_score,
+                now()
+            from trending_params tp
+            inner join aggregate_interval_plays aip
+                on tp.track_id = aip.track_id;
+        INSERT INTO track_trending_scores
+            (track_id, genre, type, version, time_range, score, created_at)
+            select
+                tp.track_id,
+                tp.genre,
+                :type,
+                :version,
+                :month_time_range,
+                CASE
+                WHEN tp.owner_follower_count < :y
+                    THEN 0
+                WHEN EXTRACT(DAYS from now() - aip.created_at) > :month
+                    THEN greatest(1.0/:q, pow(:q, greatest(-10, 1.0 - 1.0*EXTRACT(DAYS from now() - aip.created_at)/:month))) * (:N * aip.month_listen_counts + :F * tp.repost_month_count + :O * tp.save_month_count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
+                ELSE (:N * aip.month_listen_counts + :F * tp.repost_month_count + :O * tp.save_month_count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
+                END as month_score,
+                now()
+            from trending_params tp
+            inner join aggregate_interval_plays aip
+                on tp.track_id = aip.track_id;
+        INSERT INTO track_trending_scores
+            (track_id, genre, type, version, time_range, score, created_at)
+            select
+                tp.track_id,
+                tp.genre,
+                :type,
+                :version,
+                :all_time_time_range,
+                CASE
+                WHEN tp.owner_follower_count < :y
+                    THEN 0
+                ELSE (:N * ap.count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
+                END as all_time_score,
+                now()
+            from trending_params tp
+            inner join aggregate_plays ap
+                on tp.track_id = ap.play_item_id
+            inner join tracks t
+                on ap.play_item_id = t.track_id
+            where -- same filtering for aggregate_interval_plays
+                t.is_current is True AND
+                t.is_delete is False AND
+                t.is_unlisted is False AND
+                t.stem_of is Null;
+    commit;
+"""
+)
+
+
+def test_trending_decay_on_read_matches_baked_decay(app):
+    """Test that decaying scores on read ranks every genre and time range like
+    the scores with the decay baked in"""
+    with app.app_context():
+        db = get_db()
+
+    # setup
+    genres = ["Electronic", "Rock", "Hip-Hop"]
+    setup_trending(db, genres)
+    # tracks partially decayed in the week and month time ranges
+    populate_mock_db(
+        db,
+        {
+            "tracks": [
+                {
+                    "track_id": 10,
+                    "owner_id": 1,
+                    "genre": "Electronic",
+                    "created_at": datetime.now() - timedelta(days=10),
+                },
+                {
+                    "track_id": 11,
+                    "owner_id": 2,
+                    "genre": "Rock",
+                    "created_at": datetime.now() - timedelta(days=40),
+                },
+            ],
+            "plays": [
+                *[{"id": 1000 + i, "item_id": 10} for i in range(30)],
+                *[
+                    {
+                        "id": 2000 + i,
+                        "item_id": 11,
+                        "created_at": datetime.now() - timedelta(days=20),
+                    }
+                    for i in range(40)
+                ],
+            ],
+            "reposts": [
+                *[{"repost_item_id": 10, "user_id": i + 1} for i in range(15)],
+                *[
+                    {
+                        "repost_item_id": 11,
+                        "user_id": i + 1,
+                        "created_at": datetime.now() - timedelta(days=20),
+                    }
+                    for i in range(18)
+                ],
+            ],
+            "saves": [
+                *[{"save_item_id": 10, "user_id": i + 1} for i in range(12)],
+                *[{"save_item_id": 11, "user_id": i + 1} for i in range(9)],
+            ],
+        },
+    )
+    udpated_strategy = TrendingTracksStrategyEJ57D()
+    time_ranges = ["week", "month", "year", "allTime"]
+
+    def get_all_trending(session):
+        return {
+            (genre, time_range): generate_unpopulated_trending_from_mat_views(
+                session, genre, time_range, udpated_strategy
+            )
+            for genre in [None, *genres]
+            for time_range in time_ranges
+        }
+
+    with db.scoped_session() as session:
+        session.execute("REFRESH MATERIALIZED VIEW aggregate_interval_plays")
+        session.execute("REFRESH MATERIALIZED VIEW trending_params")
+        session.execute(
+            baked_decay_track_score_query,
+            {
+                "week": EJ57D_trending_tracks_strategy.T["week"],
+                "month": EJ57D_trending_tracks_strategy.T["month"],
+                **{
+                    param: getattr(EJ57D_trending_tracks_strategy, param)
+                    for param in ["N", "F", "O", "R", "i", "q", "y"]
+                },
+                "type": udpated_strategy.trending_type.name,
+                "version": udpated_strategy.version.name,
+                "week_time_range": "week",
+                "month_time_range": "month",
+                "all_time_time_range": "allTime",
+            },
+        )
+        baked_decay_trending = get_all_trending(session)
+
+        udpated_strategy.update_track_score_query(session)
+        # every row is rewritten without the decay
+        assert (
+            session.query(TrackTrendingScore)
+            .filter(TrackTrendingScore.track_created_at == None)
+            .count()
+            == 0
+        )
+        trending = get_all_trending(session)
+
+    # the decayed tracks are ranked
+    assert 10 in baked_decay_trending[(None, "week")][1]
+    assert 11 in baked_decay_trending[(None, "month")][1]
+    assert all(baked_decay_trending[(genre, "week")][1] for genre in [None, *genres])
+    assert trending == baked_decay_trending
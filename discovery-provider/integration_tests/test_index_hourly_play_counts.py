@@ -5,9 +5,9 @@ from typing import List
 from sqlalchemy import desc
 from src.models.indexing.indexing_checkpoints import IndexingCheckpoint
 from src.models.social.hourly_play_counts import HourlyPlayCount
-from src.tasks.index_hourly_play_counts import (
-    HOURLY_PLAY_COUNTS_TABLE_NAME,
-    _index_hourly_play_counts,
+from src.tasks.index_play_rollups import (
+    PLAY_ROLLUPS_CHECKPOINT_NAME,
+    _index_play_rollups,
 )
 from src.utils.config import shared_config
 from src.utils.db_session import get_db
@@ -22,7 +22,7 @@ TIMESTAMP = datetime.now().replace(microsecond=0, second=0, minute=0)
 
 
 # Tests
-def test_index_hourly_play_counts_populate(app):
+def test_index_play_rollups_populate(app):
     """Test that hourly play counts populate from empty"""
 
     # setup
@@ -58,7 +58,7 @@ def test_index_hourly_play_counts_populate(app):
 
     # run
     with db.scoped_session() as session:
-        _index_hourly_play_counts(session)
+        _index_play_rollups(session)
 
         results: List[HourlyPlayCount] = (
             session.query(HourlyPlayCount)
@@ -80,13 +80,13 @@ def test_index_hourly_play_counts_populate(app):
 
         new_checkpoint: IndexingCheckpoint = (
             session.query(IndexingCheckpoint.last_checkpoint)
-            .filter(IndexingCheckpoint.tablename == HOURLY_PLAY_COUNTS_TABLE_NAME)
+            .filter(IndexingCheckpoint.tablename == PLAY_ROLLUPS_CHECKPOINT_NAME)
             .scalar()
         )
         assert new_checkpoint == 13
 
 
-def test_index_hourly_play_counts_single_update(app):
+def test_index_play_rollups_single_update(app):
     """Test that hourly play counts update from the previous checkpoint"""
 
     # setup
@@ -127,7 +127,7 @@ def test_index_hourly_play_counts_single_update(app):
             {"hourly_timestamp": TIMESTAMP - timedelta(hours=1), "play_count": 3},
         ],
         "indexing_checkpoints": [
-            {"tablename": HOURLY_PLAY_COUNTS_TABLE_NAME, "last_checkpoint": 13}
+            {"tablename": PLAY_ROLLUPS_CHECKPOINT_NAME, "last_checkpoint": 13}
         ],
     }
 
@@ -135,7 +135,7 @@ def test_index_hourly_play_counts_single_update(app):
 
     # run
     with db.scoped_session() as session:
-        _index_hourly_play_counts(session)
+        _index_play_rollups(session)
 
         results: List[HourlyPlayCount] = (
             session.query(HourlyPlayCount)
@@ -158,13 +158,13 @@ def test_index_hourly_play_counts_single_update(app):
 
         new_checkpoint: IndexingCheckpoint = (
             session.query(IndexingCheckpoint.last_checkpoint)
-            .filter(IndexingCheckpoint.tablename == HOURLY_PLAY_COUNTS_TABLE_NAME)
+            .filter(IndexingCheckpoint.tablename == PLAY_ROLLUPS_CHECKPOINT_NAME)
             .scalar()
         )
         assert new_checkpoint == 16
 
 
-def test_index_hourly_play_counts_idempotent(app):
+def test_index_play_rollups_idempotent(app):
     """Tests multiple updates does not change data"""
 
     # setup
@@ -205,7 +205,7 @@ def test_index_hourly_play_counts_idempotent(app):
             {"hourly_timestamp": TIMESTAMP - timedelta(hours=1), "play_count": 3},
         ],
         "indexing_checkpoints": [
-            {"tablename": HOURLY_PLAY_COUNTS_TABLE_NAME, "last_checkpoint": 13}
+            {"tablename": PLAY_ROLLUPS_CHECKPOINT_NAME, "last_checkpoint": 13}
         ],
     }
 
@@ -213,9 +213,9 @@ def test_index_hourly_play_counts_idempotent(app):
 
     # run
     with db.scoped_session() as session:
-        _index_hourly_play_counts(session)
-        _index_hourly_play_counts(session)
-        _index_hourly_play_counts(session)
+        _index_play_rollups(session)
+        _index_play_rollups(session)
+        _index_play_rollups(session)
 
         results: List[HourlyPlayCount] = (
             session.query(HourlyPlayCount)
@@ -238,13 +238,13 @@ def test_index_hourly_play_counts_idempotent(app):
 
         new_checkpoint: IndexingCheckpoint = (
             session.query(IndexingCheckpoint.last_checkpoint)
-            .filter(IndexingCheckpoint.tablename == HOURLY_PLAY_COUNTS_TABLE_NAME)
+            .filter(IndexingCheckpoint.tablename == PLAY_ROLLUPS_CHECKPOINT_NAME)
             .scalar()
         )
         assert new_checkpoint == 16
 
 
-def test_index_hourly_play_counts_no_change(app):
+def test_index_play_rollups_no_change(app):
     """Test that hourly play counts should not write if there are no new plays"""
 
     # setup
@@ -281,7 +281,7 @@ def test_index_hourly_play_counts_no_change(app):
             {"hourly_timestamp": TIMESTAMP, "play_count": 4},
         ],
         "indexing_checkpoints": [
-            {"tablename": HOURLY_PLAY_COUNTS_TABLE_NAME, "last_checkpoint": 13}
+            {"tablename": PLAY_ROLLUPS_CHECKPOINT_NAME, "last_checkpoint": 13}
         ],
     }
 
@@ -289,7 +289,7 @@ def test_index_hourly_play_counts_no_change(app):
 
     # run
     with db.scoped_session() as session:
-        _index_hourly_play_counts(session)
+        _index_play_rollups(session)
 
         results: List[HourlyPlayCount] = (
             session.query(HourlyPlayCount)
@@ -311,13 +311,13 @@ def test_index_hourly_play_counts_no_change(app):
 
         new_checkpoint: IndexingCheckpoint = (
             session.query(IndexingCheckpoint.last_checkpoint)
-            .filter(IndexingCheckpoint.tablename == HOURLY_PLAY_COUNTS_TABLE_NAME)
+            .filter(IndexingCheckpoint.tablename == PLAY_ROLLUPS_CHECKPOINT_NAME)
             .scalar()
         )
         assert new_checkpoint == 13
 
 
-def test_index_hourly_play_counts_empty_plays(app):
+def test_index_play_rollups_empty_plays(app):
     """Test that hourly play counts should skip indexing if there are no plays"""
 
     # setup
@@ -338,4 +338,4 @@ def test_index_hourly_play_counts_empty_plays(app):
 
     # run
     with db.scoped_session() as session:
-        _index_hourly_play_counts(session)
+        _index_play_rollups(session)
@@ -0,0 +1,31 @@
+from src.tasks.index import save_cid_metadata
+from src.utils.cid_metadata_cache import CIDMetadataCache
+from src.utils.db_session import get_db
+
+
+def test_cid_metadata_cache_reads_cid_data(app):
+    """Tests that CIDs saved to cid_data are served without a gateway fetch"""
+    with app.app_context():
+        db = get_db()
+
+        with db.scoped_session() as session:
+            save_cid_metadata(
+                session,
+                {"cid1": {"user_id": 1}, "cid2": {"track_id": 2}},
+                {"cid1": "user", "cid2": "track"},
+            )
+
+        cache = CIDMetadataCache()
+        with db.scoped_session() as session:
+            cid_metadata = cache.get(
+                session,
+                {"cid1": "user", "cid2": "playlist_data", "cid3": "track"},
+            )
+        # cid2 was saved as a track so it can't be used as playlist metadata
+        assert cid_metadata == {"cid1": {"user_id": 1}}
+        assert cache.counters["db"] == 1
+        assert cache.counters["miss"] == 2
+
+        # db hits are promoted to the in-process LRU
+        assert cache.get(None, {"cid1": "user"}) == {"cid1": {"user_id": 1}}
+        assert cache.counters["lru"] == 1
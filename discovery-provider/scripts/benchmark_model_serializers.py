@@ -0,0 +1,164 @@
+"""
+
+Benchmarks serializing tracks and users with the per-row key discovery of the
+original `helpers.model_to_dictionary` against the compiled serializers in
+src/utils/model_serializers.py.
+
+It builds tracks with their joined owner and route, checks that both approaches
+serialize them to identical JSON, and prints timings.
+
+    PYTHONPATH=. python scripts/benchmark_model_serializers.py
+
+Optionally pass the number of tracks and the number of rounds:
+
+    PYTHONPATH=. python scripts/benchmark_model_serializers.py 1000 20
+
+"""
+
+import json
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect
+from src.models.tracks.track import Track
+from src.models.tracks.track_route import TrackRoute
+from src.models.users.user import User
+from src.utils.helpers import query_result_to_list
+from src.utils.model_serializers import get_model_serializer
+
+
+def legacy_query_result_to_list(query_result):
+    results = []
+    for row in query_result:
+        results.append(legacy_model_to_dictionary(row, None))
+    return results
+
+
+def legacy_model_to_dictionary(model, exclude_keys=None):
+    state = inspect(model)
+    unloaded = state.unloaded
+    model_dict = {}
+
+    columns = model.__table__.columns.keys()
+    relationships = model.__mapper__.relationships.keys()
+    properties = []
+    for key in list(set(dir(model)) - set(columns) - set(relationships)):
+        if hasattr(type(model), key):
+            attr = getattr(type(model), key)
+            if not callable(attr) and isinstance(attr, property):
+                properties.append(key)
+
+    if exclude_keys is None:
+        exclude_keys = []
+    if hasattr(model, "exclude_keys"):
+        exclude_keys.extend(model.exclude_keys)
+
+    assert set(exclude_keys).issubset(set(properties).union(columns))
+
+    for key in columns:
+        if key not in exclude_keys and not key.startswith("_"):
+            model_dict[key] = getattr(model, key)
+
+    for key in properties:
+        if key not in exclude_keys and not key.startswith("_"):
+            model_dict[key] = getattr(model, key)
+
+    for key in relationships:
+        if key not in exclude_keys and not key.startswith("_"):
+            if key in unloaded:
+                continue
+            attr = getattr(model, key)
+            if isinstance(attr, list):
+                model_dict[key] = legacy_query_result_to_list(attr)
+            else:
+                model_dict[key] = legacy_model_to_dictionary(attr)
+
+    return model_dict
+
+
+def build_tracks(num_tracks):
+    now = datetime(2022, 1, 1)
+    tracks = []
+    for i in range(num_tracks):
+        owner_id = i % 100
+        user = User(
+            user_id=owner_id,
+            handle=f"user_{owner_id}",
+            name=f"User {owner_id}",
+            is_current=True,
+            created_at=now,
+            updated_at=now,
+        )
+        route = TrackRoute(
+            slug=f"track-{i}",
+            title_slug=f"track-{i}",
+            collision_id=0,
+            owner_id=owner_id,
+            track_id=i,
+            is_current=True,
+        )
+        tracks.append(
+            Track(
+                track_id=i,
+                owner_id=owner_id,
+                title=f"Track {i}",
+                is_current=True,
+                is_delete=False,
+                created_at=now,
+                updated_at=now,
+                user=[user],
+                _routes=[route],
+            )
+        )
+    return tracks
+
+
+def time_rounds(serialize, rows, num_rounds):
+    start = time.time()
+    for _ in range(num_rounds):
+        result = serialize(rows)
+    return result, time.time() - start
+
+
+def main():
+    num_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    num_rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    tracks = build_tracks(num_tracks)
+    users = [track.user[0] for track in tracks]
+    print(f"{num_tracks} tracks and users, {num_rounds} rounds")
+
+    for name, rows in (("tracks", tracks), ("users", users)):
+        legacy, legacy_duration = time_rounds(
+            legacy_query_result_to_list, rows, num_rounds
+        )
+        compiled, compiled_duration = time_rounds(
+            query_result_to_list, rows, num_rounds
+        )
+        print(
+            f"{name}: legacy {legacy_duration:.3f}s, compiled {compiled_duration:.3f}s"
+        )
+        assert json.dumps(legacy, default=str) == json.dumps(
+            compiled, default=str
+        ), f"serialized {name} mismatch"
+
+    # users selected as column tuples skip building the models
+    serializer = get_model_serializer(User)
+    user_rows = [
+        tuple(getattr(user, column.key) for column in serializer.columns)
+        for user in users
+    ]
+    column_users, column_duration = time_rounds(
+        lambda rows: [serializer.serialize_columns(row) for row in rows],
+        user_rows,
+        num_rounds,
+    )
+    print(f"users from column tuples: {column_duration:.3f}s")
+    assert json.dumps(legacy_query_result_to_list(users), default=str) == json.dumps(
+        column_users, default=str
+    ), "serialized user rows mismatch"
+    print("serialized output matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+
+Benchmarks building related artist MinHash signatures and scores one artist
+at a time with datasketch (how index_related_artists used to work) against
+the vectorized signature matrix in src/queries/get_related_artists_minhash.py.
+
+It generates a synthetic follow graph with power law follower counts, checks
+that both approaches produce identical signatures and scores, and prints timings.
+
+    PYTHONPATH=. python scripts/benchmark_related_artists_minhash.py
+
+Optionally pass the number of artists and users:
+
+    PYTHONPATH=. python scripts/benchmark_related_artists_minhash.py 5000 200000
+
+"""
+
+import sys
+import time
+
+import numpy as np
+from datasketch import MinHash
+from src.queries.get_related_artists_minhash import (
+    MIN_FOLLOWER_REQUIREMENT,
+    MINHASH_SEED,
+    RelatedArtistsIndex,
+    build_signatures,
+    num_perm,
+    top_k,
+)
+
+
+def generate_follows(num_artists, num_users, rng):
+    follower_counts = np.minimum(
+        (rng.pareto(1.2, num_artists) * 50).astype(np.int64) + 1, num_users
+    )
+    return [
+        rng.choice(num_users, size=count, replace=False) for count in follower_counts
+    ]
+
+
+def legacy_related_artists(user_ids, follower_id_arrays):
+    minhashes = {}
+    for user_id, follower_ids in zip(user_ids, follower_id_arrays):
+        mh = MinHash(num_perm=num_perm, seed=MINHASH_SEED)
+        for follower_id in follower_ids:
+            mh.update(str(follower_id).encode("utf8"))
+        minhashes[user_id] = mh
+    build_done = time.time()
+
+    index = RelatedArtistsIndex(
+        user_ids, np.array([minhashes[user_id].hashvalues for user_id in user_ids])
+    )
+    results = {}
+    for user_id in user_ids:
+        mh = minhashes[user_id]
+        if mh.count() < MIN_FOLLOWER_REQUIREMENT:
+            continue
+        scored = []
+        for other_id in index.query_candidates(user_id):
+            if other_id == user_id:
+                continue
+            mh2 = minhashes[other_id]
+            intersection_size = mh.count() + mh2.count() - mh.union(mh, mh2).count()
+            scored.append(
+                (other_id, intersection_size * intersection_size / mh2.count())
+            )
+        scored.sort(key=lambda x: x[1], reverse=True)
+        results[user_id] = scored[:top_k]
+    return minhashes, results, build_done
+
+
+def main():
+    num_artists = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    num_users = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    rng = np.random.default_rng(0)
+    user_ids = list(range(num_artists))
+    follower_id_arrays = generate_follows(num_artists, num_users, rng)
+    print(
+        f"{num_artists} artists, {sum(len(ids) for ids in follower_id_arrays)} follows"
+    )
+
+    start = time.time()
+    minhashes, legacy_results, legacy_build_done = legacy_related_artists(
+        user_ids, follower_id_arrays
+    )
+    legacy_done = time.time()
+    print(
+        f"legacy:     signatures {legacy_build_done - start:.2f}s, "
+        f"total {legacy_done - start:.2f}s"
+    )
+
+    start = time.time()
+    signatures = build_signatures(follower_id_arrays)
+    build_done = time.time()
+    index = RelatedArtistsIndex(user_ids, signatures)
+    results = {user_id: index.get_related_artists(user_id) for user_id in user_ids}
+    done = time.time()
+    print(
+        f"vectorized: signatures {build_done - start:.2f}s, "
+        f"total {done - start:.2f}s"
+    )
+
+    for user_id in user_ids:
+        assert np.array_equal(
+            signatures[user_id], minhashes[user_id].hashvalues
+        ), f"signature mismatch for artist {user_id}"
+        legacy = legacy_results.get(user_id, [])
+        assert [other_id for other_id, _ in results[user_id]] == [
+            other_id for other_id, _ in legacy
+        ], f"related artists mismatch for artist {user_id}"
+        assert np.allclose(
+            [score for _, score in results[user_id]], [score for _, score in legacy]
+        ), f"score mismatch for artist {user_id}"
+    print("signatures and scores match")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,7 +39,10 @@ from src.queries import (
 from src.solana.anchor_program_indexer import AnchorProgramIndexer
 from src.solana.solana_client_manager import SolanaClientManager
 from src.tasks import celery_app
+from src.tasks.index_play_rollups import INDEX_PLAY_ROLLUPS_LOCK
+from src.tasks.index_random_tracks import INDEX_RANDOM_TRACKS_LOCK
 from src.tasks.index_reactions import INDEX_REACTIONS_LOCK
+from src.tasks.index_sitemaps import INDEX_SITEMAPS_LOCK
 from src.tasks.update_track_is_available import UPDATE_TRACK_IS_AVAILABLE_LOCK
 from src.utils import helpers
 from src.utils.cid_metadata_client import CIDMetadataClient
@@ -115,7 +118,12 @@ def create_celery(test_config=None):
     eth_abi_values = helpers.load_eth_abi_values()
 
     # Initialize Solana web3 provider
-    solana_client_manager = SolanaClientManager(shared_config["solana"]["endpoint"])
+    solana_client_manager = SolanaClientManager(
+        shared_config["solana"]["endpoint"],
+        async_rpc_enabled=shared_config["solana"].getboolean(
+            "async_rpc_enabled", fallback=False
+        ),
+    )
 
     global entity_manager
     global contract_addresses
@@ -296,8 +304,7 @@ def configure_celery(celery, test_config=None):
             "src.tasks.index",
             "src.tasks.index_nethermind",
             "src.tasks.index_metrics",
-            "src.tasks.index_aggregate_monthly_plays",
-            "src.tasks.index_hourly_play_counts",
+            "src.tasks.index_play_rollups",
             "src.tasks.vacuum_db",
             "src.tasks.index_network_peers",
             "src.tasks.index_trending",
@@ -320,6 +327,8 @@ def configure_celery(celery, test_config=None):
             "src.tasks.index_aggregate_tips",
             "src.tasks.index_reactions",
             "src.tasks.update_track_is_available",
+            "src.tasks.index_sitemaps",
+            "src.tasks.index_random_tracks",
         ],
         beat_schedule={
             "update_discovery_provider": {
@@ -342,8 +351,8 @@ def configure_celery(celery, test_config=None):
                 "task": "synchronize_metrics",
                 "schedule": timedelta(minutes=SYNCHRONIZE_METRICS_INTERVAL),
             },
-            "index_hourly_play_counts": {
-                "task": "index_hourly_play_counts",
+            "index_play_rollups": {
+                "task": "index_play_rollups",
                 "schedule": timedelta(seconds=30),
             },
             "vacuum_db": {
@@ -402,10 +411,6 @@ def configure_celery(celery, test_config=None):
                 "task": "index_user_listening_history",
                 "schedule": timedelta(seconds=5),
             },
-            "index_aggregate_monthly_plays": {
-                "task": "index_aggregate_monthly_plays",
-                "schedule": timedelta(minutes=5),
-            },
             "prune_plays": {
                 "task": "prune_plays",
                 "schedule": crontab(
@@ -432,7 +437,15 @@ def configure_celery(celery, test_config=None):
             "index_profile_challenge_backfill": {
                 "task": "index_profile_challenge_backfill",
                 "schedule": timedelta(minutes=1),
-            }
+            },
+            "index_sitemaps": {
+                "task": "index_sitemaps",
+                "schedule": timedelta(minutes=30),
+            },
+            "index_random_tracks": {
+                "task": "index_random_tracks",
+                "schedule": timedelta(minutes=1),
+            },
             # UNCOMMENT BELOW FOR MIGRATION DEV WORK
             # "index_solana_user_data": {
             #     "task": "index_solana_user_data",
@@ -492,7 +505,6 @@ def configure_celery(celery, test_config=None):
     redis_inst.delete("network_peers_lock")
     redis_inst.delete("update_metrics_lock")
     redis_inst.delete("update_play_count_lock")
-    redis_inst.delete("index_hourly_play_counts_lock")
     redis_inst.delete("update_discovery_lock")
     redis_inst.delete("aggregate_metrics_lock")
     redis_inst.delete("synchronize_metrics_lock")
@@ -512,6 +524,9 @@ def configure_celery(celery, test_config=None):
     redis_inst.delete("index_trending_lock")
     redis_inst.delete(INDEX_REACTIONS_LOCK)
     redis_inst.delete(UPDATE_TRACK_IS_AVAILABLE_LOCK)
+    redis_inst.delete(INDEX_SITEMAPS_LOCK)
+    redis_inst.delete(INDEX_PLAY_ROLLUPS_LOCK)
+    redis_inst.delete(INDEX_RANDOM_TRACKS_LOCK)
 
     # delete cached final_poa_block in case it has changed
     redis_inst.delete(final_poa_block_redis_key)
@@ -1,9 +1,10 @@
 import logging
 from abc import ABC
 from collections import defaultdict
-from typing import Dict, List, Optional, Set, Tuple, TypedDict, cast
+from typing import Dict, Iterable, List, Optional, Set, Tuple, TypedDict, cast
 
-from sqlalchemy import func
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm.session import Session
 from src.models.rewards.challenge import Challenge, ChallengeType
 from src.models.rewards.user_challenge import UserChallenge
@@ -29,6 +30,55 @@ def fetch_user_challenges(
     return [specifier_map[s] for s in specifiers if s in specifier_map]
 
 
+def fetch_user_challenges_by_specifier(
+    session: Session, specifiers_by_challenge: Dict[str, Iterable[str]]
+) -> Dict[str, Dict[str, UserChallenge]]:
+    """Fetches the user challenges of several challenges in one query.
+    Returns {challenge_id: {specifier: UserChallenge}}. The UserChallenges are
+    not added to the session, they are written back with `upsert_user_challenges`.
+    """
+    keys = [
+        (challenge_id, specifier)
+        for challenge_id, specifiers in specifiers_by_challenge.items()
+        for specifier in specifiers
+    ]
+    user_challenges: Dict[str, Dict[str, UserChallenge]] = {
+        challenge_id: {} for challenge_id in specifiers_by_challenge
+    }
+    if not keys:
+        return user_challenges
+
+    table = UserChallenge.__table__
+    rows = session.execute(
+        select([table]).where(tuple_(table.c.challenge_id, table.c.specifier).in_(keys))
+    ).fetchall()
+    for row in rows:
+        user_challenges[row.challenge_id][row.specifier] = UserChallenge(**dict(row))
+    return user_challenges
+
+
+def upsert_user_challenges(session: Session, user_challenges: List[UserChallenge]):
+    """Writes the user challenges of one challenge in a single INSERT ... ON CONFLICT"""
+    if not user_challenges:
+        return
+    table = UserChallenge.__table__
+    statement = insert(table).values(
+        [
+            {column.name: getattr(user_challenge, column.name) for column in table.c}
+            for user_challenge in user_challenges
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.challenge_id, table.c.specifier],
+        set_={
+            "is_complete": statement.excluded.is_complete,
+            "current_step_count": statement.excluded.current_step_count,
+            "completed_blocknumber": statement.excluded.completed_blocknumber,
+        },
+    )
+    session.execute(statement)
+
+
 class EventMetadata(TypedDict):
     block_number: int
     user_id: int
@@ -126,22 +176,21 @@ class ChallengeManager:
         self._challenge_type = None  # type: ignore
         self._is_active = False
 
-    def process(self, session, event_type: str, event_metadatas: List[EventMetadata]):
-        """Processes a number of events for a particular event type, updating
-        UserChallengeEvents as needed.
+    def get_events_with_specifiers(
+        self, session: Session, event_metadatas: List[EventMetadata]
+    ) -> List[FullEventMetadata]:
+        """Returns the events this challenge should process, one per specifier.
+        Events before the challenge's starting block, or for an inactive challenge,
+        are dropped.
         """
-        logger.info(
-            f"ChallengeManager: processing event type [{event_type}] for challenge [{self.challenge_id}]"
-        )
         if not self._did_init:  # lazy init
             self._init_challenge(session)
 
         # If inactive, do nothing
         if not self._is_active:
-            return
+            return []
 
-        # filter out events that took place before the starting block, returning
-        # early if need be
+        # filter out events that took place before the starting block
         if self._starting_block is not None:
             event_metadatas = list(
                 filter(
@@ -149,8 +198,6 @@ class ChallengeManager:
                     event_metadatas,
                 )
             )
-        if not event_metadatas:
-            return
 
         # Add specifiers
         events_with_specifiers: List[FullEventMetadata] = [
@@ -169,8 +216,36 @@ class ChallengeManager:
         events_with_specifiers_map = {
             event["specifier"]: event for event in events_with_specifiers
         }
-        events_with_specifiers = list(events_with_specifiers_map.values())
+        return list(events_with_specifiers_map.values())
+
+    def process(
+        self,
+        session: Session,
+        event_type: str,
+        event_metadatas: List[EventMetadata],
+        existing_user_challenges: Optional[Dict[str, UserChallenge]] = None,
+    ) -> Optional[List[UserChallenge]]:
+        """Processes a number of events for a particular event type, updating
+        UserChallengeEvents as needed.
 
+        `existing_user_challenges` maps specifiers to this challenge's existing
+        UserChallenges, as fetched by `fetch_user_challenges_by_specifier`. They are
+        fetched here if not given.
+        Returns the UserChallenges written, or None if processing failed and the
+        session was rolled back.
+        """
+        logger.info(
+            f"ChallengeManager: processing event type [{event_type}] for challenge [{self.challenge_id}]"
+        )
+        events_with_specifiers = self.get_events_with_specifiers(
+            session, event_metadatas
+        )
+        if not events_with_specifiers:
+            return []
+
+        events_with_specifiers_map = {
+            event["specifier"]: event for event in events_with_specifiers
+        }
         specifiers: List[str] = [e["specifier"] for e in events_with_specifiers]
 
         # Because we reuse a single session between multiple
@@ -180,21 +255,22 @@ class ChallengeManager:
         # code belongs in a `try` block here.
         try:
             # Gets all user challenges,
-            existing_user_challenges = fetch_user_challenges(
-                session, self.challenge_id, specifiers
-            )
-
-            # Create users that need challenges still
-            existing_specifiers = {
-                challenge.specifier for challenge in existing_user_challenges
-            }
+            if existing_user_challenges is None:
+                existing_user_challenges = fetch_user_challenges_by_specifier(
+                    session, {self.challenge_id: specifiers}
+                )[self.challenge_id]
+            existing_user_challenges_list = [
+                existing_user_challenges[specifier]
+                for specifier in specifiers
+                if specifier in existing_user_challenges
+            ]
 
             # Create new challenges
 
             new_challenge_metadata = [
                 metadata
                 for metadata in events_with_specifiers
-                if metadata["specifier"] not in existing_specifiers
+                if metadata["specifier"] not in existing_user_challenges
             ]
             to_create_metadata: List[FullEventMetadata] = []
             if self._challenge_type == ChallengeType.aggregate:
@@ -203,7 +279,7 @@ class ChallengeManager:
                 # we haven't overriden this via should_create_new_challenge
 
                 # Get *all* UserChallenges per user
-                user_ids = list({e["user_id"] for e in event_metadatas})
+                user_ids = list({e["user_id"] for e in events_with_specifiers})
                 all_user_challenges: List[Tuple[int, int]] = (
                     session.query(
                         UserChallenge.user_id, func.count(UserChallenge.specifier)
@@ -243,26 +319,25 @@ class ChallengeManager:
                 )
                 for metadata in to_create_metadata
             ]
-            logger.warning(f"new challenges ${new_user_challenges}")
+            logger.debug(f"ChallengeManager: new challenges {new_user_challenges}")
 
             # Get the other challenges to update (the ones in progress)
             in_progress_challenges = [
                 challenge
-                for challenge in existing_user_challenges
+                for challenge in existing_user_challenges_list
                 if not challenge.is_complete
             ]
             to_update = in_progress_challenges + new_user_challenges
 
             # Filter out challenges for deactivated users
             to_update_user_ids = list({c.user_id for c in to_update})
-            deactivated_user_ids = (
-                session.query(User.user_id)
-                .filter(
+            deactivated_user_ids = {
+                user_id
+                for (user_id,) in session.query(User.user_id).filter(
                     User.user_id.in_(to_update_user_ids),
                     User.is_deactivated == True,
                 )
-                .all()
-            )
+            }
             to_create_metadata = list(
                 filter(
                     lambda c: c["user_id"] not in deactivated_user_ids,
@@ -297,19 +372,21 @@ class ChallengeManager:
             logger.debug(
                 f"ChallengeManager: Updated challenges from event [{event_type}]: [{to_update}]"
             )
-            # Only add the new ones
-            session.add_all(new_user_challenges)
+            # Write the new and updated challenges in one statement
+            upsert_user_challenges(session, to_update)
 
             # Commit, so if there are DB errors
             # we encounter now and can roll back
             # to keep the session valid
             # for the next manager
             session.commit()
+            return to_update
         except Exception as e:
             logger.warning(
                 f"ChallengeManager: caught error in manager [{self.challenge_id}]: [{e}]. Rolling back"
             )
             session.rollback()
+            return None
 
     def get_user_challenge_state(
         self, session: Session, specifiers: List[str]
@@ -2,10 +2,14 @@ import json
 import logging
 from collections import defaultdict
 from contextlib import contextmanager
-from typing import Any, DefaultDict, Dict, List, Tuple, TypedDict
+from typing import Any, DefaultDict, Dict, List, Set, Tuple, TypedDict
 
 from sqlalchemy.orm.session import Session
-from src.challenges.challenge import ChallengeManager, EventMetadata
+from src.challenges.challenge import (
+    ChallengeManager,
+    EventMetadata,
+    fetch_user_challenges_by_specifier,
+)
 from src.challenges.challenge_event import ChallengeEvent
 from src.challenges.connect_verified_challenge import connect_verified_challenge_manager
 from src.challenges.first_playlist_challenge import first_playlist_challenge_manager
@@ -167,11 +171,46 @@ class ChallengeEventBus:
             return (-1, True)
 
         did_error = False
+
+        # Fetch the existing user challenges of every listening manager at once
+        specifiers_by_challenge: DefaultDict[str, Set[str]] = defaultdict(set)
+        for (event_type, event_dicts) in event_user_dict.items():
+            for listener in self._listeners[event_type]:
+                try:
+                    events_with_specifiers = listener.get_events_with_specifiers(
+                        session, event_dicts
+                    )
+                except Exception as e:
+                    # Leave it to the manager to surface the error when processing
+                    logger.warning(
+                        f"ChallengeEventBus: manager [{listener.challenge_id}] failed to prepare events: [{e}]"
+                    )
+                    continue
+                specifiers_by_challenge[listener.challenge_id].update(
+                    event["specifier"] for event in events_with_specifiers
+                )
+        try:
+            existing_user_challenges = fetch_user_challenges_by_specifier(
+                session, specifiers_by_challenge
+            )
+        except Exception as e:
+            # Managers fall back to fetching their own user challenges
+            logger.warning(
+                f"ChallengeEventBus: error fetching user challenges, rolling back: [{e}]"
+            )
+            session.rollback()
+            existing_user_challenges = {}
+
         for (event_type, event_dicts) in event_user_dict.items():
             listeners = self._listeners[event_type]
             for listener in listeners:
+                challenge_user_challenges = existing_user_challenges.get(
+                    listener.challenge_id
+                )
                 try:
-                    listener.process(session, event_type, event_dicts)
+                    updated_user_challenges = listener.process(
+                        session, event_type, event_dicts, challenge_user_challenges
+                    )
                 except Exception as e:
                     # We really shouldn't see errors from a ChallengeManager (they should handle on their own),
                     # but in case we do, swallow it and continue on
@@ -179,9 +218,25 @@ class ChallengeEventBus:
                         f"ChallengeEventBus: manager [{listener.challenge_id} unexpectedly propogated error: [{e}]"
                     )
                     did_error = True
+                    updated_user_challenges = None
+
+                if challenge_user_challenges is None:
+                    continue
+                if updated_user_challenges is None:
+                    # Processing was rolled back, so the fetched state may no longer
+                    # match the db. Later events for this challenge fetch it again.
+                    existing_user_challenges.pop(listener.challenge_id)
+                    continue
+                # Keep the state current for the next event type this manager listens to
+                for user_challenge in updated_user_challenges:
+                    challenge_user_challenges[user_challenge.specifier] = user_challenge
 
         return (len(events_json), did_error)
 
+    def get_queue_depth(self) -> int:
+        """Returns the number of events waiting to be processed"""
+        return self._redis.llen(REDIS_QUEUE_PREFIX)
+
     # Helpers
 
     def _event_to_json(self, event: str, block_number: int, user_id: int, extra: Dict):
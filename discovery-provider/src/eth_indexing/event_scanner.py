@@ -1,9 +1,11 @@
 import datetime
 import logging
 import time
-from typing import Any, Iterable, Tuple, Type, TypedDict, Union
+from typing import Any, Iterable, List, Optional, Tuple, Type, TypedDict, Union
 
 from eth_abi.codec import ABICodec
+from sqlalchemy import union
+from src.eth_indexing.wallet_index import KnownWalletIndex
 from src.models.indexing.eth_block import EthBlock
 from src.models.users.associated_wallet import AssociatedWallet
 from src.models.users.user import User
@@ -69,6 +71,7 @@ class EventScanner:
         contract: Type[Contract],
         event_type: Type[ContractEvent],
         filters: dict,
+        wallet_index: Optional[KnownWalletIndex] = None,
     ):
         """
         :param db: database handle
@@ -78,6 +81,8 @@ class EventScanner:
         :param state: state manager to keep tracks of last scanned block and persisting events to db
         :param event_type: web3 Event we scan
         :param filters: Filters passed to get_logs e.g. { "address": <token-address> }
+        :param wallet_index: Optional index of user wallets, kept across scans, used to
+            skip the database for transfers between wallets that no user owns
         """
 
         self.logger = logger
@@ -87,6 +92,7 @@ class EventScanner:
         self.web3 = web3
         self.event_type = event_type
         self.filters = filters
+        self.wallet_index = wallet_index
         self.last_scanned_block = MIN_SCAN_START_BLOCK
         self.latest_chain_block = self.web3.eth.block_number
 
@@ -147,7 +153,8 @@ class EventScanner:
     def process_event(
         self, block_timestamp: datetime.datetime, event: TransferEvent
     ) -> str:
-        """Record a ERC-20 transfer in our database."""
+        """Returns a pointer to a ERC-20 transfer.
+        Balance refreshes for the chunk's transfers are enqueued together by enqueue_balance_refreshes."""
         # Events are keyed by their transaction hash and log index
         # One transaction may contain multiple events
         # and each one of those gets their own log index
@@ -157,49 +164,47 @@ class EventScanner:
         txhash = event["transactionHash"].hex()  # Transaction hash
         block_number = event["blockNumber"]
 
-        # Convert ERC-20 Transfer event to our internal format
-        args = event["args"]
-        transfer = {
-            "from": args["from"],
-            "to": args["to"],
-            "value": args["value"],
-            "timestamp": block_timestamp,
-        }
+        # Return a pointer that allows us to look up this event later if needed
+        return f"{block_number}-{txhash}-{log_index}"
 
-        # Add user ids from the transfer event into the balance refresh queue.
-        # Depending on the wallet connection, we may have the address stored as
-        # lower cased, so to be safe, we refresh check-summed and lower-cased adddresses.
-        transfer_event_wallets = [
-            transfer["from"],
-            transfer["to"],
-            transfer["from"].lower(),
-            transfer["to"].lower(),
-        ]
+    def get_user_ids_for_wallets(self, wallets: List[str]) -> List[int]:
+        """Resolves wallets to the users that own them, as their user wallet or
+        an associated wallet, with a single query"""
         with self.db.scoped_session() as session:
-            user_result = (
+            if self.wallet_index is not None:
+                self.wallet_index.refresh(session)
+                wallets = self.wallet_index.filter_known(wallets)
+            if not wallets:
+                return []
+
+            user_ids_query = union(
                 session.query(User.user_id)
                 .filter(User.is_current == True)
-                .filter(User.wallet.in_(transfer_event_wallets))
-            ).all()
-            user_set = {user_id for [user_id] in user_result}
-
-            associated_wallet_result = (
+                .filter(User.wallet.in_(wallets)),
                 session.query(AssociatedWallet.user_id)
                 .filter(AssociatedWallet.is_current == True)
                 .filter(AssociatedWallet.is_delete == False)
-                .filter(AssociatedWallet.wallet.in_(transfer_event_wallets))
-            ).all()
-            associated_wallet_set = {user_id for [user_id] in associated_wallet_result}
-
-            user_ids = list(user_set.union(associated_wallet_set))
-            if user_ids:
-                logger.info(
-                    f"event_scanner.py | Enqueueing user ids {user_ids} to immediate balance refresh queue"
-                )
-                enqueue_immediate_balance_refresh(self.redis, user_ids)
+                .filter(AssociatedWallet.wallet.in_(wallets)),
+            )
+            return [user_id for (user_id,) in session.execute(user_ids_query)]
 
-        # Return a pointer that allows us to look up this event later if needed
-        return f"{block_number}-{txhash}-{log_index}"
+    def enqueue_balance_refreshes(self, events: List[TransferEvent]):
+        """Add users involved in the transfer events into the balance refresh queue."""
+        # Depending on the wallet connection, we may have the address stored as
+        # lower cased, so to be safe, we refresh check-summed and lower-cased adddresses.
+        transfer_event_wallets = set()
+        for event in events:
+            args = event["args"]
+            for wallet in (args["from"], args["to"]):
+                transfer_event_wallets.add(wallet)
+                transfer_event_wallets.add(wallet.lower())
+
+        user_ids = self.get_user_ids_for_wallets(list(transfer_event_wallets))
+        if user_ids:
+            logger.info(
+                f"event_scanner.py | Enqueueing {len(user_ids)} user ids from {len(events)} transfers to immediate balance refresh queue"
+            )
+            enqueue_immediate_balance_refresh(self.redis, user_ids)
 
     def scan_chunk(self, start_block, end_block) -> Tuple[int, list]:
         """Read and process events between to block numbers.
@@ -258,6 +263,9 @@ class EventScanner:
             processed = self.process_event(block_timestamp, evt)
             all_processed.append(processed)
 
+        if events:
+            self.enqueue_balance_refreshes(events)
+
         return end_block, all_processed
 
     def estimate_next_chunk_size(self, current_chuck_size: int, event_found_count: int):
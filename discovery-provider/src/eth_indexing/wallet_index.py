@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm.session import Session
+from src.models.users.associated_wallet import AssociatedWallet
+from src.models.users.user import User
+
+logger = logging.getLogger(__name__)
+
+# Rebuild from scratch periodically to drop wallets that were changed or removed
+FULL_REBUILD_INTERVAL_SEC = 60 * 60
+# Incremental refreshes re-read this many blocks below the last block seen so
+# that rows re-indexed after a revert are not missed
+REFRESH_OVERLAP_BLOCKS = 1000
+# Rows read at a time during a full rebuild
+REBUILD_BATCH_SIZE = 100000
+
+
+def hash_wallet(wallet: str) -> int:
+    """Case insensitive 64 bit hash of a wallet address"""
+    return int.from_bytes(
+        hashlib.blake2b(wallet.lower().encode("utf-8"), digest_size=8).digest(),
+        "little",
+    )
+
+
+class KnownWalletIndex:
+    """
+    Compact in-memory set of every wallet that belongs to a user, either as
+    their user wallet or as an associated wallet.
+
+    Used to skip the database for transfers between wallets no user owns.
+    Wallets are stored as sorted 64 bit hashes, so membership has no false
+    negatives once refreshed. Matches should still be resolved against the
+    database, because wallets that changed since the last full rebuild stay in
+    the index.
+    """
+
+    def __init__(self):
+        self._hashes = np.array([], dtype=np.uint64)
+        # wallets added by incremental refreshes since the last full rebuild
+        self._recent_hashes: set = set()
+        self._last_user_blocknumber = 0
+        self._last_associated_wallet_blocknumber = 0
+        self._last_full_rebuild: Optional[float] = None
+
+    def __len__(self):
+        return len(self._hashes) + len(self._recent_hashes)
+
+    def refresh(self, session: Session):
+        """Adds wallets indexed since the last refresh, or rebuilds periodically"""
+        if (
+            self._last_full_rebuild is None
+            or time.time() - self._last_full_rebuild > FULL_REBUILD_INTERVAL_SEC
+        ):
+            self._rebuild(session)
+            return
+
+        user_wallets = (
+            session.query(User.wallet, User.blocknumber)
+            .filter(User.is_current == True)
+            .filter(
+                User.blocknumber > self._last_user_blocknumber - REFRESH_OVERLAP_BLOCKS
+            )
+        ).all()
+        associated_wallets = (
+            session.query(AssociatedWallet.wallet, AssociatedWallet.blocknumber)
+            .filter(AssociatedWallet.is_current == True)
+            .filter(AssociatedWallet.is_delete == False)
+            .filter(
+                AssociatedWallet.blocknumber
+                > self._last_associated_wallet_blocknumber - REFRESH_OVERLAP_BLOCKS
+            )
+        ).all()
+
+        self._recent_hashes.update(
+            hash_wallet(wallet)
+            for wallet, _ in user_wallets + associated_wallets
+            if wallet
+        )
+        self._last_user_blocknumber = max(
+            [self._last_user_blocknumber]
+            + [blocknumber for _, blocknumber in user_wallets if blocknumber]
+        )
+        self._last_associated_wallet_blocknumber = max(
+            [self._last_associated_wallet_blocknumber]
+            + [blocknumber for _, blocknumber in associated_wallets]
+        )
+
+    def _rebuild(self, session: Session):
+        start_time = time.time()
+        # read the watermarks first so rows indexed during the rebuild
+        # are picked up by the next refresh
+        last_user_blocknumber = session.query(func.max(User.blocknumber)).scalar() or 0
+        last_associated_wallet_blocknumber = (
+            session.query(func.max(AssociatedWallet.blocknumber)).scalar() or 0
+        )
+
+        user_wallets = (
+            session.query(User.wallet)
+            .filter(User.is_current == True)
+            .filter(User.wallet != None)
+            .yield_per(REBUILD_BATCH_SIZE)
+        )
+        associated_wallets = (
+            session.query(AssociatedWallet.wallet)
+            .filter(AssociatedWallet.is_current == True)
+            .filter(AssociatedWallet.is_delete == False)
+            .yield_per(REBUILD_BATCH_SIZE)
+        )
+        hashes = np.fromiter(
+            (
+                hash_wallet(wallet)
+                for query in (user_wallets, associated_wallets)
+                for (wallet,) in query
+            ),
+            dtype=np.uint64,
+        )
+
+        self._hashes = np.unique(hashes)
+        self._recent_hashes = set()
+        self._last_user_blocknumber = last_user_blocknumber
+        self._last_associated_wallet_blocknumber = last_associated_wallet_blocknumber
+        self._last_full_rebuild = time.time()
+        logger.info(
+            f"wallet_index.py | Rebuilt index of {len(self._hashes)} wallets in {time.time() - start_time} seconds"
+        )
+
+    def filter_known(self, wallets: Iterable[str]) -> List[str]:
+        """Returns the wallets that may belong to a user"""
+        wallets = list(wallets)
+        if not wallets:
+            return []
+        hashes = np.array([hash_wallet(wallet) for wallet in wallets], dtype=np.uint64)
+        if len(self._hashes):
+            positions = np.minimum(
+                np.searchsorted(self._hashes, hashes), len(self._hashes) - 1
+            )
+            in_index = self._hashes[positions] == hashes
+        else:
+            in_index = np.zeros(len(hashes), dtype=bool)
+        return [
+            wallet
+            for wallet, wallet_hash, found in zip(wallets, hashes.tolist(), in_index)
+            if found or wallet_hash in self._recent_hashes
+        ]
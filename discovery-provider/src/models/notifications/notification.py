@@ -2,6 +2,7 @@ from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    ForeignKey,
     Integer,
     PrimaryKeyConstraint,
     String,
@@ -32,6 +33,25 @@ class Notification(Base, RepresentableMixin):
     UniqueConstraint("group_id", "specifier", name="uq_notification")
 
 
+class NotificationInbox(Base, RepresentableMixin):
+    """
+    A row per notification recipient, filled by the notification triggers.
+    seen_at is the time of the first view at or after the notification,
+    or 'infinity' while unseen.
+    """
+
+    __tablename__ = "notification_inbox"
+
+    user_id = Column(Integer, nullable=False)
+    notification_id = Column(
+        Integer, ForeignKey("notification.id", ondelete="CASCADE"), nullable=False
+    )
+    group_id = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    seen_at = Column(DateTime, nullable=False, server_default=text("'infinity'"))
+    PrimaryKeyConstraint(user_id, notification_id)
+
+
 class NotificationSeen(Base, RepresentableMixin):
     __tablename__ = "notification_seen"
 
@@ -17,3 +17,4 @@ class TrackTrendingScore(Base, RepresentableMixin):
     time_range = Column(String, primary_key=True, nullable=False)
     score = Column(Float(53), nullable=False, index=True)
     created_at = Column(DateTime, nullable=False)
+    track_created_at = Column(DateTime)
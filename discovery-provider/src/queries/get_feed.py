@@ -11,6 +11,7 @@ from src.models.tracks.track import Track
 from src.queries import response_name_constants
 from src.queries.get_feed_es import get_feed_es
 from src.queries.get_unpopulated_tracks import get_unpopulated_tracks
+from src.queries.hydration_context import get_hydration_context
 from src.queries.query_helpers import (
     get_pagination_vars,
     get_users_by_id,
@@ -273,13 +274,23 @@ def get_feed_sql(args):
         # bundle peripheral info into track and playlist objects
         track_ids = list(map(lambda track: track["track_id"], tracks))
         playlist_ids = list(map(lambda playlist: playlist["playlist_id"], playlists))
+        playlist_repost_types = [RepostType.playlist, RepostType.album]
+        playlist_save_types = [SaveType.playlist, SaveType.album]
+        # load the tracks' and playlists' metadata together, one query per relation
+        get_hydration_context(current_user_id).prefetch(
+            session,
+            track_ids=track_ids,
+            playlists=playlists,
+            playlist_repost_types=playlist_repost_types,
+            playlist_save_types=playlist_save_types,
+        )
         tracks = populate_track_metadata(session, track_ids, tracks, current_user_id)
         playlists = populate_playlist_metadata(
             session,
             playlist_ids,
             playlists,
-            [RepostType.playlist, RepostType.album],
-            [SaveType.playlist, SaveType.album],
+            playlist_repost_types,
+            playlist_save_types,
             current_user_id,
         )
 
@@ -1,11 +1,14 @@
+import json
 import logging
 import os
+import threading
 import time
 from datetime import datetime
 from typing import Dict, Optional, Tuple, TypedDict, cast
 
 import requests
 from elasticsearch import Elasticsearch
+from flask import current_app, has_app_context
 from redis import Redis
 from src.eth_indexing.event_scanner import eth_indexing_last_scanned_block_key
 from src.models.indexing.block import Block
@@ -30,6 +33,8 @@ from src.utils.redis_constants import (
     UPDATE_TRACK_IS_AVAILABLE_FINISH_REDIS_KEY,
     UPDATE_TRACK_IS_AVAILABLE_START_REDIS_KEY,
     challenges_last_processed_event_redis_key,
+    health_snapshot_redis_key,
+    health_snapshot_refresh_lock_redis_key,
     index_eth_last_completion_redis_key,
     latest_block_hash_redis_key,
     latest_block_redis_key,
@@ -64,6 +69,11 @@ min_filesystem_size: int = 240000000000  # 240 GB of file system storage
 
 CHAIN_HEALTH_ENDPOINT = "http://chain:8545/health"
 
+# Health snapshots older than this are rebuilt in the background
+HEALTH_SNAPSHOT_REFRESH_SEC = 5
+# Health snapshots older than this are not served, health is computed inline
+HEALTH_SNAPSHOT_MAX_AGE_SEC = 60
+
 
 def get_elapsed_time_redis(redis, redis_key):
     last_seen = redis.get(redis_key)
@@ -140,21 +150,23 @@ def get_health(args: GetHealthArgs, use_redis_cache: bool = True) -> Tuple[Dict,
     Returns a tuple of health results and a boolean indicating an error
     """
     redis = redis_connection.get_redis()
-    web3 = web3_provider.get_web3()
 
-    verbose = args.get("verbose")
-    enforce_block_diff = args.get("enforce_block_diff")
-    qs_healthy_block_diff = cast(Optional[int], args.get("healthy_block_diff"))
-    challenge_events_age_max_drift = args.get("challenge_events_age_max_drift")
-    plays_count_max_drift = args.get("plays_count_max_drift")
+    snapshot = get_health_snapshot(redis) if use_redis_cache else None
+    if snapshot is None:
+        snapshot = build_health_snapshot(
+            redis, web3_provider.get_web3(), use_redis_cache
+        )
+        if use_redis_cache:
+            save_health_snapshot(redis, snapshot)
+
+    return get_health_from_snapshot(snapshot, args)
 
-    # If healthy block diff is given in url and positive, override config value
-    healthy_block_diff = (
-        qs_healthy_block_diff
-        if qs_healthy_block_diff is not None and qs_healthy_block_diff >= 0
-        else default_healthy_block_diff
-    )
 
+def build_health_snapshot(redis: Redis, web3, use_redis_cache: bool = True) -> Dict:
+    """
+    Assembles the parts of the health check that do not depend on the request.
+    Request specific thresholds are applied by get_health_from_snapshot.
+    """
     latest_block_num: Optional[int] = None
     latest_block_hash: Optional[str] = None
     latest_indexed_block_num: Optional[int] = None
@@ -199,15 +211,11 @@ def get_health(args: GetHealthArgs, use_redis_cache: bool = True) -> Tuple[Dict,
         latest_indexed_block_num = db_block_state["number"] or 0
         latest_indexed_block_hash = db_block_state["blockhash"]
 
-    play_health_info = get_play_health_info(redis, plays_count_max_drift)
+    play_health_snapshot = get_play_health_snapshot(redis)
     rewards_manager_health_info = get_rewards_manager_health_info(redis)
     user_bank_health_info = get_user_bank_health_info(redis)
     spl_audio_info = get_spl_audio_info(redis)
-    reactions_health_info = get_reactions_health_info(
-        redis,
-        args.get("reactions_max_indexing_drift"),
-        args.get("reactions_max_last_reaction_drift"),
-    )
+    reactions_health_snapshot = get_reactions_health_snapshot(redis)
 
     trending_tracks_age_sec = get_elapsed_time_redis(
         redis, trending_tracks_last_completion_redis_key
@@ -310,12 +318,12 @@ def get_health(args: GetHealthArgs, use_redis_cache: bool = True) -> Tuple[Dict,
         "index_eth_age_sec": index_eth_age_sec,
         "number_of_cpus": number_of_cpus,
         **sys_info,
-        "plays": play_health_info,
+        "plays": play_health_snapshot,
         "rewards_manager": rewards_manager_health_info,
         "user_bank": user_bank_health_info,
         "openresty_public_key": openresty_public_key,
         "spl_audio_info": spl_audio_info,
-        "reactions": reactions_health_info,
+        "reactions": reactions_health_snapshot,
         "infra_setup": infra_setup,
         "url": url,
         # Temp
@@ -358,12 +366,48 @@ def get_health(args: GetHealthArgs, use_redis_cache: bool = True) -> Tuple[Dict,
         health_results["meets_min_requirements"] = True
 
     health_results["chain_health"] = _get_chain_health()
+    health_results["health_snapshot_timestamp"] = time.time()
+
+    return health_results
+
+
+def get_health_from_snapshot(snapshot: Dict, args: GetHealthArgs) -> Tuple[Dict, bool]:
+    """
+    Applies the request's thresholds to a health snapshot
+
+    Returns a tuple of health results and a boolean indicating an error
+    """
+    verbose = args.get("verbose")
+    enforce_block_diff = args.get("enforce_block_diff")
+    qs_healthy_block_diff = cast(Optional[int], args.get("healthy_block_diff"))
+    challenge_events_age_max_drift = args.get("challenge_events_age_max_drift")
+    plays_count_max_drift = args.get("plays_count_max_drift")
+
+    # If healthy block diff is given in url and positive, override config value
+    healthy_block_diff = (
+        qs_healthy_block_diff
+        if qs_healthy_block_diff is not None and qs_healthy_block_diff >= 0
+        else default_healthy_block_diff
+    )
+
+    health_results = dict(snapshot)
+    snapshot_timestamp = health_results.pop("health_snapshot_timestamp")
+    health_results["health_snapshot_age_sec"] = max(time.time() - snapshot_timestamp, 0)
+
+    play_health_info = apply_play_health_drift(snapshot["plays"], plays_count_max_drift)
+    reactions_health_info = apply_reactions_health_drift(
+        snapshot["reactions"],
+        args.get("reactions_max_indexing_drift"),
+        args.get("reactions_max_last_reaction_drift"),
+    )
+    health_results["plays"] = play_health_info
+    health_results["reactions"] = reactions_health_info
 
     if verbose:
         # Elasticsearch health
         if esclient:
             health_results["elasticsearch"] = get_elasticsearch_health_info(
-                esclient, latest_indexed_block_num
+                esclient, health_results["db"]["number"]
             )
 
         # DB connections check
@@ -389,6 +433,8 @@ def get_health(args: GetHealthArgs, use_redis_cache: bool = True) -> Tuple[Dict,
 
         health_results["tables"] = table_size_info_json
 
+    block_difference = health_results["block_difference"]
+    challenge_events_age_sec = health_results["challenge_last_event_age_sec"]
     unhealthy_blocks = bool(
         enforce_block_diff and block_difference > healthy_block_diff
     )
@@ -408,6 +454,64 @@ def get_health(args: GetHealthArgs, use_redis_cache: bool = True) -> Tuple[Dict,
     return health_results, is_unhealthy
 
 
+def save_health_snapshot(redis: Redis, snapshot: Dict):
+    """Replaces the health snapshot hash, one JSON encoded field per key"""
+    pipe = redis.pipeline()
+    pipe.delete(health_snapshot_redis_key)
+    pipe.hmset(
+        health_snapshot_redis_key,
+        {key: json.dumps(value, default=str) for key, value in snapshot.items()},
+    )
+    pipe.execute()
+
+
+def _refresh_health_snapshot(app):
+    try:
+        with app.app_context():
+            redis = redis_connection.get_redis()
+            save_health_snapshot(
+                redis, build_health_snapshot(redis, web3_provider.get_web3())
+            )
+    except Exception as e:
+        logger.error(f"get_health.py | Failed to refresh health snapshot: {e}")
+
+
+def get_health_snapshot(redis: Redis) -> Optional[Dict]:
+    """
+    Reads the health snapshot in a single round trip. Snapshots past the refresh
+    interval are still served while one server worker rebuilds them in the
+    background. Returns None if there is no snapshot recent enough to serve.
+    """
+    encoded_snapshot = redis.hgetall(health_snapshot_redis_key)
+    if not encoded_snapshot:
+        return None
+    try:
+        snapshot = {
+            key.decode(): json.loads(value) for key, value in encoded_snapshot.items()
+        }
+        age = time.time() - snapshot["health_snapshot_timestamp"]
+    except Exception as e:
+        logger.error(f"get_health.py | Invalid health snapshot: {e}")
+        return None
+
+    if age > HEALTH_SNAPSHOT_MAX_AGE_SEC:
+        return None
+    if age > HEALTH_SNAPSHOT_REFRESH_SEC and has_app_context():
+        # only one worker refreshes the snapshot at a time
+        if redis.set(
+            health_snapshot_refresh_lock_redis_key,
+            1,
+            nx=True,
+            ex=HEALTH_SNAPSHOT_REFRESH_SEC,
+        ):
+            threading.Thread(
+                target=_refresh_health_snapshot,
+                args=(current_app._get_current_object(),),  # type: ignore
+                daemon=True,
+            ).start()
+    return snapshot
+
+
 class LocationResponse(TypedDict):
     country: str
     latitude: str
@@ -474,58 +578,75 @@ class PlayHealthInfo(SolHealthInfo):
     oldest_unarchived_play_created_at: str
 
 
+class PlayHealthSnapshot(TypedDict):
+    tx_info: Dict
+    latest_legacy_play_time_diff: Optional[float]
+    oldest_unarchived_play_created_at: str
+
+
 # Aggregate play health info across Solana and legacy storage
-def get_play_health_info(
-    redis: Redis, plays_count_max_drift: Optional[int]
-) -> PlayHealthInfo:
+def get_play_health_snapshot(redis: Redis) -> PlayHealthSnapshot:
     if redis is None:
-        raise Exception("Invalid arguments for get_play_health_info")
+        raise Exception("Invalid arguments for get_play_health_snapshot")
 
     current_time_utc = datetime.utcnow()
     # Fetch plays info from Solana
     sol_play_info = get_sol_play_health_info(redis, current_time_utc)
 
+    # Calculate time diff from now to latest play
+    latest_db_play = redis.get(latest_legacy_play_db_key)
+    if not latest_db_play:
+        # Query and cache latest db play if found
+        latest_db_play = get_latest_play()
+        if latest_db_play:
+            redis.set(latest_legacy_play_db_key, latest_db_play.timestamp())
+    else:
+        # Decode bytes into float for latest timestamp
+        latest_db_play = float(latest_db_play.decode())
+        latest_db_play = datetime.utcfromtimestamp(latest_db_play)
+
+    oldest_unarchived_play = redis.get(oldest_unarchived_play_key)
+    if not oldest_unarchived_play:
+        # Query and cache oldest unarchived play
+        oldest_unarchived_play = get_oldest_unarchived_play()
+        if oldest_unarchived_play:
+            redis.set(
+                oldest_unarchived_play_key,
+                oldest_unarchived_play.timestamp(),
+            )
+    else:
+        # Decode bytes into float for latest timestamp
+        oldest_unarchived_play = datetime.utcfromtimestamp(
+            float(oldest_unarchived_play.decode())
+        )
+
+    return {
+        "tx_info": sol_play_info,
+        "latest_legacy_play_time_diff": (
+            (current_time_utc - latest_db_play).total_seconds()
+            if latest_db_play
+            else None
+        ),
+        "oldest_unarchived_play_created_at": str(oldest_unarchived_play),
+    }
+
+
+def apply_play_health_drift(
+    snapshot: PlayHealthSnapshot, plays_count_max_drift: Optional[int]
+) -> PlayHealthInfo:
+    sol_time_diff = snapshot["tx_info"]["time_diff"]
+
     # If play count max drift provided, perform comparison
     is_unhealthy_sol_plays = bool(
-        plays_count_max_drift and plays_count_max_drift < sol_play_info["time_diff"]
+        plays_count_max_drift and plays_count_max_drift < sol_time_diff
     )
 
     # If unhealthy sol plays, this will be overwritten
-    time_diff_general = sol_play_info["time_diff"]
-
-    if is_unhealthy_sol_plays or not plays_count_max_drift:
-        # Calculate time diff from now to latest play
-        latest_db_play = redis.get(latest_legacy_play_db_key)
-        if not latest_db_play:
-            # Query and cache latest db play if found
-            latest_db_play = get_latest_play()
-            if latest_db_play:
-                redis.set(latest_legacy_play_db_key, latest_db_play.timestamp())
-        else:
-            # Decode bytes into float for latest timestamp
-            latest_db_play = float(latest_db_play.decode())
-            latest_db_play = datetime.utcfromtimestamp(latest_db_play)
-
-        oldest_unarchived_play = redis.get(oldest_unarchived_play_key)
-        if not oldest_unarchived_play:
-            # Query and cache oldest unarchived play
-            oldest_unarchived_play = get_oldest_unarchived_play()
-            if oldest_unarchived_play:
-                redis.set(
-                    oldest_unarchived_play_key,
-                    oldest_unarchived_play.timestamp(),
-                )
-        else:
-            # Decode bytes into float for latest timestamp
-            oldest_unarchived_play = datetime.utcfromtimestamp(
-                float(oldest_unarchived_play.decode())
-            )
-
-        time_diff_general = (
-            (current_time_utc - latest_db_play).total_seconds()
-            if latest_db_play
-            else time_diff_general
-        )
+    time_diff_general = sol_time_diff
+    if (is_unhealthy_sol_plays or not plays_count_max_drift) and snapshot[
+        "latest_legacy_play_time_diff"
+    ] is not None:
+        time_diff_general = snapshot["latest_legacy_play_time_diff"]
 
     is_unhealthy_plays = bool(
         plays_count_max_drift
@@ -534,12 +655,25 @@ def get_play_health_info(
 
     return {
         "is_unhealthy": is_unhealthy_plays,
-        "tx_info": sol_play_info,
+        "tx_info": snapshot["tx_info"],
         "time_diff_general": time_diff_general,
-        "oldest_unarchived_play_created_at": str(oldest_unarchived_play),
+        "oldest_unarchived_play_created_at": snapshot[
+            "oldest_unarchived_play_created_at"
+        ],
     }
 
 
+def get_play_health_info(
+    redis: Redis, plays_count_max_drift: Optional[int]
+) -> PlayHealthInfo:
+    if redis is None:
+        raise Exception("Invalid arguments for get_play_health_info")
+
+    return apply_play_health_drift(
+        get_play_health_snapshot(redis), plays_count_max_drift
+    )
+
+
 def get_user_bank_health_info(
     redis: Redis, max_drift: Optional[int] = None
 ) -> SolHealthInfo:
@@ -559,11 +693,7 @@ def get_user_bank_health_info(
     }
 
 
-def get_reactions_health_info(
-    redis: Redis,
-    max_indexing_drift: Optional[int] = None,
-    max_reaction_drift: Optional[int] = None,
-):
+def get_reactions_health_snapshot(redis: Redis):
     now = datetime.now()
     last_index_time = redis.get(LAST_REACTIONS_INDEX_TIME_KEY)
     last_index_time = int(last_index_time) if last_index_time else None
@@ -584,6 +714,20 @@ def get_reactions_health_info(
         (now - last_reaction_time).total_seconds() if last_reaction_time else None
     )
 
+    return {
+        "indexing_delta": indexing_delta,
+        "reaction_delta": reaction_delta,
+    }
+
+
+def apply_reactions_health_drift(
+    snapshot: Dict,
+    max_indexing_drift: Optional[int] = None,
+    max_reaction_drift: Optional[int] = None,
+):
+    indexing_delta = snapshot["indexing_delta"]
+    reaction_delta = snapshot["reaction_delta"]
+
     is_unhealthy_indexing = bool(
         indexing_delta and max_indexing_drift and indexing_delta > max_indexing_drift
     )
@@ -600,6 +744,16 @@ def get_reactions_health_info(
     }
 
 
+def get_reactions_health_info(
+    redis: Redis,
+    max_indexing_drift: Optional[int] = None,
+    max_reaction_drift: Optional[int] = None,
+):
+    return apply_reactions_health_drift(
+        get_reactions_health_snapshot(redis), max_indexing_drift, max_reaction_drift
+    )
+
+
 def get_spl_audio_info(redis: Redis, max_drift: Optional[int] = None) -> SolHealthInfo:
     if redis is None:
         raise Exception("Invalid arguments for get_spl_audio_info")
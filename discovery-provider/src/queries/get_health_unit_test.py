@@ -6,9 +6,14 @@ from unittest.mock import MagicMock
 from hexbytes import HexBytes
 from src.models.indexing.block import Block
 from src.models.indexing.indexing_checkpoints import IndexingCheckpoint
-from src.queries.get_health import get_health
+from src.queries.get_health import (
+    HEALTH_SNAPSHOT_MAX_AGE_SEC,
+    default_healthy_block_diff,
+    get_health,
+)
 from src.utils.redis_constants import (
     challenges_last_processed_event_redis_key,
+    health_snapshot_redis_key,
     latest_block_hash_redis_key,
     latest_block_redis_key,
     latest_legacy_play_db_key,
@@ -533,3 +538,102 @@ def test_get_health_challenge_events_max_drift(web3_mock, redis_mock, db_mock):
 
     assert error == True
     assert health_results["challenge_last_event_age_sec"] < int(time() - 49)
+
+
+def test_get_health_from_snapshot(web3_mock, redis_mock, db_mock):
+    """Tests that the health check serves later requests from the redis snapshot"""
+    # Set up web3 eth
+    def get_block(_u1, _u2):  # unused
+        block = MagicMock()
+        block.number = 50
+        block.hash = HexBytes(b"\x50")
+        return block
+
+    cache_play_health_vars(redis_mock)
+    web3_mock.eth.get_block = get_block
+
+    # Set up redis state
+    redis_mock.set(latest_block_redis_key, "50")
+    redis_mock.set(latest_block_hash_redis_key, "0x50")
+    redis_mock.set(most_recent_indexed_block_redis_key, "1")
+    redis_mock.set(most_recent_indexed_block_hash_redis_key, "0x01")
+
+    # Set up db state
+    with db_mock.scoped_session() as session:
+        Block.__table__.create(db_mock._engine)
+        session.add(
+            Block(
+                blockhash="0x01",
+                number=1,
+                parenthash="0x01",
+                is_current=True,
+            )
+        )
+
+    health_results, error = get_health({})
+    assert error == False
+    assert health_results["block_difference"] == 49
+
+    # Indexing progress is not picked up until the snapshot is refreshed
+    redis_mock.set(most_recent_indexed_block_redis_key, "45")
+    redis_mock.set(most_recent_indexed_block_hash_redis_key, "0x45")
+
+    args = {"enforce_block_diff": True, "healthy_block_diff": 40}
+    health_results, error = get_health(args)
+
+    # Request thresholds are still applied to the snapshot
+    assert error == True
+    assert health_results["db"]["number"] == 1
+    assert health_results["block_difference"] == 49
+    # The reported maximum is the configured one, as before the snapshot
+    assert (
+        health_results["maximum_healthy_block_difference"] == default_healthy_block_diff
+    )
+    assert health_results["health_snapshot_age_sec"] >= 0
+
+
+def test_get_health_expired_snapshot(web3_mock, redis_mock, db_mock):
+    """Tests that the health check rebuilds a snapshot that is too old"""
+    # Set up web3 eth
+    def get_block(_u1, _u2):  # unused
+        block = MagicMock()
+        block.number = 50
+        block.hash = HexBytes(b"\x50")
+        return block
+
+    cache_play_health_vars(redis_mock)
+    web3_mock.eth.get_block = get_block
+
+    # Set up redis state
+    redis_mock.set(latest_block_redis_key, "50")
+    redis_mock.set(latest_block_hash_redis_key, "0x50")
+    redis_mock.set(most_recent_indexed_block_redis_key, "1")
+    redis_mock.set(most_recent_indexed_block_hash_redis_key, "0x01")
+
+    # Set up db state
+    with db_mock.scoped_session() as session:
+        Block.__table__.create(db_mock._engine)
+        session.add(
+            Block(
+                blockhash="0x01",
+                number=1,
+                parenthash="0x01",
+                is_current=True,
+            )
+        )
+
+    get_health({})
+    redis_mock.hset(
+        health_snapshot_redis_key,
+        "health_snapshot_timestamp",
+        json.dumps(time() - HEALTH_SNAPSHOT_MAX_AGE_SEC - 1),
+    )
+    redis_mock.set(most_recent_indexed_block_redis_key, "45")
+    redis_mock.set(most_recent_indexed_block_hash_redis_key, "0x45")
+
+    health_results, error = get_health({})
+
+    assert error == False
+    assert health_results["db"]["number"] == 45
+    assert health_results["block_difference"] == 5
+    assert health_results["health_snapshot_age_sec"] < HEALTH_SNAPSHOT_MAX_AGE_SEC
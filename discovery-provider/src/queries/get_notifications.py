@@ -16,61 +16,78 @@ class GetNotificationArgs(TypedDict):
     limit: Optional[int]
 
 
-notification_groups_sql = text(
-    """
---- Create Intervals of user seen
-WITH user_seen as (
+# Groups the user's inbox by notification group and the view that saw them,
+# walking the (user_id, seen_at, group_id) index so that a page only reads the
+# notifications in its groups. Unseen notifications have seen_at 'infinity'
+# and their groups are ordered by their latest notification.
+notification_groups_sql = """
+WITH notification_groups AS (
   SELECT
-    LAG(seen_at, 1, now()::timestamp) OVER ( ORDER BY seen_at desc ) AS seen_at,
-    seen_at as prev_seen_at
+    group_id,
+    seen_at,
+    array_agg(notification_id ORDER BY notification_id) AS notification_ids,
+    count(*) AS count,
+    CASE WHEN seen_at = 'infinity' THEN max(timestamp) END AS unseen_timestamp
   FROM
-    notification_seen
+    notification_inbox
   WHERE
-    user_id = :user_id
+    user_id = :user_id {offset_filter}
+  GROUP BY
+    seen_at, group_id{unseen_offset_filter}
   ORDER BY
-    seen_at desc
+    seen_at desc,
+    unseen_timestamp desc,
+    group_id desc
+  LIMIT :limit
 )
 SELECT
-    n.group_id as group_id,
-    array_agg(n.id),
-    CASE 
-      WHEN user_seen.seen_at is not NULL THEN now()::timestamp != user_seen.seen_at
-      ELSE EXISTS(SELECT 1 from notification_seen where user_id = :user_id)
-    END as is_seen,
-    CASE 
-      WHEN user_seen.seen_at is not NULL THEN user_seen.seen_at
-      ELSE (
-        SELECT seen_at from notification_seen
-        WHERE user_id = :user_id
-        ORDER BY seen_at ASC
-        limit 1
-      )
-    END as seen_at,
-    user_seen.prev_seen_at,
-    count(n.group_id)
+  notification_groups.group_id,
+  notification_groups.notification_ids,
+  notification_groups.seen_at != 'infinity' AS is_seen,
+  CASE
+    WHEN notification_groups.seen_at != 'infinity' THEN notification_groups.seen_at
+    WHEN prev_seen.seen_at is not NULL THEN now()::timestamp
+  END AS seen_at,
+  prev_seen.seen_at AS prev_seen_at,
+  notification_groups.count
 FROM
-    notification n
-LEFT JOIN user_seen on
-  user_seen.seen_at >= n.timestamp and user_seen.prev_seen_at < n.timestamp
-WHERE
-  :user_id = ANY(n.user_ids) AND
-  (
-    (:timestamp_offset is NULL) OR
-    (user_seen.seen_at is NULL AND n.timestamp < :timestamp_offset) OR
-    (:timestamp_offset is NOT NULL AND user_seen.seen_at < :timestamp_offset) OR
-    (
-        :group_id_offset is NOT NULL AND :timestamp_offset is NOT NULL AND 
-        (user_seen.seen_at = :timestamp_offset AND n.group_id < :group_id_offset)
-    )
-  )
-GROUP BY
-  n.group_id, user_seen.seen_at, user_seen.prev_seen_at
+  notification_groups
+LEFT JOIN LATERAL (
+  SELECT max(seen_at) AS seen_at
+  FROM notification_seen
+  WHERE user_id = :user_id AND seen_at < notification_groups.seen_at
+) prev_seen ON true
 ORDER BY
-  user_seen.seen_at desc NULLS LAST,
-  n.group_id desc
-limit :limit;
+  notification_groups.seen_at desc,
+  notification_groups.unseen_timestamp desc,
+  notification_groups.group_id desc;
 """
-)
+
+
+def get_notification_groups_sql(timestamp_offset, group_id_offset):
+    offset_filter = ""
+    unseen_offset_filter = ""
+    if timestamp_offset is not None:
+        # Seen groups are keyset paginated by the view that saw them and
+        # unseen groups by their latest notification, which is after every
+        # view. Unseen rows are filtered once grouped so that a page never
+        # splits a group.
+        seen_filter = "seen_at < :timestamp_offset"
+        unseen_filter = "max(timestamp) < :timestamp_offset"
+        if group_id_offset is not None:
+            seen_filter = "(seen_at, group_id) < (:timestamp_offset, :group_id_offset)"
+            unseen_filter = (
+                "(max(timestamp), group_id) < (:timestamp_offset, :group_id_offset)"
+            )
+        offset_filter = f"AND (seen_at = 'infinity' OR {seen_filter})"
+        unseen_offset_filter = f"""
+  HAVING
+    seen_at != 'infinity' OR {unseen_filter}"""
+    return text(
+        notification_groups_sql.format(
+            offset_filter=offset_filter, unseen_offset_filter=unseen_offset_filter
+        )
+    )
 
 
 MAX_LIMIT = 50
@@ -93,13 +110,15 @@ def get_notification_groups(session: Session, args: GetNotificationArgs):
     limit = args.get("limit") or DEFAULT_LIMIT
     limit = min(limit, MAX_LIMIT)  # type: ignore
 
+    timestamp_offset = args.get("timestamp", None)
+    group_id_offset = args.get("group_id", None)
     rows = session.execute(
-        notification_groups_sql,
+        get_notification_groups_sql(timestamp_offset, group_id_offset),
         {
             "user_id": args["user_id"],
             "limit": limit,
-            "timestamp_offset": args.get("timestamp", None),
-            "group_id_offset": args.get("group_id", None),
+            "timestamp_offset": timestamp_offset,
+            "group_id_offset": group_id_offset,
         },
     )
 
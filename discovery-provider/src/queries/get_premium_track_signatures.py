@@ -561,7 +561,12 @@ def _load_abis():
 
 def _init_solana_client_manager():
     global solana_client_manager
-    solana_client_manager = SolanaClientManager(shared_config["solana"]["endpoint"])
+    solana_client_manager = SolanaClientManager(
+        shared_config["solana"]["endpoint"],
+        async_rpc_enabled=shared_config["solana"].getboolean(
+            "async_rpc_enabled", fallback=False
+        ),
+    )
 
 
 _load_abis()
@@ -1,5 +1,6 @@
 from sqlalchemy import func
 from src.models.tracks.track import Track
+from src.queries.get_unpopulated_tracks import get_unpopulated_tracks
 from src.queries.query_helpers import (
     get_users_by_id,
     get_users_ids,
@@ -7,6 +8,16 @@ from src.queries.query_helpers import (
 )
 from src.utils import helpers
 from src.utils.db_session import get_db_read_replica
+from src.utils.redis_connection import get_redis
+from src.utils.redis_constants import random_tracks_pool_redis_key
+
+
+def get_random_track_ids(redis, limit):
+    """Draws up to `limit` distinct track ids from the pool kept by index_random_tracks"""
+    return [
+        int(track_id)
+        for track_id in redis.srandmember(random_tracks_pool_redis_key, limit)
+    ]
 
 
 def get_random_tracks(args):
@@ -15,24 +26,28 @@ def get_random_tracks(args):
 
     current_user_id = args.get("user_id")
     db = get_db_read_replica()
+    track_ids = get_random_track_ids(get_redis(), limit)
     with db.scoped_session() as session:
-        # Query for random tracks
-        tracks_query = (
-            session.query(
-                Track,
-            )
-            .filter(
-                Track.is_current == True,
-                Track.is_delete == False,
-                Track.is_unlisted == False,
-                Track.stem_of == None,
+        if track_ids:
+            tracks = get_unpopulated_tracks(session, track_ids, filter_deleted=True)
+        else:
+            # Query for random tracks until the pool is built
+            tracks_query = (
+                session.query(
+                    Track,
+                )
+                .filter(
+                    Track.is_current == True,
+                    Track.is_delete == False,
+                    Track.is_unlisted == False,
+                    Track.stem_of == None,
+                )
+                .order_by(func.random())
+                .limit(limit)
             )
-            .order_by(func.random())
-            .limit(limit)
-        )
 
-        tracks_query_results = tracks_query.all()
-        tracks = helpers.query_result_to_list(tracks_query_results)
+            tracks_query_results = tracks_query.all()
+            tracks = helpers.query_result_to_list(tracks_query_results)
         track_ids = list(map(lambda track: track["track_id"], tracks))
 
         # bundle peripheral info into track results
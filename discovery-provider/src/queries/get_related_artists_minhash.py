@@ -1,8 +1,21 @@
 import datetime
+import hashlib
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
 
-from datasketch import MinHash, MinHashLSHForest
+import numpy as np
+from datasketch import LeanMinHash, MinHash, MinHashLSHForest
+from datasketch.hashfunc import sha1_hash32
 from psycopg2.extras import execute_values
+from redis import Redis
 from sqlalchemy.orm import Session
+from src.utils.redis_constants import (
+    related_artists_fingerprints_redis_key,
+    related_artists_last_full_rebuild_redis_key,
+)
+
+logger = logging.getLogger(__name__)
 
 top_k = 100
 num_perm = 256
@@ -12,8 +25,86 @@ num_perm = 256
 # set to 150 here
 MIN_FOLLOWER_REQUIREMENT = 150
 
+# Signatures are computed exactly like datasketch.MinHash computes hashvalues,
+# so the LSH forest and scores are the same as with a MinHash per artist
+MINHASH_SEED = 1
+_mersenne_prime = np.uint64((1 << 61) - 1)
+_max_hash = np.uint64((1 << 32) - 1)
+_permutations = MinHash(num_perm=num_perm, seed=MINHASH_SEED).permutations
+
+# Number of follow edges hashed at a time when building signatures.
+# Bounds memory to about SIGNATURE_BATCH_SIZE * num_perm * 8 bytes
+SIGNATURE_BATCH_SIZE = 50_000
+
+# Between full rebuilds only the artists whose signatures changed, and the
+# artists related to them, are rescored
+FULL_REBUILD_INTERVAL_SEC = 24 * 60 * 60
+
+
+def hash_follower_ids(follower_ids: np.ndarray) -> np.ndarray:
+    """Hashes ids the way MinHash.update hashes `str(id).encode("utf8")`"""
+    return np.fromiter(
+        (sha1_hash32(str(id).encode("utf8")) for id in follower_ids),
+        dtype=np.uint64,
+        count=len(follower_ids),
+    )
+
+
+def build_signatures(follower_id_arrays: List[np.ndarray]) -> np.ndarray:
+    """
+    Returns an (artists x num_perm) matrix whose rows are the MinHash signatures
+    of each array of follower ids.
+
+    Each distinct follower is hashed once, then the permutations are applied
+    to batches of follow edges and reduced per artist with np.minimum.reduceat.
+    """
+    signatures = np.full((len(follower_id_arrays), num_perm), _max_hash)
+    if not follower_id_arrays:
+        return signatures
+
+    lengths = np.array([len(ids) for ids in follower_id_arrays], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    unique_ids, inverse = np.unique(
+        np.concatenate(follower_id_arrays), return_inverse=True
+    )
+    edge_hashes = hash_follower_ids(unique_ids)[inverse]
+
+    a, b = _permutations
+    start = 0
+    while start < len(follower_id_arrays):
+        # take as many artists as fit in a batch, and at least one
+        end = int(
+            np.searchsorted(offsets, offsets[start] + SIGNATURE_BATCH_SIZE, "right")
+        )
+        end = min(max(end - 1, start + 1), len(follower_id_arrays))
+
+        hv = edge_hashes[offsets[start] : offsets[end]][:, np.newaxis]
+        permuted = np.bitwise_and((hv * a + b) % _mersenne_prime, _max_hash)
 
-def build_minhash(session: Session):
+        has_followers = lengths[start:end] > 0
+        segment_starts = offsets[start:end][has_followers] - offsets[start]
+        if len(segment_starts):
+            signatures[start:end][has_followers] = np.minimum.reduceat(
+                permuted, segment_starts, axis=0
+            )
+        start = end
+
+    return signatures
+
+
+def estimate_cardinalities(signatures: np.ndarray) -> np.ndarray:
+    """Vectorized MinHash.count() over the rows of a signature matrix"""
+    return (
+        float(signatures.shape[-1]) / np.sum(signatures / float(_max_hash), axis=-1)
+        - 1.0
+    )
+
+
+def get_signature_fingerprint(signature: np.ndarray) -> str:
+    return hashlib.blake2b(signature.tobytes(), digest_size=8).hexdigest()
+
+
+def fetch_follower_ids(session: Session) -> Tuple[List[int], List[np.ndarray]]:
     engine = session.get_bind()
     connection = engine.raw_connection()
     cursor = connection.cursor()
@@ -31,70 +122,198 @@ def build_minhash(session: Session):
             group by 1
             """
         )
-
-        forest = MinHashLSHForest(num_perm=num_perm)
-
-        user_mh = {}
-        follower_counts = {}
-
+        user_ids = []
+        follower_id_arrays = []
         for (user_id, follower_ids) in cursor:
-            ids = [str(id).encode("utf8") for id in follower_ids]
-            mh = MinHash(num_perm=num_perm)
-            mh.update_batch(ids)
-
-            user_mh[user_id] = mh
-            follower_counts[user_id] = len(follower_ids)
-            forest.add(user_id, mh)
-        forest.index()
-        return (user_mh, forest)
+            user_ids.append(user_id)
+            follower_id_arrays.append(np.array(follower_ids, dtype=np.int64))
+        return user_ids, follower_id_arrays
 
     finally:
         connection.commit()
         connection.close()
 
 
-def update_related_artist_minhash(session: Session):
+class RelatedArtistsIndex:
+    """MinHash signatures of every artist and an LSH forest over them"""
 
-    (user_mh, forest) = build_minhash(session)
+    def __init__(self, user_ids: List[int], signatures: np.ndarray):
+        self.user_ids = user_ids
+        self.signatures = signatures
+        self.counts = estimate_cardinalities(signatures)
+        self.user_index = {user_id: i for i, user_id in enumerate(user_ids)}
 
-    engine = session.get_bind()
-    connection = engine.raw_connection()
-    cursor = connection.cursor()
+        self.minhashes = [
+            LeanMinHash(seed=MINHASH_SEED, hashvalues=signature)
+            for signature in signatures
+        ]
+        self.forest = MinHashLSHForest(num_perm=num_perm)
+        for user_id, minhash in zip(user_ids, self.minhashes):
+            self.forest.add(user_id, minhash)
+        self.forest.index()
 
-    try:
-        cursor.execute("truncate table related_artists;")
+    def query_candidates(self, user_id: int) -> List[int]:
+        # overfetch with rescore to improve accuracy:
+        # http://ekzhu.com/datasketch/lshforest.html#tips-for-improving-accuracy
+        return self.forest.query(self.minhashes[self.user_index[user_id]], top_k * 5)
 
-        for user_id, mh in user_mh.items():
-            if mh.count() < MIN_FOLLOWER_REQUIREMENT:
-                continue
+    def get_related_artists(self, user_id: int) -> List[Tuple[int, float]]:
+        """Returns the top_k (related artist id, score) for an artist"""
+        i = self.user_index[user_id]
+        if self.counts[i] < MIN_FOLLOWER_REQUIREMENT:
+            return []
 
-            # overfetch with rescore to improve accuracy:
-            # http://ekzhu.com/datasketch/lshforest.html#tips-for-improving-accuracy
-            similar = forest.query(mh, top_k * 5)
-            created_at = datetime.datetime.now()
+        others = [
+            other_id
+            for other_id in self.query_candidates(user_id)
+            if other_id != user_id
+        ]
+        if not others:
+            return []
+        other_indexes = np.array([self.user_index[other_id] for other_id in others])
 
-            rows = []
-            for other_id in similar:
-                if other_id == user_id:
-                    continue
-                mh2 = user_mh[other_id]
+        # this attempts to match previous formula
+        # https://github.com/AudiusProject/audius-protocol/blob/ddda462014ecdfd588f2834d07bf0a6066c56487/discovery-provider/src/queries/get_related_artists.py#L95-L98
+        union_counts = estimate_cardinalities(
+            np.minimum(self.signatures[i], self.signatures[other_indexes])
+        )
+        other_counts = self.counts[other_indexes]
+        intersection_sizes = self.counts[i] + other_counts - union_counts
+        scores = intersection_sizes * intersection_sizes / other_counts
 
-                # default datasketch score would come from jaccard estimation
-                # score = mh.jaccard(mh2)
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [(others[j], float(scores[j])) for j in top]
 
-                # this attempts to match previous formula
-                # https://github.com/AudiusProject/audius-protocol/blob/ddda462014ecdfd588f2834d07bf0a6066c56487/discovery-provider/src/queries/get_related_artists.py#L95-L98
-                union = MinHash.union(mh, mh2)
-                intersection_size = mh.count() + mh2.count() - union.count()
-                score = intersection_size * intersection_size / mh2.count()
 
-                rows.append((user_id, other_id, score, created_at))
+def build_minhash(session: Session) -> RelatedArtistsIndex:
+    start_time = time.time()
+    user_ids, follower_id_arrays = fetch_follower_ids(session)
+    fetch_time = time.time()
+    signatures = build_signatures(follower_id_arrays)
+    signature_time = time.time()
+    index = RelatedArtistsIndex(user_ids, signatures)
+    logger.info(
+        f"get_related_artists_minhash.py | built signatures for {len(user_ids)} artists: \
+        fetched followers in {fetch_time - start_time}s, \
+        hashed in {signature_time - fetch_time}s, \
+        indexed in {time.time() - signature_time}s"
+    )
+    return index
 
-            rows = sorted(rows, key=lambda x: x[2], reverse=True)[:top_k]
 
-            insert_query = "insert into related_artists (user_id, related_artist_user_id, score, created_at) values %s"
-            execute_values(cursor, insert_query, rows, template=None, page_size=100000)
+def get_affected_artists(
+    session: Session, index: RelatedArtistsIndex, changed: Set[int]
+) -> Set[int]:
+    """
+    Returns the artists whose related artists may change when the signatures of
+    `changed` artists change: the changed artists themselves, the artists that
+    currently list one of them, and the artists near one of them in the forest
+    """
+    affected = set(changed)
+    if not changed:
+        return affected
 
-    finally:
+    affected.update(
+        user_id
+        for (user_id,) in session.execute(
+            "select distinct user_id from related_artists where related_artist_user_id = any(:user_ids)",
+            {"user_ids": list(changed)},
+        )
+    )
+    for user_id in changed:
+        if user_id in index.user_index:
+            affected.update(index.query_candidates(user_id))
+    return affected
+
+
+def write_related_artists(
+    session: Session, rows: list, user_ids: Optional[Set[int]] = None
+):
+    """
+    Replaces the related artists of `user_ids`, or of everyone if None, in a
+    single transaction so readers see either the old or the new rows
+    """
+    engine = session.get_bind()
+    connection = engine.raw_connection()
+    cursor = connection.cursor()
+
+    try:
+        if user_ids is None:
+            cursor.execute("delete from related_artists;")
+        else:
+            cursor.execute(
+                "delete from related_artists where user_id = any(%s);",
+                (list(user_ids),),
+            )
+        insert_query = "insert into related_artists (user_id, related_artist_user_id, score, created_at) values %s"
+        execute_values(cursor, insert_query, rows, template=None, page_size=100000)
         connection.commit()
+    except Exception as e:
+        connection.rollback()
+        raise e
+    finally:
         connection.close()
+
+
+def update_related_artist_minhash(session: Session, redis: Optional[Redis] = None):
+    """
+    Recomputes related artists. With redis, the fingerprints of the last run's
+    signatures are kept so that between full rebuilds only the artists affected
+    by changed follower sets are rescored and rewritten.
+    """
+    index = build_minhash(session)
+
+    fingerprints = {
+        str(user_id): get_signature_fingerprint(signature)
+        for user_id, signature in zip(index.user_ids, index.signatures)
+    }
+
+    last_full_rebuild = (
+        redis.get(related_artists_last_full_rebuild_redis_key) if redis else None
+    )
+    full_rebuild = (
+        not last_full_rebuild
+        or time.time() - float(last_full_rebuild) > FULL_REBUILD_INTERVAL_SEC
+    )
+
+    affected: Optional[Set[int]] = None
+    if full_rebuild:
+        user_ids_to_score = index.user_ids
+    else:
+        previous_fingerprints: Dict[str, str] = {
+            user_id.decode(): fingerprint.decode()
+            for user_id, fingerprint in redis.hgetall(  # type: ignore
+                related_artists_fingerprints_redis_key
+            ).items()
+        }
+        changed = {
+            int(user_id)
+            for user_id in fingerprints.keys() | previous_fingerprints.keys()
+            if fingerprints.get(user_id) != previous_fingerprints.get(user_id)
+        }
+        affected = get_affected_artists(session, index, changed)
+        user_ids_to_score = [
+            user_id for user_id in index.user_ids if user_id in affected
+        ]
+
+    start_time = time.time()
+    created_at = datetime.datetime.now()
+    rows = [
+        (user_id, other_id, score, created_at)
+        for user_id in user_ids_to_score
+        for (other_id, score) in index.get_related_artists(user_id)
+    ]
+    write_related_artists(session, rows, affected)
+    logger.info(
+        f"get_related_artists_minhash.py | scored {len(user_ids_to_score)} artists \
+        ({'full rebuild' if full_rebuild else 'incremental'}) in {time.time() - start_time}s"
+    )
+
+    if redis:
+        pipe = redis.pipeline()
+        pipe.delete(related_artists_fingerprints_redis_key)
+        if fingerprints:
+            pipe.hmset(related_artists_fingerprints_redis_key, fingerprints)
+        if full_rebuild:
+            pipe.set(related_artists_last_full_rebuild_redis_key, time.time())
+        pipe.execute()
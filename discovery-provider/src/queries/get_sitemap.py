@@ -1,9 +1,11 @@
 import logging
 import urllib.parse
-from typing import List, Tuple
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 from lxml import etree
+from redis import Redis
 from sqlalchemy import asc, func
+from sqlalchemy.orm import Query
 from sqlalchemy.orm.session import Session
 from src.models.playlists.playlist import Playlist
 from src.models.tracks.track import Track
@@ -69,6 +71,10 @@ default_routes = [
 # The max number of urls that can be in a single sitemap
 LIMIT = 50_000
 
+# Pre-rendered sitemaps are stored under
+# sitemap:<type>:index and sitemap:<type>:<page>
+SITEMAP_REDIS_PREFIX = "sitemap"
+
 
 def build_default():
     root = etree.Element("urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9")
@@ -112,6 +118,10 @@ def get_max_playlist_count(session: Session) -> int:
 
 def get_dynamic_root(max: int, base_route: str, limit: int = LIMIT):
     num_pages = (max // limit) + 1 if max % limit != 0 else int(max / limit)
+    return get_sitemap_index(num_pages, base_route)
+
+
+def get_sitemap_index(num_pages: int, base_route: str):
     root = etree.Element("urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9")
     for num in range(num_pages):
         sitemap_el = etree.Element("sitemap")
@@ -134,9 +144,9 @@ def get_entity_page(slugs: List[str]):
     return etree.tostring(root, pretty_print=True)
 
 
-def get_track_slugs(session: Session, limit: int, offset: int):
-    slugs: List[str] = (
-        session.query(User.handle_lc, TrackRoute.slug)
+def get_track_slugs_query(session: Session):
+    return (
+        session.query(Track.track_id, User.handle_lc, TrackRoute.slug)
         .join(Track, TrackRoute.track_id == Track.track_id)
         .join(User, TrackRoute.owner_id == User.user_id)
         .filter(
@@ -145,52 +155,114 @@ def get_track_slugs(session: Session, limit: int, offset: int):
             User.is_current == True,
             TrackRoute.is_current == True,
         )
-        .order_by(asc(Track.track_id))
-        .limit(limit)
-        .offset(offset)
-        .all()
     )
 
-    return [f"{slug[0]}/{slug[1]}" for slug in slugs]
 
-
-def get_playlist_slugs(session: Session, limit: int, offset: int):
-    playlists: List[Tuple[str, str, int, str]] = (
+def get_playlist_slugs_query(session: Session):
+    return (
         session.query(
+            Playlist.playlist_id,
             User.handle_lc,
             Playlist.playlist_name,
-            Playlist.playlist_id,
             Playlist.is_album,
         )
         .join(User, User.user_id == Playlist.playlist_owner_id)
-        .filter(Playlist.is_current == True, Playlist.is_private == False)
-        .order_by(asc(Playlist.playlist_id))
-        .limit(limit)
-        .offset(offset)
-        .all()
+        .filter(
+            Playlist.is_current == True,
+            Playlist.is_private == False,
+            User.is_current == True,
+        )
     )
-    slugs = [
-        f"{p[0]}/{'album' if p[3] else 'playlist'}/{p[1]}-{p[2]}" for p in playlists
-    ]
 
-    return slugs
 
+def get_user_slugs_query(session: Session):
+    return session.query(User.user_id, User.handle_lc).filter(
+        User.is_current == True,
+        User.is_deactivated == False,
+        User.handle_lc != None,
+    )
 
-def get_user_slugs(session: Session, limit: int, offset: int):
-    slugs = (
-        session.query(User.handle_lc)
-        .filter(
-            User.is_current == True,
-            User.is_deactivated == False,
-            User.handle_lc != None,
-        )
-        .order_by(asc(User.user_id))
+
+def format_track_slug(row) -> str:
+    return f"{row[1]}/{row[2]}"
+
+
+def format_playlist_slug(row) -> str:
+    return f"{row[1]}/{'album' if row[3] else 'playlist'}/{row[2]}-{row[0]}"
+
+
+def format_user_slug(row) -> str:
+    return row[1]
+
+
+class SitemapEntity(NamedTuple):
+    get_query: Callable[[Session], Query]
+    # column the pages are ordered and keyset paginated by
+    id_column: Any
+    format_slug: Callable[[Any], str]
+
+
+SITEMAP_ENTITIES: Dict[str, SitemapEntity] = {
+    "track": SitemapEntity(get_track_slugs_query, Track.track_id, format_track_slug),
+    "playlist": SitemapEntity(
+        get_playlist_slugs_query, Playlist.playlist_id, format_playlist_slug
+    ),
+    "user": SitemapEntity(get_user_slugs_query, User.user_id, format_user_slug),
+}
+
+
+def get_entity_slugs(session: Session, type: str, limit: int, offset: int):
+    entity = SITEMAP_ENTITIES[type]
+    rows = (
+        entity.get_query(session)
+        .order_by(asc(entity.id_column))
         .limit(limit)
         .offset(offset)
         .all()
     )
+    return [entity.format_slug(row) for row in rows]
+
+
+def get_entity_slugs_after(
+    session: Session, type: str, limit: int, after_id: Optional[int] = None
+) -> List[Tuple[int, str]]:
+    """
+    Returns the next `limit` (id, slug) pairs ordered by id, starting after
+    `after_id`. Seeks on the id index instead of scanning past an offset.
+    """
+    entity = SITEMAP_ENTITIES[type]
+    query = entity.get_query(session)
+    if after_id is not None:
+        query = query.filter(entity.id_column > after_id)
+    rows = query.order_by(asc(entity.id_column)).limit(limit).all()
+    return [(row[0], entity.format_slug(row)) for row in rows]
+
+
+def iter_entity_slug_pages(
+    session: Session, type: str, limit: int = LIMIT
+) -> Iterator[List[Tuple[int, str]]]:
+    """Streams every sitemap page of (id, slug) pairs for the entity type"""
+    after_id = None
+    while True:
+        page = get_entity_slugs_after(session, type, limit, after_id)
+        if not page:
+            return
+        yield page
+        if len(page) < limit:
+            return
+        after_id = page[-1][0]
+
+
+def get_track_slugs(session: Session, limit: int, offset: int):
+    return get_entity_slugs(session, "track", limit, offset)
+
+
+def get_playlist_slugs(session: Session, limit: int, offset: int):
+    return get_entity_slugs(session, "playlist", limit, offset)
+
 
-    return [slug[0] for slug in slugs]
+def get_user_slugs(session: Session, limit: int, offset: int):
+    return get_entity_slugs(session, "user", limit, offset)
 
 
 def get_track_root(session: Session, limit: int = LIMIT):
@@ -224,3 +296,25 @@ def get_user_page(session: Session, page: int, limit: int = LIMIT):
     offset = (page - 1) * limit
     slugs = get_user_slugs(session, limit, offset)
     return get_entity_page(slugs)
+
+
+def get_sitemap_page_redis_key(type: str, page: int) -> str:
+    return f"{SITEMAP_REDIS_PREFIX}:{type}:{page}"
+
+
+def get_sitemap_index_redis_key(type: str) -> str:
+    return f"{SITEMAP_REDIS_PREFIX}:{type}:index"
+
+
+def get_sitemap_digests_redis_key(type: str) -> str:
+    return f"{SITEMAP_REDIS_PREFIX}:{type}:digests"
+
+
+def get_cached_sitemap_index(redis: Redis, type: str) -> Optional[bytes]:
+    """Returns the gzip compressed sitemap index built by index_sitemaps"""
+    return redis.get(get_sitemap_index_redis_key(type))
+
+
+def get_cached_sitemap_page(redis: Redis, type: str, page: int) -> Optional[bytes]:
+    """Returns the gzip compressed sitemap page built by index_sitemaps"""
+    return redis.get(get_sitemap_page_redis_key(type, page))
@@ -1,6 +1,7 @@
+from collections import defaultdict
 from typing import Optional, TypedDict
 
-from sqlalchemy import desc
+from sqlalchemy import and_, case, desc, func, or_
 from sqlalchemy.orm.session import Session
 from src.models.tracks.track import Track
 from src.models.tracks.track_trending_score import TrackTrendingScore
@@ -8,6 +9,7 @@ from src.premium_content.premium_content_constants import (
     SHOULD_TRENDING_EXCLUDE_PREMIUM_TRACKS,
 )
 from src.queries.get_unpopulated_tracks import get_unpopulated_tracks
+from src.queries.hydration_context import get_hydration_context
 from src.queries.query_helpers import add_users_to_tracks, populate_track_metadata
 from src.tasks.generate_trending import generate_trending
 from src.trending_strategies.base_trending_strategy import BaseTrendingStrategy
@@ -83,6 +85,15 @@ def generate_unpopulated_trending(
     return (tracks, track_ids)
 
 
+def get_mat_view_time_range(strategy, time_range):
+    # use all time instead of year for version EJ57D
+    if strategy.version == TrendingVersion.EJ57D and time_range == "year":
+        return "allTime"
+    if strategy.version != TrendingVersion.EJ57D and time_range == "allTime":
+        return "year"
+    return time_range
+
+
 def generate_unpopulated_trending_from_mat_views(
     session,
     genre,
@@ -92,15 +103,11 @@ def generate_unpopulated_trending_from_mat_views(
     limit=TRENDING_LIMIT,
 ):
 
-    # use all time instead of year for version EJ57D
-    if strategy.version == TrendingVersion.EJ57D and time_range == "year":
-        time_range = "allTime"
-    elif strategy.version != TrendingVersion.EJ57D and time_range == "allTime":
-        time_range = "year"
+    time_range = get_mat_view_time_range(strategy, time_range)
 
-    trending_track_ids_query = session.query(
-        TrackTrendingScore.track_id, TrackTrendingScore.score
-    ).filter(
+    # scores are stored without time decay, see get_score_expression
+    score = strategy.get_score_expression(time_range).label("score")
+    trending_track_ids_query = session.query(TrackTrendingScore.track_id, score).filter(
         TrackTrendingScore.type == strategy.trending_type.name,
         TrackTrendingScore.version == strategy.version.name,
         TrackTrendingScore.time_range == time_range,
@@ -140,7 +147,7 @@ def generate_unpopulated_trending_from_mat_views(
     else:
         trending_track_ids = (
             trending_track_ids_query.order_by(
-                desc(TrackTrendingScore.score), desc(TrackTrendingScore.track_id)
+                desc(score), desc(TrackTrendingScore.track_id)
             )
             .limit(limit)
             .all()
@@ -153,6 +160,124 @@ def generate_unpopulated_trending_from_mat_views(
     return (tracks, track_ids)
 
 
+def generate_all_unpopulated_trending_from_mat_views(
+    session,
+    genres,
+    time_ranges,
+    strategy,
+    exclude_premium=SHOULD_TRENDING_EXCLUDE_PREMIUM_TRACKS,
+    limit=TRENDING_LIMIT,
+):
+    """
+    Ranks every genre and time range slice of trending with a single query and
+    fetches the tracks for all of them at once.
+
+    Returns a dict of (genre, time_range) -> (tracks, track_ids), where each
+    value is what generate_unpopulated_trending_from_mat_views returns for that
+    slice. An empty genre is trending across all genres.
+    """
+    mat_view_time_ranges = {
+        time_range: get_mat_view_time_range(strategy, time_range)
+        for time_range in time_ranges
+    }
+    genre_set = {genre for genre in genres if genre}
+
+    score = case(
+        [
+            (
+                TrackTrendingScore.time_range == mat_view_time_range,
+                strategy.get_score_expression(mat_view_time_range),
+            )
+            for mat_view_time_range in set(mat_view_time_ranges.values())
+        ],
+        else_=TrackTrendingScore.score,
+    )
+    order_by = (desc(score), desc(TrackTrendingScore.track_id))
+    ranked_query = session.query(
+        TrackTrendingScore.track_id,
+        TrackTrendingScore.genre,
+        TrackTrendingScore.time_range,
+        func.row_number()
+        .over(
+            partition_by=(TrackTrendingScore.genre, TrackTrendingScore.time_range),
+            order_by=order_by,
+        )
+        .label("genre_rank"),
+        func.row_number()
+        .over(partition_by=TrackTrendingScore.time_range, order_by=order_by)
+        .label("rank"),
+    ).filter(
+        TrackTrendingScore.type == strategy.trending_type.name,
+        TrackTrendingScore.version == strategy.version.name,
+        TrackTrendingScore.time_range.in_(set(mat_view_time_ranges.values())),
+    )
+
+    # If exclude_premium is true, then filter out track ids belonging to
+    # premium tracks before ranking.
+    if exclude_premium:
+        ranked_query = ranked_query.join(
+            Track, Track.track_id == TrackTrendingScore.track_id
+        ).filter(
+            Track.is_current == True,
+            Track.is_delete == False,
+            Track.is_premium == False,
+        )
+
+    ranked = ranked_query.subquery()
+    ranked_rows = (
+        session.query(
+            ranked.c.track_id,
+            ranked.c.genre,
+            ranked.c.time_range,
+            ranked.c.genre_rank,
+            ranked.c.rank,
+        )
+        .filter(
+            or_(
+                and_(ranked.c.genre.in_(genre_set), ranked.c.genre_rank <= limit),
+                ranked.c.rank <= limit,
+            )
+        )
+        .all()
+    )
+
+    ranked_track_ids = defaultdict(list)
+    for row in ranked_rows:
+        if row.rank <= limit:
+            ranked_track_ids[(None, row.time_range)].append((row.rank, row.track_id))
+        if row.genre in genre_set and row.genre_rank <= limit:
+            ranked_track_ids[(row.genre, row.time_range)].append(
+                (row.genre_rank, row.track_id)
+            )
+
+    # Get unpopulated metadata for every slice at once
+    tracks = get_unpopulated_tracks(
+        session,
+        list({row.track_id for row in ranked_rows}),
+        exclude_premium=exclude_premium,
+    )
+    tracks_by_id = {track["track_id"]: track for track in tracks}
+
+    trending = {}
+    for genre in genres:
+        for time_range, mat_view_time_range in mat_view_time_ranges.items():
+            track_ids = [
+                track_id
+                for _, track_id in sorted(
+                    ranked_track_ids[(genre or None, mat_view_time_range)]
+                )
+            ]
+            trending[(genre, time_range)] = (
+                [
+                    tracks_by_id[track_id]
+                    for track_id in track_ids
+                    if track_id in tracks_by_id
+                ],
+                track_ids,
+            )
+    return trending
+
+
 def make_generate_unpopulated_trending(
     session: Session,
     genre: Optional[str],
@@ -223,6 +348,13 @@ def _get_trending_tracks_with_session(
         ),
     )
 
+    # load the tracks' and their owners' metadata together
+    get_hydration_context(current_user_id).prefetch(
+        session,
+        user_ids={track["owner_id"] for track in tracks},
+        track_ids=track_ids,
+    )
+
     # populate track metadata
     tracks = populate_track_metadata(session, track_ids, tracks, current_user_id)
     tracks_map = {track["track_id"]: track for track in tracks}
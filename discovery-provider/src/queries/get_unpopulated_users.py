@@ -25,13 +25,15 @@ def get_unpopulated_users(session, user_ids):
         Array of users
     """
 
+    # select the user columns rather than User models, users have no
+    # properties or eagerly loaded relationships to serialize
     users = (
-        session.query(User)
+        session.query(*helpers.model_columns(User))
         .filter(User.is_current == True, User.wallet != None, User.handle != None)
         .filter(User.user_id.in_(user_ids))
         .all()
     )
-    users = helpers.query_result_to_list(users)
+    users = helpers.column_rows_to_list(users, User)
     queried_users = {user["user_id"]: user for user in users}
 
     users_response = []
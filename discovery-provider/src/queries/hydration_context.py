@@ -0,0 +1,493 @@
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from flask import g, has_request_context
+from sqlalchemy import and_, bindparam, func, or_, text
+from sqlalchemy.orm.session import Session
+from src.models.playlists.aggregate_playlist import AggregatePlaylist
+from src.models.social.follow import Follow
+from src.models.social.repost import Repost, RepostType
+from src.models.social.save import Save, SaveType
+from src.models.tracks.aggregate_track import AggregateTrack
+from src.models.tracks.track import Track
+from src.models.users.aggregate_user import AggregateUser
+from src.models.users.user_bank import UserBankAccount
+from src.queries import response_name_constants
+from src.queries.get_balances import get_balances
+from src.utils import helpers, redis_connection
+
+logger = logging.getLogger(__name__)
+
+redis = redis_connection.get_redis()
+
+RepostKey = Tuple[int, RepostType]
+SaveKey = Tuple[int, SaveType]
+
+
+class HydrationContext:
+    """
+    Request scoped store of the aggregates and current user relationships used by
+    populate_user_metadata, populate_track_metadata and populate_playlist_metadata.
+
+    Each getter only queries for the ids it has not seen yet in this request, so
+    populating the same users, tracks or playlists again is free, and `prefetch`
+    loads everything a response needs up front with one query per relation
+    instead of one per populate call.
+    """
+
+    def __init__(self, current_user_id: Optional[int] = None):
+        self.current_user_id = current_user_id
+        self.query_count = 0
+
+        self._user_counts: Dict[int, dict] = {}
+        self._user_track_blocknumbers: Dict[int, int] = {}
+        self._user_banks: Dict[str, Optional[str]] = {}
+        self._user_balances: Dict[int, dict] = {}
+        self._current_user_follows: Dict[int, Tuple[bool, bool]] = {}
+        self._current_user_followee_follow_counts: Dict[int, int] = {}
+
+        self._track_counts: Dict[int, dict] = {}
+        self._track_play_counts: Dict[int, int] = {}
+        self._playlist_counts: Dict[int, dict] = {}
+
+        self._current_user_reposts: Dict[RepostKey, bool] = {}
+        self._current_user_saves: Dict[SaveKey, bool] = {}
+        self._followee_reposts: Dict[RepostKey, List[dict]] = {}
+        self._followee_saves: Dict[SaveKey, List[dict]] = {}
+
+    def _load_missing(
+        self,
+        cache: dict,
+        keys: Iterable[Hashable],
+        fetch: Callable[[list], dict],
+        default,
+    ):
+        """Fetches the keys that are not cached yet and caches `default` for misses"""
+        missing = list({key for key in keys if key is not None and key not in cache})
+        if not missing:
+            return
+        self.query_count += 1
+        fetched = fetch(missing)
+        for key in missing:
+            cache[key] = fetched.get(key, default)
+
+    def prefetch(
+        self,
+        session: Session,
+        user_ids: Iterable[int] = (),
+        track_ids: Iterable[int] = (),
+        playlists: Iterable[dict] = (),
+        playlist_repost_types: Iterable[RepostType] = (),
+        playlist_save_types: Iterable[SaveType] = (),
+    ):
+        """
+        Loads the aggregates and current user relationships for all the users,
+        tracks and playlists of a response, so the populate functions called on
+        them afterwards do not query again
+        """
+        user_ids = list(user_ids)
+        track_ids = list(track_ids)
+        playlists = list(playlists)
+        playlist_ids = [playlist["playlist_id"] for playlist in playlists]
+        playlist_track_ids = [
+            track["track"]
+            for playlist in playlists
+            for track in playlist["playlist_contents"]["track_ids"]
+        ]
+
+        if user_ids:
+            self.get_user_counts(session, user_ids)
+            self.get_user_track_blocknumbers(session, user_ids)
+            self.get_user_balances(session, user_ids)
+            self.get_current_user_follows(session, user_ids)
+            self.get_current_user_followee_follow_counts(session, user_ids)
+        if track_ids:
+            self.get_track_counts(session, track_ids)
+        if playlist_ids:
+            self.get_playlist_counts(session, playlist_ids)
+        self.get_track_play_counts(session, track_ids + playlist_track_ids)
+
+        repost_keys = [(track_id, RepostType.track) for track_id in track_ids] + [
+            (playlist_id, repost_type)
+            for playlist_id in playlist_ids
+            for repost_type in playlist_repost_types
+        ]
+        save_keys = [(track_id, SaveType.track) for track_id in track_ids] + [
+            (playlist_id, save_type)
+            for playlist_id in playlist_ids
+            for save_type in playlist_save_types
+        ]
+        self.get_current_user_reposts(session, repost_keys)
+        self.get_current_user_saves(session, save_keys)
+        self.get_followee_reposts(session, repost_keys)
+        self.get_followee_saves(session, save_keys)
+
+    # ####### USERS ####### #
+
+    def get_user_counts(self, session: Session, user_ids: Iterable[int]):
+        def fetch(missing):
+            rows = (
+                session.query(
+                    AggregateUser.user_id,
+                    AggregateUser.track_count,
+                    AggregateUser.playlist_count,
+                    AggregateUser.album_count,
+                    AggregateUser.follower_count,
+                    AggregateUser.following_count,
+                    AggregateUser.repost_count,
+                    AggregateUser.track_save_count,
+                    AggregateUser.supporter_count,
+                    AggregateUser.supporting_count,
+                )
+                .filter(AggregateUser.user_id.in_(missing))
+                .all()
+            )
+            return {
+                user_id: {
+                    response_name_constants.track_count: track_count,
+                    response_name_constants.playlist_count: playlist_count,
+                    response_name_constants.album_count: album_count,
+                    response_name_constants.follower_count: follower_count,
+                    response_name_constants.followee_count: following_count,
+                    response_name_constants.repost_count: repost_count,
+                    response_name_constants.track_save_count: track_save_count,
+                    response_name_constants.supporter_count: supporter_count,
+                    response_name_constants.supporting_count: supporting_count,
+                }
+                for (
+                    user_id,
+                    track_count,
+                    playlist_count,
+                    album_count,
+                    follower_count,
+                    following_count,
+                    repost_count,
+                    track_save_count,
+                    supporter_count,
+                    supporting_count,
+                ) in rows
+            }
+
+        self._load_missing(self._user_counts, user_ids, fetch, {})
+        return self._user_counts
+
+    def get_user_track_blocknumbers(self, session: Session, user_ids: Iterable[int]):
+        def fetch(missing):
+            return dict(
+                session.query(Track.owner_id, func.max(Track.blocknumber))
+                .filter(
+                    Track.is_current == True,
+                    Track.is_delete == False,
+                    Track.owner_id.in_(missing),
+                )
+                .group_by(Track.owner_id)
+                .all()
+            )
+
+        self._load_missing(self._user_track_blocknumbers, user_ids, fetch, -1)
+        return self._user_track_blocknumbers
+
+    def get_user_banks(self, session: Session, wallets: Iterable[str]):
+        def fetch(missing):
+            return dict(
+                session.query(
+                    UserBankAccount.ethereum_address, UserBankAccount.bank_account
+                ).filter(UserBankAccount.ethereum_address.in_(missing))
+            )
+
+        self._load_missing(self._user_banks, wallets, fetch, None)
+        return self._user_banks
+
+    def get_user_balances(self, session: Session, user_ids: Iterable[int]):
+        def fetch(missing):
+            return get_balances(session, redis, missing)
+
+        self._load_missing(self._user_balances, user_ids, fetch, {})
+        return self._user_balances
+
+    def get_current_user_follows(self, session: Session, user_ids: Iterable[int]):
+        """
+        Returns a dict of user id -> (whether the current user follows them,
+        whether they follow the current user)
+        """
+        current_user_id = self.current_user_id
+        if not current_user_id:
+            return {}
+
+        def fetch(missing):
+            # collect all incoming and outgoing follow edges for current user.
+            rows = (
+                session.query(Follow.follower_user_id, Follow.followee_user_id)
+                .filter(
+                    Follow.is_current == True,
+                    Follow.is_delete == False,
+                    or_(
+                        and_(
+                            Follow.followee_user_id.in_(missing),
+                            Follow.follower_user_id == current_user_id,
+                        ),
+                        and_(
+                            Follow.followee_user_id == current_user_id,
+                            Follow.follower_user_id.in_(missing),
+                        ),
+                    ),
+                )
+                .all()
+            )
+            edges: Dict[int, Tuple[bool, bool]] = {}
+            for follower_id, followee_id in rows:
+                if follower_id == current_user_id:
+                    _, followed_by = edges.get(followee_id, (False, False))
+                    edges[followee_id] = (True, followed_by)
+                else:
+                    follows, _ = edges.get(follower_id, (False, False))
+                    edges[follower_id] = (follows, True)
+            return edges
+
+        self._load_missing(self._current_user_follows, user_ids, fetch, (False, False))
+        return self._current_user_follows
+
+    def get_current_user_followee_follow_counts(
+        self, session: Session, user_ids: Iterable[int]
+    ):
+        """Returns a dict of user id -> number of the current user's followees following them"""
+        if not self.current_user_id:
+            return {}
+
+        def fetch(missing):
+            return dict(
+                session.query(
+                    Follow.followee_user_id, func.count(Follow.followee_user_id)
+                )
+                .filter(
+                    Follow.is_current == True,
+                    Follow.is_delete == False,
+                    Follow.follower_user_id.in_(self._followees_subquery(session)),
+                    Follow.followee_user_id.in_(missing),
+                )
+                .group_by(Follow.followee_user_id)
+                .all()
+            )
+
+        self._load_missing(
+            self._current_user_followee_follow_counts, user_ids, fetch, 0
+        )
+        return self._current_user_followee_follow_counts
+
+    # ####### TRACKS AND PLAYLISTS ####### #
+
+    def get_track_counts(self, session: Session, track_ids: Iterable[int]):
+        def fetch(missing):
+            rows = (
+                session.query(
+                    AggregateTrack.track_id,
+                    AggregateTrack.repost_count,
+                    AggregateTrack.save_count,
+                )
+                .filter(AggregateTrack.track_id.in_(missing))
+                .all()
+            )
+            return {
+                track_id: {
+                    response_name_constants.repost_count: repost_count,
+                    response_name_constants.save_count: save_count,
+                }
+                for (track_id, repost_count, save_count) in rows
+            }
+
+        self._load_missing(self._track_counts, track_ids, fetch, {})
+        return self._track_counts
+
+    def get_track_play_counts(self, session: Session, track_ids: Iterable[int]):
+        def fetch(missing):
+            query = text(
+                """
+                select play_item_id, count
+                from aggregate_plays
+                where play_item_id in :ids
+                """
+            ).bindparams(bindparam("ids", expanding=True))
+            return dict(session.execute(query, {"ids": missing}).fetchall())
+
+        self._load_missing(self._track_play_counts, track_ids, fetch, 0)
+        return self._track_play_counts
+
+    def get_playlist_counts(self, session: Session, playlist_ids: Iterable[int]):
+        def fetch(missing):
+            rows = (
+                session.query(
+                    AggregatePlaylist.playlist_id,
+                    AggregatePlaylist.repost_count,
+                    AggregatePlaylist.save_count,
+                )
+                .filter(AggregatePlaylist.playlist_id.in_(missing))
+                .all()
+            )
+            return {
+                playlist_id: {
+                    response_name_constants.repost_count: repost_count,
+                    response_name_constants.save_count: save_count,
+                }
+                for (playlist_id, repost_count, save_count) in rows
+            }
+
+        self._load_missing(self._playlist_counts, playlist_ids, fetch, {})
+        return self._playlist_counts
+
+    # ####### CURRENT USER RELATIONSHIPS ####### #
+
+    def _followees_subquery(self, session: Session):
+        return (
+            session.query(Follow.followee_user_id)
+            .filter(
+                Follow.follower_user_id == self.current_user_id,
+                Follow.is_current == True,
+                Follow.is_delete == False,
+            )
+            .subquery()
+        )
+
+    def _get_reposts(self, session: Session, keys: List[RepostKey], user_filter):
+        """Returns the reposts matching user_filter for (item id, repost type) keys"""
+        item_ids_by_type = defaultdict(list)
+        for item_id, repost_type in keys:
+            item_ids_by_type[repost_type].append(item_id)
+        reposts = (
+            session.query(Repost)
+            .filter(
+                Repost.is_current == True,
+                Repost.is_delete == False,
+                user_filter,
+                or_(
+                    *[
+                        and_(
+                            Repost.repost_type == repost_type,
+                            Repost.repost_item_id.in_(item_ids),
+                        )
+                        for repost_type, item_ids in item_ids_by_type.items()
+                    ]
+                ),
+            )
+            .all()
+        )
+        return reposts
+
+    def _get_saves(self, session: Session, keys: List[SaveKey], user_filter):
+        """Returns the saves matching user_filter for (item id, save type) keys"""
+        item_ids_by_type = defaultdict(list)
+        for item_id, save_type in keys:
+            item_ids_by_type[save_type].append(item_id)
+        saves = (
+            session.query(Save)
+            .filter(
+                Save.is_current == True,
+                Save.is_delete == False,
+                user_filter,
+                or_(
+                    *[
+                        and_(
+                            Save.save_type == save_type,
+                            Save.save_item_id.in_(item_ids),
+                        )
+                        for save_type, item_ids in item_ids_by_type.items()
+                    ]
+                ),
+            )
+            .all()
+        )
+        return saves
+
+    def get_current_user_reposts(self, session: Session, keys: Iterable[RepostKey]):
+        """Returns a dict of (item id, repost type) -> whether the current user reposted it"""
+        if not self.current_user_id:
+            return {}
+
+        def fetch(missing):
+            reposts = self._get_reposts(
+                session, missing, Repost.user_id == self.current_user_id
+            )
+            return {
+                (repost.repost_item_id, repost.repost_type): True for repost in reposts
+            }
+
+        self._load_missing(self._current_user_reposts, keys, fetch, False)
+        return self._current_user_reposts
+
+    def get_current_user_saves(self, session: Session, keys: Iterable[SaveKey]):
+        """Returns a dict of (item id, save type) -> whether the current user saved it"""
+        if not self.current_user_id:
+            return {}
+
+        def fetch(missing):
+            saves = self._get_saves(
+                session, missing, Save.user_id == self.current_user_id
+            )
+            return {(save.save_item_id, save.save_type): True for save in saves}
+
+        self._load_missing(self._current_user_saves, keys, fetch, False)
+        return self._current_user_saves
+
+    def get_followee_reposts(self, session: Session, keys: Iterable[RepostKey]):
+        """Returns a dict of (item id, repost type) -> reposts by the current user's followees"""
+        if not self.current_user_id:
+            return {}
+
+        def fetch(missing):
+            reposts = self._get_reposts(
+                session,
+                missing,
+                Repost.user_id.in_(self._followees_subquery(session)),
+            )
+            followee_reposts = defaultdict(list)
+            for repost in helpers.query_result_to_list(reposts):
+                followee_reposts[
+                    (repost["repost_item_id"], RepostType(repost["repost_type"]))
+                ].append(repost)
+            return followee_reposts
+
+        self._load_missing(self._followee_reposts, keys, fetch, [])
+        return self._followee_reposts
+
+    def get_followee_saves(self, session: Session, keys: Iterable[SaveKey]):
+        """Returns a dict of (item id, save type) -> saves by the current user's followees"""
+        if not self.current_user_id:
+            return {}
+
+        def fetch(missing):
+            saves = self._get_saves(
+                session,
+                missing,
+                Save.user_id.in_(self._followees_subquery(session)),
+            )
+            followee_saves = defaultdict(list)
+            for save in helpers.query_result_to_list(saves):
+                followee_saves[
+                    (save["save_item_id"], SaveType(save["save_type"]))
+                ].append(save)
+            return followee_saves
+
+        self._load_missing(self._followee_saves, keys, fetch, [])
+        return self._followee_saves
+
+
+def get_hydration_context(current_user_id: Optional[int]) -> HydrationContext:
+    """
+    Returns the hydration context of the current request for current_user_id.
+    Outside of a request (eg. in celery tasks) every call gets a new context so
+    nothing is cached across calls.
+    """
+    if not has_request_context():
+        return HydrationContext(current_user_id)
+    if "hydration_contexts" not in g:
+        g.hydration_contexts = {}
+    if current_user_id not in g.hydration_contexts:
+        g.hydration_contexts[current_user_id] = HydrationContext(current_user_id)
+    return g.hydration_contexts[current_user_id]
+
+
+def get_request_hydration_query_count() -> int:
+    """Returns the number of queries the hydration contexts of this request ran"""
+    if not has_request_context() or "hydration_contexts" not in g:
+        return 0
+    return sum(context.query_count for context in g.hydration_contexts.values())
@@ -1,3 +1,4 @@
+import gzip
 import logging  # pylint: disable=C0302
 import re
 
@@ -26,7 +27,11 @@ from src.queries.get_savers_for_playlist import get_savers_for_playlist
 from src.queries.get_savers_for_track import get_savers_for_track
 from src.queries.get_saves import get_saves
 from src.queries.get_sitemap import (
+    SITEMAP_ENTITIES,
     build_default,
+    get_cached_sitemap_index,
+    get_cached_sitemap_page,
+    get_entity_page,
     get_playlist_page,
     get_playlist_root,
     get_track_page,
@@ -54,6 +59,7 @@ from src.queries.get_user_history import get_user_history
 from src.queries.get_users import get_users
 from src.queries.get_users_account import get_users_account
 from src.queries.query_helpers import get_current_user_id, get_pagination_vars
+from src.utils import redis_connection
 from src.utils.db_session import get_db_read_replica
 from src.utils.redis_metrics import record_metrics
 
@@ -680,9 +686,30 @@ def get_base_sitemap():
         return api_helpers.error_response(str(e), 400)
 
 
+def sitemap_response(compressed_xml: bytes):
+    """Serves a pre-rendered sitemap, decompressing it for clients without gzip"""
+    if "gzip" in request.accept_encodings:
+        response = Response(compressed_xml, mimetype="text/xml")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(gzip.decompress(compressed_xml), mimetype="text/xml")
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
 @bp.route("/sitemaps/<string:type>/index.xml", methods=("GET",))
 def get_type_base_sitemap(type):
     try:
+        if type not in SITEMAP_ENTITIES:
+            return api_helpers.error_response(
+                f"Invalid sitemap type {type}, should be one of playlist, track, user",
+                400,
+            )
+        cached_xml = get_cached_sitemap_index(redis_connection.get_redis(), type)
+        if cached_xml:
+            return sitemap_response(cached_xml)
+
+        # Sitemaps have not been pre-rendered yet, build from the db
         db = get_db_read_replica()
         with db.scoped_session() as session:
             xml = ""
@@ -692,11 +719,6 @@ def get_type_base_sitemap(type):
                 xml = get_track_root(session)
             elif type == "user":
                 xml = get_user_root(session)
-            else:
-                return api_helpers.error_response(
-                    f"Invalid sitemap type {type}, should be one of playlist, track, user",
-                    400,
-                )
             return Response(xml, mimetype="text/xml")
     except exceptions.ArgumentError as e:
         return api_helpers.error_response(str(e), 400)
@@ -711,6 +733,20 @@ def get_type_sitemap_page(type: str, file_name: str):
                 f"Invalid filepath {file_name}, should be of format <integer>.xml", 400
             )
         page_number = int(number.group(1))
+        if type not in SITEMAP_ENTITIES:
+            return api_helpers.error_response(
+                f"Invalid sitemap type {type}, should be one of playlist, track, user",
+                400,
+            )
+        redis = redis_connection.get_redis()
+        cached_xml = get_cached_sitemap_page(redis, type, page_number)
+        if cached_xml:
+            return sitemap_response(cached_xml)
+        if get_cached_sitemap_index(redis, type):
+            # Pre-rendered pages are complete, so the page is past the end
+            return Response(get_entity_page([]), mimetype="text/xml")
+
+        # Sitemaps have not been pre-rendered yet, build from the db
         db = get_db_read_replica()
         with db.scoped_session() as session:
             xml = ""
@@ -720,11 +756,6 @@ def get_type_sitemap_page(type: str, file_name: str):
                 xml = get_track_page(session, page_number)
             elif type == "user":
                 xml = get_user_page(session, page_number)
-            else:
-                return api_helpers.error_response(
-                    f"Invalid sitemap type {type}, should be one of playlist, track, user",
-                    400,
-                )
             return Response(xml, mimetype="text/xml")
     except exceptions.ArgumentError as e:
         return api_helpers.error_response(str(e), 400)
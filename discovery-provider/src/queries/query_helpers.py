@@ -4,35 +4,30 @@ import logging
 from typing import Tuple
 
 from flask import request
-from sqlalchemy import Integer, and_, bindparam, cast, desc, func, text
+from sqlalchemy import Integer, and_, cast, desc, func, text
 from sqlalchemy.orm.session import Session
 from sqlalchemy.sql.expression import or_
 from src import exceptions
-from src.models.playlists.aggregate_playlist import AggregatePlaylist
 from src.models.playlists.playlist import Playlist
 from src.models.social.follow import Follow
 from src.models.social.repost import Repost, RepostType
 from src.models.social.save import Save, SaveType
-from src.models.tracks.aggregate_track import AggregateTrack
 from src.models.tracks.remix import Remix
 from src.models.tracks.track import Track
 from src.models.users.aggregate_user import AggregateUser
 from src.models.users.user import User
-from src.models.users.user_bank import UserBankAccount
 from src.premium_content.premium_content_access_checker import (
     premium_content_access_checker,
 )
 from src.premium_content.signature import get_premium_content_signature_for_user
 from src.queries import response_name_constants
-from src.queries.get_balances import get_balances
 from src.queries.get_unpopulated_users import get_unpopulated_users
+from src.queries.hydration_context import get_hydration_context
 from src.trending_strategies.trending_type_and_version import TrendingVersion
-from src.utils import helpers, redis_connection
+from src.utils import helpers
 
 logger = logging.getLogger(__name__)
 
-redis = redis_connection.get_redis()
-
 
 # ####### VARS ####### #
 
@@ -137,125 +132,18 @@ class SortDirection(str, enum.Enum):
 def populate_user_metadata(
     session, user_ids, users, current_user_id, with_track_save_count=False
 ):
-    aggregate_user = (
-        session.query(
-            AggregateUser.user_id,
-            AggregateUser.track_count,
-            AggregateUser.playlist_count,
-            AggregateUser.album_count,
-            AggregateUser.follower_count,
-            AggregateUser.following_count,
-            AggregateUser.repost_count,
-            AggregateUser.track_save_count,
-            AggregateUser.supporter_count,
-            AggregateUser.supporting_count,
-        )
-        .filter(AggregateUser.user_id.in_(user_ids))
-        .all()
-    )
-
+    context = get_hydration_context(current_user_id)
+    count_dict = context.get_user_counts(session, user_ids)
     # build a dict of user (eth) wallet -> user bank
-    user_banks = session.query(
-        UserBankAccount.ethereum_address, UserBankAccount.bank_account
-    ).filter(UserBankAccount.ethereum_address.in_(user["wallet"] for user in users))
-    user_banks_dict = dict(user_banks)
-
-    # build dict of user id --> track/playlist/album/follower/followee/repost/track save/supporting/supporter counts
-    count_dict = {
-        user_id: {
-            response_name_constants.track_count: track_count,
-            response_name_constants.playlist_count: playlist_count,
-            response_name_constants.album_count: album_count,
-            response_name_constants.follower_count: follower_count,
-            response_name_constants.followee_count: following_count,
-            response_name_constants.repost_count: repost_count,
-            response_name_constants.track_save_count: track_save_count,
-            response_name_constants.supporter_count: supporter_count,
-            response_name_constants.supporting_count: supporting_count,
-        }
-        for (
-            user_id,
-            track_count,
-            playlist_count,
-            album_count,
-            follower_count,
-            following_count,
-            repost_count,
-            track_save_count,
-            supporter_count,
-            supporting_count,
-        ) in aggregate_user
-    }
-
-    # build dict of user id --> track blocknumber
-    track_blocknumbers = (
-        session.query(Track.owner_id, func.max(Track.blocknumber))
-        .filter(
-            Track.is_current == True,
-            Track.is_delete == False,
-            Track.owner_id.in_(user_ids),
-        )
-        .group_by(Track.owner_id)
-        .all()
+    user_banks_dict = context.get_user_banks(
+        session, [user["wallet"] for user in users]
     )
-    track_blocknumber_dict = dict(track_blocknumbers)
-
-    follows_current_user_set = set()
-    current_user_followed_user_ids = {}
-    current_user_followee_follow_count_dict = {}
-    if current_user_id:
-        # collect all incoming and outgoing follow edges for current user.
-        current_user_follow_rows = (
-            session.query(Follow.follower_user_id, Follow.followee_user_id)
-            .filter(
-                Follow.is_current == True,
-                Follow.is_delete == False,
-                or_(
-                    and_(
-                        Follow.followee_user_id.in_(user_ids),
-                        Follow.follower_user_id == current_user_id,
-                    ),
-                    and_(
-                        Follow.followee_user_id == current_user_id,
-                        Follow.follower_user_id.in_(user_ids),
-                    ),
-                ),
-            )
-            .all()
-        )
-        for follower_id, following_id in current_user_follow_rows:
-            if follower_id == current_user_id:
-                current_user_followed_user_ids[following_id] = True
-            else:
-                follows_current_user_set.add(follower_id)
-
-        # build dict of user id --> followee follow count
-        current_user_followees = (
-            session.query(Follow.followee_user_id)
-            .filter(
-                Follow.is_current == True,
-                Follow.is_delete == False,
-                Follow.follower_user_id == current_user_id,
-            )
-            .subquery()
-        )
-
-        current_user_followee_follow_counts = (
-            session.query(Follow.followee_user_id, func.count(Follow.followee_user_id))
-            .filter(
-                Follow.is_current == True,
-                Follow.is_delete == False,
-                Follow.follower_user_id.in_(current_user_followees),
-                Follow.followee_user_id.in_(user_ids),
-            )
-            .group_by(Follow.followee_user_id)
-            .all()
-        )
-        current_user_followee_follow_count_dict = dict(
-            current_user_followee_follow_counts
-        )
-
-    balance_dict = get_balances(session, redis, user_ids)
+    track_blocknumber_dict = context.get_user_track_blocknumbers(session, user_ids)
+    current_user_follows_dict = context.get_current_user_follows(session, user_ids)
+    current_user_followee_follow_count_dict = (
+        context.get_current_user_followee_follow_counts(session, user_ids)
+    )
+    balance_dict = context.get_user_balances(session, user_ids)
 
     for user in users:
         user_id = user["user_id"]
@@ -292,9 +180,13 @@ def populate_user_metadata(
             user_id, {}
         ).get(response_name_constants.supporting_count, 0)
         # current user specific
+        (
+            does_current_user_follow,
+            does_follow_current_user,
+        ) = current_user_follows_dict.get(user_id, (False, False))
         user[
             response_name_constants.does_current_user_follow
-        ] = current_user_followed_user_ids.get(user_id, False)
+        ] = does_current_user_follow
         user[
             response_name_constants.current_user_followee_follow_count
         ] = current_user_followee_follow_count_dict.get(user_id, 0)
@@ -316,9 +208,9 @@ def populate_user_metadata(
         user[response_name_constants.spl_wallet] = user_banks_dict.get(
             user["wallet"], None
         )
-        user[response_name_constants.does_follow_current_user] = (
-            user_id in follows_current_user_set
-        )
+        user[
+            response_name_constants.does_follow_current_user
+        ] = does_follow_current_user
 
     return users
 
@@ -326,18 +218,7 @@ def populate_user_metadata(
 def get_track_play_count_dict(session, track_ids):
     if not track_ids:
         return {}
-    query = text(
-        """
-        select play_item_id, count
-        from aggregate_plays
-        where play_item_id in :ids
-        """
-    )
-    query = query.bindparams(bindparam("ids", expanding=True))
-
-    track_play_counts = session.execute(query, {"ids": track_ids}).fetchall()
-    track_play_dict = dict(track_play_counts)
-    return track_play_dict
+    return get_hydration_context(None).get_track_play_counts(session, track_ids)
 
 
 # given list of track ids and corresponding tracks, populates each track object with:
@@ -348,102 +229,23 @@ def get_track_play_count_dict(session, track_ids):
 def populate_track_metadata(
     session, track_ids, tracks, current_user_id, track_has_aggregates=False
 ):
+    context = get_hydration_context(current_user_id)
     if not track_has_aggregates:
         # build dict of track id --> repost count
-        counts = (
-            session.query(
-                AggregateTrack.track_id,
-                AggregateTrack.repost_count,
-                AggregateTrack.save_count,
-            )
-            .filter(
-                AggregateTrack.track_id.in_(track_ids),
-            )
-            .all()
-        )
-
-        count_dict = {
-            track_id: {
-                response_name_constants.repost_count: repost_count,
-                response_name_constants.save_count: save_count,
-            }
-            for (track_id, repost_count, save_count) in counts
-        }
-
-        play_count_dict = get_track_play_count_dict(session, track_ids)
+        count_dict = context.get_track_counts(session, track_ids)
+        play_count_dict = context.get_track_play_counts(session, track_ids)
 
     remixes = get_track_remix_metadata(session, tracks, current_user_id)
 
-    user_reposted_track_dict = {}
-    user_saved_track_dict = {}
-    followee_track_repost_dict = {}
-    followee_track_save_dict = {}
+    repost_keys = [(track_id, RepostType.track) for track_id in track_ids]
+    save_keys = [(track_id, SaveType.track) for track_id in track_ids]
+    # has current user reposted or saved any of requested track ids
+    user_reposted_track_dict = context.get_current_user_reposts(session, repost_keys)
+    user_saved_track_dict = context.get_current_user_saves(session, save_keys)
+    # build dicts of track id --> followee reposts and saves
+    followee_track_repost_dict = context.get_followee_reposts(session, repost_keys)
+    followee_track_save_dict = context.get_followee_saves(session, save_keys)
     if current_user_id:
-        # has current user reposted any of requested track ids
-        user_reposted = (
-            session.query(Repost.repost_item_id)
-            .filter(
-                Repost.is_current == True,
-                Repost.is_delete == False,
-                Repost.repost_item_id.in_(track_ids),
-                Repost.repost_type == RepostType.track,
-                Repost.user_id == current_user_id,
-            )
-            .all()
-        )
-        user_reposted_track_dict = {repost[0]: True for repost in user_reposted}
-
-        # has current user saved any of requested track ids
-        user_saved_tracks_query = (
-            session.query(Save.save_item_id)
-            .filter(
-                Save.is_current == True,
-                Save.is_delete == False,
-                Save.user_id == current_user_id,
-                Save.save_item_id.in_(track_ids),
-                Save.save_type == SaveType.track,
-            )
-            .all()
-        )
-        user_saved_track_dict = {save[0]: True for save in user_saved_tracks_query}
-
-        # Get current user's followees.
-        followees = session.query(Follow.followee_user_id).filter(
-            Follow.follower_user_id == current_user_id,
-            Follow.is_current == True,
-            Follow.is_delete == False,
-        )
-
-        # build dict of track id --> followee reposts
-        followee_track_reposts = session.query(Repost).filter(
-            Repost.is_current == True,
-            Repost.is_delete == False,
-            Repost.repost_item_id.in_(track_ids),
-            Repost.repost_type == RepostType.track,
-            Repost.user_id.in_(followees),
-        )
-        followee_track_reposts = helpers.query_result_to_list(followee_track_reposts)
-        for track_repost in followee_track_reposts:
-            if track_repost["repost_item_id"] not in followee_track_repost_dict:
-                followee_track_repost_dict[track_repost["repost_item_id"]] = []
-            followee_track_repost_dict[track_repost["repost_item_id"]].append(
-                track_repost
-            )
-
-        # Build dict of track id --> followee saves.
-        followee_track_saves = session.query(Save).filter(
-            Save.is_current == True,
-            Save.is_delete == False,
-            Save.save_item_id.in_(track_ids),
-            Save.save_type == SaveType.track,
-            Save.user_id.in_(followees),
-        )
-        followee_track_saves = helpers.query_result_to_list(followee_track_saves)
-        for track_save in followee_track_saves:
-            if track_save["save_item_id"] not in followee_track_save_dict:
-                followee_track_save_dict[track_save["save_item_id"]] = []
-            followee_track_save_dict[track_save["save_item_id"]].append(track_save)
-
         # has current user unlocked premium tracks
         # if so, also populate corresponding signatures
         _populate_premium_track_metadata(session, tracks, current_user_id)
@@ -472,18 +274,18 @@ def populate_track_metadata(
             ).get(response_name_constants.save_count, 0)
             track[response_name_constants.play_count] = play_count_dict.get(track_id, 0)
         # current user specific
-        track[
-            response_name_constants.followee_reposts
-        ] = followee_track_repost_dict.get(track_id, [])
-        track[response_name_constants.followee_saves] = followee_track_save_dict.get(
-            track_id, []
+        track[response_name_constants.followee_reposts] = list(
+            followee_track_repost_dict.get((track_id, RepostType.track), [])
+        )
+        track[response_name_constants.followee_saves] = list(
+            followee_track_save_dict.get((track_id, SaveType.track), [])
         )
         track[
             response_name_constants.has_current_user_reposted
-        ] = user_reposted_track_dict.get(track_id, False)
+        ] = user_reposted_track_dict.get((track_id, RepostType.track), False)
         track[
             response_name_constants.has_current_user_saved
-        ] = user_saved_track_dict.get(track["track_id"], False)
+        ] = user_saved_track_dict.get((track_id, SaveType.track), False)
 
         # Populate the remix_of tracks w/ the parent track's user and if that user saved/reposted the child
         if (
@@ -702,122 +504,32 @@ def get_track_remix_metadata(session, tracks, current_user_id):
 def populate_playlist_metadata(
     session, playlist_ids, playlists, repost_types, save_types, current_user_id
 ):
+    context = get_hydration_context(current_user_id)
     # build dict of playlist id --> repost & save count
-    counts = (
-        session.query(
-            AggregatePlaylist.playlist_id,
-            AggregatePlaylist.repost_count,
-            AggregatePlaylist.save_count,
-        )
-        .filter(
-            AggregatePlaylist.playlist_id.in_(playlist_ids),
-        )
-        .all()
-    )
-
-    count_dict = {
-        playlist_id: {
-            response_name_constants.repost_count: repost_count,
-            response_name_constants.save_count: save_count,
-        }
-        for (playlist_id, repost_count, save_count) in counts
-    }
-
-    user_reposted_playlist_dict = {}
-    user_saved_playlist_dict = {}
-    followee_playlist_repost_dict = {}
-    followee_playlist_save_dict = {}
-    if current_user_id:
-        # has current user reposted any of requested playlist ids
-        current_user_playlist_reposts = (
-            session.query(Repost.repost_item_id)
-            .filter(
-                Repost.is_current == True,
-                Repost.is_delete == False,
-                Repost.repost_item_id.in_(playlist_ids),
-                Repost.repost_type.in_(repost_types),
-                Repost.user_id == current_user_id,
-            )
-            .all()
-        )
-        user_reposted_playlist_dict = {
-            r[0]: True for r in current_user_playlist_reposts
-        }
-
-        # has current user saved any of requested playlist ids
-        user_saved_playlists_query = (
-            session.query(Save.save_item_id)
-            .filter(
-                Save.is_current == True,
-                Save.is_delete == False,
-                Save.user_id == current_user_id,
-                Save.save_item_id.in_(playlist_ids),
-                Save.save_type.in_(save_types),
-            )
-            .all()
-        )
-        user_saved_playlist_dict = {
-            save[0]: True for save in user_saved_playlists_query
-        }
-
-        # Get current user's followees.
-        followee_user_ids = (
-            session.query(Follow.followee_user_id)
-            .filter(
-                Follow.follower_user_id == current_user_id,
-                Follow.is_current == True,
-                Follow.is_delete == False,
-            )
-            .all()
-        )
-
-        # Build dict of playlist id --> followee reposts.
-        followee_playlist_reposts = (
-            session.query(Repost)
-            .filter(
-                Repost.is_current == True,
-                Repost.is_delete == False,
-                Repost.repost_item_id.in_(playlist_ids),
-                Repost.repost_type.in_(repost_types),
-                Repost.user_id.in_(followee_user_ids),
-            )
-            .all()
-        )
-        followee_playlist_reposts = helpers.query_result_to_list(
-            followee_playlist_reposts
-        )
-        for playlist_repost in followee_playlist_reposts:
-            if playlist_repost["repost_item_id"] not in followee_playlist_repost_dict:
-                followee_playlist_repost_dict[playlist_repost["repost_item_id"]] = []
-            followee_playlist_repost_dict[playlist_repost["repost_item_id"]].append(
-                playlist_repost
-            )
-
-        # Build dict of playlist id --> followee saves.
-        followee_playlist_saves = (
-            session.query(Save)
-            .filter(
-                Save.is_current == True,
-                Save.is_delete == False,
-                Save.save_item_id.in_(playlist_ids),
-                Save.save_type.in_(save_types),
-                Save.user_id.in_(followee_user_ids),
-            )
-            .all()
-        )
-        followee_playlist_saves = helpers.query_result_to_list(followee_playlist_saves)
-        for playlist_save in followee_playlist_saves:
-            if playlist_save["save_item_id"] not in followee_playlist_save_dict:
-                followee_playlist_save_dict[playlist_save["save_item_id"]] = []
-            followee_playlist_save_dict[playlist_save["save_item_id"]].append(
-                playlist_save
-            )
+    count_dict = context.get_playlist_counts(session, playlist_ids)
+
+    repost_keys = [
+        (playlist_id, repost_type)
+        for playlist_id in playlist_ids
+        for repost_type in repost_types
+    ]
+    save_keys = [
+        (playlist_id, save_type)
+        for playlist_id in playlist_ids
+        for save_type in save_types
+    ]
+    # has current user reposted or saved any of requested playlist ids
+    user_reposted_playlist_dict = context.get_current_user_reposts(session, repost_keys)
+    user_saved_playlist_dict = context.get_current_user_saves(session, save_keys)
+    # build dicts of playlist id --> followee reposts and saves
+    followee_playlist_repost_dict = context.get_followee_reposts(session, repost_keys)
+    followee_playlist_save_dict = context.get_followee_saves(session, save_keys)
 
     track_ids = []
     for playlist in playlists:
         for track in playlist["playlist_contents"]["track_ids"]:
             track_ids.append(track["track"])
-    play_count_dict = get_track_play_count_dict(session, track_ids)
+    play_count_dict = context.get_track_play_counts(session, track_ids)
 
     for playlist in playlists:
         playlist_id = playlist["playlist_id"]
@@ -834,18 +546,26 @@ def populate_playlist_metadata(
         playlist[response_name_constants.total_play_count] = total_play_count
 
         # current user specific
-        playlist[
-            response_name_constants.followee_reposts
-        ] = followee_playlist_repost_dict.get(playlist_id, [])
-        playlist[
-            response_name_constants.followee_saves
-        ] = followee_playlist_save_dict.get(playlist_id, [])
-        playlist[
-            response_name_constants.has_current_user_reposted
-        ] = user_reposted_playlist_dict.get(playlist_id, False)
-        playlist[
-            response_name_constants.has_current_user_saved
-        ] = user_saved_playlist_dict.get(playlist_id, False)
+        playlist[response_name_constants.followee_reposts] = [
+            repost
+            for repost_type in repost_types
+            for repost in followee_playlist_repost_dict.get(
+                (playlist_id, repost_type), []
+            )
+        ]
+        playlist[response_name_constants.followee_saves] = [
+            save
+            for save_type in save_types
+            for save in followee_playlist_save_dict.get((playlist_id, save_type), [])
+        ]
+        playlist[response_name_constants.has_current_user_reposted] = any(
+            user_reposted_playlist_dict.get((playlist_id, repost_type), False)
+            for repost_type in repost_types
+        )
+        playlist[response_name_constants.has_current_user_saved] = any(
+            user_saved_playlist_dict.get((playlist_id, save_type), False)
+            for save_type in save_types
+        )
 
     return playlists
 
@@ -16,6 +16,7 @@ from src.solana.anchor_parser import AnchorParser
 from src.solana.audius_data_transaction_handlers import ParsedTx, transaction_handlers
 from src.solana.solana_client_manager import SolanaClientManager
 from src.solana.solana_program_indexer import SolanaProgramIndexer
+from src.solana.solana_traversal import get_indexed_tx_sigs
 from src.utils.cid_metadata_client import CIDMetadataClient
 from src.utils.helpers import split_list
 from src.utils.session_manager import SessionManager
@@ -31,6 +32,8 @@ class AnchorProgramIndexer(SolanaProgramIndexer):
     Indexer for the audius user data layer
     """
 
+    _tx_encoding = "base64"
+
     def __init__(
         self,
         program_id: str,
@@ -52,13 +55,8 @@ class AnchorProgramIndexer(SolanaProgramIndexer):
             "create_user": "user",
         }
 
-    def is_tx_in_db(self, session: Session, tx_sig: str):
-        exists = False
-        tx_sig_db_count = (
-            session.query(AudiusDataTx).filter(AudiusDataTx.signature == tx_sig)
-        ).count()
-        exists = tx_sig_db_count > 0
-        return exists
+    def get_indexed_tx_sigs(self, session: Session, tx_sigs: List[str]) -> Set[str]:
+        return get_indexed_tx_sigs(session, AudiusDataTx.signature, tx_sigs)
 
     def get_latest_slot(self):
         latest_slot = None
@@ -253,7 +251,9 @@ class AnchorProgramIndexer(SolanaProgramIndexer):
         return entities
 
     async def parse_tx(self, tx_sig: str) -> ParsedTx:
-        tx_receipt = self._solana_client_manager.get_sol_tx_info(tx_sig, 5, "base64")
+        tx_receipt = self._solana_client_manager.get_sol_tx_info(
+            tx_sig, 5, self._tx_encoding
+        )
         self.msg(tx_receipt)
         encoded_data = tx_receipt["result"].get("transaction")[0]
         decoded_data = base64.b64decode(encoded_data)
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from src.solana.constants import UNSUPPORTED_VERSION_ERROR_CODE
+from src.solana.solana_transaction_types import ConfirmedTransaction
+from src.utils.helpers import split_list
+from src.utils.prometheus_metric import PrometheusMetric, PrometheusMetricNames
+
+logger = logging.getLogger(__name__)
+
+# Number of getTransaction calls sent in one JSON-RPC batch POST
+RPC_BATCH_SIZE = 50
+# Batch requests in flight at once against a single endpoint
+RPC_MAX_CONCURRENT_REQUESTS_PER_ENDPOINT = 4
+RPC_REQUEST_TIMEOUT_SECONDS = 30
+RPC_KEEPALIVE_TIMEOUT_SECONDS = 60
+
+# maximum number of rounds across all endpoints for signatures that were not found
+DEFAULT_MAX_RETRIES = 5
+# number of seconds to wait between rounds
+DELAY_SECONDS = 0.2
+
+# Endpoints that fail this many times in a row are tried last until the cooldown has passed
+RPC_MAX_CONSECUTIVE_FAILURES = 3
+RPC_SKIP_COOLDOWN_SECONDS = 60
+# Weight of the latest request in an endpoint's moving average latency
+RPC_LATENCY_EWMA_ALPHA = 0.2
+
+
+class RpcEndpointStats:
+    """Recent latency and failure history of a single Solana RPC endpoint"""
+
+    def __init__(self):
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.last_failure_at = 0.0
+
+    def record_success(self, latency: float):
+        self.consecutive_failures = 0
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = (
+                RPC_LATENCY_EWMA_ALPHA * latency
+                + (1 - RPC_LATENCY_EWMA_ALPHA) * self.latency_ewma
+            )
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.last_failure_at = time.time()
+
+    def is_failing(self) -> bool:
+        return (
+            self.consecutive_failures >= RPC_MAX_CONSECUTIVE_FAILURES
+            and time.time() - self.last_failure_at < RPC_SKIP_COOLDOWN_SECONDS
+        )
+
+    def sort_key(self):
+        # endpoints we have no data for yet sort first so they get measured
+        return (
+            self.is_failing(),
+            self.latency_ewma if self.latency_ewma is not None else 0.0,
+        )
+
+
+def record_rpc_request(
+    endpoint: str,
+    endpoint_stats: RpcEndpointStats,
+    method: str,
+    latency: float,
+    success: bool,
+):
+    """Updates an endpoint's stats and exports the request's latency and outcome"""
+    if success:
+        endpoint_stats.record_success(latency)
+    else:
+        endpoint_stats.record_failure()
+    PrometheusMetric(PrometheusMetricNames.SOLANA_RPC_REQUEST_DURATION_SECONDS).save(
+        latency,
+        {
+            # only the host, endpoint urls can carry api keys
+            "endpoint": urlparse(endpoint).hostname or "unknown",
+            "method": method,
+            "success": str(success),
+        },
+    )
+
+
+class AsyncSolanaClientManager:
+    """
+    Fetches Solana transactions with JSON-RPC batch requests over a pooled
+    aiohttp session. Requests run on one long-lived event loop in a background
+    thread, so sync callers in thread pools and async callers share the same
+    connections, per endpoint concurrency caps and latency stats.
+    """
+
+    def __init__(self, solana_endpoints: str) -> None:
+        self.endpoints = solana_endpoints.split(",")
+        self._endpoint_stats = {
+            endpoint: RpcEndpointStats() for endpoint in self.endpoints
+        }
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._async_session: Optional[aiohttp.ClientSession] = None
+        self._endpoint_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="async_solana_client_manager_loop",
+                    daemon=True,
+                )
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _run_in_loop(self, coro):
+        """Schedules a coroutine on the manager's background event loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    async def _get_async_session(self) -> aiohttp.ClientSession:
+        # only ever called from the background loop
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=RPC_MAX_CONCURRENT_REQUESTS_PER_ENDPOINT,
+                keepalive_timeout=RPC_KEEPALIVE_TIMEOUT_SECONDS,
+            )
+            self._async_session = aiohttp.ClientSession(connector=connector)
+        return self._async_session
+
+    def _get_endpoint_semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        # only ever called from the background loop
+        if endpoint not in self._endpoint_semaphores:
+            self._endpoint_semaphores[endpoint] = asyncio.Semaphore(
+                RPC_MAX_CONCURRENT_REQUESTS_PER_ENDPOINT
+            )
+        return self._endpoint_semaphores[endpoint]
+
+    def get_ordered_endpoints(self) -> List[str]:
+        """Orders endpoints by recent latency, with failing endpoints last"""
+        return sorted(
+            self.endpoints,
+            key=lambda endpoint: self._endpoint_stats[endpoint].sort_key(),
+        )
+
+    async def _post_batch(self, endpoint: str, requests: List[Dict]) -> List[Dict]:
+        session = await self._get_async_session()
+        async with self._get_endpoint_semaphore(endpoint):
+            start_time = time.time()
+            success = False
+            try:
+                async with session.post(
+                    endpoint,
+                    json=requests,
+                    timeout=aiohttp.ClientTimeout(total=RPC_REQUEST_TIMEOUT_SECONDS),
+                ) as resp:
+                    resp.raise_for_status()
+                    responses = await resp.json(content_type=None)
+                success = True
+            finally:
+                record_rpc_request(
+                    endpoint,
+                    self._endpoint_stats[endpoint],
+                    "getTransaction_batch",
+                    time.time() - start_time,
+                    success,
+                )
+        if not isinstance(responses, list):
+            # rpc nodes answer a whole batch with a single error, eg. when rate limited
+            raise Exception(f"Unexpected batch response {responses}")
+        return responses
+
+    async def _fetch_tx_batch(
+        self, endpoint: str, tx_sigs: List[str], encoding: str
+    ) -> Dict[str, ConfirmedTransaction]:
+        """Fetches a batch of transactions from one endpoint.
+        Returns the transactions that were found, keyed by signature."""
+        requests = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "getTransaction",
+                "params": [tx_sig, {"encoding": encoding}],
+            }
+            for i, tx_sig in enumerate(tx_sigs)
+        ]
+        tx_infos: Dict[str, ConfirmedTransaction] = {}
+        for response in await self._post_batch(endpoint, requests):
+            tx_sig = tx_sigs[response["id"]]
+            error = response.get("error")
+            if error:
+                # We currently only support "legacy" solana transactions. Keep the
+                # error response for newer versions so callers can raise
+                # UnsupportedVersionError for that transaction alone
+                if error.get("code") == UNSUPPORTED_VERSION_ERROR_CODE:
+                    tx_infos[tx_sig] = response
+                continue
+            if response.get("result") is not None:
+                tx_infos[tx_sig] = response
+        return tx_infos
+
+    async def _fetch_tx_batch_from_any(
+        self, tx_sigs: List[str], encoding: str
+    ) -> Dict[str, ConfirmedTransaction]:
+        """Tries each endpoint, fastest first, for signatures not found yet"""
+        tx_infos: Dict[str, ConfirmedTransaction] = {}
+        for endpoint in self.get_ordered_endpoints():
+            missing_tx_sigs = [tx_sig for tx_sig in tx_sigs if tx_sig not in tx_infos]
+            if not missing_tx_sigs:
+                break
+            try:
+                tx_infos.update(
+                    await self._fetch_tx_batch(endpoint, missing_tx_sigs, encoding)
+                )
+            except Exception as e:
+                logger.error(
+                    f"async_solana_client_manager.py | _fetch_tx_batch_from_any | \
+                        Error fetching {len(missing_tx_sigs)} txs from endpoint {endpoint}, {e}"
+                )
+        return tx_infos
+
+    async def get_sol_tx_infos_async(
+        self,
+        tx_sigs: List[str],
+        retries: int = DEFAULT_MAX_RETRIES,
+        encoding: str = "json",
+    ) -> Dict[str, ConfirmedTransaction]:
+        """
+        Fetches solana transactions by signature in JSON-RPC batches.
+        Returns the transactions found within the retries, keyed by signature;
+        callers decide how to handle the rest. Transactions with unsupported
+        versions are returned as their "error" response.
+        Must run on the manager's loop, see get_sol_tx_infos.
+        """
+        tx_infos: Dict[str, ConfirmedTransaction] = {}
+        missing_tx_sigs = list(dict.fromkeys(tx_sigs))
+        for attempt in range(retries):
+            if attempt:
+                await asyncio.sleep(DELAY_SECONDS)
+            batches = await asyncio.gather(
+                *[
+                    self._fetch_tx_batch_from_any(batch, encoding)
+                    for batch in split_list(missing_tx_sigs, RPC_BATCH_SIZE)
+                ]
+            )
+            for batch_tx_infos in batches:
+                tx_infos.update(batch_tx_infos)
+            missing_tx_sigs = [
+                tx_sig for tx_sig in missing_tx_sigs if tx_sig not in tx_infos
+            ]
+            if not missing_tx_sigs:
+                break
+            logger.info(
+                f"async_solana_client_manager.py | get_sol_tx_infos | Retrying {len(missing_tx_sigs)} txs"
+            )
+        return tx_infos
+
+    def get_sol_tx_infos(
+        self,
+        tx_sigs: List[str],
+        retries: int = DEFAULT_MAX_RETRIES,
+        encoding: str = "json",
+    ) -> Dict[str, ConfirmedTransaction]:
+        """Blocking get_sol_tx_infos_async, safe to call from any thread"""
+        return self._run_in_loop(
+            self.get_sol_tx_infos_async(tx_sigs, retries, encoding)
+        ).result()
+
+    async def get_sol_tx_infos_from_loop(
+        self,
+        tx_sigs: List[str],
+        retries: int = DEFAULT_MAX_RETRIES,
+        encoding: str = "json",
+    ) -> Dict[str, ConfirmedTransaction]:
+        """get_sol_tx_infos for coroutines running on another event loop"""
+        return await asyncio.wrap_future(
+            self._run_in_loop(self.get_sol_tx_infos_async(tx_sigs, retries, encoding))
+        )
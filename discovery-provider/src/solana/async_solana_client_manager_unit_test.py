@@ -0,0 +1,147 @@
+from unittest import mock
+
+import pytest
+from src.exceptions import UnsupportedVersionError
+from src.solana.async_solana_client_manager import (
+    RPC_BATCH_SIZE,
+    RPC_MAX_CONSECUTIVE_FAILURES,
+    AsyncSolanaClientManager,
+)
+from src.solana.constants import UNSUPPORTED_VERSION_ERROR_CODE
+from src.solana.solana_client_manager import SolanaClientManager
+
+ENDPOINTS = "https://first.rpc,https://second.rpc"
+
+
+def batch_responses(found_tx_sigs, unsupported_tx_sigs=()):
+    """Fakes an rpc node that only knows about found_tx_sigs"""
+
+    async def post_batch(endpoint, requests):
+        responses = []
+        for request in requests:
+            tx_sig = request["params"][0]
+            if tx_sig in unsupported_tx_sigs:
+                responses.append(
+                    {
+                        "id": request["id"],
+                        "error": {"code": UNSUPPORTED_VERSION_ERROR_CODE},
+                    }
+                )
+            else:
+                responses.append(
+                    {
+                        "id": request["id"],
+                        "result": {"slot": 1} if tx_sig in found_tx_sigs else None,
+                    }
+                )
+        return responses
+
+    return post_batch
+
+
+def test_get_sol_tx_infos_batches_requests():
+    manager = AsyncSolanaClientManager(ENDPOINTS)
+    tx_sigs = [f"sig{i}" for i in range(RPC_BATCH_SIZE + 1)]
+    with mock.patch.object(
+        manager, "_post_batch", side_effect=batch_responses(tx_sigs)
+    ) as post_batch:
+        tx_infos = manager.get_sol_tx_infos(tx_sigs)
+
+    assert set(tx_infos.keys()) == set(tx_sigs)
+    assert tx_infos["sig0"]["result"] == {"slot": 1}
+    # one POST per batch of signatures
+    assert post_batch.call_count == 2
+    batch_sizes = sorted(len(call.args[1]) for call in post_batch.call_args_list)
+    assert batch_sizes == [1, RPC_BATCH_SIZE]
+
+
+def test_get_sol_tx_infos_retries_missing():
+    manager = AsyncSolanaClientManager(ENDPOINTS)
+    with mock.patch.object(
+        manager,
+        "_post_batch",
+        side_effect=batch_responses({"sig0"}, unsupported_tx_sigs={"sig2"}),
+    ) as post_batch:
+        tx_infos = manager.get_sol_tx_infos(["sig0", "sig1", "sig2"], retries=2)
+
+    # sig1 is never found, sig2 keeps its error response
+    assert set(tx_infos.keys()) == {"sig0", "sig2"}
+    assert "error" in tx_infos["sig2"]
+    # each round asks every endpoint for the signatures still missing
+    assert post_batch.call_count == 4
+    assert post_batch.call_args_list[-1].args[1][0]["params"][0] == "sig1"
+
+
+def test_get_ordered_endpoints():
+    manager = AsyncSolanaClientManager(ENDPOINTS)
+    first, second = manager.endpoints
+
+    manager._endpoint_stats[first].record_success(1.0)
+    manager._endpoint_stats[second].record_success(0.1)
+    assert manager.get_ordered_endpoints() == [second, first]
+
+    for _ in range(RPC_MAX_CONSECUTIVE_FAILURES):
+        manager._endpoint_stats[second].record_failure()
+    assert manager.get_ordered_endpoints() == [first, second]
+
+
+@mock.patch("solana.rpc.api.Client")
+def test_prefetched_sol_tx_infos(_):
+    solana_client_manager = SolanaClientManager(ENDPOINTS, async_rpc_enabled=True)
+    client_mocks = [mock.Mock(name="first"), mock.Mock(name="second")]
+    solana_client_manager.clients = client_mocks
+    client_mocks[0].get_transaction.return_value = {"result": "fetched"}
+
+    with mock.patch.object(
+        solana_client_manager.async_client_manager,
+        "get_sol_tx_infos",
+        return_value={
+            "sig0": {"result": "prefetched"},
+            "sig1": {"error": {"code": UNSUPPORTED_VERSION_ERROR_CODE}},
+        },
+    ):
+        with solana_client_manager.prefetched_sol_tx_infos(["sig0", "sig1", "sig2"]):
+            assert solana_client_manager.get_sol_tx_info("sig0") == {
+                "result": "prefetched"
+            }
+            with pytest.raises(UnsupportedVersionError):
+                solana_client_manager.get_sol_tx_info("sig1")
+            # not prefetched, falls back to fetching it alone
+            assert solana_client_manager.get_sol_tx_info("sig2") == {
+                "result": "fetched"
+            }
+
+    # prefetched transactions are dropped when the block exits
+    assert solana_client_manager.get_sol_tx_info("sig0") == {"result": "fetched"}
+
+
+@mock.patch("solana.rpc.api.Client")
+def test_overlapping_prefetched_sol_tx_infos(_):
+    solana_client_manager = SolanaClientManager(ENDPOINTS, async_rpc_enabled=True)
+    client_mocks = [mock.Mock(name="first"), mock.Mock(name="second")]
+    solana_client_manager.clients = client_mocks
+    client_mocks[0].get_transaction.return_value = {"result": "fetched"}
+
+    def get_sol_tx_infos(tx_sigs, retries, encoding):
+        return {tx_sig: {"result": "prefetched"} for tx_sig in tx_sigs}
+
+    with mock.patch.object(
+        solana_client_manager.async_client_manager,
+        "get_sol_tx_infos",
+        side_effect=get_sol_tx_infos,
+    ):
+        with solana_client_manager.prefetched_sol_tx_infos(["sig0", "sig1"]):
+            with solana_client_manager.prefetched_sol_tx_infos(["sig1", "sig2"]):
+                assert solana_client_manager.get_sol_tx_info("sig2") == {
+                    "result": "prefetched"
+                }
+            # the inner block exiting keeps the transactions the outer one holds
+            assert solana_client_manager.get_sol_tx_info("sig1") == {
+                "result": "prefetched"
+            }
+            assert solana_client_manager.get_sol_tx_info("sig2") == {
+                "result": "fetched"
+            }
+
+    assert solana_client_manager.get_sol_tx_info("sig1") == {"result": "fetched"}
+    assert not solana_client_manager._prefetched_tx_info_refs
@@ -11,3 +11,6 @@ TX_SIGNATURES_MAX_BATCHES = 100
 
 # Last N entries present in tx_signatures array during processing
 TX_SIGNATURES_RESIZE_LENGTH = 75
+
+# JSON-RPC error code returned for transactions newer than "legacy"
+UNSUPPORTED_VERSION_ERROR_CODE = -32015
@@ -0,0 +1,244 @@
+import concurrent.futures
+import json
+import logging
+from typing import Callable, List, Optional, Set
+
+from redis import Redis
+from src.models.indexing.indexing_checkpoints import IndexingCheckpoint
+from src.solana.constants import (
+    FETCH_TX_SIGNATURES_BATCH_SIZE,
+    TX_SIGNATURES_MAX_BATCHES,
+)
+from src.solana.solana_client_manager import SolanaClientManager
+from src.solana.solana_transaction_types import ConfirmedSignatureForAddressResult
+from src.solana.solana_traversal import get_unindexed_txs, is_retraversed
+from src.utils.config import shared_config
+from src.utils.session_manager import SessionManager
+from src.utils.update_indexing_checkpoints import save_indexed_checkpoint
+
+logger = logging.getLogger(__name__)
+
+# Slots between the chain tail and the latest processed slot at which
+# indexers switch from following the tail to backfilling
+BACKFILL_SLOT_GAP = int(shared_config["solana"]["backfill_slot_gap"])
+
+# Number of segments discovered and parsed concurrently
+BACKFILL_WORKERS = int(shared_config["solana"]["backfill_workers"])
+
+# Pages of signatures discovered per run, each page is a segment
+BACKFILL_MAX_PAGES = TX_SIGNATURES_MAX_BATCHES
+
+# Segments are keyed by the signature they were fetched before,
+# the first segment is fetched from the chain tail
+TAIL_SEGMENT_KEY = "tail"
+
+GetIndexedTxSigs = Callable[[List[str]], Set[str]]
+ProcessSegment = Callable[[List[ConfirmedSignatureForAddressResult]], None]
+
+
+class SolanaBackfill:
+    """
+    Backfills the transactions of a Solana program missing from the DB.
+
+    Instead of walking back from the chain tail until the DB is met before
+    parsing anything, each page of signatures is a segment that is parsed and
+    committed by a worker as soon as it is discovered, so segments are parsed
+    concurrently with each other and with the walk back.
+
+    Segments are committed newest first, so the latest processed slot of the
+    indexer reaches the chain tail before the backfill completes. The slot the
+    backfill started from is checkpointed in the DB before any segment is
+    committed and marks the backfill in progress until every segment is, so
+    the normal tail following loop, which stops at the first indexed signature,
+    does not run and skip the segments that are not committed yet.
+
+    Progress is checkpointed in redis:
+    - the signature the walk back continues from, until the DB is met
+    - the segments that were discovered but are not committed yet, keyed by
+    the signature they were fetched before
+
+    so an interrupted backfill resumes where it stopped. If the redis state is
+    lost the walk back restarts from the chain tail, which only costs time since
+    segments are committed idempotently by skipping the signatures that are
+    already indexed.
+    """
+
+    def __init__(
+        self,
+        db: SessionManager,
+        redis: Redis,
+        solana_client_manager: SolanaClientManager,
+        program: str,
+        label: str,
+        get_indexed_tx_sigs: GetIndexedTxSigs,
+        process_segment: ProcessSegment,
+        min_slot: Optional[int] = None,
+        max_workers: int = BACKFILL_WORKERS,
+    ):
+        """
+        @param program: program address to fetch signatures for
+        @param label: name of the indexer, keys the backfill state in the DB and redis
+        @param get_indexed_tx_sigs: returns the given signatures found in the DB
+        @param process_segment: parses and commits the transactions of a segment,
+        given newest first like pages of getSignaturesForAddress
+        @param min_slot: transactions at or below this slot are never indexed
+        """
+        self.db = db
+        self.redis = redis
+        self.solana_client_manager = solana_client_manager
+        self.program = program
+        self.label = label
+        self.get_indexed_tx_sigs = get_indexed_tx_sigs
+        self.process_segment = process_segment
+        self.min_slot = min_slot
+        self.max_workers = max_workers
+        self.state_key = f"solana_backfill:{label}"
+        self.segments_key = f"{self.state_key}:segments"
+
+    def get_start_slot(self) -> Optional[int]:
+        """Returns the latest processed slot the backfill in progress started from"""
+        with self.db.scoped_session() as session:
+            return (
+                session.query(IndexingCheckpoint.last_checkpoint)
+                .filter(IndexingCheckpoint.tablename == self.state_key)
+                .scalar()
+            )
+
+    def is_in_progress(self) -> bool:
+        return self.get_start_slot() is not None
+
+    def should_run(self, latest_processed_slot: int, latest_chain_slot: Optional[int]):
+        """Whether the indexer should backfill rather than follow the tail"""
+        if self.is_in_progress():
+            return True
+        return (
+            latest_chain_slot is not None
+            and latest_chain_slot - latest_processed_slot > BACKFILL_SLOT_GAP
+        )
+
+    def run(self, latest_processed_slot: int, max_pages: int = BACKFILL_MAX_PAGES):
+        """
+        Starts or resumes the backfill, discovering at most `max_pages` pages of
+        signatures so that a run fits in the lock of the indexer task.
+        Returns whether every missing transaction up to the chain tail at the
+        start of the backfill is committed.
+        """
+        latest_slot = self.get_start_slot()
+        if latest_slot is None:
+            latest_slot = latest_processed_slot
+            # drop the progress of a backfill that was never completed
+            pipe = self.redis.pipeline()
+            pipe.delete(self.segments_key)
+            pipe.delete(self.state_key)
+            pipe.execute()
+            with self.db.scoped_session() as session:
+                save_indexed_checkpoint(session, self.state_key, latest_slot)
+
+        state = self.redis.hgetall(self.state_key)
+        cursor = json.loads(state[b"cursor"]) if b"cursor" in state else None
+        discovered = b"discovered" in state
+        page_count = 0
+
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+            futures: Set[concurrent.futures.Future] = set()
+
+            # resume the segments that were discovered before an interruption
+            for segment_key, segment in self.redis.hgetall(self.segments_key).items():
+                futures.add(
+                    executor.submit(
+                        self.commit_segment, segment_key.decode(), json.loads(segment)
+                    )
+                )
+
+            while not discovered and page_count < max_pages:
+                # bound the number of discovered segments waiting to be parsed
+                if len(futures) >= 2 * self.max_workers:
+                    futures = self.wait_for_segments(
+                        futures, concurrent.futures.FIRST_COMPLETED
+                    )
+
+                transactions = self.get_signatures(
+                    cursor, FETCH_TX_SIGNATURES_BATCH_SIZE
+                )
+                page_count += 1
+                if not transactions:
+                    discovered = True
+                    break
+
+                retraversed_tx_sigs = [
+                    tx["signature"]
+                    for tx in transactions
+                    if is_retraversed(tx, latest_slot, self.min_slot)
+                ]
+                unindexed_txs, discovered = get_unindexed_txs(
+                    transactions,
+                    latest_slot,
+                    self.get_indexed_tx_sigs(retraversed_tx_sigs),
+                    self.min_slot,
+                )
+                segment_key = cursor or TAIL_SEGMENT_KEY
+                cursor = transactions[-1]["signature"]
+
+                pipe = self.redis.pipeline()
+                if unindexed_txs:
+                    pipe.hset(self.segments_key, segment_key, json.dumps(unindexed_txs))
+                pipe.hset(self.state_key, "cursor", json.dumps(cursor))
+                if discovered:
+                    pipe.hset(self.state_key, "discovered", 1)
+                pipe.execute()
+
+                if unindexed_txs:
+                    futures.add(
+                        executor.submit(self.commit_segment, segment_key, unindexed_txs)
+                    )
+
+            self.wait_for_segments(futures, concurrent.futures.ALL_COMPLETED)
+
+        if not discovered:
+            logger.info(
+                f"solana_backfill.py | {self.label} | Discovered {page_count} pages, continuing before {cursor}"
+            )
+            return False
+
+        pipe = self.redis.pipeline()
+        pipe.delete(self.segments_key)
+        pipe.delete(self.state_key)
+        pipe.execute()
+        # hand off to the tail following loop once every segment is committed
+        with self.db.scoped_session() as session:
+            session.query(IndexingCheckpoint).filter(
+                IndexingCheckpoint.tablename == self.state_key
+            ).delete()
+        logger.info(f"solana_backfill.py | {self.label} | Backfill complete")
+        return True
+
+    def get_signatures(
+        self, before: Optional[str], limit: int
+    ) -> List[ConfirmedSignatureForAddressResult]:
+        transactions_history = self.solana_client_manager.get_signatures_for_address(
+            self.program, before=before, limit=limit
+        )
+        return transactions_history["result"]
+
+    def commit_segment(
+        self, segment_key: str, transactions: List[ConfirmedSignatureForAddressResult]
+    ):
+        indexed_tx_sigs = self.get_indexed_tx_sigs(
+            [tx["signature"] for tx in transactions]
+        )
+        unindexed_txs = [
+            tx for tx in transactions if tx["signature"] not in indexed_tx_sigs
+        ]
+        if unindexed_txs:
+            self.process_segment(unindexed_txs)
+        self.redis.hdel(self.segments_key, segment_key)
+        logger.info(
+            f"solana_backfill.py | {self.label} | Committed {len(unindexed_txs)} txs before {segment_key}"
+        )
+
+    def wait_for_segments(self, futures, return_when):
+        done, not_done = concurrent.futures.wait(futures, return_when=return_when)
+        for future in done:
+            # raise the first error, the backfill resumes from its checkpoints
+            future.result()
+        return not_done
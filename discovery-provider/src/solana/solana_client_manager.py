@@ -1,15 +1,22 @@
+import concurrent.futures
 import logging
 import random
 import signal
+import threading
 import time
 from contextlib import contextmanager
-from typing import Optional, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 from solana.keypair import Keypair
 from solana.publickey import PublicKey
 from solana.rpc.api import Client, Commitment
 from solana.rpc.types import TokenAccountOpts
 from src.exceptions import UnsupportedVersionError
+from src.solana.async_solana_client_manager import (
+    AsyncSolanaClientManager,
+    RpcEndpointStats,
+    record_rpc_request,
+)
 from src.solana.solana_helpers import SPL_TOKEN_ID_PK
 from src.solana.solana_transaction_types import (
     ConfirmedSignatureForAddressResponse,
@@ -22,13 +29,40 @@ logger = logging.getLogger(__name__)
 DEFAULT_MAX_RETRIES = 5
 # number of seconds to wait between calls to get_confirmed_transaction
 DELAY_SECONDS = 0.2
-UNSUPPORTED_VERSION_ERROR_CODE = -32015
+
+# seconds before a single request to an endpoint is abandoned
+RPC_REQUEST_TIMEOUT_SECONDS = 10
+# rounds of fetches for the transactions still missing from a batch
+TX_BATCH_MAX_ATTEMPTS = 5
+# seconds a round waits for its requests before moving on without them
+TX_BATCH_ROUND_TIMEOUT_SECONDS = 30
+# seconds to wait before the second round, doubling each round after
+TX_BATCH_BACKOFF_SECONDS = 0.5
+TX_BATCH_MAX_WORKERS = 32
 
 
 class SolanaClientManager:
-    def __init__(self, solana_endpoints) -> None:
+    def __init__(self, solana_endpoints, async_rpc_enabled=False) -> None:
         self.endpoints = solana_endpoints.split(",")
-        self.clients = [Client(endpoint) for endpoint in self.endpoints]
+        self.clients = [
+            Client(endpoint, timeout=RPC_REQUEST_TIMEOUT_SECONDS)
+            for endpoint in self.endpoints
+        ]
+        self._endpoint_stats = [RpcEndpointStats() for _ in self.endpoints]
+        # Shared by every get_sol_tx_batch call so timed out requests can never
+        # pile up threads, they finish on their own within the request timeout
+        self._tx_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=TX_BATCH_MAX_WORKERS, thread_name_prefix="solana_tx_fetch"
+        )
+        # Batched, pooled getTransaction requests, see prefetched_sol_tx_infos
+        self.async_client_manager: Optional[AsyncSolanaClientManager] = (
+            AsyncSolanaClientManager(solana_endpoints) if async_rpc_enabled else None
+        )
+        self._prefetched_tx_infos: Dict[Tuple[str, str], ConfirmedTransaction] = {}
+        # Number of open prefetched_sol_tx_infos blocks holding each transaction,
+        # blocks can overlap across threads and share transactions
+        self._prefetched_tx_info_refs: Dict[Tuple[str, str], int] = {}
+        self._prefetched_tx_infos_lock = threading.Lock()
 
     def get_client(self, randomize=False) -> Client:
         if not self.clients:
@@ -44,6 +78,10 @@ class SolanaClientManager:
         self, tx_sig: str, retries=DEFAULT_MAX_RETRIES, encoding="json"
     ):
         """Fetches a solana transaction by signature with retries and a delay."""
+        prefetched_tx_info = self._prefetched_tx_infos.get((tx_sig, encoding))
+        if prefetched_tx_info is not None:
+            _check_error(prefetched_tx_info, tx_sig)
+            return prefetched_tx_info
 
         def handle_get_sol_tx_info(client: Client, index: int):
             endpoint = self.endpoints[index]
@@ -81,6 +119,168 @@ class SolanaClientManager:
             f"solana_client_manager.py | get_sol_tx_info | All requests failed to fetch {tx_sig}",
         )
 
+    def get_sol_tx_infos(
+        self, tx_sigs: List[str], retries=DEFAULT_MAX_RETRIES, encoding="json"
+    ) -> Dict[str, ConfirmedTransaction]:
+        """
+        Fetches solana transactions by signature with JSON-RPC batch requests.
+        Returns the transactions found, which is none of them unless async rpc is
+        enabled.
+        """
+        if not self.async_client_manager or not tx_sigs:
+            return {}
+        try:
+            return self.async_client_manager.get_sol_tx_infos(
+                tx_sigs, retries, encoding
+            )
+        except Exception as e:
+            logger.error(
+                f"solana_client_manager.py | get_sol_tx_infos | Failed to fetch {len(tx_sigs)} txs, {e}",
+                exc_info=True,
+            )
+            return {}
+
+    def get_ordered_client_indexes(self) -> List[int]:
+        """Orders clients by their endpoint's recent latency, with failing endpoints last"""
+        return sorted(
+            range(len(self.clients)),
+            key=lambda index: self._endpoint_stats[index].sort_key(),
+        )
+
+    def _get_sol_tx_info_once(
+        self, index: int, tx_sig: str, encoding: str
+    ) -> Optional[ConfirmedTransaction]:
+        """Makes a single getTransaction request to one endpoint"""
+        start_time = time.time()
+        success = False
+        try:
+            tx_info: ConfirmedTransaction = self.clients[index].get_transaction(
+                tx_sig, encoding
+            )
+            success = True
+        finally:
+            record_rpc_request(
+                self.endpoints[index],
+                self._endpoint_stats[index],
+                "getTransaction",
+                time.time() - start_time,
+                success,
+            )
+        _check_error(tx_info, tx_sig)
+        return tx_info if tx_info["result"] is not None else None
+
+    def get_sol_tx_batch(
+        self,
+        tx_sigs: List[str],
+        max_attempts=TX_BATCH_MAX_ATTEMPTS,
+        encoding="json",
+    ) -> Dict[str, ConfirmedTransaction]:
+        """
+        Fetches a batch of transactions, keyed by signature.
+
+        Completed transactions are kept and only the missing ones are retried,
+        with backoff, against the next endpoint in latency order. Each round
+        waits at most TX_BATCH_ROUND_TIMEOUT_SECONDS; requests still queued are
+        cancelled and running ones end within RPC_REQUEST_TIMEOUT_SECONDS.
+        Raises if any transaction is still missing after max_attempts rounds.
+        """
+        # batched up front when async rpc is enabled
+        tx_infos = self.get_sol_tx_infos(tx_sigs, encoding=encoding)
+        for tx_sig, tx_info in tx_infos.items():
+            _check_error(tx_info, tx_sig)
+        missing_tx_sigs = [
+            tx_sig for tx_sig in dict.fromkeys(tx_sigs) if tx_sig not in tx_infos
+        ]
+
+        tried_indexes: Set[int] = set()
+        for attempt in range(max_attempts):
+            if not missing_tx_sigs:
+                break
+            if attempt:
+                time.sleep(TX_BATCH_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+            # fastest endpoint not tried yet for this batch
+            client_indexes = [
+                index
+                for index in self.get_ordered_client_indexes()
+                if index not in tried_indexes
+            ]
+            if not client_indexes:
+                tried_indexes.clear()
+                client_indexes = self.get_ordered_client_indexes()
+            index = client_indexes[0]
+            tried_indexes.add(index)
+            futures = {
+                self._tx_executor.submit(
+                    self._get_sol_tx_info_once, index, tx_sig, encoding
+                ): tx_sig
+                for tx_sig in missing_tx_sigs
+            }
+            done, not_done = concurrent.futures.wait(
+                futures, timeout=TX_BATCH_ROUND_TIMEOUT_SECONDS
+            )
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                tx_sig = futures[future]
+                try:
+                    tx_info = future.result()
+                except UnsupportedVersionError as e:
+                    raise e
+                except Exception as e:
+                    logger.error(
+                        f"solana_client_manager.py | get_sol_tx_batch | \
+                            Error fetching tx {tx_sig} from endpoint {self.endpoints[index]}, {e}"
+                    )
+                    continue
+                if tx_info is not None:
+                    tx_infos[tx_sig] = tx_info
+
+            missing_tx_sigs = [
+                tx_sig for tx_sig in missing_tx_sigs if tx_sig not in tx_infos
+            ]
+            if missing_tx_sigs:
+                logger.info(
+                    f"solana_client_manager.py | get_sol_tx_batch | \
+                        {len(missing_tx_sigs)} of {len(futures)} txs missing from endpoint {self.endpoints[index]}"
+                )
+
+        if missing_tx_sigs:
+            raise Exception(
+                f"solana_client_manager.py | get_sol_tx_batch | Failed to fetch {len(missing_tx_sigs)} txs: {missing_tx_sigs}"
+            )
+        return tx_infos
+
+    @contextmanager
+    def prefetched_sol_tx_infos(
+        self, tx_sigs: List[str], retries=DEFAULT_MAX_RETRIES, encoding="json"
+    ):
+        """
+        Fetches a batch of transactions up front so that get_sol_tx_info calls
+        for them inside the block, from any thread, do not each make a request.
+        Transactions that could not be prefetched are fetched one by one as usual.
+        A no-op unless async rpc is enabled.
+        """
+        tx_infos = self.get_sol_tx_infos(tx_sigs, retries, encoding)
+        with self._prefetched_tx_infos_lock:
+            for tx_sig, tx_info in tx_infos.items():
+                key = (tx_sig, encoding)
+                self._prefetched_tx_infos[key] = tx_info
+                self._prefetched_tx_info_refs[key] = (
+                    self._prefetched_tx_info_refs.get(key, 0) + 1
+                )
+        try:
+            yield tx_infos
+        finally:
+            with self._prefetched_tx_infos_lock:
+                for tx_sig in tx_infos:
+                    key = (tx_sig, encoding)
+                    self._prefetched_tx_info_refs[key] -= 1
+                    # only drop transactions no other open block holds
+                    if not self._prefetched_tx_info_refs[key]:
+                        del self._prefetched_tx_info_refs[key]
+                        self._prefetched_tx_infos.pop(key, None)
+
     def get_signatures_for_address(
         self,
         account: Union[str, Keypair, PublicKey],
@@ -214,6 +414,42 @@ class SolanaClientManager:
             "solana_client_manager.py | get_account_info | All requests failed to fetch",
         )
 
+    def get_multiple_accounts(
+        self,
+        accounts: List[PublicKey],
+        encoding="jsonParsed",
+        retries=DEFAULT_MAX_RETRIES,
+    ):
+        """Fetches up to 100 accounts in one getMultipleAccounts request.
+        Accounts that do not exist are returned as None."""
+
+        def _get_multiple_accounts(client: Client, index):
+            endpoint = self.endpoints[index]
+            num_retries = retries
+            while num_retries > 0:
+                try:
+                    response = client.get_multiple_accounts(accounts, encoding=encoding)
+                    return response["result"]["value"]
+                except Exception as e:
+                    logger.error(
+                        f"solana_client_manager.py | get_multiple_accounts, {e}",
+                        exc_info=True,
+                    )
+                num_retries -= 1
+                time.sleep(DELAY_SECONDS)
+                logger.error(
+                    f"solana_client_manager.py | get_multiple_accounts | Retrying with endpoint {endpoint}"
+                )
+            raise Exception(
+                f"solana_client_manager.py | get_multiple_accounts | Failed with endpoint {endpoint}"
+            )
+
+        return _try_all(
+            self.clients,
+            _get_multiple_accounts,
+            "solana_client_manager.py | get_multiple_accounts | All requests failed to fetch",
+        )
+
 
 @contextmanager
 def timeout(time):
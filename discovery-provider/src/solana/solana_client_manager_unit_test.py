@@ -113,3 +113,46 @@ def test_get_signatures_for_address(_):
         solana_client_manager.get_signatures_for_address(
             "account", "before", "until", "limit"
         )
+
+
+@mock.patch("src.solana.solana_client_manager.time.sleep")
+def test_get_sol_tx_batch(_):
+    solana_client_manager = SolanaClientManager(
+        "https://first.rpc,https://second.rpc,https://third.rpc"
+    )
+    client_mocks = [
+        mock.Mock(name="first"),
+        mock.Mock(name="second"),
+        mock.Mock(name="third"),
+    ]
+    solana_client_manager.clients = client_mocks
+
+    # the first endpoint is missing one transaction and fails another
+    def first_get_transaction(tx_sig, encoding):
+        if tx_sig == "failed":
+            raise Exception()
+        return {"result": None if tx_sig == "missing" else tx_sig}
+
+    client_mocks[0].get_transaction.side_effect = first_get_transaction
+    client_mocks[1].get_transaction.side_effect = lambda tx_sig, encoding: {
+        "result": tx_sig
+    }
+
+    tx_infos = solana_client_manager.get_sol_tx_batch(["found", "missing", "failed"])
+    assert tx_infos == {
+        "found": {"result": "found"},
+        "missing": {"result": "missing"},
+        "failed": {"result": "failed"},
+    }
+    # only the missing transactions are retried, on the next endpoint
+    assert client_mocks[0].get_transaction.call_count == 3
+    assert sorted(
+        call.args[0] for call in client_mocks[1].get_transaction.call_args_list
+    ) == ["failed", "missing"]
+    assert client_mocks[2].get_transaction.call_count == 0
+
+    # test exception raised if a transaction is never found
+    client_mocks[1].get_transaction.side_effect = Exception()
+    client_mocks[2].get_transaction.side_effect = Exception()
+    with pytest.raises(Exception):
+        solana_client_manager.get_sol_tx_batch(["found", "failed"], max_attempts=3)
@@ -1,7 +1,7 @@
 import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, TypedDict
+from typing import Any, Dict, List, Set, TypedDict
 
 from redis import Redis
 from src.solana.anchor_parser import ParsedTxInstr
@@ -13,6 +13,7 @@ from src.solana.constants import (
 )
 from src.solana.solana_client_manager import SolanaClientManager
 from src.solana.solana_transaction_types import TransactionInfoResult
+from src.solana.solana_traversal import get_unindexed_txs
 from src.utils.session_manager import SessionManager
 
 logger = logging.getLogger(__name__)
@@ -83,6 +84,8 @@ class SolanaProgramIndexer(IndexerBase):
     _program_id: str
     _redis_queue_cache_prefix: str
     _solana_client_manager: SolanaClientManager
+    # encoding parse_tx fetches transactions with
+    _tx_encoding: str = "json"
 
     def __init__(
         self,
@@ -106,13 +109,21 @@ class SolanaProgramIndexer(IndexerBase):
         self.db = db
 
     @abstractmethod
+    def get_indexed_tx_sigs(self, session: Any, tx_sigs: List[str]) -> Set[str]:
+        """
+        Return the tx signatures that are found in the DB
+        @param session: DB session
+        @param tx_sigs: transaction signatures to look up
+        """
+        raise Exception("Must be implemented in subclass")
+
     def is_tx_in_db(self, session: Any, tx_sig: str):
         """
         Return a boolean value indicating whether tx signature is found
         @param session: DB session
         @param tx_sig: transaction signature to look up
         """
-        raise Exception("Must be implemented in subclass")
+        return tx_sig in self.get_indexed_tx_sigs(session, [tx_sig])
 
     @abstractmethod
     def get_latest_slot(self):
@@ -153,17 +164,22 @@ class SolanaProgramIndexer(IndexerBase):
         self.msg(f"Parsing {tx_sig_batch_records}")
         futures = []
         tx_sig_futures_map: Dict[str, ParsedTx] = {}
-        for tx_sig in tx_sig_batch_records:
-            future: asyncio.Future = asyncio.ensure_future(self.parse_tx(tx_sig))
-            futures.append(future)
-        for future in asyncio.as_completed(futures, timeout=PARSE_TX_TIMEOUT):
-            try:
-                future_result = await future
-                self.msg(f"{future_result}")
-                tx_sig_futures_map[future_result["tx_sig"]] = future_result
-            except asyncio.CancelledError:
-                # Swallow cancelled requests
-                pass
+        # Fetch the batch with JSON-RPC batch requests when async rpc is enabled
+        # so parse_tx does not make a blocking request per transaction
+        with self._solana_client_manager.prefetched_sol_tx_infos(
+            tx_sig_batch_records, encoding=self._tx_encoding
+        ):
+            for tx_sig in tx_sig_batch_records:
+                future: asyncio.Future = asyncio.ensure_future(self.parse_tx(tx_sig))
+                futures.append(future)
+            for future in asyncio.as_completed(futures, timeout=PARSE_TX_TIMEOUT):
+                try:
+                    future_result = await future
+                    self.msg(f"{future_result}")
+                    tx_sig_futures_map[future_result["tx_sig"]] = future_result
+                except asyncio.CancelledError:
+                    # Swallow cancelled requests
+                    pass
 
         # Committing to DB
         parsed_transactions: List[ParsedTx] = []
@@ -225,28 +241,21 @@ class SolanaProgramIndexer(IndexerBase):
                 intersection_found = True
                 self.msg(f"No transactions found before {last_tx_signature}")
             else:
+                # Check the txs at or below the latest processed slot against the DB
+                # in one query and stop at the first one that has been indexed
+                retraversed_tx_sigs = [
+                    tx["signature"]
+                    for tx in transactions_array
+                    if tx["slot"] <= latest_processed_slot
+                ]
                 with self._db.scoped_session() as read_session:
-                    for tx in transactions_array:
-                        if tx["slot"] > latest_processed_slot:
-                            unindexed_transactions.append(tx)
-                        else:
-                            # Add any txs that haven't been indexed yet
-                            # Check the tx signature for any txs in the latest batch,
-                            # and if not present in DB, add to processing
-                            self.msg(
-                                f"Latest slot re-traversal\
-                                slot={tx['slot']}, sig={tx['signature']},\
-                                latest_processed_slot(db)={latest_processed_slot}"
-                            )
-                            exists = self.is_tx_in_db(read_session, tx["signature"])
-                            if exists:
-                                # Exit loop and set terminal condition since this tx has been found in DB
-                                # Transactions are returned with most recently committed first, so we can assume
-                                # subsequent transactions in this batch have already been processed
-                                intersection_found = True
-                                break
-                            # Otherwise, ensure this transaction is still processed
-                            unindexed_transactions.append(tx)
+                    indexed_tx_sigs = self.get_indexed_tx_sigs(
+                        read_session, retraversed_tx_sigs
+                    )
+                page_unindexed_transactions, intersection_found = get_unindexed_txs(
+                    transactions_array, latest_processed_slot, indexed_tx_sigs
+                )
+                unindexed_transactions.extend(page_unindexed_transactions)
                 # Restart processing at the end of this transaction signature batch
                 if unindexed_transactions:
                     last_tx = unindexed_transactions[-1]
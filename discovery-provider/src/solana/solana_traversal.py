@@ -0,0 +1,123 @@
+import json
+import logging
+from typing import List, Optional, Set, Tuple
+
+from redis import Redis
+from sqlalchemy import String, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from sqlalchemy.orm.session import Session
+from src.solana.solana_transaction_types import ConfirmedSignatureForAddressResult
+
+logger = logging.getLogger(__name__)
+
+
+def get_indexed_tx_sigs(
+    session: Session, signature_column: InstrumentedAttribute, tx_sigs: List[str]
+) -> Set[str]:
+    """Returns the signatures in `tx_sigs` found in `signature_column` with one
+    `signature = ANY(:tx_sigs)` query"""
+    if not tx_sigs:
+        return set()
+    return {
+        tx_sig
+        for (tx_sig,) in session.query(signature_column).filter(
+            signature_column == any_(bindparam("tx_sigs", tx_sigs, type_=ARRAY(String)))
+        )
+    }
+
+
+def is_retraversed(
+    tx: ConfirmedSignatureForAddressResult,
+    latest_processed_slot: int,
+    min_slot: Optional[int],
+):
+    """Whether a tx at or below the latest processed slot must be checked against the DB"""
+    return tx["slot"] <= latest_processed_slot and (
+        min_slot is None or tx["slot"] > min_slot
+    )
+
+
+def get_unindexed_txs(
+    transactions: List[ConfirmedSignatureForAddressResult],
+    latest_processed_slot: int,
+    indexed_tx_sigs: Set[str],
+    min_slot: Optional[int] = None,
+) -> Tuple[List[ConfirmedSignatureForAddressResult], bool]:
+    """
+    Walks a page of transactions, newest first, and returns the ones that are
+    not indexed yet along with whether the first indexed transaction was found.
+
+    Transactions above the latest processed slot are always unindexed. The ones
+    at or below it are unindexed until the first signature in `indexed_tx_sigs`,
+    since transactions are returned with most recently committed first, so we can
+    assume the transactions after it have already been processed. Transactions
+    at or below `min_slot` are skipped.
+    """
+    unindexed_txs = []
+    for tx in transactions:
+        if tx["slot"] > latest_processed_slot:
+            unindexed_txs.append(tx)
+        elif is_retraversed(tx, latest_processed_slot, min_slot):
+            if tx["signature"] in indexed_tx_sigs:
+                return unindexed_txs, True
+            unindexed_txs.append(tx)
+    return unindexed_txs, False
+
+
+def find_unindexed_txs(
+    session: Session,
+    signature_column: InstrumentedAttribute,
+    transactions: List[ConfirmedSignatureForAddressResult],
+    latest_processed_slot: int,
+    min_slot: Optional[int] = None,
+) -> Tuple[List[ConfirmedSignatureForAddressResult], bool]:
+    """
+    Checks a page of transactions returned by getSignaturesForAddress against
+    the DB with one query, see `get_unindexed_txs`.
+    """
+    retraversed_tx_sigs = [
+        tx["signature"]
+        for tx in transactions
+        if is_retraversed(tx, latest_processed_slot, min_slot)
+    ]
+    indexed_tx_sigs = get_indexed_tx_sigs(
+        session, signature_column, retraversed_tx_sigs
+    )
+    return get_unindexed_txs(
+        transactions, latest_processed_slot, indexed_tx_sigs, min_slot
+    )
+
+
+# Push to head of array containing seen transactions
+# Used to avoid re-traversal from chain tail when slot diff > certain number
+def cache_traversed_tx(
+    redis: Redis, cache_key: str, tx: ConfirmedSignatureForAddressResult
+):
+    redis.lpush(cache_key, json.dumps(tx))
+
+
+# Fetch the cached transaction from redis queue
+# Eliminates transactions one by one if they are < latest db slot
+def fetch_traversed_tx_from_cache(
+    redis: Redis, cache_key: str, latest_db_slot: Optional[int]
+) -> Optional[str]:
+    if latest_db_slot is None:
+        return None
+    while True:
+        last_cached_tx_raw = redis.lrange(cache_key, 0, 1)
+        if not last_cached_tx_raw:
+            return None
+        last_cached_tx: ConfirmedSignatureForAddressResult = json.loads(
+            last_cached_tx_raw[0]
+        )
+        logger.info(
+            f"solana_traversal.py | processing cached tx = {last_cached_tx}, latest_db_slot = {latest_db_slot}"
+        )
+        redis.ltrim(cache_key, 1, -1)
+        # If a single element is remaining, clear the list to avoid dupe processing
+        if redis.llen(cache_key) == 1:
+            redis.delete(cache_key)
+        # Return if a valid signature is found
+        if last_cached_tx["slot"] > latest_db_slot:
+            return last_cached_tx["signature"]
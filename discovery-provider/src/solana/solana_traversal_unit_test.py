@@ -0,0 +1,35 @@
+from src.solana.solana_traversal import get_unindexed_txs
+
+transactions = [
+    {"slot": 5, "signature": "sig5"},
+    {"slot": 4, "signature": "sig4"},
+    {"slot": 3, "signature": "sig3"},
+    {"slot": 2, "signature": "sig2"},
+    {"slot": 1, "signature": "sig1"},
+]
+
+
+def get_signatures(txs):
+    return [tx["signature"] for tx in txs]
+
+
+def test_get_unindexed_txs_stops_at_first_indexed_tx():
+    unindexed_txs, intersection_found = get_unindexed_txs(
+        transactions, 4, {"sig3", "sig1"}
+    )
+    assert get_signatures(unindexed_txs) == ["sig5", "sig4"]
+    assert intersection_found
+
+
+def test_get_unindexed_txs_ignores_indexed_txs_above_latest_slot():
+    unindexed_txs, intersection_found = get_unindexed_txs(transactions, 3, {"sig4"})
+    assert get_signatures(unindexed_txs) == get_signatures(transactions)
+    assert not intersection_found
+
+
+def test_get_unindexed_txs_skips_txs_below_min_slot():
+    unindexed_txs, intersection_found = get_unindexed_txs(
+        transactions, 3, {"sig1"}, min_slot=1
+    )
+    assert get_signatures(unindexed_txs) == ["sig5", "sig4", "sig3", "sig2"]
+    assert not intersection_found
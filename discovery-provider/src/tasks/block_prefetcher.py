@@ -0,0 +1,111 @@
+import concurrent.futures
+import logging
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def get_prefetched_txs_in_order(
+    prefetched_txs: List[Dict[str, Any]], tx_hashes: List[str]
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Returns the txs prefetched for a block in the order of `tx_hashes`, which is
+    the order the block's txs are applied in, or None if they are not the same
+    txs. Blocks are prefetched before their txs are sorted and skipped.
+    """
+    prefetched_txs_by_hash = {tx["txhash"]: tx for tx in prefetched_txs}
+    if len(prefetched_txs) != len(tx_hashes) or prefetched_txs_by_hash.keys() != set(
+        tx_hashes
+    ):
+        return None
+    return [prefetched_txs_by_hash[tx_hash] for tx_hash in tx_hashes]
+
+
+class BlockPrefetcher(Generic[T]):
+    """
+    Runs `fetch_block_data` for upcoming blocks on a background thread pool so
+    that network bound work (tx receipts, CID metadata) for blocks N+1..N+k
+    happens while block N is being written to the db.
+
+    Results are handed back by block index, so callers still apply and commit
+    blocks strictly in order. A lookahead of 0 disables prefetching and `get`
+    always returns None, signalling the caller to fetch inline.
+
+    Usage:
+        with BlockPrefetcher(fetch_fn, ordered_blocks, lookahead) as prefetcher:
+            for index, block in enumerate(ordered_blocks):
+                prefetched = prefetcher.get(index)
+                ...
+    """
+
+    def __init__(
+        self,
+        fetch_block_data: Callable[[Any], T],
+        blocks: List[Any],
+        lookahead: int,
+    ):
+        self._fetch_block_data = fetch_block_data
+        self._blocks = blocks
+        self._lookahead = max(lookahead, 0)
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        if self._lookahead > 0 and blocks:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._lookahead,
+                thread_name_prefix="block_prefetcher",
+            )
+        self._futures: Dict[int, concurrent.futures.Future] = {}
+        self._next_index_to_submit = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    def _submit_through(self, index: int):
+        assert self._executor is not None
+        last_index = min(index + self._lookahead, len(self._blocks) - 1)
+        while self._next_index_to_submit <= last_index:
+            block = self._blocks[self._next_index_to_submit]
+            self._futures[self._next_index_to_submit] = self._executor.submit(
+                self._fetch_block_data, block
+            )
+            self._next_index_to_submit += 1
+
+    def get(self, index: int) -> Optional[T]:
+        """
+        Returns the prefetched data for the block at `index`, blocking until it
+        is available, and schedules the blocks after it up to the lookahead.
+        Returns None if prefetching is disabled or the fetch failed, in which
+        case the caller should fetch the block inline.
+        """
+        if not self._executor:
+            return None
+
+        self._submit_through(index)
+        future = self._futures.pop(index, None)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning(
+                f"block_prefetcher.py | prefetch failed for block index {index}, "
+                f"falling back to inline fetch: {e}"
+            )
+            return None
+
+    def shutdown(self):
+        if not self._executor:
+            return
+        for future in self._futures.values():
+            future.cancel()
+        self._futures = {}
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
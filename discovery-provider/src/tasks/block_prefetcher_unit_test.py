@@ -0,0 +1,86 @@
+import threading
+
+from src.tasks.block_prefetcher import BlockPrefetcher, get_prefetched_txs_in_order
+from src.tasks.sort_block_transactions import sort_block_transactions
+
+
+class TestBlock:
+    def __init__(self, number, transactions):
+        self.number = number
+        self.transactions = transactions
+
+
+def test_prefetcher_disabled_returns_none():
+    fetched = []
+    with BlockPrefetcher(fetched.append, [1, 2, 3], 0) as prefetcher:
+        assert not prefetcher.enabled
+        assert prefetcher.get(0) is None
+        assert prefetcher.get(1) is None
+    assert fetched == []
+
+
+def test_prefetcher_returns_results_in_block_order():
+    blocks = list(range(10))
+    with BlockPrefetcher(lambda block: block * 2, blocks, 3) as prefetcher:
+        assert prefetcher.enabled
+        results = [prefetcher.get(index) for index in range(len(blocks))]
+    assert results == [block * 2 for block in blocks]
+
+
+def test_prefetcher_fetches_ahead_up_to_lookahead():
+    blocks = list(range(10))
+    submitted = []
+    lock = threading.Lock()
+
+    def fetch(block):
+        with lock:
+            submitted.append(block)
+        return block
+
+    with BlockPrefetcher(fetch, blocks, 2) as prefetcher:
+        assert prefetcher.get(0) == 0
+        assert prefetcher.get(1) == 1
+        # blocks up to index 1 + lookahead have been scheduled, nothing further
+        assert prefetcher._next_index_to_submit == 4
+    assert set(submitted) <= {0, 1, 2, 3}
+
+
+def test_prefetcher_failed_fetch_returns_none():
+    def fetch(block):
+        if block == 1:
+            raise Exception("rpc timeout")
+        return block
+
+    with BlockPrefetcher(fetch, [0, 1, 2], 2) as prefetcher:
+        assert prefetcher.get(0) == 0
+        assert prefetcher.get(1) is None
+        assert prefetcher.get(2) == 2
+
+
+def test_prefetched_txs_follow_sorted_block_order():
+    # hash order differs from the order txs are in the block
+    block = TestBlock(
+        100,
+        [
+            {"hash": "0xccc", "transactionIndex": 0},
+            {"hash": "0xaaa", "transactionIndex": 1},
+            {"hash": "0xbbb", "transactionIndex": 2},
+        ],
+    )
+    prefetched_txs = [{"txhash": tx["hash"]} for tx in block.transactions]
+
+    # before the transaction index start block, txs are applied in hash order
+    sorted_tx_hashes = [tx["hash"] for tx in sort_block_transactions(block, 200)]
+    assert [
+        tx["txhash"]
+        for tx in get_prefetched_txs_in_order(prefetched_txs, sorted_tx_hashes)
+    ] == ["0xaaa", "0xbbb", "0xccc"]
+
+    sorted_tx_hashes = [tx["hash"] for tx in sort_block_transactions(block, 50)]
+    assert [
+        tx["txhash"]
+        for tx in get_prefetched_txs_in_order(prefetched_txs, sorted_tx_hashes)
+    ] == ["0xccc", "0xaaa", "0xbbb"]
+
+    # a skipped tx means the prefetched txs are not used
+    assert get_prefetched_txs_in_order(prefetched_txs, ["0xaaa", "0xbbb"]) is None
@@ -1,12 +1,10 @@
+import concurrent.futures
 import logging
 import time
 from typing import Dict, List, Optional, Set, Tuple, TypedDict
 
 from redis import Redis
-from solana.keypair import Keypair
 from solana.publickey import PublicKey
-from solana.rpc.api import Client
-from spl.token.client import Token
 from sqlalchemy import and_
 from sqlalchemy.orm.session import Session
 from src.app import get_eth_abi_values
@@ -20,13 +18,17 @@ from src.queries.get_balances import (
     LAZY_REFRESH_REDIS_PREFIX,
     does_user_balance_need_refresh,
 )
+from src.solana.solana_client_manager import SolanaClientManager
 from src.solana.solana_helpers import ASSOCIATED_TOKEN_PROGRAM_ID_PK, SPL_TOKEN_ID_PK
 from src.tasks.celery_app import celery
 from src.utils.config import shared_config
+from src.utils.helpers import split_list
+from src.utils.multi_provider import MultiProvider
 from src.utils.prometheus_metric import save_duration_metric
 from src.utils.redis_constants import user_balances_refresh_last_completion_redis_key
 from src.utils.session_manager import SessionManager
 from src.utils.spl_audio import to_wei
+from web3.contract import Contract
 
 logger = logging.getLogger(__name__)
 audius_token_registry_key = bytes("Token", "utf-8")
@@ -40,6 +42,20 @@ WAUDIO_MINT_PUBKEY = PublicKey(WAUDIO_MINT) if WAUDIO_MINT else None
 
 MAX_LAZY_REFRESH_USER_IDS = 100
 
+# Number of eth_calls sent in one JSON-RPC batch
+ETH_CALL_BATCH_SIZE = 100
+# getMultipleAccounts accepts at most 100 accounts
+SOL_ACCOUNTS_BATCH_SIZE = 100
+# Balance batches in flight at once
+BALANCE_FETCH_MAX_WORKERS = 8
+
+# Reads summed into the balance of each associated eth wallet
+ASSOCIATED_WALLET_ETH_FUNCTIONS = (
+    "balanceOf",
+    "getTotalDelegatorStake",
+    "totalStakedFor",
+)
+
 
 class AssociatedWallets(TypedDict):
     eth: List[str]
@@ -52,6 +68,25 @@ class UserWalletMetadata(TypedDict):
     bank_account: Optional[str]
 
 
+class UserBalanceReads(TypedDict):
+    owner_wallet: str
+    associated_eth_wallets: List[str]
+    # derived wAUDIO token accounts of the associated sol wallets
+    associated_sol_accounts: List[str]
+    bank_account: Optional[str]
+
+
+class FetchedBalances(TypedDict):
+    owner_wallet_balance: int
+    associated_balance: int
+    waudio_balance: str
+    associated_sol_balance: int
+
+
+# (contract function name, checksum wallet) read with an eth_call
+EthRead = Tuple[str, str]
+
+
 def get_lazy_refresh_user_ids(redis: Redis, session: Session) -> List[int]:
     redis_user_ids = redis.smembers(LAZY_REFRESH_REDIS_PREFIX)
     user_ids = [int(user_id.decode()) for user_id in redis_user_ids]
@@ -75,6 +110,220 @@ def get_immediate_refresh_user_ids(redis: Redis) -> List[int]:
     return [int(user_id.decode()) for user_id in redis_user_ids]
 
 
+def get_user_balance_reads(wallets: UserWalletMetadata, eth_web3) -> UserBalanceReads:
+    """Converts a user's wallets into the accounts whose balances are read"""
+    associated_sol_accounts: List[str] = []
+    bank_account = None
+    if WAUDIO_MINT_PUBKEY is not None:
+        for wallet in wallets["associated_wallets"]["sol"]:
+            try:
+                root_sol_account = PublicKey(wallet)
+                derived_account, _ = PublicKey.find_program_address(
+                    [
+                        bytes(root_sol_account),
+                        bytes(SPL_TOKEN_ID_PK),
+                        bytes(WAUDIO_MINT_PUBKEY),
+                    ],
+                    ASSOCIATED_TOKEN_PROGRAM_ID_PK,
+                )
+                associated_sol_accounts.append(str(derived_account))
+            except Exception as e:
+                logger.error(
+                    f"cache_user_balance.py | Invalid associated sol wallet {wallet}: {e}"
+                )
+        bank_account = wallets["bank_account"]
+    elif wallets["bank_account"] is not None:
+        logger.error("cache_user_balance.py | Missing Required SPL Confirguration")
+
+    return {
+        "owner_wallet": eth_web3.toChecksumAddress(wallets["owner_wallet"]),
+        "associated_eth_wallets": [
+            eth_web3.toChecksumAddress(wallet)
+            for wallet in wallets["associated_wallets"]["eth"]
+        ],
+        "associated_sol_accounts": associated_sol_accounts,
+        "bank_account": bank_account,
+    }
+
+
+def get_eth_reads(reads: UserBalanceReads) -> List[EthRead]:
+    return [("balanceOf", reads["owner_wallet"])] + [
+        (function_name, wallet)
+        for wallet in reads["associated_eth_wallets"]
+        for function_name in ASSOCIATED_WALLET_ETH_FUNCTIONS
+    ]
+
+
+def get_sol_accounts(reads: UserBalanceReads) -> List[str]:
+    accounts = list(reads["associated_sol_accounts"])
+    if reads["bank_account"] is not None:
+        accounts.append(reads["bank_account"])
+    return accounts
+
+
+def fetch_eth_reads(
+    eth_web3, contracts: Dict[str, Contract], reads: List[EthRead]
+) -> Dict[EthRead, int]:
+    """Sends the reads as a single JSON-RPC batch of eth_calls.
+    Returns the reads that succeeded."""
+    batch = [
+        {
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "eth_call",
+            "params": [
+                {
+                    "to": contracts[function_name].address,
+                    "data": contracts[function_name].encodeABI(
+                        fn_name=function_name, args=[wallet]
+                    ),
+                },
+                "latest",
+            ],
+        }
+        for i, (function_name, wallet) in enumerate(reads)
+    ]
+    provider = eth_web3.provider
+    if isinstance(provider, MultiProvider):
+        responses = provider.make_batch_request(batch)
+    else:
+        responses = [
+            {**provider.make_request(request["method"], request["params"]), "id": i}
+            for i, request in enumerate(batch)
+        ]
+
+    results: Dict[EthRead, int] = {}
+    for response in responses:
+        read = reads[response["id"]]
+        result = response.get("result")
+        if response.get("error") or not result or result == "0x":
+            logger.error(
+                f"cache_user_balance.py | Failed eth read {read}: {response.get('error')}"
+            )
+            continue
+        results[read] = int(result, 16)
+    return results
+
+
+def fetch_waudio_balances(
+    solana_client_manager: SolanaClientManager, accounts: List[str]
+) -> Dict[str, int]:
+    """Reads wAUDIO token accounts with a single getMultipleAccounts request.
+    Returns the balances that were read, accounts that do not exist have 0."""
+    values = solana_client_manager.get_multiple_accounts(
+        [PublicKey(account) for account in accounts]
+    )
+    balances: Dict[str, int] = {}
+    for account, value in zip(accounts, values):
+        if value is None:
+            # the token account has not been created
+            balances[account] = 0
+            continue
+        try:
+            balances[account] = int(
+                value["data"]["parsed"]["info"]["tokenAmount"]["amount"]
+            )
+        except (KeyError, TypeError) as e:
+            logger.error(
+                f"cache_user_balance.py | Unexpected token account {account}: {e}"
+            )
+    return balances
+
+
+def fetch_user_balances(
+    user_id_metadata: Dict[int, UserWalletMetadata],
+    token_contract,
+    delegate_manager_contract,
+    staking_contract,
+    eth_web3,
+    solana_client_manager: SolanaClientManager,
+) -> Tuple[Dict[int, FetchedBalances], Set[int]]:
+    """
+    Fetches the balances of all the given users together. Eth reads are
+    deduped and sent as JSON-RPC batches of eth_calls, wAUDIO token accounts
+    are read with getMultipleAccounts, and all batches are in flight at once.
+
+    Returns the balances of users whose reads all succeeded, and the ids of
+    users with a failed read.
+    """
+    contracts = {
+        "balanceOf": token_contract,
+        "getTotalDelegatorStake": delegate_manager_contract,
+        "totalStakedFor": staking_contract,
+    }
+
+    user_reads: Dict[int, UserBalanceReads] = {}
+    for user_id, wallets in user_id_metadata.items():
+        try:
+            user_reads[user_id] = get_user_balance_reads(wallets, eth_web3)
+        except Exception as e:
+            # Invalid wallets will never succeed, so these users are not retried
+            logger.error(
+                f"cache_user_balance.py | Error reading wallets for user {user_id}: {e}"
+            )
+
+    eth_reads = list(
+        dict.fromkeys(
+            read for reads in user_reads.values() for read in get_eth_reads(reads)
+        )
+    )
+    sol_accounts = list(
+        dict.fromkeys(
+            account
+            for reads in user_reads.values()
+            for account in get_sol_accounts(reads)
+        )
+    )
+
+    eth_results: Dict[EthRead, int] = {}
+    sol_results: Dict[str, int] = {}
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=BALANCE_FETCH_MAX_WORKERS
+    ) as executor:
+        eth_futures = [
+            executor.submit(fetch_eth_reads, eth_web3, contracts, batch)
+            for batch in split_list(eth_reads, ETH_CALL_BATCH_SIZE)
+        ]
+        sol_futures = [
+            executor.submit(fetch_waudio_balances, solana_client_manager, batch)
+            for batch in split_list(sol_accounts, SOL_ACCOUNTS_BATCH_SIZE)
+        ]
+        for future in concurrent.futures.as_completed(eth_futures + sol_futures):
+            try:
+                if future in eth_futures:
+                    eth_results.update(future.result())
+                else:
+                    sol_results.update(future.result())
+            except Exception as e:
+                logger.error(
+                    f"cache_user_balance.py | Error fetching balance batch: {e}",
+                    exc_info=True,
+                )
+
+    fetched_balances: Dict[int, FetchedBalances] = {}
+    failed_user_ids: Set[int] = set()
+    for user_id, reads in user_reads.items():
+        if any(read not in eth_results for read in get_eth_reads(reads)) or any(
+            account not in sol_results for account in get_sol_accounts(reads)
+        ):
+            failed_user_ids.add(user_id)
+            continue
+
+        fetched_balances[user_id] = {
+            "owner_wallet_balance": eth_results[("balanceOf", reads["owner_wallet"])],
+            "associated_balance": sum(
+                eth_results[read] for read in get_eth_reads(reads)[1:]
+            ),
+            "waudio_balance": str(sol_results[reads["bank_account"]])
+            if reads["bank_account"] is not None
+            else "0",
+            "associated_sol_balance": sum(
+                sol_results[account] for account in reads["associated_sol_accounts"]
+            ),
+        }
+    return fetched_balances, failed_user_ids
+
+
 # *Explanation of user balance caching*
 # In an effort to minimize eth calls, we look up users embedded in track metadata once per user,
 # and current users (logged in dapp users, who might be changing their balance) on an interval.
@@ -97,7 +346,10 @@ def get_immediate_refresh_user_ids(redis: Redis) -> List[int]:
 #     we look up said users, adding User_Balance rows, and removing them from Redis.
 #     we check if they have associated_wallets and update those balances as well
 #     we check if they have a user_bank_account and update that balance as well
+#     All users' balances are read together, in batched eth_calls and getMultipleAccounts
+#     requests, see fetch_user_balances.
 #
+#     Users with a read that failed are left in the queue to be retried on the next run.
 #     Enqueued User Ids in Redis that are *not* ready to be refreshed yet are left in the queue
 #     for later.
 def refresh_user_ids(
@@ -107,7 +359,7 @@ def refresh_user_ids(
     delegate_manager_contract,
     staking_contract,
     eth_web3,
-    waudio_token,
+    solana_client_manager: SolanaClientManager,
 ):
     with db.scoped_session() as session:
         lazy_refresh_user_ids = get_lazy_refresh_user_ids(redis, session)[
@@ -212,130 +464,62 @@ def refresh_user_ids(
         # mapping of user_id => balance change
         needs_balance_change_update: Dict[int, Dict] = {}
 
-        # Fetch balances
-        # pylint: disable=too-many-nested-blocks
-        for user_id, wallets in user_id_metadata.items():
-            try:
-                owner_wallet = wallets["owner_wallet"]
-                owner_wallet = eth_web3.toChecksumAddress(owner_wallet)
-                owner_wallet_balance = token_contract.functions.balanceOf(
-                    owner_wallet
-                ).call()
-                associated_balance = 0
-                waudio_balance: str = "0"
-                associated_sol_balance = 0
-
-                if "associated_wallets" in wallets:
-                    for wallet in wallets["associated_wallets"]["eth"]:
-                        wallet = eth_web3.toChecksumAddress(wallet)
-                        balance = token_contract.functions.balanceOf(wallet).call()
-                        delegation_balance = (
-                            delegate_manager_contract.functions.getTotalDelegatorStake(
-                                wallet
-                            ).call()
-                        )
-                        stake_balance = staking_contract.functions.totalStakedFor(
-                            wallet
-                        ).call()
-                        associated_balance += (
-                            balance + delegation_balance + stake_balance
-                        )
-                    if waudio_token is not None:
-                        for wallet in wallets["associated_wallets"]["sol"]:
-                            try:
-                                root_sol_account = PublicKey(wallet)
-                                derived_account, _ = PublicKey.find_program_address(
-                                    [
-                                        bytes(root_sol_account),
-                                        bytes(SPL_TOKEN_ID_PK),
-                                        bytes(WAUDIO_MINT_PUBKEY),  # type: ignore
-                                    ],
-                                    ASSOCIATED_TOKEN_PROGRAM_ID_PK,
-                                )
-
-                                bal_info = waudio_token.get_balance(derived_account)
-                                if (
-                                    "error" in bal_info
-                                    and "code" in bal_info["error"]
-                                    and bal_info["error"]["code"] == -32602
-                                ):
-                                    # Error is 'Invalid param: could not find account'
-                                    # meaning that the token account does not exist
-                                    continue
-                                associated_waudio_balance: str = bal_info["result"][
-                                    "value"
-                                ]["amount"]
-                                associated_sol_balance += int(associated_waudio_balance)
-                            except Exception as e:
-                                logger.error(
-                                    " ".join(
-                                        [
-                                            "cache_user_balance.py | Error fetching associated ",
-                                            "wallet balance for user %s, wallet %s: %s",
-                                        ]
-                                    ),
-                                    user_id,
-                                    wallet,
-                                    e,
-                                )
-
-                if wallets["bank_account"] is not None:
-                    if waudio_token is None:
-                        logger.error(
-                            "cache_user_balance.py | Missing Required SPL Confirguration"
-                        )
-                    else:
-                        bal_info = waudio_token.get_balance(
-                            PublicKey(wallets["bank_account"])
-                        )
-                        waudio_balance = bal_info["result"]["value"]["amount"]
-
-                # update the balance on the user model
-                user_balance = user_balances[user_id]
-
-                # Convert Sol balances to wei
-                waudio_in_wei = to_wei(waudio_balance)
-                assoc_sol_balance_in_wei = to_wei(associated_sol_balance)
-                user_waudio_in_wei = (
-                    to_wei(user_balance.waudio) if user_balance.waudio else 0
-                )
-                user_assoc_sol_balance_in_wei = to_wei(
-                    user_balance.associated_sol_wallets_balance
-                )
-
-                # Get values for user balance change
-                current_total_balance = (
-                    owner_wallet_balance
-                    + associated_balance
-                    + waudio_in_wei
-                    + assoc_sol_balance_in_wei
-                )
-                prev_total_balance = (
-                    int(user_balance.balance)
-                    + int(user_balance.associated_wallets_balance)
-                    + user_waudio_in_wei
-                    + user_assoc_sol_balance_in_wei
-                )
+        # Fetch balances for every user at once
+        fetched_balances, failed_user_ids = fetch_user_balances(
+            user_id_metadata,
+            token_contract,
+            delegate_manager_contract,
+            staking_contract,
+            eth_web3,
+            solana_client_manager,
+        )
+        blocknumber = eth_web3.eth.block_number
+
+        for user_id, balances in fetched_balances.items():
+            owner_wallet_balance = balances["owner_wallet_balance"]
+            associated_balance = balances["associated_balance"]
+            waudio_balance = balances["waudio_balance"]
+            associated_sol_balance = balances["associated_sol_balance"]
+
+            # update the balance on the user model
+            user_balance = user_balances[user_id]
+
+            # Convert Sol balances to wei
+            waudio_in_wei = to_wei(waudio_balance)
+            assoc_sol_balance_in_wei = to_wei(associated_sol_balance)
+            user_waudio_in_wei = (
+                to_wei(user_balance.waudio) if user_balance.waudio else 0
+            )
+            user_assoc_sol_balance_in_wei = to_wei(
+                user_balance.associated_sol_wallets_balance
+            )
 
-                # Write to user_balance_changes table
-                needs_balance_change_update[user_id] = {
-                    "user_id": user_id,
-                    "blocknumber": eth_web3.eth.block_number,
-                    "current_balance": str(current_total_balance),
-                    "previous_balance": str(prev_total_balance),
-                }
+            # Get values for user balance change
+            current_total_balance = (
+                owner_wallet_balance
+                + associated_balance
+                + waudio_in_wei
+                + assoc_sol_balance_in_wei
+            )
+            prev_total_balance = (
+                int(user_balance.balance)
+                + int(user_balance.associated_wallets_balance)
+                + user_waudio_in_wei
+                + user_assoc_sol_balance_in_wei
+            )
 
-                user_balance.balance = str(owner_wallet_balance)
-                user_balance.associated_wallets_balance = str(associated_balance)
-                user_balance.waudio = waudio_balance
-                user_balance.associated_sol_wallets_balance = str(
-                    associated_sol_balance
-                )
+            # Write to user_balance_changes table
+            needs_balance_change_update[user_id] = {
+                "user_id": user_id,
+                "blocknumber": blocknumber,
+                "current_balance": str(current_total_balance),
+                "previous_balance": str(prev_total_balance),
+            }
 
-            except Exception as e:
-                logger.error(
-                    f"cache_user_balance.py | Error fetching balance for user {user_id}: {(e)}"
-                )
+            user_balance.balance = str(owner_wallet_balance)
+            user_balance.associated_wallets_balance = str(associated_balance)
+            user_balance.waudio = waudio_balance
+            user_balance.associated_sol_wallets_balance = str(associated_sol_balance)
 
         # Outside the loop, batch update the UserBalanceChanges:
 
@@ -378,10 +562,23 @@ def refresh_user_ids(
         # Commit the new balances
         session.commit()
 
-        # Remove the fetched balances from Redis set
+        # Remove the fetched balances from Redis set. Users with a failed read
+        # stay queued so they are refreshed on the next run instead of keeping
+        # a stale balance.
         logger.info(
-            f"cache_user_balance.py | Got balances for {len(user_associated_wallet_query)} users, removing from Redis."
+            f"cache_user_balance.py | Got balances for {len(fetched_balances)} users, removing from Redis. "
+            f"Leaving {len(failed_user_ids)} users with failed reads queued: {failed_user_ids}"
         )
+        lazy_refresh_user_ids = [
+            user_id
+            for user_id in lazy_refresh_user_ids
+            if user_id not in failed_user_ids
+        ]
+        immediate_refresh_user_ids = [
+            user_id
+            for user_id in immediate_refresh_user_ids
+            if user_id not in failed_user_ids
+        ]
         if lazy_refresh_user_ids:
             redis.srem(LAZY_REFRESH_REDIS_PREFIX, *lazy_refresh_user_ids)
         if immediate_refresh_user_ids:
@@ -455,22 +652,6 @@ def get_staking_contract(eth_web3):
     return staking_instance
 
 
-SPL_TOKEN_PROGRAM_ID_PUBKEY = PublicKey("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
-
-
-def get_audio_token(solana_client: Client):
-    if WAUDIO_MINT_PUBKEY is None:
-        logger.error("cache_user_balance.py | Missing Required SPL Confirguration")
-        return None
-    waudio_token = Token(
-        conn=solana_client,
-        pubkey=WAUDIO_MINT_PUBKEY,
-        program_id=SPL_TOKEN_PROGRAM_ID_PUBKEY,
-        payer=Keypair.generate(),  # not making any txs so payer is not required
-    )
-    return waudio_token
-
-
 @celery.task(name="update_user_balances", bind=True)
 @save_duration_metric(metric_group="celery_task")
 def update_user_balances_task(self):
@@ -495,7 +676,6 @@ def update_user_balances_task(self):
             token_inst = get_token_contract(
                 eth_web3, update_user_balances_task.shared_config
             )
-            waudio_token = get_audio_token(solana_client_manager.get_client())
             refresh_user_ids(
                 redis,
                 db,
@@ -503,7 +683,7 @@ def update_user_balances_task(self):
                 delegate_manager_inst,
                 staking_inst,
                 eth_web3,
-                waudio_token,
+                solana_client_manager,
             )
 
             end_time = time.time()
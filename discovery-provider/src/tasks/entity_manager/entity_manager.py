@@ -1,7 +1,7 @@
 import logging
 import time
 from collections import defaultdict
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple, TypedDict
 
 from sqlalchemy import and_, or_
 from sqlalchemy.orm.session import Session
@@ -49,6 +49,7 @@ from src.tasks.entity_manager.utils import (
 )
 from src.utils import helpers
 from src.utils.prometheus_metric import PrometheusMetric, PrometheusMetricNames
+from web3.datastructures import AttributeDict
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +57,12 @@ logger = logging.getLogger(__name__)
 ENABLE_DEVELOPMENT_FEATURES = True
 
 
+class DecodedEntityManagerTx(TypedDict):
+    txhash: str
+    # ManageEntity events decoded from the tx receipt, trimmed to their args
+    events: List[AttributeDict]
+
+
 def get_record_columns(record) -> List[str]:
     columns = [str(m.key) for m in record.__table__.columns]
     return columns
@@ -70,6 +77,7 @@ def entity_manager_update(
     block_timestamp,
     block_hash: str,
     metadata: Dict,
+    decoded_entity_manager_txs: Optional[List[DecodedEntityManagerTx]] = None,
 ) -> Tuple[int, Dict[str, Set[(int)]]]:
     try:
         challenge_bus: ChallengeEventBus = update_task.challenge_event_bus
@@ -91,9 +99,15 @@ def entity_manager_update(
             PrometheusMetricNames.ENTITY_MANAGER_UPDATE_ERRORS
         )
 
+        # decode each receipt once, unless the caller already has
+        if decoded_entity_manager_txs is None:
+            decoded_entity_manager_txs = decode_entity_manager_txs(
+                update_task, entity_manager_txs
+            )
+
         # collect events by entity type and action
         entities_to_fetch = collect_entities_to_fetch(
-            update_task, entity_manager_txs, metadata
+            decoded_entity_manager_txs, metadata
         )
 
         # fetch existing tracks and playlists
@@ -110,12 +124,9 @@ def entity_manager_update(
         pending_playlist_routes: List[PlaylistRoute] = []
 
         # process in tx order and populate records_to_save
-        for tx_receipt in entity_manager_txs:
-            txhash = update_task.web3.toHex(tx_receipt.transactionHash)
-            entity_manager_event_tx = get_entity_manager_events_tx(
-                update_task, tx_receipt
-            )
-            for event in entity_manager_event_tx:
+        for decoded_tx in decoded_entity_manager_txs:
+            txhash = decoded_tx["txhash"]
+            for event in decoded_tx["events"]:
                 try:
                     start_time_tx = time.time()
                     params = ManageEntityParameters(
@@ -284,12 +295,13 @@ def copy_original_records(existing_records):
 entity_types_to_fetch = set([EntityType.USER, EntityType.TRACK, EntityType.PLAYLIST])
 
 
-def collect_entities_to_fetch(update_task, entity_manager_txs, metadata):
+def collect_entities_to_fetch(
+    decoded_entity_manager_txs: List[DecodedEntityManagerTx], metadata
+):
     entities_to_fetch: Dict[EntityType, Set] = defaultdict(set)
 
-    for tx_receipt in entity_manager_txs:
-        entity_manager_event_tx = get_entity_manager_events_tx(update_task, tx_receipt)
-        for event in entity_manager_event_tx:
+    for decoded_tx in decoded_entity_manager_txs:
+        for event in decoded_tx["events"]:
             entity_id = helpers.get_tx_arg(event, "_entityId")
             entity_type = helpers.get_tx_arg(event, "_entityType")
             action = helpers.get_tx_arg(event, "_action")
@@ -493,3 +505,23 @@ def get_entity_manager_events_tx(update_task, tx_receipt):
     return getattr(
         update_task.entity_manager_contract.events, MANAGE_ENTITY_EVENT_TYPE
     )().processReceipt(tx_receipt)
+
+
+def decode_entity_manager_txs(
+    update_task, entity_manager_txs: List[Any]
+) -> List[DecodedEntityManagerTx]:
+    """
+    Decodes the ManageEntity events of each tx receipt exactly once.
+    ABI log decoding is expensive, so metadata prefetch, entity collection
+    and handler dispatch all share the records returned here.
+    """
+    decoded_entity_manager_txs: List[DecodedEntityManagerTx] = []
+    for tx_receipt in entity_manager_txs:
+        events = get_entity_manager_events_tx(update_task, tx_receipt)
+        decoded_entity_manager_txs.append(
+            {
+                "txhash": update_task.web3.toHex(tx_receipt.transactionHash),
+                "events": [AttributeDict({"args": event["args"]}) for event in events],
+            }
+        )
+    return decoded_entity_manager_txs
@@ -2,7 +2,11 @@ import logging
 import time
 
 from src.tasks.celery_app import celery
-from src.utils.prometheus_metric import save_duration_metric
+from src.utils.prometheus_metric import (
+    PrometheusMetric,
+    PrometheusMetricNames,
+    save_duration_metric,
+)
 from src.utils.redis_constants import challenges_last_processed_event_redis_key
 
 logger = logging.getLogger(__name__)
@@ -10,10 +14,20 @@ index_challenges_last_event_key = ""
 
 
 def index_challenges(event_bus, db, redis):
+    start_time = time.time()
     with db.scoped_session() as session:
-        num_processed = event_bus.process_events(session)
-        if num_processed:
-            redis.set(challenges_last_processed_event_redis_key, int(time.time()))
+        (num_processed, _) = event_bus.process_events(session)
+        # Set on every run so that an idle queue does not look stalled
+        redis.set(challenges_last_processed_event_redis_key, int(time.time()))
+
+    elapsed = time.time() - start_time
+    if num_processed > 0 and elapsed > 0:
+        PrometheusMetric(PrometheusMetricNames.INDEX_CHALLENGES_EVENTS_PER_SECOND).save(
+            num_processed / elapsed
+        )
+    PrometheusMetric(PrometheusMetricNames.INDEX_CHALLENGES_QUEUE_DEPTH_LATEST).save(
+        event_bus.get_queue_depth()
+    )
 
 
 @celery.task(name="index_challenges", bind=True)
@@ -2,6 +2,7 @@ import logging
 import time
 
 from src.eth_indexing.event_scanner import EventScanner
+from src.eth_indexing.wallet_index import KnownWalletIndex
 from src.tasks.cache_user_balance import get_token_address
 from src.tasks.celery_app import celery
 from src.utils.config import shared_config
@@ -31,6 +32,9 @@ AUDIO_TOKEN_CONTRACT = web3.eth.contract(abi=eth_abi_values["AudiusToken"]["abi"
 
 AUDIO_CHECKSUM_ADDRESS = get_token_address(web3, shared_config)
 
+# Kept for the life of the worker and refreshed incrementally on every scan
+wallet_index = KnownWalletIndex()
+
 
 # This implementation follows the example outlined in the link below
 # https://web3py.readthedocs.io/en/stable/examples.html#advanced-example-fetching-all-token-transfer-events
@@ -42,6 +46,7 @@ def index_eth_transfer_events(db, redis_inst):
         contract=AUDIO_TOKEN_CONTRACT,
         event_type=AUDIO_TOKEN_CONTRACT.events.Transfer,
         filters={"address": AUDIO_CHECKSUM_ADDRESS},
+        wallet_index=wallet_index,
     )
     scanner.restore()
 
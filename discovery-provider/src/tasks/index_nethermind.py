@@ -6,7 +6,7 @@ import os
 import time
 from datetime import datetime
 from operator import itemgetter, or_
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 
 from src.challenges.challenge_event_bus import ChallengeEventBus
 from src.challenges.trending_challenge import should_trending_challenge_update
@@ -30,8 +30,13 @@ from src.queries.get_skipped_transactions import (
     set_indexing_error,
 )
 from src.queries.skipped_transactions import add_network_level_skipped_transaction
+from src.tasks.block_prefetcher import BlockPrefetcher, get_prefetched_txs_in_order
 from src.tasks.celery_app import celery
-from src.tasks.entity_manager.entity_manager import entity_manager_update
+from src.tasks.entity_manager.entity_manager import (
+    DecodedEntityManagerTx,
+    decode_entity_manager_txs,
+    entity_manager_update,
+)
 from src.tasks.entity_manager.utils import Action, EntityType
 from src.tasks.index import save_cid_metadata
 from src.tasks.sort_block_transactions import sort_block_transactions
@@ -58,7 +63,6 @@ from src.utils.redis_constants import (
     most_recent_indexed_block_redis_key,
 )
 from src.utils.session_manager import SessionManager
-from src.utils.user_event_constants import entity_manager_event_types_arr
 from web3.datastructures import AttributeDict
 
 ENTITY_MANAGER = CONTRACT_TYPES.ENTITY_MANAGER.value
@@ -185,9 +189,8 @@ def fetch_tx_receipts(self, block):
     return block_tx_with_receipts
 
 
-def fetch_cid_metadata(db, entity_manager_txs):
+def fetch_cid_metadata(db, decoded_entity_manager_txs: List[DecodedEntityManagerTx]):
     start_time = datetime.now()
-    entity_manager_contract = update_task.entity_manager_contract
 
     cids_txhash_set: Tuple[str, Any] = set()
     cid_type: Dict[str, str] = {}  # cid -> entity type track / user
@@ -198,31 +201,32 @@ def fetch_cid_metadata(db, entity_manager_txs):
 
     # fetch transactions
     with db.scoped_session() as session:
-        for tx_receipt in entity_manager_txs:
-            txhash = web3.toHex(tx_receipt.transactionHash)
-            for event_type in entity_manager_event_types_arr:
-                entity_manager_events_tx = getattr(
-                    entity_manager_contract.events, event_type
-                )().processReceipt(tx_receipt)
-                for entry in entity_manager_events_tx:
-                    event_args = entry["args"]
-                    user_id = event_args._userId
-                    cid = event_args._metadata
-                    event_type = event_args._entityType
-                    action = event_args._action
-                    if not cid or event_type == EntityType.USER_REPLICA_SET:
-                        continue
-                    if action == Action.CREATE and event_type == EntityType.USER:
-                        continue
-
-                    cids_txhash_set.add((cid, txhash))
-                    cid_to_user_id[cid] = user_id
-                    if event_type == EntityType.PLAYLIST:
-                        cid_type[cid] = "playlist_data"
-                    elif event_type == EntityType.TRACK:
-                        cid_type[cid] = "track"
-                    elif event_type == EntityType.USER:
-                        cid_type[cid] = "user"
+        for decoded_tx in decoded_entity_manager_txs:
+            txhash = decoded_tx["txhash"]
+            for entry in decoded_tx["events"]:
+                event_args = entry["args"]
+                user_id = event_args._userId
+                cid = event_args._metadata
+                event_type = event_args._entityType
+                action = event_args._action
+                if not cid or event_type == EntityType.USER_REPLICA_SET:
+                    continue
+                if action == Action.CREATE and event_type == EntityType.USER:
+                    continue
+
+                cids_txhash_set.add((cid, txhash))
+                cid_to_user_id[cid] = user_id
+                if event_type == EntityType.PLAYLIST:
+                    cid_type[cid] = "playlist_data"
+                elif event_type == EntityType.TRACK:
+                    cid_type[cid] = "track"
+                elif event_type == EntityType.USER:
+                    cid_type[cid] = "user"
+
+        # serve CIDs we've already seen from the metadata cache / cid_data table
+        cid_metadata.update(
+            update_task.cid_metadata_client.get_cached_metadata(session, cid_type)
+        )
 
         # user -> replica set string lookup, used to make user and track cid get_metadata fetches faster
         user_to_replica_set = dict(
@@ -274,6 +278,58 @@ def fetch_cid_metadata(db, entity_manager_txs):
     return cid_metadata, cid_type
 
 
+def decode_block_entity_manager_txs(
+    entity_manager_txs: List[Any],
+) -> List[DecodedEntityManagerTx]:
+    metric = PrometheusMetric(PrometheusMetricNames.INDEX_BLOCKS_DURATION_SECONDS)
+    decoded_entity_manager_txs = decode_entity_manager_txs(
+        update_task, entity_manager_txs
+    )
+    metric.save_time({"scope": "decode_events"})
+    return decoded_entity_manager_txs
+
+
+class PrefetchedBlock(TypedDict):
+    tx_receipt_dict: Dict[str, Any]
+    decoded_entity_manager_txs: List[DecodedEntityManagerTx]
+    cid_metadata: Dict[str, Dict]
+    cid_type: Dict[str, str]
+
+
+def get_index_blocks_lookahead(shared_config) -> int:
+    """Number of blocks to prefetch ahead of the block being indexed, 0 disables it"""
+    return int(shared_config["discprov"].get("index_blocks_lookahead", 0) or 0)
+
+
+def prefetch_block(self, db, block) -> PrefetchedBlock:
+    """
+    Fetches tx receipts and CID metadata for a block ahead of it being indexed.
+    Runs off the indexing thread so it must not touch the indexing session.
+    Txs to skip are not known yet, so every entity manager tx is included and
+    index_blocks refetches metadata inline if the final set of txs differs.
+    """
+    tx_receipt_dict = fetch_tx_receipts(self, block)
+    txs_grouped_by_type: Dict[str, List[Any]] = {ENTITY_MANAGER: []}
+    for tx in block.transactions:
+        if not tx["to"] or tx["to"] == zero_address:
+            continue
+        tx_receipt = tx_receipt_dict[web3.toHex(tx["hash"])]
+        contract_type = get_contract_type_for_tx(txs_grouped_by_type, tx, tx_receipt)
+        if contract_type:
+            txs_grouped_by_type[contract_type].append(tx_receipt)
+
+    decoded_entity_manager_txs = decode_block_entity_manager_txs(
+        txs_grouped_by_type[ENTITY_MANAGER]
+    )
+    cid_metadata, cid_type = fetch_cid_metadata(db, decoded_entity_manager_txs)
+    return {
+        "tx_receipt_dict": tx_receipt_dict,
+        "decoded_entity_manager_txs": decoded_entity_manager_txs,
+        "cid_metadata": cid_metadata,
+        "cid_type": cid_type,
+    }
+
+
 def get_tx_hash_to_skip(session, redis):
     """Fetch if there is a tx_hash to be skipped because of continuous errors"""
     indexing_error = get_indexing_error(redis)
@@ -353,6 +409,7 @@ def process_state_changes(
     session,
     cid_metadata,
     tx_type_to_grouped_lists_map,
+    decoded_txs_by_type,
     block,
 ):
     block_number, block_hash, block_timestamp = itemgetter(
@@ -371,6 +428,7 @@ def process_state_changes(
             block_timestamp,
             block_hash,
             cid_metadata,
+            decoded_txs_by_type[tx_type],
         ]
 
         (
@@ -410,227 +468,283 @@ def index_blocks(self, db, blocks_list):
     block_order_range = range(len(blocks_list) - 1, -1, -1)
     latest_block_timestamp = None
     metric = PrometheusMetric(PrometheusMetricNames.INDEX_BLOCKS_DURATION_SECONDS)
-    for i in block_order_range:
-        start_time = time.time()
-        metric.reset_timer()
-        block = blocks_list[i]
-        block_index = num_blocks - i
-        block_number, block_hash, latest_block_timestamp = itemgetter(
-            "number", "hash", "timestamp"
-        )(block)
-        logger.info(
-            f"index_nethermind.py | index_blocks | {self.request.id} | block {block.number} - {block_index}/{num_blocks}"
-        )
-        challenge_bus: ChallengeEventBus = update_task.challenge_event_bus
+    ordered_blocks = [blocks_list[i] for i in block_order_range]
+    prefetcher: BlockPrefetcher[PrefetchedBlock] = BlockPrefetcher(
+        lambda block_to_prefetch: prefetch_block(self, db, block_to_prefetch),
+        ordered_blocks,
+        get_index_blocks_lookahead(shared_config),
+    )
+    with prefetcher:
+        for i in block_order_range:
+            start_time = time.time()
+            metric.reset_timer()
+            block = blocks_list[i]
+            block_index = num_blocks - i
+            block_number, block_hash, latest_block_timestamp = itemgetter(
+                "number", "hash", "timestamp"
+            )(block)
+            logger.info(
+                f"index_nethermind.py | index_blocks | {self.request.id} | block {block.number} - {block_index}/{num_blocks}"
+            )
+            challenge_bus: ChallengeEventBus = update_task.challenge_event_bus
 
-        with db.scoped_session() as session, challenge_bus.use_scoped_dispatch_queue():
-            skip_tx_hash = get_tx_hash_to_skip(session, redis)
-            skip_whole_block = skip_tx_hash == "commit"  # db tx failed at commit level
-            if skip_whole_block:
-                logger.info(
-                    f"index_nethermind.py | Skipping all txs in block {block.hash} {block.number}"
+            prefetch_wait_start_time = time.time()
+            prefetched_block: Optional[PrefetchedBlock] = prefetcher.get(
+                block_index - 1
+            )
+            if prefetcher.enabled:
+                metric.save_time(
+                    {"scope": "prefetch_wait"}, start_time=prefetch_wait_start_time
                 )
-                save_skipped_tx(session, redis)
-                add_indexed_block_to_db(session, block)
-            else:
-                txs_grouped_by_type = {
-                    ENTITY_MANAGER: [],
-                }
-                try:
-                    """
-                    Fetch transaction receipts
-                    """
-                    fetch_tx_receipts_start_time = time.time()
-                    logger.info(f"index_nethermind.py fetching block {block}")
-                    tx_receipt_dict = fetch_tx_receipts(self, block)
-                    metric.save_time(
-                        {"scope": "fetch_tx_receipts"},
-                        start_time=fetch_tx_receipts_start_time,
-                    )
+
+            with db.scoped_session() as session, challenge_bus.use_scoped_dispatch_queue():
+                skip_tx_hash = get_tx_hash_to_skip(session, redis)
+                # db tx failed at commit level
+                skip_whole_block = skip_tx_hash == "commit"
+                if skip_whole_block:
                     logger.info(
-                        f"index_nethermind.py | index_blocks - fetch_tx_receipts in {time.time() - fetch_tx_receipts_start_time}s"
+                        f"index_nethermind.py | Skipping all txs in block {block.hash} {block.number}"
                     )
+                    save_skipped_tx(session, redis)
+                    add_indexed_block_to_db(session, block)
+                else:
+                    txs_grouped_by_type = {
+                        ENTITY_MANAGER: [],
+                    }
+                    try:
+                        """
+                        Fetch transaction receipts
+                        """
+                        fetch_tx_receipts_start_time = time.time()
+                        logger.info(f"index_nethermind.py fetching block {block}")
+                        if prefetched_block:
+                            tx_receipt_dict = prefetched_block["tx_receipt_dict"]
+                        else:
+                            tx_receipt_dict = fetch_tx_receipts(self, block)
+                        metric.save_time(
+                            {"scope": "fetch_tx_receipts"},
+                            start_time=fetch_tx_receipts_start_time,
+                        )
+                        logger.info(
+                            f"index_nethermind.py | index_blocks - fetch_tx_receipts in {time.time() - fetch_tx_receipts_start_time}s"
+                        )
 
-                    """
-                    Parse transaction receipts
-                    """
-                    parse_tx_receipts_start_time = time.time()
+                        """
+                        Parse transaction receipts
+                        """
+                        parse_tx_receipts_start_time = time.time()
 
-                    sorted_txs = sort_block_transactions(
-                        block, indexing_transaction_index_sort_order_start_block
-                    )
+                        sorted_txs = sort_block_transactions(
+                            block, indexing_transaction_index_sort_order_start_block
+                        )
 
-                    # Parse tx events in each block
-                    for tx in sorted_txs:
-                        tx_hash = web3.toHex(tx["hash"])
-                        tx_target_contract_address = (
-                            tx["to"] if tx["to"] else zero_address
+                        # Parse tx events in each block
+                        for tx in sorted_txs:
+                            tx_hash = web3.toHex(tx["hash"])
+                            tx_target_contract_address = (
+                                tx["to"] if tx["to"] else zero_address
+                            )
+                            tx_receipt = tx_receipt_dict[tx_hash]
+                            should_skip_tx = (
+                                tx_target_contract_address == zero_address
+                            ) or (skip_tx_hash is not None and skip_tx_hash == tx_hash)
+
+                            if should_skip_tx:
+                                logger.info(
+                                    f"index_nethermind.py | Skipping tx {tx_hash} targeting {tx_target_contract_address}"
+                                )
+                                save_skipped_tx(session, redis)
+                                continue
+                            else:
+                                contract_type = get_contract_type_for_tx(
+                                    txs_grouped_by_type, tx, tx_receipt
+                                )
+                                if contract_type:
+                                    txs_grouped_by_type[contract_type].append(
+                                        tx_receipt
+                                    )
+                        metric.save_time(
+                            {"scope": "parse_tx_receipts"},
+                            start_time=parse_tx_receipts_start_time,
+                        )
+                        logger.info(
+                            f"index_nethermind.py | index_blocks - parse_tx_receipts in {time.time() - parse_tx_receipts_start_time}s"
                         )
-                        tx_receipt = tx_receipt_dict[tx_hash]
-                        should_skip_tx = (
-                            tx_target_contract_address == zero_address
-                        ) or (skip_tx_hash is not None and skip_tx_hash == tx_hash)
 
-                        if should_skip_tx:
-                            logger.info(
-                                f"index_nethermind.py | Skipping tx {tx_hash} targeting {tx_target_contract_address}"
+                        """
+                        Fetch JSON metadata
+                        """
+                        fetch_metadata_start_time = time.time()
+                        # pre-fetch cids asynchronously to not have it block in user_state_update
+                        # and track_state_update
+                        # Prefetched txs are reordered to match sorted_txs
+                        prefetched_entity_manager_txs = (
+                            get_prefetched_txs_in_order(
+                                prefetched_block["decoded_entity_manager_txs"],
+                                [
+                                    web3.toHex(tx_receipt.transactionHash)
+                                    for tx_receipt in txs_grouped_by_type[
+                                        ENTITY_MANAGER
+                                    ]
+                                ],
                             )
-                            save_skipped_tx(session, redis)
-                            continue
+                            if prefetched_block
+                            else None
+                        )
+                        if (
+                            prefetched_block
+                            and prefetched_entity_manager_txs is not None
+                        ):
+                            decoded_txs_by_type = {
+                                ENTITY_MANAGER: prefetched_entity_manager_txs
+                            }
+                            cid_metadata = prefetched_block["cid_metadata"]
+                            cid_type = prefetched_block["cid_type"]
                         else:
-                            contract_type = get_contract_type_for_tx(
-                                txs_grouped_by_type, tx, tx_receipt
+                            decoded_txs_by_type = {
+                                ENTITY_MANAGER: decode_block_entity_manager_txs(
+                                    txs_grouped_by_type[ENTITY_MANAGER]
+                                )
+                            }
+                            cid_metadata, cid_type = fetch_cid_metadata(
+                                db,
+                                decoded_txs_by_type[ENTITY_MANAGER],
                             )
-                            if contract_type:
-                                txs_grouped_by_type[contract_type].append(tx_receipt)
-                    metric.save_time(
-                        {"scope": "parse_tx_receipts"},
-                        start_time=parse_tx_receipts_start_time,
-                    )
-                    logger.info(
-                        f"index_nethermind.py | index_blocks - parse_tx_receipts in {time.time() - parse_tx_receipts_start_time}s"
-                    )
-
-                    """
-                    Fetch JSON metadata
-                    """
-                    fetch_metadata_start_time = time.time()
-                    # pre-fetch cids asynchronously to not have it block in user_state_update
-                    # and track_state_update
-                    cid_metadata, cid_type = fetch_cid_metadata(
-                        db,
-                        txs_grouped_by_type[ENTITY_MANAGER],
-                    )
-                    logger.info(
-                        f"index_nethermind.py | index_blocks - fetch_metadata in {time.time() - fetch_metadata_start_time}s"
-                    )
-                    # Record the time this took in redis
-                    duration_ms = round(
-                        (time.time() - fetch_metadata_start_time) * 1000
-                    )
-                    record_fetch_metadata_ms(redis, duration_ms)
-                    metric.save_time(
-                        {"scope": "fetch_metadata"},
-                        start_time=fetch_metadata_start_time,
-                    )
-                    logger.info(
-                        f"index_nethermind.py | index_blocks - fetch_metadata in {duration_ms}ms"
-                    )
+                        logger.info(
+                            f"index_nethermind.py | index_blocks - fetch_metadata in {time.time() - fetch_metadata_start_time}s"
+                        )
+                        # Record the time this took in redis
+                        duration_ms = round(
+                            (time.time() - fetch_metadata_start_time) * 1000
+                        )
+                        record_fetch_metadata_ms(redis, duration_ms)
+                        metric.save_time(
+                            {"scope": "fetch_metadata"},
+                            start_time=fetch_metadata_start_time,
+                        )
+                        logger.info(
+                            f"index_nethermind.py | index_blocks - fetch_metadata in {duration_ms}ms"
+                        )
 
-                    """
-                    Add block to db
-                    """
-                    add_indexed_block_to_db_start_time = time.time()
-                    add_indexed_block_to_db(session, block)
-                    # Record the time this took in redis
-                    duration_ms = round(
-                        (time.time() - add_indexed_block_to_db_start_time) * 1000
-                    )
-                    record_add_indexed_block_to_db_ms(redis, duration_ms)
-                    metric.save_time(
-                        {"scope": "add_indexed_block_to_db"},
-                        start_time=add_indexed_block_to_db_start_time,
-                    )
-                    logger.info(
-                        f"index_nethermind.py | index_blocks - add_indexed_block_to_db in {duration_ms}ms"
-                    )
+                        """
+                        Add block to db
+                        """
+                        add_indexed_block_to_db_start_time = time.time()
+                        add_indexed_block_to_db(session, block)
+                        # Record the time this took in redis
+                        duration_ms = round(
+                            (time.time() - add_indexed_block_to_db_start_time) * 1000
+                        )
+                        record_add_indexed_block_to_db_ms(redis, duration_ms)
+                        metric.save_time(
+                            {"scope": "add_indexed_block_to_db"},
+                            start_time=add_indexed_block_to_db_start_time,
+                        )
+                        logger.info(
+                            f"index_nethermind.py | index_blocks - add_indexed_block_to_db in {duration_ms}ms"
+                        )
 
-                    """
-                    Add state changes in block to db (users, tracks, etc.)
-                    """
-                    process_state_changes_start_time = time.time()
-                    # bulk process operations once all tx's for block have been parsed
-                    # and get changed entity IDs for cache clearing
-                    # after session commit
-                    process_state_changes(
-                        self,
-                        session,
-                        cid_metadata,
-                        txs_grouped_by_type,
-                        block,
-                    )
-                    metric.save_time(
-                        {"scope": "process_state_changes"},
-                        start_time=process_state_changes_start_time,
-                    )
-                    logger.info(
-                        f"index_nethermind.py | index_blocks - process_state_changes in {time.time() - process_state_changes_start_time}s"
-                    )
-                    is_save_cid_enabled = shared_config["discprov"]["enable_save_cid"]
-                    if is_save_cid_enabled:
                         """
-                        Add CID Metadata to db (cid -> json blob, etc.)
+                        Add state changes in block to db (users, tracks, etc.)
                         """
-                        save_cid_metadata_time = time.time()
+                        process_state_changes_start_time = time.time()
                         # bulk process operations once all tx's for block have been parsed
                         # and get changed entity IDs for cache clearing
                         # after session commit
-                        save_cid_metadata(session, cid_metadata, cid_type)
+                        process_state_changes(
+                            self,
+                            session,
+                            cid_metadata,
+                            txs_grouped_by_type,
+                            decoded_txs_by_type,
+                            block,
+                        )
                         metric.save_time(
-                            {"scope": "save_cid_metadata"},
-                            start_time=save_cid_metadata_time,
+                            {"scope": "process_state_changes"},
+                            start_time=process_state_changes_start_time,
                         )
                         logger.info(
-                            f"index.py | index_blocks - save_cid_metadata in {time.time() - save_cid_metadata_time}s"
+                            f"index_nethermind.py | index_blocks - process_state_changes in {time.time() - process_state_changes_start_time}s"
                         )
+                        is_save_cid_enabled = shared_config["discprov"][
+                            "enable_save_cid"
+                        ]
+                        if is_save_cid_enabled:
+                            """
+                            Add CID Metadata to db (cid -> json blob, etc.)
+                            """
+                            save_cid_metadata_time = time.time()
+                            # bulk process operations once all tx's for block have been parsed
+                            # and get changed entity IDs for cache clearing
+                            # after session commit
+                            save_cid_metadata(session, cid_metadata, cid_type)
+                            metric.save_time(
+                                {"scope": "save_cid_metadata"},
+                                start_time=save_cid_metadata_time,
+                            )
+                            logger.info(
+                                f"index.py | index_blocks - save_cid_metadata in {time.time() - save_cid_metadata_time}s"
+                            )
 
-                except Exception as e:
+                    except Exception as e:
+
+                        blockhash = web3.toHex(block_hash)
+                        indexing_error = IndexingError(
+                            "prefetch-cids", block_number, blockhash, None, str(e)
+                        )
+                        create_and_raise_indexing_error(indexing_error, redis)
 
+                try:
+                    commit_start_time = time.time()
+                    session.commit()
+                    metric.save_time(
+                        {"scope": "commit_time"}, start_time=commit_start_time
+                    )
+                    logger.info(
+                        f"index_nethermind.py | session committed to db for block={block_number} in {time.time() - commit_start_time}s"
+                    )
+                except Exception as e:
+                    # Use 'commit' as the tx hash here.
+                    # We're at a point where the whole block can't be added to the database, so
+                    # we should skip it in favor of making progress
                     blockhash = web3.toHex(block_hash)
                     indexing_error = IndexingError(
-                        "prefetch-cids", block_number, blockhash, None, str(e)
+                        "session.commit", block_number, blockhash, "commit", str(e)
                     )
                     create_and_raise_indexing_error(indexing_error, redis)
-
-            try:
-                commit_start_time = time.time()
-                session.commit()
-                metric.save_time({"scope": "commit_time"}, start_time=commit_start_time)
-                logger.info(
-                    f"index_nethermind.py | session committed to db for block={block_number} in {time.time() - commit_start_time}s"
-                )
-            except Exception as e:
-                # Use 'commit' as the tx hash here.
-                # We're at a point where the whole block can't be added to the database, so
-                # we should skip it in favor of making progress
-                blockhash = web3.toHex(block_hash)
-                indexing_error = IndexingError(
-                    "session.commit", block_number, blockhash, "commit", str(e)
-                )
-                create_and_raise_indexing_error(indexing_error, redis)
-            try:
-                # Check the last block's timestamp for updating the trending challenge
-                [should_update, date] = should_trending_challenge_update(
-                    session, latest_block_timestamp
-                )
-                if should_update:
-                    celery.send_task(
-                        "calculate_trending_challenges", kwargs={"date": date}
+                try:
+                    # Check the last block's timestamp for updating the trending challenge
+                    [should_update, date] = should_trending_challenge_update(
+                        session, latest_block_timestamp
                     )
-            except Exception as e:
-                # Do not throw error, as this should not stop indexing
-                logger.error(
-                    f"index_nethermind.py | Error in calling update trending challenge {e}",
-                    exc_info=True,
-                )
-            if skip_tx_hash:
-                clear_indexing_error(redis)
+                    if should_update:
+                        celery.send_task(
+                            "calculate_trending_challenges", kwargs={"date": date}
+                        )
+                except Exception as e:
+                    # Do not throw error, as this should not stop indexing
+                    logger.error(
+                        f"index_nethermind.py | Error in calling update trending challenge {e}",
+                        exc_info=True,
+                    )
+                if skip_tx_hash:
+                    clear_indexing_error(redis)
 
-        add_indexed_block_to_redis(block, redis)
-        logger.info(
-            f"index_nethermind.py | update most recently processed block complete for block=${block_number}"
-        )
+            add_indexed_block_to_redis(block, redis)
+            logger.info(
+                f"index_nethermind.py | update most recently processed block complete for block=${block_number}"
+            )
 
-        # Record the time this took in redis
-        metric.save_time({"scope": "full"})
-        duration_ms = round(time.time() - start_time * 1000)
-        record_index_blocks_ms(redis, duration_ms)
+            # Record the time this took in redis
+            metric.save_time({"scope": "full"})
+            duration_ms = round(time.time() - start_time * 1000)
+            record_index_blocks_ms(redis, duration_ms)
 
-        # Sweep records older than 30 days every day
-        if block_number % BLOCKS_PER_DAY == 0:
-            sweep_old_index_blocks_ms(redis, 30)
-            sweep_old_fetch_metadata_ms(redis, 30)
-            sweep_old_add_indexed_block_to_db_ms(redis, 30)
+            # Sweep records older than 30 days every day
+            if block_number % BLOCKS_PER_DAY == 0:
+                sweep_old_index_blocks_ms(redis, 30)
+                sweep_old_fetch_metadata_ms(redis, 30)
+                sweep_old_add_indexed_block_to_db_ms(redis, 30)
 
     if num_blocks > 0:
         logger.info(f"index_nethermind.py | index_blocks | Indexed {num_blocks} blocks")
@@ -0,0 +1,168 @@
+import logging
+import time
+
+from sqlalchemy import func, text
+from src.models.social.play import Play
+from src.tasks.celery_app import celery
+from src.utils.prometheus_metric import save_duration_metric
+from src.utils.update_indexing_checkpoints import (
+    get_last_indexed_checkpoint,
+    save_indexed_checkpoint,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_PLAY_ROLLUPS_LOCK = "index_play_rollups_lock"
+PLAY_ROLLUPS_CHECKPOINT_NAME = "play_rollups"
+HOURLY_PLAY_COUNTS_TABLE_NAME = "hourly_play_counts"
+AGGREGATE_MONTHLY_PLAYS_TABLE_NAME = "aggregate_monthly_plays"
+
+# max number of play ids rolled up per run
+MAX_PLAYS_PER_RUN = 1000000
+
+# UPSERT_PLAY_ROLLUPS_QUERY
+# Read the new plays that came after the last checkpoint once
+# Group them into hourly buckets and monthly buckets per play item
+# and add the counts to the existing rollups with one multi-row upsert per table
+# The per-table checkpoints only differ on the first run after the rollups
+# started sharing a checkpoint, where each table skips the plays it already counted
+UPSERT_PLAY_ROLLUPS_QUERY = """
+    with new_plays as (
+        select
+            id,
+            play_item_id,
+            created_at
+        from
+            plays
+        where
+            id > :prev_id_checkpoint
+            and id <= :new_id_checkpoint
+    ),
+    upsert_hourly_play_counts as (
+        insert into
+            hourly_play_counts (hourly_timestamp, play_count)
+        select
+            date_trunc('hour', created_at) as hourly_timestamp,
+            count(id) as play_count
+        from
+            new_plays
+        where
+            id > :prev_hourly_id_checkpoint
+        group by
+            date_trunc('hour', created_at)
+        on conflict (hourly_timestamp) do
+        update
+        set
+            play_count = hourly_play_counts.play_count + excluded.play_count
+    )
+    insert into
+        aggregate_monthly_plays (play_item_id, timestamp, count)
+    select
+        play_item_id,
+        date_trunc('month', created_at) as timestamp,
+        count(id) as count
+    from
+        new_plays
+    where
+        id > :prev_monthly_id_checkpoint
+    group by
+        play_item_id, date_trunc('month', created_at)
+    on conflict (play_item_id, timestamp) do
+    update
+    set
+        count = aggregate_monthly_plays.count + excluded.count
+    """
+
+
+def get_prev_id_checkpoints(session):
+    """
+    Returns the last play id rolled up into the hourly and monthly rollups.
+    Before the first shared checkpoint is saved, these are the checkpoints
+    of the tasks that used to roll up each table on their own.
+    """
+    prev_id_checkpoint = get_last_indexed_checkpoint(
+        session, PLAY_ROLLUPS_CHECKPOINT_NAME
+    )
+    if prev_id_checkpoint:
+        return prev_id_checkpoint, prev_id_checkpoint
+
+    return (
+        get_last_indexed_checkpoint(session, HOURLY_PLAY_COUNTS_TABLE_NAME),
+        get_last_indexed_checkpoint(session, AGGREGATE_MONTHLY_PLAYS_TABLE_NAME),
+    )
+
+
+def _index_play_rollups(session):
+    prev_hourly_id_checkpoint, prev_monthly_id_checkpoint = get_prev_id_checkpoints(
+        session
+    )
+    prev_id_checkpoint = min(prev_hourly_id_checkpoint, prev_monthly_id_checkpoint)
+
+    most_recent_play_id = (session.query(func.max(Play.id))).scalar()
+
+    if not most_recent_play_id:
+        return
+
+    # never stop short of a per-table checkpoint so the shared checkpoint
+    # is safe for both tables once saved
+    new_id_checkpoint = min(
+        most_recent_play_id,
+        max(
+            prev_id_checkpoint + MAX_PLAYS_PER_RUN,
+            prev_hourly_id_checkpoint,
+            prev_monthly_id_checkpoint,
+        ),
+    )
+
+    if new_id_checkpoint <= prev_id_checkpoint:
+        logger.info(
+            "index_play_rollups.py | Skip update because there are no new plays"
+        )
+        return
+
+    session.execute(
+        text(UPSERT_PLAY_ROLLUPS_QUERY),
+        {
+            "prev_id_checkpoint": prev_id_checkpoint,
+            "new_id_checkpoint": new_id_checkpoint,
+            "prev_hourly_id_checkpoint": prev_hourly_id_checkpoint,
+            "prev_monthly_id_checkpoint": prev_monthly_id_checkpoint,
+        },
+    )
+
+    save_indexed_checkpoint(session, PLAY_ROLLUPS_CHECKPOINT_NAME, new_id_checkpoint)
+
+
+# ####### CELERY TASKS ####### #
+@celery.task(name="index_play_rollups", bind=True)
+@save_duration_metric(metric_group="celery_task")
+def index_play_rollups(self):
+    # Cache custom task class properties
+    # Details regarding custom task context can be found in wiki
+    # Custom Task definition can be found in src/app.py
+    db = index_play_rollups.db
+    redis = index_play_rollups.redis
+    # Define lock acquired boolean
+    have_lock = False
+    # Define redis lock object
+    update_lock = redis.lock(INDEX_PLAY_ROLLUPS_LOCK, timeout=60 * 10)
+    try:
+        # Attempt to acquire lock - do not block if unable to acquire
+        have_lock = update_lock.acquire(blocking=False)
+        if have_lock:
+            start_time = time.time()
+
+            with db.scoped_session() as session:
+                _index_play_rollups(session)
+
+            logger.info(
+                f"index_play_rollups.py | Finished updating play rollups in: {time.time()-start_time} sec"
+            )
+        else:
+            logger.info("index_play_rollups.py | Failed to acquire lock")
+    except Exception as e:
+        logger.error("index_play_rollups.py | Fatal error in main loop", exc_info=True)
+        raise e
+    finally:
+        if have_lock:
+            update_lock.release()
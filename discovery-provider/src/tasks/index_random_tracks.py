@@ -0,0 +1,158 @@
+import logging
+import time
+
+from redis import Redis
+from sqlalchemy import and_
+from sqlalchemy.orm.session import Session
+from src.models.indexing.block import Block
+from src.models.tracks.track import Track
+from src.tasks.celery_app import celery
+from src.utils.prometheus_metric import save_duration_metric
+from src.utils.redis_constants import (
+    random_tracks_pool_checkpoint_redis_key,
+    random_tracks_pool_redis_key,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_RANDOM_TRACKS_LOCK = "index_random_tracks_lock"
+DEFAULT_LOCK_TIMEOUT_SECONDS = 60 * 10  # 10 minutes
+
+# Number of track ids written to redis per command
+REDIS_BATCH_SIZE = 10000
+
+# Tracks that can be drawn by get_random_tracks
+is_eligible = and_(
+    Track.is_delete == False,
+    Track.is_unlisted == False,
+    Track.stem_of == None,
+)
+
+
+def get_random_tracks_pool_checkpoint(redis: Redis):
+    checkpoint = redis.hgetall(random_tracks_pool_checkpoint_redis_key)
+    if not checkpoint:
+        return None
+    return int(checkpoint[b"blocknumber"]), checkpoint[b"blockhash"].decode()
+
+
+def write_track_ids(command, key, track_ids):
+    # unsafe to call sadd or srem with an empty array
+    for i in range(0, len(track_ids), REDIS_BATCH_SIZE):
+        command(key, *track_ids[i : i + REDIS_BATCH_SIZE])
+
+
+def rebuild_random_tracks_pool(session: Session, redis: Redis, latest_block: Block):
+    """Replaces the pool with every eligible current track"""
+    track_ids = [
+        track_id
+        for (track_id,) in session.query(Track.track_id).filter(
+            Track.is_current == True,
+            Track.blocknumber <= latest_block.number,
+            is_eligible,
+        )
+    ]
+
+    # build into a temporary key so requests never see a partial pool
+    tmp_key = f"{random_tracks_pool_redis_key}:tmp"
+    pipe = redis.pipeline()
+    pipe.delete(tmp_key)
+    write_track_ids(pipe.sadd, tmp_key, track_ids)
+    if track_ids:
+        pipe.rename(tmp_key, random_tracks_pool_redis_key)
+    else:
+        pipe.delete(random_tracks_pool_redis_key)
+    pipe.hmset(
+        random_tracks_pool_checkpoint_redis_key,
+        {"blocknumber": latest_block.number, "blockhash": latest_block.blockhash},
+    )
+    pipe.execute()
+    return len(track_ids), 0
+
+
+def update_random_tracks_pool(session: Session, redis: Redis, prev_blocknumber: int):
+    """Adds and removes the tracks written since the previous checkpoint.
+    Returns the number of track ids added and removed."""
+    latest_block = session.query(Block).filter(Block.is_current == True).first()
+    if not latest_block or latest_block.number <= prev_blocknumber:
+        return None
+
+    tracks = session.query(Track.track_id, is_eligible.label("is_eligible")).filter(
+        Track.is_current == True,
+        Track.blocknumber > prev_blocknumber,
+        Track.blocknumber <= latest_block.number,
+    )
+    added_track_ids = []
+    removed_track_ids = []
+    for track_id, eligible in tracks:
+        if eligible:
+            added_track_ids.append(track_id)
+        else:
+            removed_track_ids.append(track_id)
+
+    pipe = redis.pipeline()
+    write_track_ids(pipe.sadd, random_tracks_pool_redis_key, added_track_ids)
+    write_track_ids(pipe.srem, random_tracks_pool_redis_key, removed_track_ids)
+    pipe.hmset(
+        random_tracks_pool_checkpoint_redis_key,
+        {"blocknumber": latest_block.number, "blockhash": latest_block.blockhash},
+    )
+    pipe.execute()
+    return len(added_track_ids), len(removed_track_ids)
+
+
+def index_random_tracks_pool(session: Session, redis: Redis):
+    """
+    Keeps the set of track ids get_random_tracks samples from in sync with
+    the tracks table. Only the tracks written after the checkpoint block are
+    read, unless the checkpoint block was reverted or the pool was never built.
+    """
+    checkpoint = get_random_tracks_pool_checkpoint(redis)
+    if checkpoint:
+        prev_blocknumber, prev_blockhash = checkpoint
+        checkpoint_block_exists = session.query(
+            session.query(Block).filter(Block.blockhash == prev_blockhash).exists()
+        ).scalar()
+        if checkpoint_block_exists:
+            return update_random_tracks_pool(session, redis, prev_blocknumber)
+
+    latest_block = session.query(Block).filter(Block.is_current == True).first()
+    if not latest_block:
+        return None
+    return rebuild_random_tracks_pool(session, redis, latest_block)
+
+
+# ####### CELERY TASKS ####### #
+@celery.task(name="index_random_tracks", bind=True)
+@save_duration_metric(metric_group="celery_task")
+def index_random_tracks(self):
+    """Keeps the pool of tracks sampled by get_random_tracks up to date"""
+
+    db = index_random_tracks.db_read_replica
+    redis = index_random_tracks.redis
+
+    have_lock = False
+    update_lock = redis.lock(
+        INDEX_RANDOM_TRACKS_LOCK, timeout=DEFAULT_LOCK_TIMEOUT_SECONDS
+    )
+
+    try:
+        have_lock = update_lock.acquire(blocking=False)
+
+        if have_lock:
+            start_time = time.time()
+            with db.scoped_session() as session:
+                result = index_random_tracks_pool(session, redis)
+            if result:
+                num_added, num_removed = result
+                logger.info(
+                    f"index_random_tracks.py | Added {num_added} and removed {num_removed} tracks in {time.time() - start_time} seconds"
+                )
+        else:
+            logger.info("index_random_tracks.py | Failed to acquire lock")
+    except Exception as e:
+        logger.error("index_random_tracks.py | Fatal error in main loop", exc_info=True)
+        raise e
+    finally:
+        if have_lock:
+            update_lock.release()
@@ -1,5 +1,7 @@
 import logging
+import time
 
+from redis import Redis
 from src.queries.get_related_artists_minhash import update_related_artist_minhash
 from src.tasks.celery_app import celery
 from src.utils.prometheus_metric import save_duration_metric
@@ -8,11 +10,14 @@ from src.utils.session_manager import SessionManager
 logger = logging.getLogger(__name__)
 
 
-def process_related_artists(db: SessionManager):
+def process_related_artists(db: SessionManager, redis: Redis):
     with db.scoped_session() as session:
         logger.info("index_related_artists.py | starting")
-        update_related_artist_minhash(session)
-        logger.info("index_related_artists.py | done")
+        start_time = time.time()
+        update_related_artist_minhash(session, redis)
+        logger.info(
+            f"index_related_artists.py | done in {time.time() - start_time} sec"
+        )
 
 
 @celery.task(name="index_related_artists", bind=True)
@@ -25,7 +30,7 @@ def index_related_artists(self):
     try:
         have_lock = update_lock.acquire(blocking=False)
         if have_lock:
-            process_related_artists(db)
+            process_related_artists(db, redis)
         else:
             logger.info("index_related_artists.py | Failed to acquire lock")
     except Exception as e:
@@ -8,6 +8,7 @@ from typing import Callable, Dict, List, Optional, TypedDict
 import base58
 from redis import Redis
 from sqlalchemy import desc
+from sqlalchemy.orm.attributes import InstrumentedAttribute
 from sqlalchemy.orm.session import Session
 from src.models.rewards.challenge import Challenge, ChallengeType
 from src.models.rewards.challenge_disbursement import ChallengeDisbursement
@@ -26,6 +27,7 @@ from src.solana.constants import (
     TX_SIGNATURES_MAX_BATCHES,
     TX_SIGNATURES_RESIZE_LENGTH,
 )
+from src.solana.solana_backfill import SolanaBackfill
 from src.solana.solana_client_manager import SolanaClientManager
 from src.solana.solana_parser import (
     InstructionFormat,
@@ -33,11 +35,13 @@ from src.solana.solana_parser import (
     parse_instruction_data,
 )
 from src.solana.solana_transaction_types import (
+    ConfirmedSignatureForAddressResult,
     ResultMeta,
     TransactionInfoResult,
     TransactionMessage,
     TransactionMessageInstruction,
 )
+from src.solana.solana_traversal import find_unindexed_txs, get_indexed_tx_sigs
 from src.tasks.celery_app import celery
 from src.utils.cache_solana_program import (
     cache_latest_sol_db_tx,
@@ -414,23 +418,12 @@ def get_latest_reward_disbursment_slot(session: Session):
     return latest_slot
 
 
-def get_tx_in_db(session: Session, tx_sig: str) -> bool:
-    """Checks if the transaction signature already exists for Challenge Disburements"""
-    tx_sig_db_count = (
-        session.query(RewardManagerTransaction).filter(
-            RewardManagerTransaction.signature == tx_sig
-        )
-    ).count()
-    exists = tx_sig_db_count > 0
-    return exists
-
-
 def get_transaction_signatures(
     solana_client_manager: SolanaClientManager,
     db: SessionManager,
     program: str,
     get_latest_slot: Callable[[Session], int],
-    check_tx_exists: Callable[[Session, str], bool],
+    signature_column: InstrumentedAttribute,
     min_slot=None,
 ) -> List[List[str]]:
     """Fetches next batch of transaction signature offset from the previous latest processed slot
@@ -473,31 +466,14 @@ def get_transaction_signatures(
                 )
             else:
                 # Current batch of transactions
-                transaction_signature_batch = []
-                for tx_info in transactions_array:
-                    tx_sig = tx_info["signature"]
-                    tx_slot = tx_info["slot"]
-                    logger.debug(
-                        f"index_rewards_manager.py | Processing tx={tx_sig} | slot={tx_slot}"
-                    )
-                    if tx_info["slot"] > latest_processed_slot:
-                        transaction_signature_batch.append(tx_sig)
-                    elif tx_info["slot"] <= latest_processed_slot and (
-                        min_slot is None or tx_info["slot"] > min_slot
-                    ):
-                        # Check the tx signature for any txs in the latest batch,
-                        # and if not present in DB, add to processing
-                        logger.info(
-                            f"index_rewards_manager.py | Latest slot re-traversal\
-                            slot={tx_slot}, sig={tx_sig},\
-                            latest_processed_slot(db)={latest_processed_slot}"
-                        )
-                        exists = check_tx_exists(session, tx_sig)
-                        if exists:
-                            intersection_found = True
-                            break
-                        # Ensure this transaction is still processed
-                        transaction_signature_batch.append(tx_sig)
+                unindexed_txs, intersection_found = find_unindexed_txs(
+                    session,
+                    signature_column,
+                    transactions_array,
+                    latest_processed_slot,
+                    min_slot,
+                )
+                transaction_signature_batch = [tx["signature"] for tx in unindexed_txs]
 
                 # Restart processing at the end of this transaction signature batch
                 last_tx = transactions_array[-1]
@@ -538,30 +514,34 @@ def process_transaction_signatures(
 
         transfer_instructions: List[RewardManagerTransactionInfo] = []
         # Process each batch in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            parse_sol_tx_futures = {
-                executor.submit(
-                    fetch_and_parse_sol_rewards_transfer_instruction,
-                    solana_client_manager,
-                    tx_sig,
-                ): tx_sig
-                for tx_sig in tx_sig_batch
-            }
-            for future in concurrent.futures.as_completed(parse_sol_tx_futures):
-                try:
-                    # No return value expected here so we just ensure all futures are resolved
-                    parsed_solana_transfer_instruction = future.result()
-                    if parsed_solana_transfer_instruction is not None:
-                        transfer_instructions.append(parsed_solana_transfer_instruction)
-                        if (
-                            last_tx_sig
-                            and last_tx_sig
-                            == parsed_solana_transfer_instruction["tx_sig"]
-                        ):
-                            last_tx = parsed_solana_transfer_instruction
-                except Exception as exc:
-                    logger.error(f"index_rewards_manager.py | {exc}")
-                    raise exc
+        # Fetch the batch with JSON-RPC batch requests when async rpc is enabled
+        with solana_client_manager.prefetched_sol_tx_infos(tx_sig_batch):
+            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+                parse_sol_tx_futures = {
+                    executor.submit(
+                        fetch_and_parse_sol_rewards_transfer_instruction,
+                        solana_client_manager,
+                        tx_sig,
+                    ): tx_sig
+                    for tx_sig in tx_sig_batch
+                }
+                for future in concurrent.futures.as_completed(parse_sol_tx_futures):
+                    try:
+                        # No return value expected here so we just ensure all futures are resolved
+                        parsed_solana_transfer_instruction = future.result()
+                        if parsed_solana_transfer_instruction is not None:
+                            transfer_instructions.append(
+                                parsed_solana_transfer_instruction
+                            )
+                            if (
+                                last_tx_sig
+                                and last_tx_sig
+                                == parsed_solana_transfer_instruction["tx_sig"]
+                            ):
+                                last_tx = parsed_solana_transfer_instruction
+                    except Exception as exc:
+                        logger.error(f"index_rewards_manager.py | {exc}")
+                        raise exc
         with db.scoped_session() as session:
             process_batch_sol_reward_manager_txs(session, transfer_instructions, redis)
         batch_end_time = time.time()
@@ -596,18 +576,53 @@ def process_solana_rewards_manager(
         return
 
     # Get the latests slot available globally before fetching txs to keep track of indexing progress
+    latest_global_slot = None
     try:
         latest_global_slot = solana_client_manager.get_slot()
     except:
         logger.error("index_rewards_manager.py | Failed to get slot")
 
+    def get_indexed_reward_manager_tx_sigs(tx_sigs: List[str]):
+        with db.scoped_session() as session:
+            return get_indexed_tx_sigs(
+                session, RewardManagerTransaction.signature, tx_sigs
+            )
+
+    def process_backfill_segment(
+        transactions: List[ConfirmedSignatureForAddressResult],
+    ):
+        process_transaction_signatures(
+            solana_client_manager,
+            db,
+            redis,
+            [[tx["signature"] for tx in transactions]],
+        )
+
+    # Far behind the chain tail, e.g. after restoring an old snapshot,
+    # discover and parse the missing transactions in parallel segments
+    backfill = SolanaBackfill(
+        db,
+        redis,
+        solana_client_manager,
+        REWARDS_MANAGER_PROGRAM,
+        "rewards_manager",
+        get_indexed_reward_manager_tx_sigs,
+        process_backfill_segment,
+        MIN_SLOT,
+    )
+    with db.scoped_session() as session:
+        latest_processed_slot = get_latest_reward_disbursment_slot(session)
+    if backfill.should_run(latest_processed_slot, latest_global_slot):
+        backfill.run(latest_processed_slot)
+        return
+
     # List of signatures that will be populated as we traverse recent operations
     transaction_signatures = get_transaction_signatures(
         solana_client_manager,
         db,
         REWARDS_MANAGER_PROGRAM,
         get_latest_reward_disbursment_slot,
-        get_tx_in_db,
+        RewardManagerTransaction.signature,
         MIN_SLOT,
     )
     logger.info(f"index_rewards_manager.py | {transaction_signatures}")
@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import logging
+import time
+from typing import List, Tuple
+
+from redis import Redis
+from sqlalchemy.orm.session import Session
+from src.queries.get_sitemap import (
+    LIMIT,
+    SITEMAP_ENTITIES,
+    get_entity_page,
+    get_sitemap_digests_redis_key,
+    get_sitemap_index,
+    get_sitemap_index_redis_key,
+    get_sitemap_page_redis_key,
+    iter_entity_slug_pages,
+)
+from src.tasks.celery_app import celery
+from src.utils.prometheus_metric import save_duration_metric
+from src.utils.redis_constants import index_sitemaps_last_completion_redis_key
+
+logger = logging.getLogger(__name__)
+
+INDEX_SITEMAPS_LOCK = "index_sitemaps_lock"
+DEFAULT_LOCK_TIMEOUT_SECONDS = 60 * 60  # 1 hour
+
+
+def compress_sitemap(xml: bytes) -> bytes:
+    # fixed mtime so the same page always compresses to the same bytes
+    return gzip.compress(xml, mtime=0)
+
+
+def get_page_digest(page: List[Tuple[int, str]]) -> str:
+    digest = hashlib.sha256()
+    for entity_id, slug in page:
+        digest.update(f"{entity_id}:{slug}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_sitemap(session: Session, redis: Redis, type: str, limit: int = LIMIT):
+    """
+    Pre-renders the gzip compressed sitemap pages and index of an entity type.
+    Pages are streamed with keyset pagination, and a page is only re-rendered
+    when the ids or slugs in its range changed since the last build.
+    Returns the number of pages and the number of pages re-rendered.
+    """
+    digests_key = get_sitemap_digests_redis_key(type)
+    previous_digests = {
+        int(page_number): digest.decode()
+        for page_number, digest in redis.hgetall(digests_key).items()
+    }
+
+    num_pages = 0
+    num_updated_pages = 0
+    for page_number, page in enumerate(
+        iter_entity_slug_pages(session, type, limit), start=1
+    ):
+        num_pages = page_number
+        digest = get_page_digest(page)
+        if previous_digests.get(page_number) == digest:
+            continue
+
+        xml = get_entity_page([slug for _, slug in page])
+        pipe = redis.pipeline()
+        pipe.set(get_sitemap_page_redis_key(type, page_number), compress_sitemap(xml))
+        pipe.hset(digests_key, page_number, digest)
+        pipe.execute()
+        num_updated_pages += 1
+
+    pipe = redis.pipeline()
+    pipe.set(
+        get_sitemap_index_redis_key(type),
+        compress_sitemap(get_sitemap_index(num_pages, type)),
+    )
+    # drop pages past the end, e.g. after entities were deleted
+    for page_number in previous_digests:
+        if page_number > num_pages:
+            pipe.delete(get_sitemap_page_redis_key(type, page_number))
+            pipe.hdel(digests_key, page_number)
+    pipe.execute()
+
+    return num_pages, num_updated_pages
+
+
+def build_sitemaps(session: Session, redis: Redis, limit: int = LIMIT):
+    for type in SITEMAP_ENTITIES:
+        start_time = time.time()
+        num_pages, num_updated_pages = build_sitemap(session, redis, type, limit)
+        logger.info(
+            f"index_sitemaps.py | Built {type} sitemap, re-rendered {num_updated_pages} of {num_pages} pages in {time.time() - start_time} seconds"
+        )
+
+
+# ####### CELERY TASKS ####### #
+@celery.task(name="index_sitemaps", bind=True)
+@save_duration_metric(metric_group="celery_task")
+def index_sitemaps(self):
+    """Pre-renders the sitemaps served to crawlers"""
+
+    db = index_sitemaps.db_read_replica
+    redis = index_sitemaps.redis
+
+    have_lock = False
+    update_lock = redis.lock(INDEX_SITEMAPS_LOCK, timeout=DEFAULT_LOCK_TIMEOUT_SECONDS)
+
+    try:
+        have_lock = update_lock.acquire(blocking=False)
+
+        if have_lock:
+            with db.scoped_session() as session:
+                build_sitemaps(session, redis)
+            redis.set(index_sitemaps_last_completion_redis_key, int(time.time()))
+        else:
+            logger.info("index_sitemaps.py | Failed to acquire lock")
+    except Exception as e:
+        logger.error("index_sitemaps.py | Fatal error in main loop", exc_info=True)
+        raise e
+    finally:
+        if have_lock:
+            update_lock.release()
@@ -1,9 +1,8 @@
-import concurrent.futures
 import json
 import logging
 import time
 from datetime import datetime
-from typing import Dict, Tuple, TypedDict, Union
+from typing import Dict, List, Tuple, TypedDict, Union
 
 import base58
 from redis import Redis
@@ -12,8 +11,18 @@ from src.challenges.challenge_event import ChallengeEvent
 from src.challenges.challenge_event_bus import ChallengeEventBus
 from src.models.social.play import Play
 from src.solana.constants import FETCH_TX_SIGNATURES_BATCH_SIZE
+from src.solana.solana_backfill import SolanaBackfill
 from src.solana.solana_client_manager import SolanaClientManager
-from src.solana.solana_transaction_types import ConfirmedSignatureForAddressResult
+from src.solana.solana_transaction_types import (
+    ConfirmedSignatureForAddressResult,
+    ConfirmedTransaction,
+)
+from src.solana.solana_traversal import (
+    cache_traversed_tx,
+    fetch_traversed_tx_from_cache,
+    find_unindexed_txs,
+    get_indexed_tx_sigs,
+)
 from src.tasks.celery_app import celery
 from src.utils.cache_solana_program import (
     CachedProgramTxInfo,
@@ -160,15 +169,8 @@ def is_valid_tx(account_keys):
     return False
 
 
-def parse_sol_play_transaction(solana_client_manager: SolanaClientManager, tx_sig: str):
+def parse_sol_play_transaction(tx_info: ConfirmedTransaction, tx_sig: str):
     try:
-        fetch_start_time = time.time()
-        tx_info = solana_client_manager.get_sol_tx_info(tx_sig)
-        fetch_completion_time = time.time()
-        fetch_time = fetch_completion_time - fetch_start_time
-        logger.info(
-            f"index_solana_plays.py | Got transaction: {tx_sig} in {fetch_time}"
-        )
         meta = tx_info["result"]["meta"]
         error = meta["err"]
 
@@ -250,15 +252,6 @@ def get_latest_slot(db):
     return latest_slot
 
 
-# Query a tx signature and confirm its existence
-def get_tx_in_db(session, tx_sig):
-    exists = False
-    tx_sig_db_count = (session.query(Play).filter(Play.signature == tx_sig)).count()
-    exists = tx_sig_db_count > 0
-    logger.info(f"index_solana_plays.py | {tx_sig} exists={exists}")
-    return exists
-
-
 # pylint: disable=W0105
 """
 Processing of plays through the Solana TrackListenCount program is handled differently
@@ -340,15 +333,13 @@ is found - these limiting parameters are defined as TX_SIGNATURES_MAX_BATCHES, T
 """
 
 
-def parse_sol_tx_batch(
-    db, solana_client_manager, redis, tx_sig_batch_records, retries=10
-):
+def parse_sol_tx_batch(db, solana_client_manager, redis, tx_sig_batch_records):
     """
-    Parse a batch of solana transactions in parallel by calling parse_sol_play_transaction
-    with a ThreaPoolExecutor
+    Fetch a batch of solana transactions with get_sol_tx_batch, which retries
+    only the transactions that are missing, and parse them with
+    parse_sol_play_transaction
 
-    This function also has a recursive retry upto a certain limit in case a future doesn't complete
-    within the alloted time. It clears the futures thread queue and the batch is retried
+    Plays are only written if every transaction in the batch was fetched
     """
     batch_start_time = time.time()
     challenge_bus_events = []
@@ -359,83 +350,50 @@ def parse_sol_tx_batch(
     last_tx_in_batch = tx_sig_batch_records[0]
     challenge_bus = index_solana_plays.challenge_event_bus
 
-    # Process each batch in parallel
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        parse_sol_tx_futures = {
-            executor.submit(
-                parse_sol_play_transaction,
-                solana_client_manager,
-                tx_sig,
-            ): tx_sig
-            for tx_sig in tx_sig_batch_records
-        }
-        try:
-            for future in concurrent.futures.as_completed(
-                parse_sol_tx_futures, timeout=45
-            ):
-                # Returns the properties for a Play object to be created in the db
-                # can be None so check the value exists
-                result = future.result()
-                if result:
-                    (
-                        user_id,
-                        track_id,
-                        created_at,
-                        source,
-                        location,
-                        slot,
-                        tx_sig,
-                    ) = result
+    tx_infos = solana_client_manager.get_sol_tx_batch(tx_sig_batch_records)
+    logger.info(
+        f"index_solana_plays.py | Got {len(tx_infos)} transactions in {time.time() - batch_start_time}"
+    )
 
-                    # Append plays to a list that will be written if all plays are successfully retrieved
-                    # from the rpc pool
-                    play: PlayInfo = {
-                        "user_id": user_id,
-                        "play_item_id": track_id,
-                        "created_at": created_at,
-                        "updated_at": datetime.now(),
-                        "source": source,
-                        "city": location.get("city"),
-                        "region": location.get("region"),
-                        "country": location.get("country"),
+    for tx_sig in tx_sig_batch_records:
+        # Returns the properties for a Play object to be created in the db
+        # can be None so check the value exists
+        result = parse_sol_play_transaction(tx_infos[tx_sig], tx_sig)
+        if result:
+            (
+                user_id,
+                track_id,
+                created_at,
+                source,
+                location,
+                slot,
+                tx_sig,
+            ) = result
+
+            play: PlayInfo = {
+                "user_id": user_id,
+                "play_item_id": track_id,
+                "created_at": created_at,
+                "updated_at": datetime.now(),
+                "source": source,
+                "city": location.get("city"),
+                "region": location.get("region"),
+                "country": location.get("country"),
+                "slot": slot,
+                "signature": tx_sig,
+            }
+            plays.append(play)
+            # Only enqueue a challenge event if it's *not*
+            # an anonymous listen
+            if user_id is not None:
+                challenge_bus_events.append(
+                    {
                         "slot": slot,
-                        "signature": tx_sig,
+                        "user_id": user_id,
+                        "created_at": created_at.timestamp(),
                     }
-                    plays.append(play)
-                    # Only enqueue a challenge event if it's *not*
-                    # an anonymous listen
-                    if user_id is not None:
-                        challenge_bus_events.append(
-                            {
-                                "slot": slot,
-                                "user_id": user_id,
-                                "created_at": created_at.timestamp(),
-                            }
-                        )
-
-        except Exception as exc:
-            logger.error(
-                f"index_solana_plays.py | Error parsing sol play transaction: {exc}"
-            )
-            # timeout in a ThreadPoolExecutor doesn't actually stop execution of the underlying thread
-            # in order to do that we need to actually clear the queue which we do here to force this
-            # task to stop execution
-            executor._threads.clear()
-            concurrent.futures.thread._threads_queues.clear()
-
-            # if we have retries left, recursively call this function again
-            if retries > 0:
-                return parse_sol_tx_batch(
-                    db, solana_client_manager, redis, tx_sig_batch_records, retries - 1
                 )
 
-            # if no more retries, raise
-            raise exc
-
-        # if the thread pool executor completes successfully without raising an exception
-        # the data is successfully fetched so we can add it to the db session and dispatch
-        # events to challenge bus
-
     # In the case where an entire batch is comprised of errors, wipe the cache to avoid a future find intersection loop
     # For example, if the transactions between the latest cached value and database tail are entirely errors, no Play record will be inserted.
     # This means every subsequent run will continue to no-op on error transactions and the cache will never be updated
@@ -499,37 +457,22 @@ def parse_sol_tx_batch(
     return None
 
 
-# Push to head of array containing seen transactions
-# Used to avoid re-traversal from chain tail when slot diff > certain number
-def cache_traversed_tx(redis: Redis, tx: ConfirmedSignatureForAddressResult):
-    redis.lpush(REDIS_TX_CACHE_QUEUE_PREFIX, json.dumps(tx))
+def get_indexed_play_tx_sigs(tx_sigs: List[str]):
+    with index_solana_plays.db.scoped_session() as session:
+        return get_indexed_tx_sigs(session, Play.signature, tx_sigs)
 
 
-# Fetch the cached transaction from redis queue
-# Eliminates transactions one by one if they are < latest db slot
-def fetch_traversed_tx_from_cache(redis: Redis, latest_db_slot: int):
-    cached_offset_tx_found = False
-    while not cached_offset_tx_found:
-        last_cached_tx_raw = redis.lrange(REDIS_TX_CACHE_QUEUE_PREFIX, 0, 1)
-        if last_cached_tx_raw:
-            last_cached_tx: ConfirmedSignatureForAddressResult = json.loads(
-                last_cached_tx_raw[0]
-            )
-            logger.info(
-                f"index_solana_plays.py | processing cached tx = {last_cached_tx}, latest_db_slot = {latest_db_slot}"
-            )
-            redis.ltrim(REDIS_TX_CACHE_QUEUE_PREFIX, 1, -1)
-            # If a single element is remaining, clear the list to avoid dupe processing
-            if redis.llen(REDIS_TX_CACHE_QUEUE_PREFIX) == 1:
-                redis.delete(REDIS_TX_CACHE_QUEUE_PREFIX)
-            # Return if a valid signature is found
-            if last_cached_tx["slot"] > latest_db_slot:
-                cached_offset_tx_found = True
-                last_tx_signature = last_cached_tx["signature"]
-                return last_tx_signature
-        else:
-            break
-    return None
+def process_plays_backfill_segment(
+    transactions: List[ConfirmedSignatureForAddressResult],
+):
+    tx_sigs = [tx["signature"] for tx in transactions]
+    for tx_sig_batch_records in split_list(tx_sigs, TX_SIGNATURES_PROCESSING_SIZE):
+        parse_sol_tx_batch(
+            index_solana_plays.db,
+            index_solana_plays.solana_client_manager,
+            index_solana_plays.redis,
+            tx_sig_batch_records,
+        )
 
 
 def process_solana_plays(solana_client_manager: SolanaClientManager, redis: Redis):
@@ -548,8 +491,32 @@ def process_solana_plays(solana_client_manager: SolanaClientManager, redis: Redi
     latest_processed_slot = get_latest_slot(db)
     logger.info(f"index_solana_plays.py | latest used slot: {latest_processed_slot}")
 
+    # Get the latests slot available globally before fetching txs to keep track of indexing progress
+    latest_global_slot = None
+    try:
+        latest_global_slot = solana_client_manager.get_slot()
+    except:
+        logger.error("index_solana_plays.py | Failed to get block height")
+
+    # Far behind the chain tail, e.g. after restoring an old snapshot,
+    # discover and parse the missing plays in parallel segments
+    backfill = SolanaBackfill(
+        db,
+        redis,
+        solana_client_manager,
+        TRACK_LISTEN_PROGRAM,
+        "plays",
+        get_indexed_play_tx_sigs,
+        process_plays_backfill_segment,
+    )
+    if backfill.should_run(latest_processed_slot, latest_global_slot):
+        backfill.run(latest_processed_slot)
+        return
+
     # Utilize the cached tx to offset
-    cached_offset_tx = fetch_traversed_tx_from_cache(redis, latest_processed_slot)
+    cached_offset_tx = fetch_traversed_tx_from_cache(
+        redis, REDIS_TX_CACHE_QUEUE_PREFIX, latest_processed_slot
+    )
 
     # The 'before' value from where we start querying transactions
     last_tx_signature = cached_offset_tx
@@ -573,12 +540,6 @@ def process_solana_plays(solana_client_manager: SolanaClientManager, redis: Redi
     latest_play_slot = None
     is_initial_fetch = True
 
-    # Get the latests slot available globally before fetching txs to keep track of indexing progress
-    try:
-        latest_global_slot = solana_client_manager.get_slot()
-    except:
-        logger.error("index_solana_plays.py | Failed to get block height")
-
     # Traverse recent records until an intersection is found with existing Plays table
     while not intersection_found:
         fetch_size = (
@@ -605,28 +566,15 @@ def process_solana_plays(solana_client_manager: SolanaClientManager, redis: Redi
             )
         else:
             with db.scoped_session() as read_session:
-                for tx in transactions_array:
-                    tx_sig = tx["signature"]
-                    slot = tx["slot"]
-                    if tx["slot"] > latest_processed_slot:
-                        transaction_signature_batch.append(tx_sig)
-                    elif tx["slot"] <= latest_processed_slot:
-                        # Check the tx signature for any txs in the latest batch,
-                        # and if not present in DB, add to processing
-                        logger.info(
-                            f"index_solana_plays.py | Latest slot re-traversal\
-                            slot={slot}, sig={tx_sig},\
-                            latest_processed_slot(db)={latest_processed_slot}"
-                        )
-                        exists = get_tx_in_db(read_session, tx_sig)
-                        if exists:
-                            # Exit loop and set terminal condition since this tx has been found in DB
-                            # Transactions are returned with most recently committed first, so we can assume
-                            # subsequent transactions in this batch have already been processed
-                            intersection_found = True
-                            break
-                        # Otherwise, ensure this transaction is still processed
-                        transaction_signature_batch.append(tx_sig)
+                # Check the txs at or below the latest processed slot against the DB
+                # and stop at the first one that has been indexed
+                unindexed_txs, intersection_found = find_unindexed_txs(
+                    read_session,
+                    Play.signature,
+                    transactions_array,
+                    latest_processed_slot,
+                )
+                transaction_signature_batch = [tx["signature"] for tx in unindexed_txs]
                 # Restart processing at the end of this transaction signature batch
 
                 # get latest play slot from the first fetch
@@ -637,7 +585,7 @@ def process_solana_plays(solana_client_manager: SolanaClientManager, redis: Redi
                 last_tx_signature = last_tx["signature"]
 
                 # Append to recently seen cache
-                cache_traversed_tx(redis, last_tx)
+                cache_traversed_tx(redis, REDIS_TX_CACHE_QUEUE_PREFIX, last_tx)
 
                 # Append batch of processed signatures
                 if transaction_signature_batch:
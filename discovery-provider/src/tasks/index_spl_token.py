@@ -1,6 +1,5 @@
 import concurrent.futures
 import datetime
-import json
 import logging
 import time
 from decimal import Decimal
@@ -31,6 +30,10 @@ from src.solana.solana_transaction_types import (
     ConfirmedSignatureForAddressResult,
     ConfirmedTransaction,
 )
+from src.solana.solana_traversal import (
+    cache_traversed_tx,
+    fetch_traversed_tx_from_cache,
+)
 from src.tasks.celery_app import celery
 from src.utils.cache_solana_program import (
     CachedProgramTxInfo,
@@ -307,31 +310,35 @@ def parse_sol_tx_batch(
     updated_token_accounts: Set[str] = set()
     spl_token_txs: List[ConfirmedTransaction] = []
     # Process each batch in parallel
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        parse_sol_tx_futures = {
-            executor.submit(
-                parse_spl_token_transaction,
-                solana_client_manager,
-                tx_sig,
-            ): tx_sig
-            for tx_sig in tx_sig_batch_records
-        }
-        try:
-            for future in concurrent.futures.as_completed(
-                parse_sol_tx_futures, timeout=45
-            ):
-                tx_info = future.result()
-                if not tx_info:
-                    continue
-                updated_root_accounts.update(tx_info["root_accounts"])
-                updated_token_accounts.update(tx_info["token_accounts"])
-                spl_token_txs.append(tx_info)
-
-        except Exception as exc:
-            logger.error(
-                f"index_spl_token.py | Error parsing sol spl token transaction: {exc}"
-            )
-            raise exc
+    # Fetch the batch with JSON-RPC batch requests when async rpc is enabled
+    with solana_client_manager.prefetched_sol_tx_infos(
+        [tx_sig["signature"] for tx_sig in tx_sig_batch_records]
+    ):
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            parse_sol_tx_futures = {
+                executor.submit(
+                    parse_spl_token_transaction,
+                    solana_client_manager,
+                    tx_sig,
+                ): tx_sig
+                for tx_sig in tx_sig_batch_records
+            }
+            try:
+                for future in concurrent.futures.as_completed(
+                    parse_sol_tx_futures, timeout=45
+                ):
+                    tx_info = future.result()
+                    if not tx_info:
+                        continue
+                    updated_root_accounts.update(tx_info["root_accounts"])
+                    updated_token_accounts.update(tx_info["token_accounts"])
+                    spl_token_txs.append(tx_info)
+
+            except Exception as exc:
+                logger.error(
+                    f"index_spl_token.py | Error parsing sol spl token transaction: {exc}"
+                )
+                raise exc
 
     update_user_ids: Set[int] = set()
     with db.scoped_session() as session:
@@ -417,38 +424,6 @@ def split_list(list, n):
         yield list[i : i + n]
 
 
-# Push to head of array containing seen transactions
-# Used to avoid re-traversal from chain tail when slot diff > certain number
-def cache_traversed_tx(redis: Redis, tx: ConfirmedSignatureForAddressResult):
-    redis.lpush(REDIS_TX_CACHE_QUEUE_PREFIX, json.dumps(tx))
-
-
-# Fetch the cached transaction from redis queue
-# Eliminates transactions one by one if they are < latest db slot
-def fetch_traversed_tx_from_cache(redis: Redis, latest_db_slot: Optional[int]):
-    if latest_db_slot is None:
-        return None
-    cached_offset_tx_found = False
-    while not cached_offset_tx_found:
-        last_cached_tx_raw = redis.lrange(REDIS_TX_CACHE_QUEUE_PREFIX, 0, 1)
-        if last_cached_tx_raw:
-            last_cached_tx: ConfirmedSignatureForAddressResult = json.loads(
-                last_cached_tx_raw[0]
-            )
-            redis.ltrim(REDIS_TX_CACHE_QUEUE_PREFIX, 1, -1)
-            # If a single element is remaining, clear the list to avoid dupe processing
-            if redis.llen(REDIS_TX_CACHE_QUEUE_PREFIX) == 1:
-                redis.delete(REDIS_TX_CACHE_QUEUE_PREFIX)
-            # Return if a valid signature is found
-            if last_cached_tx["slot"] > latest_db_slot:
-                cached_offset_tx_found = True
-                last_tx_signature = last_cached_tx["signature"]
-                return last_tx_signature
-        else:
-            break
-    return None
-
-
 def process_spl_token_tx(
     solana_client_manager: SolanaClientManager, db: SessionManager, redis: Redis
 ):
@@ -468,7 +443,9 @@ def process_spl_token_tx(
     solana_logger.add_log(f"latest used slot: {latest_processed_slot}")
 
     # Utilize the cached tx to offset
-    cached_offset_tx = fetch_traversed_tx_from_cache(redis, latest_processed_slot)
+    cached_offset_tx = fetch_traversed_tx_from_cache(
+        redis, REDIS_TX_CACHE_QUEUE_PREFIX, latest_processed_slot
+    )
 
     # The 'before' value from where we start querying transactions
     last_tx_signature = cached_offset_tx
@@ -525,7 +502,7 @@ def process_spl_token_tx(
             last_tx_signature = last_tx["signature"]
 
             # Append to recently seen cache
-            cache_traversed_tx(redis, last_tx)
+            cache_traversed_tx(redis, REDIS_TX_CACHE_QUEUE_PREFIX, last_tx)
 
             # Append batch of processed signatures
             if transaction_signature_batch:
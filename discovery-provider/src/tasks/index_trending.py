@@ -1,7 +1,8 @@
 import logging
+import statistics
 import time
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from redis import Redis
 from sqlalchemy import bindparam, text
@@ -11,8 +12,8 @@ from src.models.notifications.notification import Notification
 from src.models.tracks.track import Track
 from src.queries.get_trending_tracks import (
     _get_trending_tracks_with_session,
+    generate_all_unpopulated_trending_from_mat_views,
     generate_unpopulated_trending,
-    generate_unpopulated_trending_from_mat_views,
     make_trending_cache_key,
 )
 from src.queries.get_underground_trending import (
@@ -130,6 +131,70 @@ def update_view(session: Session, mat_view_name: str):
     )
 
 
+def cache_trending(session: Session, redis: Redis, genres, strategy):
+    """
+    Generates trending for every genre and time range of a strategy and writes
+    them all to the cache with a single redis pipeline
+    """
+    version = strategy.version
+    cache_start_time = time.time()
+    # seconds spent on the work done for each genre/time range slice
+    slice_times: Dict[Tuple[Optional[str], str], float] = {}
+    if strategy.use_mat_view:
+        # all slices are ranked with one query, only caching is per slice
+        trending = generate_all_unpopulated_trending_from_mat_views(
+            session=session,
+            genres=genres,
+            time_ranges=time_ranges,
+            strategy=strategy,
+        )
+    else:
+        trending = {}
+        for genre in genres:
+            for time_range in time_ranges:
+                slice_start_time = time.time()
+                trending[(genre, time_range)] = generate_unpopulated_trending(
+                    session=session,
+                    genre=genre,
+                    time_range=time_range,
+                    strategy=strategy,
+                )
+                slice_times[(genre, time_range)] = time.time() - slice_start_time
+    generate_time = time.time() - cache_start_time
+
+    pipe = redis.pipeline(transaction=False)
+    for (genre, time_range), res in trending.items():
+        slice_start_time = time.time()
+        key = make_trending_cache_key(time_range, genre, version)
+        set_json_cached_key(pipe, key, res)
+        slice_times[(genre, time_range)] = slice_times.get((genre, time_range), 0) + (
+            time.time() - slice_start_time
+        )
+    pipe.execute()
+
+    total_time = time.time() - cache_start_time
+    slice_time_values = list(slice_times.values()) or [0.0]
+    min_slice_time = min(slice_time_values)
+    median_slice_time = statistics.median(slice_time_values)
+    max_slice_time = max(slice_time_values)
+    logger.info(
+        f"index_trending.py | Cached trending ({version.name} version) for \
+        {len(trending)} genre/time range slices in {total_time} seconds \
+        ({generate_time} seconds generating, {min_slice_time} min \
+        {median_slice_time} median {max_slice_time} max seconds per slice)",
+        extra={
+            "job": "index_trending",
+            "version": version.name,
+            "slices": len(trending),
+            "generate_time": generate_time,
+            "total_time": total_time,
+            "min_slice_time": min_slice_time,
+            "median_slice_time": median_slice_time,
+            "max_slice_time": max_slice_time,
+        },
+    )
+
+
 def index_trending(self, db: SessionManager, redis: Redis, timestamp):
     logger.info("index_trending.py | starting indexing")
     update_start = time.time()
@@ -157,31 +222,7 @@ def index_trending(self, db: SessionManager, redis: Redis, timestamp):
             strategy = trending_strategy_factory.get_strategy(
                 TrendingType.TRACKS, version
             )
-            for genre in genres:
-                for time_range in time_ranges:
-                    cache_start_time = time.time()
-                    if strategy.use_mat_view:
-                        res = generate_unpopulated_trending_from_mat_views(
-                            session=session,
-                            genre=genre,
-                            time_range=time_range,
-                            strategy=strategy,
-                        )
-                    else:
-                        res = generate_unpopulated_trending(
-                            session=session,
-                            genre=genre,
-                            time_range=time_range,
-                            strategy=strategy,
-                        )
-                    key = make_trending_cache_key(time_range, genre, version)
-                    set_json_cached_key(redis, key, res)
-                    cache_end_time = time.time()
-                    total_time = cache_end_time - cache_start_time
-                    logger.info(
-                        f"index_trending.py | Cached trending ({version.name} version) \
-                        for {genre}-{time_range} in {total_time} seconds"
-                    )
+            cache_trending(session, redis, genres, strategy)
 
         # Cache underground trending
         underground_trending_versions = trending_strategy_factory.get_versions_for_type(
@@ -40,6 +40,7 @@ from src.solana.solana_transaction_types import (
     TransactionInfoResult,
     TransactionMessageInstruction,
 )
+from src.solana.solana_traversal import find_unindexed_txs
 from src.tasks.celery_app import celery
 from src.utils.cache_solana_program import (
     cache_latest_sol_db_tx,
@@ -106,16 +107,6 @@ def cache_latest_sol_user_bank_db_tx(redis: Redis, tx):
     cache_latest_sol_db_tx(redis, latest_sol_user_bank_db_tx_key, tx)
 
 
-# Query a tx signature and confirm its existence
-def get_tx_in_db(session: Session, tx_sig: str) -> bool:
-    exists = False
-    tx_sig_db_count = (
-        session.query(UserBankTx).filter(UserBankTx.signature == tx_sig)
-    ).count()
-    exists = tx_sig_db_count > 0
-    return exists
-
-
 def refresh_user_balances(session: Session, redis: Redis, accts=List[str]):
     results = (
         session.query(User.user_id, UserBankAccount.bank_account)
@@ -446,32 +437,14 @@ def process_user_bank_txs():
                 )
             else:
                 # Current batch of transactions
-                transaction_signature_batch = []
-                for tx_info in transactions_array:
-                    tx_sig = tx_info["signature"]
-                    tx_slot = tx_info["slot"]
-                    logger.debug(
-                        f"index_user_bank.py | Processing tx={tx_sig} | slot={tx_slot}"
-                    )
-                    if tx_info["slot"] > latest_processed_slot:
-                        transaction_signature_batch.append(tx_sig)
-                    elif (
-                        tx_info["slot"] <= latest_processed_slot
-                        and tx_info["slot"] > MIN_SLOT
-                    ):
-                        # Check the tx signature for any txs in the latest batch,
-                        # and if not present in DB, add to processing
-                        logger.info(
-                            f"index_user_bank.py | Latest slot re-traversal\
-                            slot={tx_slot}, sig={tx_sig},\
-                            latest_processed_slot(db)={latest_processed_slot}"
-                        )
-                        exists = get_tx_in_db(session, tx_sig)
-                        if exists:
-                            intersection_found = True
-                            break
-                        # Ensure this transaction is still processed
-                        transaction_signature_batch.append(tx_sig)
+                unindexed_txs, intersection_found = find_unindexed_txs(
+                    session,
+                    UserBankTx.signature,
+                    transactions_array,
+                    latest_processed_slot,
+                    MIN_SLOT,
+                )
+                transaction_signature_batch = [tx["signature"] for tx in unindexed_txs]
 
                 # Restart processing at the end of this transaction signature batch
                 last_tx = transactions_array[-1]
@@ -506,30 +479,34 @@ def process_user_bank_txs():
         logger.info(f"index_user_bank.py | processing {tx_sig_batch}")
         batch_start_time = time.time()
         # Process each batch in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            with db.scoped_session() as session:
-                parse_sol_tx_futures = {
-                    executor.submit(
-                        parse_user_bank_transaction,
-                        session,
-                        solana_client_manager,
-                        tx_sig,
-                        redis,
-                        challenge_bus,
-                    ): tx_sig
-                    for tx_sig in tx_sig_batch
-                }
-                for future in concurrent.futures.as_completed(parse_sol_tx_futures):
-                    try:
-                        # No return value expected here so we just ensure all futures are resolved
-                        tx_info, tx_sig = future.result()
-                        if tx_info and last_tx_sig and last_tx_sig == tx_sig:
-                            last_tx = tx_info
-
-                        num_txs_processed += 1
-                    except Exception as exc:
-                        logger.error(f"index_user_bank.py | error {exc}", exc_info=True)
-                        raise
+        # Fetch the batch with JSON-RPC batch requests when async rpc is enabled
+        with solana_client_manager.prefetched_sol_tx_infos(tx_sig_batch):
+            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+                with db.scoped_session() as session:
+                    parse_sol_tx_futures = {
+                        executor.submit(
+                            parse_user_bank_transaction,
+                            session,
+                            solana_client_manager,
+                            tx_sig,
+                            redis,
+                            challenge_bus,
+                        ): tx_sig
+                        for tx_sig in tx_sig_batch
+                    }
+                    for future in concurrent.futures.as_completed(parse_sol_tx_futures):
+                        try:
+                            # No return value expected here so we just ensure all futures are resolved
+                            tx_info, tx_sig = future.result()
+                            if tx_info and last_tx_sig and last_tx_sig == tx_sig:
+                                last_tx = tx_info
+
+                            num_txs_processed += 1
+                        except Exception as exc:
+                            logger.error(
+                                f"index_user_bank.py | error {exc}", exc_info=True
+                            )
+                            raise
 
         batch_end_time = time.time()
         batch_duration = batch_end_time - batch_start_time
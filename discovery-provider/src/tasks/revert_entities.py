@@ -0,0 +1,117 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import and_, select, tuple_
+from sqlalchemy.orm.session import Session
+from src.models.indexing.ursm_content_node import UrsmContentNode
+from src.models.playlists.playlist import Playlist
+from src.models.social.follow import Follow
+from src.models.social.repost import Repost
+from src.models.social.save import Save
+from src.models.social.subscription import Subscription
+from src.models.tracks.track import Track
+from src.models.tracks.track_route import TrackRoute
+from src.models.users.associated_wallet import AssociatedWallet
+from src.models.users.user import User
+from src.models.users.user_events import UserEvent
+
+logger = logging.getLogger(__name__)
+
+
+class RevertedEntity(NamedTuple):
+    model: Any
+    # columns shared by every version of one entity
+    key_columns: Tuple[str, ...]
+    # orders versions written in the same block, the first one is restored
+    tie_breaker_columns: Tuple[str, ...] = ()
+
+
+# Entities with a row per version, the latest version before the reverted
+# blocks is made current again. Entities that write several rows per version,
+# like associated wallets, have every row of the latest version restored.
+REVERTED_ENTITIES = [
+    RevertedEntity(Save, ("user_id", "save_item_id", "save_type")),
+    RevertedEntity(Repost, ("user_id", "repost_item_id", "repost_type")),
+    RevertedEntity(Follow, ("follower_user_id", "followee_user_id")),
+    RevertedEntity(Subscription, ("subscriber_id", "user_id")),
+    RevertedEntity(Playlist, ("playlist_id",)),
+    RevertedEntity(Track, ("track_id",)),
+    RevertedEntity(UrsmContentNode, ("cnode_sp_id",)),
+    RevertedEntity(User, ("user_id",)),
+    RevertedEntity(AssociatedWallet, ("user_id",)),
+    RevertedEntity(UserEvent, ("user_id",)),
+    RevertedEntity(TrackRoute, ("track_id",), tie_breaker_columns=("slug",)),
+]
+
+
+def revert_entity(
+    session: Session, entity: RevertedEntity, revert_blockhashes: List[str]
+) -> int:
+    """
+    Deletes the entity's rows written in the reverted blocks, then makes the
+    latest remaining version of every reverted entity current.
+    Runs two statements no matter how many blocks or rows are reverted.
+    Returns the number of rows deleted.
+    """
+    table = entity.model.__table__
+    key_columns = [table.c[name] for name in entity.key_columns]
+    version_columns = (
+        key_columns
+        + [table.c.blocknumber]
+        + [table.c[name] for name in entity.tie_breaker_columns]
+    )
+
+    reverted_keys = session.execute(
+        table.delete()
+        .where(table.c.blockhash.in_(revert_blockhashes))
+        .returning(*key_columns)
+    ).fetchall()
+    if not reverted_keys:
+        return 0
+
+    # versions are read through an alias so the subquery does not correlate
+    # with the table being updated
+    versions = table.alias("versions")
+    versions_key_columns = [versions.c[name] for name in entity.key_columns]
+    unique_keys = list({tuple(key) for key in reverted_keys})
+    if len(key_columns) == 1:
+        is_reverted_key = versions_key_columns[0].in_([key for (key,) in unique_keys])
+    else:
+        is_reverted_key = tuple_(*versions_key_columns).in_(unique_keys)
+
+    latest_versions = (
+        select([versions.c[column.name] for column in version_columns])
+        .where(is_reverted_key)
+        .distinct(*versions_key_columns)
+        .order_by(
+            *versions_key_columns,
+            versions.c.blocknumber.desc(),
+            *[versions.c[name].asc() for name in entity.tie_breaker_columns],
+        )
+        .alias("latest_versions")
+    )
+    session.execute(
+        table.update()
+        .where(
+            and_(
+                *[
+                    column == latest_versions.c[column.name]
+                    for column in version_columns
+                ]
+            )
+        )
+        .values(is_current=True)
+    )
+    return len(reverted_keys)
+
+
+def revert_entities(session: Session, revert_blockhashes: List[str]) -> Dict[str, int]:
+    """Reverts all entities written in the given blocks.
+    Returns the number of rows deleted per table."""
+    num_reverted = {}
+    for entity in REVERTED_ENTITIES:
+        num_reverted[entity.model.__tablename__] = revert_entity(
+            session, entity, revert_blockhashes
+        )
+    logger.info(f"revert_entities.py | Reverted rows per table {num_reverted}")
+    return num_reverted
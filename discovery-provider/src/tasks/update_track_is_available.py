@@ -1,9 +1,12 @@
+import concurrent.futures
 import logging
 from datetime import datetime, timezone
-from typing import Any, List, Tuple, TypedDict, Union
+from typing import Any, Dict, List, Optional, Tuple, TypedDict, Union
 
 import requests
 from redis import Redis
+from sqlalchemy import Integer, any_, bindparam, func
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm.session import Session
 from src.models.tracks.track import Track
 from src.models.users.user import User
@@ -17,6 +20,7 @@ from src.utils.prometheus_metric import (
 )
 from src.utils.redis_constants import (
     ALL_UNAVAILABLE_TRACKS_REDIS_KEY,
+    UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY,
     UPDATE_TRACK_IS_AVAILABLE_FINISH_REDIS_KEY,
     UPDATE_TRACK_IS_AVAILABLE_START_REDIS_KEY,
 )
@@ -27,9 +31,11 @@ logger = logging.getLogger(__name__)
 
 UPDATE_TRACK_IS_AVAILABLE_LOCK = "update_track_is_available_lock"
 
-BATCH_SIZE = 1000
+FETCH_MAX_WORKERS = 10
 DEFAULT_LOCK_TIMEOUT_SECONDS = 30  # 30 seconds
 REQUESTS_TIMEOUT_SECONDS = 300  # 5 minutes
+# Largest id of the integer track_id column
+MAX_TRACK_ID = 2**31 - 1
 
 
 class ContentNodeInfo(TypedDict):
@@ -37,107 +43,257 @@ class ContentNodeInfo(TypedDict):
     spID: int
 
 
-def _get_redis_set_members_as_list(redis: Redis, key: str) -> List[int]:
-    """Fetches the unavailable track ids per Content Node"""
-    values = redis.smembers(key)
-    return [int(value.decode()) for value in values]
+"""
+The unavailable tracks of each Content Node are stored as a redis bitset, where
+the bit at offset `track_id` is set if the track is unavailable on the node.
+A track is unavailable once it is unavailable on every node of its replica set,
+which is the bitwise AND of the bitsets of the replica set.
+"""
+
+
+def track_ids_to_bitset(track_ids: List[int]) -> bytes:
+    """Returns a redis bitset with the bits of `track_ids` set"""
+    if not track_ids:
+        return b""
+    bitset = bytearray(max(track_ids) // 8 + 1)
+    for track_id in track_ids:
+        # redis bitsets start at the most significant bit of each byte
+        bitset[track_id >> 3] |= 0x80 >> (track_id & 7)
+    return bytes(bitset)
+
+
+def bitset_to_track_ids(bitset: bytes) -> List[int]:
+    """Returns the track ids of the bits set in a redis bitset"""
+    track_ids = []
+    for i, byte in enumerate(bitset):
+        if byte:
+            for bit in range(8):
+                if byte & (0x80 >> bit):
+                    track_ids.append(i * 8 + bit)
+    return track_ids
+
+
+def is_track_in_bitset(bitset: bytes, track_id: int) -> bool:
+    i = track_id >> 3
+    return i < len(bitset) and bool(bitset[i] & (0x80 >> (track_id & 7)))
+
+
+def and_bitsets(bitsets: List[bytes]) -> bytes:
+    """Returns the bitwise AND of redis bitsets"""
+    # bits past the end of the shortest bitset are never set in the result
+    length = min(len(bitset) for bitset in bitsets)
+    result = int.from_bytes(bitsets[0][:length], "big")
+    for bitset in bitsets[1:]:
+        result &= int.from_bytes(bitset[:length], "big")
+    return result.to_bytes(length, "big")
+
+
+def get_unavailable_track_bitsets(redis: Redis, spIDs: List[int]) -> Dict[int, bytes]:
+    """Fetches the unavailable tracks bitset of each Content Node"""
+    if not spIDs:
+        return {}
+    bitsets = redis.mget([get_unavailable_tracks_redis_key(spID) for spID in spIDs])
+    return {spID: bitset or b"" for spID, bitset in zip(spIDs, bitsets)}
+
+
+def get_unavailable_tracks_etags(redis: Redis, spIDs: List[int]) -> List[Optional[str]]:
+    """Returns the ETag of the last fetched blacklist of each Content Node"""
+    if not spIDs:
+        return []
+    pipe = redis.pipeline()
+    pipe.hmget(UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY, spIDs)
+    for spID in spIDs:
+        pipe.exists(get_unavailable_tracks_redis_key(spID))
+    etags, *bitsets_exist = pipe.execute()
+    # Refetch the full blacklist if its bitset is missing
+    return [
+        etag.decode() if etag and bitset_exists else None
+        for etag, bitset_exists in zip(etags, bitsets_exist)
+    ]
+
+
+def is_valid_track_id(track_id: Any) -> bool:
+    return (
+        isinstance(track_id, int)
+        and not isinstance(track_id, bool)
+        and 0 <= track_id <= MAX_TRACK_ID
+    )
+
+
+def get_valid_track_ids(
+    node: str, track_ids: List[Any], max_track_id: int
+) -> Tuple[List[int], bool]:
+    """
+    Drops the ids from the blacklist of a Content Node that are not ids of
+    indexed tracks, which would otherwise set the bit of another track or
+    allocate a bitset as large as the id.
+    Returns the ids of indexed tracks and whether any dropped id is a valid id
+    of a track that is not indexed yet.
+    """
+    valid_track_ids = []
+    invalid_track_ids = []
+    unindexed_track_ids = []
+    for track_id in track_ids:
+        if not is_valid_track_id(track_id):
+            invalid_track_ids.append(track_id)
+        elif track_id > max_track_id:
+            unindexed_track_ids.append(track_id)
+        else:
+            valid_track_ids.append(track_id)
+    if invalid_track_ids:
+        logger.warning(
+            f"update_track_is_available.py | Dropped {len(invalid_track_ids)} invalid unavailable track ids from {node}: {invalid_track_ids[:100]}"
+        )
+    if unindexed_track_ids:
+        logger.info(
+            f"update_track_is_available.py | Dropped {len(unindexed_track_ids)} unavailable track ids from {node} above the latest indexed track {max_track_id}: {unindexed_track_ids[:100]}"
+        )
+    return valid_track_ids, bool(unindexed_track_ids)
 
 
 def fetch_unavailable_track_ids_in_network(
     session: Session, redis: Redis, eth_web3: Web3, eth_abi_values: Any
 ) -> None:
-    """Fetches the unavailable track ids in the Content Node network"""
+    """
+    Fetches the unavailable track ids in the Content Node network.
+    Blacklists are fetched concurrently and only rewritten if they changed
+    since the ETag of the last fetch.
+    """
     content_nodes = query_registered_content_node_info(eth_web3, redis, eth_abi_values)
+    spIDs = [node["spID"] for node in content_nodes]
+    # Bounds the size of the bitsets
+    max_track_id = session.query(func.max(Track.track_id)).scalar() or 0
+    etags = get_unavailable_tracks_etags(redis, spIDs)
+
+    pipe = redis.pipeline()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=FETCH_MAX_WORKERS
+    ) as executor:
+        fetch_futures = {
+            executor.submit(fetch_unavailable_track_ids, node["endpoint"], etag): node
+            for node, etag in zip(content_nodes, etags)
+        }
+        for future in concurrent.futures.as_completed(fetch_futures):
+            node = fetch_futures[future]
+            spID = node["spID"]
+            unavailable_track_ids, etag = future.result()
+            # Keep the existing bitset if the blacklist is unchanged or unreachable
+            if unavailable_track_ids is None:
+                continue
+            valid_track_ids, has_unindexed_track_ids = get_valid_track_ids(
+                node["endpoint"], unavailable_track_ids, max_track_id
+            )
+            pipe.set(
+                get_unavailable_tracks_redis_key(spID),
+                track_ids_to_bitset(valid_track_ids),
+            )
+            # Refetch the whole blacklist until the dropped tracks are indexed
+            if etag and not has_unindexed_track_ids:
+                pipe.hset(UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY, spID, etag)
+            else:
+                pipe.hdel(UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY, spID)
+
+    # Aggregate a bitset of tracks unavailable on any node
+    if spIDs:
+        pipe.bitop(
+            "OR",
+            ALL_UNAVAILABLE_TRACKS_REDIS_KEY,
+            *[get_unavailable_tracks_redis_key(spID) for spID in spIDs],
+        )
+    else:
+        pipe.delete(ALL_UNAVAILABLE_TRACKS_REDIS_KEY)
+    pipe.execute()
 
-    # Clear redis for existing data
-    redis.delete(ALL_UNAVAILABLE_TRACKS_REDIS_KEY)
-
-    for node in content_nodes:
-        # Keep mapping of spId to set of unavailable tracks
-        unavailable_track_ids = fetch_unavailable_track_ids(node["endpoint"])
-        spID_unavailable_tracks_key = get_unavailable_tracks_redis_key(node["spID"])
-
-        # Clear redis for existing data
-        redis.delete(spID_unavailable_tracks_key)
-
-        for i in range(0, len(unavailable_track_ids), BATCH_SIZE):
-            unavailable_track_ids_batch = unavailable_track_ids[i : i + BATCH_SIZE]
-            redis.sadd(spID_unavailable_tracks_key, *unavailable_track_ids_batch)
 
-            # Aggregate a set of unavailable tracks
-            redis.sadd(ALL_UNAVAILABLE_TRACKS_REDIS_KEY, *unavailable_track_ids_batch)
+def get_unavailable_track_ids(
+    track_ids_to_replica_set: List[Tuple[int, Optional[int], List[Optional[int]]]],
+    unavailable_track_bitsets: Dict[int, bytes],
+) -> List[int]:
+    """
+    Returns the track ids that are unavailable on every node of their replica set.
+    The bitsets of each distinct replica set are ANDed once.
+    """
+    replica_set_bitsets: Dict[Tuple[int, ...], bytes] = {}
+    unavailable_track_ids = []
+    for track_id, primary_id, secondary_ids in track_ids_to_replica_set:
+        # Some users are do not have primary_ids or secondary_ids
+        # Default their tracks to available
+        if primary_id is None or not secondary_ids or None in secondary_ids:
+            continue
+
+        spID_replica_set = (primary_id, *secondary_ids)
+        if spID_replica_set not in replica_set_bitsets:
+            replica_set_bitsets[spID_replica_set] = and_bitsets(
+                [unavailable_track_bitsets.get(spID, b"") for spID in spID_replica_set]
+            )
+        if is_track_in_bitset(replica_set_bitsets[spID_replica_set], track_id):
+            unavailable_track_ids.append(track_id)
+    return unavailable_track_ids
 
 
 def update_tracks_is_available_status(db: SessionManager, redis: Redis) -> None:
-    """Check track availability on all unavailable tracks and update in Tracks table"""
-    all_unavailable_track_ids = _get_redis_set_members_as_list(
-        redis, ALL_UNAVAILABLE_TRACKS_REDIS_KEY
-    )
-
-    for i in range(0, len(all_unavailable_track_ids), BATCH_SIZE):
-        unavailable_track_ids_batch = all_unavailable_track_ids[i : i + BATCH_SIZE]
-        try:
-            with db.scoped_session() as session:
-                track_ids_to_replica_set = query_replica_set_by_track_id(
-                    session, unavailable_track_ids_batch
-                )
-
-                track_id_to_is_available_status = {}
-
-                for entry in track_ids_to_replica_set:
-                    track_id = entry[0]
-
-                    # Some users are do not have primary_ids or secondary_ids
-                    # If these values are not null, check if track is available
-                    # Else, default to track as available
-                    if (
-                        entry[1] is not None  # primary_id
-                        and entry[2][0] is not None  # secondary_id 1
-                        and entry[2][1] is not None  # secondary_id 2
-                    ):
-
-                        spID_replica_set = [entry[1], *entry[2]]
-                        is_available = check_track_is_available(
-                            redis=redis,
-                            track_id=track_id,
-                            spID_replica_set=spID_replica_set,
-                        )
-                    else:
-                        is_available = True
-
-                    track_id_to_is_available_status[track_id] = is_available
-
-                # Update tracks with is_available status
-                tracks = query_tracks_by_track_ids(session, unavailable_track_ids_batch)
-                for track in tracks:
-                    is_available = track_id_to_is_available_status[track.track_id]
-
-                    # If track is not available, also flip 'is_delete' flag to True
-                    if not is_available:
-                        track.is_available = False
-                        track.is_delete = True
-
-        except Exception as e:
-            logger.warn(
-                f"update_track_is_available.py | Could not process batch {unavailable_track_ids_batch}: {e}\nContinuing..."
-            )
+    """
+    Marks the available tracks that became unavailable on their whole replica set
+    as unavailable in the Tracks table. Tracks that are already unavailable are
+    not written again.
+    """
+    all_unavailable_bitset = redis.get(ALL_UNAVAILABLE_TRACKS_REDIS_KEY)
+    if not all_unavailable_bitset:
+        return
+    all_unavailable_track_ids = bitset_to_track_ids(all_unavailable_bitset)
+
+    with db.scoped_session() as session:
+        track_ids_to_replica_set = query_replica_set_by_track_id(
+            session, all_unavailable_track_ids
+        )
+        spIDs = {
+            spID
+            for _, primary_id, secondary_ids in track_ids_to_replica_set
+            for spID in [primary_id, *(secondary_ids or [])]
+            if spID is not None
+        }
+        unavailable_track_ids = get_unavailable_track_ids(
+            track_ids_to_replica_set,
+            get_unavailable_track_bitsets(redis, list(spIDs)),
+        )
+        if not unavailable_track_ids:
+            return
 
+        # If track is not available, also flip 'is_delete' flag to True
+        session.query(Track).filter(
+            Track.is_current == True,
+            Track.track_id
+            == any_(
+                bindparam("track_ids", unavailable_track_ids, type_=ARRAY(Integer))
+            ),
+        ).update({"is_available": False, "is_delete": True}, synchronize_session=False)
+        logger.info(
+            f"update_track_is_available.py | Marked {len(unavailable_track_ids)} tracks unavailable"
+        )
 
-def fetch_unavailable_track_ids(node: str) -> List[int]:
-    """Fetches unavailable tracks from Content Node. Returns empty list if request fails"""
-    unavailable_track_ids = []
 
+def fetch_unavailable_track_ids(
+    node: str, etag: Optional[str] = None
+) -> Tuple[Optional[List[int]], Optional[str]]:
+    """
+    Fetches unavailable tracks from Content Node along with the ETag of the response.
+    Returns None as the track ids if they are unchanged since `etag` or the request fails
+    """
     try:
+        headers = {"If-None-Match": etag} if etag else {}
         resp = requests.get(
-            f"{node}/blacklist/tracks", timeout=REQUESTS_TIMEOUT_SECONDS
-        ).json()
-        unavailable_track_ids = resp["data"]["values"]
+            f"{node}/blacklist/tracks",
+            headers=headers,
+            timeout=REQUESTS_TIMEOUT_SECONDS,
+        )
+        if resp.status_code == 304:
+            return None, etag
+        return resp.json()["data"]["values"], resp.headers.get("ETag")
     except Exception as e:
         logger.warn(
             f"update_track_is_available.py | Could not fetch unavailable tracks from {node}: {e}"
         )
-
-    return unavailable_track_ids
+        return None, etag
 
 
 def query_replica_set_by_track_id(
@@ -145,6 +301,7 @@ def query_replica_set_by_track_id(
 ) -> Union[List[Tuple[int, int, List[int]]], List[Tuple[int, None, List[None]]]]:
     """
     Returns an array of tuples with the structure: [(track_id | primary_id | secondary_ids), ...]
+    for the available tracks in `track_ids`.
     If `primary_id` and `secondary_ids` are undefined, will return as None
     """
     track_ids_and_replica_sets = (
@@ -153,7 +310,9 @@ def query_replica_set_by_track_id(
         .filter(
             User.is_current == True,
             Track.is_current == True,
-            Track.track_id.in_(track_ids),
+            Track.is_available == True,
+            Track.track_id
+            == any_(bindparam("track_ids", track_ids, type_=ARRAY(Integer))),
         )
         .all()
     )
@@ -161,20 +320,6 @@ def query_replica_set_by_track_id(
     return track_ids_and_replica_sets
 
 
-def query_tracks_by_track_ids(session: Session, track_ids: List[int]) -> List[Any]:
-    """Returns a list of Track objects that has a track id in `track_ids`"""
-    tracks = (
-        session.query(Track)
-        .filter(
-            Track.is_current == True,
-            Track.track_id.in_(track_ids),
-        )
-        .all()
-    )
-
-    return tracks
-
-
 def query_registered_content_node_info(
     eth_web3: Web3, redis: Redis, eth_abi_values: Any
 ) -> List[ContentNodeInfo]:
@@ -191,35 +336,9 @@ def query_registered_content_node_info(
     return list(map(create_node_info_response, registered_content_nodes))
 
 
-def check_track_is_available(
-    redis: Redis, track_id: int, spID_replica_set: List[int]
-) -> bool:
-    """
-    Checks if a track is available in the replica set. Needs to only be available
-    on one replica set node to be marked as available.
-        redis: redis instance
-        track_id: the observed track id
-        spID_replica_set: an array of the SP IDs that are associated with track
-    """
-
-    i = 0
-    while i < len(spID_replica_set):
-        spID_unavailable_tracks_key = get_unavailable_tracks_redis_key(
-            spID_replica_set[i]
-        )
-        is_available_on_sp = not redis.sismember(spID_unavailable_tracks_key, track_id)
-
-        if is_available_on_sp:
-            return True
-
-        i = i + 1
-
-    return False
-
-
 def get_unavailable_tracks_redis_key(spID: int) -> str:
     """Returns the redis key used to store the unavailable tracks on a sp"""
-    return f"update_track_is_available:unavailable_tracks_{spID}"
+    return f"update_track_is_available:unavailable_tracks_bitset_{spID}"
 
 
 # ####### CELERY TASKS ####### #
@@ -1,13 +1,13 @@
 import logging
 import time
-from typing import DefaultDict
 
 import sqlalchemy as sa
-from src.models.social.play import Play
-from src.models.users.user_listening_history import UserListeningHistory
 from src.tasks.celery_app import celery
-from src.tasks.user_listening_history.listen_history import ListenHistory
-from src.utils.prometheus_metric import save_duration_metric
+from src.utils.prometheus_metric import (
+    PrometheusMetric,
+    PrometheusMetricNames,
+    save_duration_metric,
+)
 from src.utils.update_indexing_checkpoints import (
     get_last_indexed_checkpoint,
     save_indexed_checkpoint,
@@ -16,93 +16,160 @@ from src.utils.update_indexing_checkpoints import (
 logger = logging.getLogger(__name__)
 
 USER_LISTENING_HISTORY_TABLE_NAME = "user_listening_history"
-BATCH_SIZE = 100000  # index 100k plays at most at a time
-
+BATCH_SIZE = 100000  # index 100k plays at most per task run
+CHUNK_SIZE = 10000  # plays merged per transaction
+LISTENING_HISTORY_LIMIT = 1000  # most recent distinct tracks kept per user
+
+# Formats timestamps the way str(datetime) does so stored entries stay comparable
+PLAY_TIMESTAMP_TEXT = """
+    case when date_part('microseconds', created_at)::integer % 1000000 = 0
+        then to_char(created_at, 'YYYY-MM-DD HH24:MI:SS')
+        else to_char(created_at, 'YYYY-MM-DD HH24:MI:SS.US')
+    end
+"""
+
+get_chunk_bounds_query = sa.text(
+    """
+    select max(id) as max_id, count(*) as play_count
+    from (
+        select id from plays
+        where id > :prev_id_checkpoint
+        and user_id is not null
+        order by id asc
+        limit :chunk_size
+    ) as chunk
+    """
+)
 
-def sort_listening_history(deduped_history_dict, limit=1000):
-    # sorts listening history and places a limit
-    deduped_history = []
-    for track_id, timestamp in deduped_history_dict.items():
-        deduped_history.append({"track_id": track_id, "timestamp": timestamp})
-    deduped_history.sort(key=lambda listen: listen["timestamp"], reverse=True)
-    return deduped_history[:limit]
+# Dedupes the chunk's plays and each affected user's existing history by
+# track, keeping the newest listen, then upserts the users whose sorted and
+# truncated history changed
+merge_listening_history_query = sa.text(
+    f"""
+    with new_listens as (
+        select distinct on (user_id, play_item_id)
+            user_id,
+            play_item_id as track_id,
+            {PLAY_TIMESTAMP_TEXT} as timestamp,
+            0 as position
+        from plays
+        where id > :prev_id_checkpoint
+        and id <= :new_checkpoint
+        and user_id is not null
+        order by user_id, play_item_id, id desc
+    ),
+    existing_listens as (
+        select
+            user_listening_history.user_id,
+            (listen->>'track_id')::integer as track_id,
+            listen->>'timestamp' as timestamp,
+            position
+        from user_listening_history
+        cross join lateral jsonb_array_elements(
+            user_listening_history.listening_history
+        ) with ordinality as listens(listen, position)
+        where user_listening_history.user_id in (select user_id from new_listens)
+    ),
+    deduped_listens as (
+        select distinct on (user_id, track_id) user_id, track_id, timestamp
+        from (
+            select * from new_listens
+            union all
+            select * from existing_listens
+        ) as listens
+        order by user_id, track_id, position asc
+    ),
+    ranked_listens as (
+        select
+            user_id,
+            track_id,
+            timestamp,
+            row_number() over (
+                partition by user_id
+                order by timestamp collate "C" desc, track_id desc
+            ) as rank
+        from deduped_listens
+    )
+    insert into user_listening_history (user_id, listening_history)
+    select
+        user_id,
+        jsonb_agg(
+            jsonb_build_object('track_id', track_id, 'timestamp', timestamp)
+            order by rank
+        )
+    from ranked_listens
+    where rank <= :limit
+    group by user_id
+    on conflict (user_id) do update
+    set listening_history = excluded.listening_history
+    where user_listening_history.listening_history
+        is distinct from excluded.listening_history
+    """
+)
 
 
-def _index_user_listening_history(session):
+def _index_user_listening_history(session, chunk_size=CHUNK_SIZE):
+    """
+    Merges the next chunk of plays into user_listening_history.
+    Returns the number of plays processed.
+    """
     # get the last updated id that counted towards user_listening_history
     # use as lower bound
     prev_id_checkpoint = get_last_indexed_checkpoint(
         session, USER_LISTENING_HISTORY_TABLE_NAME
     )
 
-    # get new plays since the last checkpoint
-    new_plays = (
-        session.query(Play.id, Play.user_id, Play.play_item_id, Play.created_at)
-        .filter(Play.id > prev_id_checkpoint)
-        .filter(Play.user_id != None)
-        .order_by(sa.asc(Play.id))
-        .limit(BATCH_SIZE)
-    ).all()
+    # get the highest play id in the chunk of new plays
+    new_checkpoint, play_count = session.execute(
+        get_chunk_bounds_query,
+        {"prev_id_checkpoint": prev_id_checkpoint, "chunk_size": chunk_size},
+    ).first()
 
     # no update exit early
-    if not new_plays:
-        return
-    new_checkpoint = new_plays[-1].id  # get the highest play id
-
-    # get existing user listening history for users with new plays
-    users_with_new_plays = {new_play.user_id for new_play in new_plays}
-    existing_user_listening_history = (
-        session.query(UserListeningHistory)
-        .filter(UserListeningHistory.user_id.in_(users_with_new_plays))
-        .all()
+    if not play_count:
+        return 0
+
+    result = session.execute(
+        merge_listening_history_query,
+        {
+            "prev_id_checkpoint": prev_id_checkpoint,
+            "new_checkpoint": new_checkpoint,
+            "limit": LISTENING_HISTORY_LIMIT,
+        },
+    )
+    logger.debug(
+        f"index_user_listening_history.py | merged {play_count} plays, "
+        f"updated {result.rowcount} users"
     )
-    existing_users = {
-        user_history.user_id for user_history in existing_user_listening_history
-    }
-
-    # reduce new plays
-    insert_user_listening_history_dict = DefaultDict(list)
-    update_user_listening_history_dict = DefaultDict(list)
-    for new_play in reversed(new_plays):
-        listen_history = ListenHistory(
-            new_play.play_item_id, new_play.created_at
-        ).to_dict()
-
-        if new_play.user_id in existing_users:
-            update_user_listening_history_dict[new_play.user_id].append(listen_history)
-        else:
-            insert_user_listening_history_dict[new_play.user_id].append(listen_history)
-
-    # make updates to existing users
-    for i, user_history in enumerate(existing_user_listening_history):
-        deduped_history_dict = {}
-        for existing_play in reversed(user_history.listening_history):
-            deduped_history_dict[existing_play["track_id"]] = existing_play["timestamp"]
-        for new_play in reversed(
-            update_user_listening_history_dict[user_history.user_id]
-        ):
-            deduped_history_dict[new_play["track_id"]] = new_play["timestamp"]
-        existing_user_listening_history[i].listening_history = sort_listening_history(
-            deduped_history_dict
-        )
-
-    # insert for new users
-    new_user_listening_history = []
-    for user, listening_history in insert_user_listening_history_dict.items():
-        deduped_history_dict = {}
-        for new_play in reversed(listening_history):
-            deduped_history_dict[new_play["track_id"]] = new_play["timestamp"]
-
-        new_user_listening_history.append(
-            UserListeningHistory(
-                user_id=user,
-                listening_history=sort_listening_history(deduped_history_dict),
-            )
-        )
-    session.add_all(new_user_listening_history)
 
     # update indexing_checkpoints with the new id
     save_indexed_checkpoint(session, USER_LISTENING_HISTORY_TABLE_NAME, new_checkpoint)
+    return play_count
+
+
+def index_user_listening_history_chunks(db, max_plays=BATCH_SIZE):
+    """
+    Streams new plays through _index_user_listening_history one chunk per
+    transaction so sessions stay short while catching up on play spikes.
+    Returns the number of plays processed.
+    """
+    start_time = time.time()
+    total_plays = 0
+    while total_plays < max_plays:
+        with db.scoped_session() as session:
+            play_count = _index_user_listening_history(
+                session, min(CHUNK_SIZE, max_plays - total_plays)
+            )
+        total_plays += play_count
+        if play_count < CHUNK_SIZE:
+            break
+
+    elapsed = time.time() - start_time
+    if total_plays and elapsed > 0:
+        PrometheusMetric(
+            PrometheusMetricNames.INDEX_USER_LISTENING_HISTORY_PLAYS_PER_SECOND
+        ).save(total_plays / elapsed)
+    return total_plays
 
 
 # ####### CELERY TASKS ####### #
@@ -127,12 +194,12 @@ def index_user_listening_history(self):
             )
             start_time = time.time()
 
-            with db.scoped_session() as session:
-                _index_user_listening_history(session)
+            play_count = index_user_listening_history_chunks(db)
 
             logger.info(
                 f"index_user_listening_history.py | Finished updating "
-                f"{USER_LISTENING_HISTORY_TABLE_NAME} in: {time.time()-start_time} sec"
+                f"{USER_LISTENING_HISTORY_TABLE_NAME} with {play_count} plays in: "
+                f"{time.time()-start_time} sec"
             )
         else:
             logger.info(
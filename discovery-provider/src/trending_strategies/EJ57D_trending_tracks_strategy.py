@@ -3,7 +3,9 @@ import time
 from datetime import datetime
 
 from dateutil.parser import parse
+from sqlalchemy import case, extract, func
 from sqlalchemy.sql import text
+from src.models.tracks.track_trending_score import TrackTrendingScore
 from src.trending_strategies.base_trending_strategy import BaseTrendingStrategy
 from src.trending_strategies.trending_type_and_version import (
     TrendingType,
@@ -58,64 +60,81 @@ class TrendingTracksStrategyEJ57D(BaseTrendingStrategy):
             f"get_track_score not implemented for Trending Tracks Strategy with version {TrendingVersion.EJ57D}"
         )
 
+    def get_score_expression(self, time_range):
+        """
+        Returns the trending score for `time_range` with time decay applied.
+        track_trending_scores stores scores without decay so that rows only
+        change when a track's plays, reposts, saves or followers do, and the
+        decay is applied here when reading.
+        """
+        if time_range not in ("week", "month"):
+            return TrackTrendingScore.score
+
+        L = T[time_range]
+        track_age_days = extract(
+            "days", func.now() - TrackTrendingScore.track_created_at
+        )
+        return case(
+            [
+                (
+                    track_age_days > L,
+                    func.greatest(
+                        1.0 / q,
+                        func.pow(q, func.greatest(-10, 1.0 - 1.0 * track_age_days / L)),
+                    )
+                    * TrackTrendingScore.score,
+                )
+            ],
+            else_=TrackTrendingScore.score,
+        )
+
     def update_track_score_query(self, session):
         start_time = time.time()
+        # Scores are computed into a temp table and only rows whose score, genre
+        # or created_at differ from the stored row are written, so an unchanged
+        # track does not rewrite its rows every run.
         trending_track_query = text(
             """
             begin;
-                DELETE FROM track_trending_scores WHERE type=:type AND version=:version;
-                INSERT INTO track_trending_scores
-                    (track_id, genre, type, version, time_range, score, created_at)
+                CREATE TEMPORARY TABLE new_track_trending_scores ON COMMIT DROP AS
                     select
                         tp.track_id,
                         tp.genre,
-                        :type,
-                        :version,
-                        :week_time_range,
+                        :week_time_range as time_range,
                         CASE
                         WHEN tp.owner_follower_count < :y
                             THEN 0
-                        WHEN EXTRACT(DAYS from now() - aip.created_at) > :week
-                            THEN greatest(1.0/:q, pow(:q, greatest(-10, 1.0 - 1.0*EXTRACT(DAYS from now() - aip.created_at)/:week))) * (:N * aip.week_listen_counts + :F * tp.repost_week_count + :O * tp.save_week_count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
                         ELSE (:N * aip.week_listen_counts + :F * tp.repost_week_count + :O * tp.save_week_count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
-                        END as week_score,
-                        now()
+                        END as score,
+                        aip.created_at as track_created_at
                     from trending_params tp
                     inner join aggregate_interval_plays aip
-                        on tp.track_id = aip.track_id;
-                INSERT INTO track_trending_scores
-                    (track_id, genre, type, version, time_range, score, created_at)
+                        on tp.track_id = aip.track_id
+                    UNION ALL
                     select
                         tp.track_id,
                         tp.genre,
-                        :type,
-                        :version,
-                        :month_time_range,
+                        :month_time_range as time_range,
                         CASE
                         WHEN tp.owner_follower_count < :y
                             THEN 0
-                        WHEN EXTRACT(DAYS from now() - aip.created_at) > :month
-                            THEN greatest(1.0/:q, pow(:q, greatest(-10, 1.0 - 1.0*EXTRACT(DAYS from now() - aip.created_at)/:month))) * (:N * aip.month_listen_counts + :F * tp.repost_month_count + :O * tp.save_month_count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
                         ELSE (:N * aip.month_listen_counts + :F * tp.repost_month_count + :O * tp.save_month_count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
-                        END as month_score,
-                        now()
+                        END as score,
+                        aip.created_at as track_created_at
                     from trending_params tp
                     inner join aggregate_interval_plays aip
-                        on tp.track_id = aip.track_id;
-                INSERT INTO track_trending_scores
-                    (track_id, genre, type, version, time_range, score, created_at)
+                        on tp.track_id = aip.track_id
+                    UNION ALL
                     select
                         tp.track_id,
                         tp.genre,
-                        :type,
-                        :version,
-                        :all_time_time_range,
+                        :all_time_time_range as time_range,
                         CASE
                         WHEN tp.owner_follower_count < :y
                             THEN 0
                         ELSE (:N * ap.count + :R * tp.repost_count + :i * tp.save_count) * tp.karma
-                        END as all_time_score,
-                        now()
+                        END as score,
+                        t.created_at as track_created_at
                     from trending_params tp
                     inner join aggregate_plays ap
                         on tp.track_id = ap.play_item_id
@@ -126,20 +145,56 @@ class TrendingTracksStrategyEJ57D(BaseTrendingStrategy):
                         t.is_delete is False AND
                         t.is_unlisted is False AND
                         t.stem_of is Null;
+
+                DELETE FROM track_trending_scores tts
+                WHERE
+                    tts.type = :type AND
+                    tts.version = :version AND
+                    NOT EXISTS (
+                        SELECT 1 FROM new_track_trending_scores nts
+                        WHERE
+                            nts.track_id = tts.track_id AND
+                            nts.time_range = tts.time_range
+                    );
+
+                INSERT INTO track_trending_scores
+                    (track_id, genre, type, version, time_range, score, track_created_at, created_at)
+                    select
+                        nts.track_id,
+                        nts.genre,
+                        :type,
+                        :version,
+                        nts.time_range,
+                        nts.score,
+                        nts.track_created_at,
+                        now()
+                    from new_track_trending_scores nts
+                ON CONFLICT (track_id, type, version, time_range) DO UPDATE SET
+                    genre = EXCLUDED.genre,
+                    score = EXCLUDED.score,
+                    track_created_at = EXCLUDED.track_created_at,
+                    created_at = EXCLUDED.created_at
+                WHERE
+                    (
+                        track_trending_scores.genre,
+                        track_trending_scores.score,
+                        track_trending_scores.track_created_at
+                    ) IS DISTINCT FROM (
+                        EXCLUDED.genre,
+                        EXCLUDED.score,
+                        EXCLUDED.track_created_at
+                    );
             commit;
         """
         )
         session.execute(
             trending_track_query,
             {
-                "week": T["week"],
-                "month": T["month"],
                 "N": N,
                 "F": F,
                 "O": O,
                 "R": R,
                 "i": i,
-                "q": q,
                 "y": y,
                 "type": self.trending_type.name,
                 "version": self.version.name,
@@ -0,0 +1,166 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from src.models.indexing.cid_data import CIDData
+from src.utils.prometheus_metric import PrometheusMetric, PrometheusMetricNames
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LRU_MAX_SIZE = 10_000
+DEFAULT_REDIS_TTL_SEC = 24 * 60 * 60
+
+cid_metadata_redis_key_prefix = "cid_metadata"
+
+
+def get_cid_metadata_redis_key(cid: str, cid_type: str):
+    return f"{cid_metadata_redis_key_prefix}:{cid_type}:{cid}"
+
+
+class CIDMetadataCache:
+    """
+    Tiered cache of formatted CID metadata sitting in front of the content node
+    gateways. Lookups go through an in-process LRU, then redis (if configured),
+    then the cid_data table, and only the remaining misses need a network fetch.
+
+    Entries are keyed by cid and type since the metadata format applied to a
+    gateway response depends on the type of the entity referencing the cid.
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        lru_max_size: int = DEFAULT_LRU_MAX_SIZE,
+        redis_ttl_sec: int = DEFAULT_REDIS_TTL_SEC,
+    ):
+        self._redis = redis
+        self._redis_ttl_sec = redis_ttl_sec
+        self._lru_max_size = lru_max_size
+        self._lru: OrderedDict = OrderedDict()
+        # blocks may be prefetched from several threads at once
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "lru": 0,
+            "redis": 0,
+            "db": 0,
+            "miss": 0,
+        }
+
+    def _get_from_lru(self, cid: str, cid_type: str) -> Optional[Dict]:
+        with self._lock:
+            key = (cid, cid_type)
+            if key not in self._lru:
+                return None
+            self._lru.move_to_end(key)
+            return self._lru[key]
+
+    def _set_in_lru(self, cid_metadata: Dict[str, Dict], cid_type: Dict[str, str]):
+        with self._lock:
+            for cid, metadata in cid_metadata.items():
+                key = (cid, cid_type[cid])
+                self._lru[key] = metadata
+                self._lru.move_to_end(key)
+            while len(self._lru) > self._lru_max_size:
+                self._lru.popitem(last=False)
+
+    def _get_from_redis(self, cid_type: Dict[str, str]) -> Dict[str, Dict]:
+        if not self._redis or not cid_type:
+            return {}
+        cids = list(cid_type.keys())
+        try:
+            values = self._redis.mget(
+                [get_cid_metadata_redis_key(cid, cid_type[cid]) for cid in cids]
+            )
+        except Exception as e:
+            logger.warning(f"cid_metadata_cache.py | failed to read redis: {e}")
+            return {}
+        cid_metadata = {}
+        for cid, value in zip(cids, values):
+            if value:
+                try:
+                    cid_metadata[cid] = json.loads(value)
+                except Exception:
+                    continue
+        return cid_metadata
+
+    def _set_in_redis(self, cid_metadata: Dict[str, Dict], cid_type: Dict[str, str]):
+        if not self._redis or not cid_metadata:
+            return
+        try:
+            pipe = self._redis.pipeline()
+            for cid, metadata in cid_metadata.items():
+                pipe.set(
+                    get_cid_metadata_redis_key(cid, cid_type[cid]),
+                    json.dumps(metadata),
+                    ex=self._redis_ttl_sec,
+                )
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"cid_metadata_cache.py | failed to write redis: {e}")
+
+    def _get_from_db(self, session, cid_type: Dict[str, str]) -> Dict[str, Dict]:
+        if session is None or not cid_type:
+            return {}
+        rows = (
+            session.query(CIDData.cid, CIDData.type, CIDData.data)
+            .filter(CIDData.cid.in_(list(cid_type.keys())))
+            .all()
+        )
+        return {
+            cid: data
+            for cid, type, data in rows
+            if data is not None and cid_type.get(cid) == type
+        }
+
+    def get(self, session, cid_type: Dict[str, str]) -> Dict[str, Dict]:
+        """
+        Returns the cached metadata for as many of the given cids as possible.
+
+        session -- db session used to read the cid_data table, or None to skip it
+        cid_type -- dict of cid -> cid type for every cid to look up
+        """
+        cid_metadata: Dict[str, Dict] = {}
+        missing: Dict[str, str] = {}
+        for cid, type in cid_type.items():
+            metadata = self._get_from_lru(cid, type)
+            if metadata is not None:
+                cid_metadata[cid] = metadata
+            else:
+                missing[cid] = type
+        num_lru_hits = len(cid_metadata)
+
+        redis_hits = self._get_from_redis(missing)
+        for cid in redis_hits:
+            missing.pop(cid)
+
+        db_hits = self._get_from_db(session, missing)
+        for cid in db_hits:
+            missing.pop(cid)
+
+        # promote lower tier hits so the next lookup is served in process
+        self._set_in_lru({**redis_hits, **db_hits}, cid_type)
+        self._set_in_redis(db_hits, cid_type)
+
+        cid_metadata.update(redis_hits)
+        cid_metadata.update(db_hits)
+        self._record_lookup("lru", num_lru_hits)
+        self._record_lookup("redis", len(redis_hits))
+        self._record_lookup("db", len(db_hits))
+        self._record_lookup("miss", len(missing))
+        return cid_metadata
+
+    def set(self, cid_metadata: Dict[str, Dict], cid_type: Dict[str, str]):
+        """Caches metadata freshly fetched from the gateways"""
+        self._set_in_lru(cid_metadata, cid_type)
+        self._set_in_redis(cid_metadata, cid_type)
+
+    def _record_lookup(self, tier: str, count: int):
+        if not count:
+            return
+        with self._lock:
+            self.counters[tier] += count
+        PrometheusMetric(PrometheusMetricNames.CID_METADATA_CACHE_LOOKUPS).save(
+            count, {"tier": tier}
+        )
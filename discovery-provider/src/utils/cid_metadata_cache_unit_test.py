@@ -0,0 +1,50 @@
+import json
+
+from src.utils.cid_metadata_cache import CIDMetadataCache, get_cid_metadata_redis_key
+
+
+def test_lru_hit_and_miss():
+    cache = CIDMetadataCache()
+    cache.set({"cid1": {"track_id": 1}}, {"cid1": "track"})
+
+    cid_metadata = cache.get(None, {"cid1": "track", "cid2": "user"})
+    assert cid_metadata == {"cid1": {"track_id": 1}}
+    assert cache.counters["lru"] == 1
+    assert cache.counters["miss"] == 1
+
+
+def test_lru_type_mismatch_is_miss():
+    cache = CIDMetadataCache()
+    cache.set({"cid1": {"track_id": 1}}, {"cid1": "track"})
+
+    assert cache.get(None, {"cid1": "playlist_data"}) == {}
+    assert cache.counters["miss"] == 1
+
+
+def test_lru_evicts_least_recently_used():
+    cache = CIDMetadataCache(lru_max_size=2)
+    cache.set({"cid1": {"user_id": 1}}, {"cid1": "user"})
+    cache.set({"cid2": {"user_id": 2}}, {"cid2": "user"})
+    # touch cid1 so cid2 is evicted next
+    cache.get(None, {"cid1": "user"})
+    cache.set({"cid3": {"user_id": 3}}, {"cid3": "user"})
+
+    cid_metadata = cache.get(None, {"cid1": "user", "cid2": "user", "cid3": "user"})
+    assert cid_metadata == {"cid1": {"user_id": 1}, "cid3": {"user_id": 3}}
+
+
+def test_redis_tier(redis_mock):
+    cache = CIDMetadataCache(redis_mock)
+    cache.set({"cid1": {"track_id": 1}}, {"cid1": "track"})
+    assert json.loads(redis_mock.get(get_cid_metadata_redis_key("cid1", "track"))) == {
+        "track_id": 1
+    }
+
+    # a fresh process only has redis to go on
+    other_cache = CIDMetadataCache(redis_mock)
+    assert other_cache.get(None, {"cid1": "track"}) == {"cid1": {"track_id": 1}}
+    assert other_cache.counters["redis"] == 1
+
+    # and promotes the hit into its LRU
+    assert other_cache.get(None, {"cid1": "track"}) == {"cid1": {"track_id": 1}}
+    assert other_cache.counters["lru"] == 1
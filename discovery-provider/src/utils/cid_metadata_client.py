@@ -2,7 +2,9 @@
 import asyncio
 import json
 import logging
-from typing import Any, Dict, KeysView, Set, Tuple
+import threading
+import time
+from typing import Any, Dict, KeysView, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 import aiohttp
@@ -11,6 +13,7 @@ from src.tasks.metadata import (
     track_metadata_format,
     user_metadata_format,
 )
+from src.utils.cid_metadata_cache import CIDMetadataCache
 from src.utils.eth_contracts_helpers import fetch_all_registered_content_nodes
 
 logger = logging.getLogger(__name__)
@@ -18,6 +21,51 @@ logger = logging.getLogger(__name__)
 GET_METADATA_TIMEOUT_SECONDS = 2
 GET_METADATA_ALL_GATEWAY_TIMEOUT_SECONDS = 5
 
+# Connection pool shared by every metadata fetch
+GATEWAY_MAX_CONNECTIONS = 100
+GATEWAY_MAX_CONNECTIONS_PER_HOST = 10
+GATEWAY_KEEPALIVE_TIMEOUT_SECONDS = 60
+
+# Endpoints that time out or refuse connections this many times in a row are
+# left out of the first (replica set) attempt until the cooldown has passed
+GATEWAY_MAX_CONSECUTIVE_FAILURES = 3
+GATEWAY_SKIP_COOLDOWN_SECONDS = 60
+# Weight of the latest request in an endpoint's moving average latency
+GATEWAY_LATENCY_EWMA_ALPHA = 0.2
+
+
+class GatewayEndpointStats:
+    """Recent latency and failure history of a single content node gateway"""
+
+    def __init__(self):
+        self.latency_ewma: Optional[float] = None
+        self.consecutive_failures = 0
+        self.last_failure_at = 0.0
+
+    def record_success(self, latency: float):
+        self.consecutive_failures = 0
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = (
+                GATEWAY_LATENCY_EWMA_ALPHA * latency
+                + (1 - GATEWAY_LATENCY_EWMA_ALPHA) * self.latency_ewma
+            )
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.last_failure_at = time.time()
+
+    def should_skip(self) -> bool:
+        return (
+            self.consecutive_failures >= GATEWAY_MAX_CONSECUTIVE_FAILURES
+            and time.time() - self.last_failure_at < GATEWAY_SKIP_COOLDOWN_SECONDS
+        )
+
+    def sort_key(self) -> float:
+        # endpoints we have no data for yet sort first so they get measured
+        return self.latency_ewma if self.latency_ewma is not None else 0.0
+
 
 class CIDMetadataClient:
     """Helper class for Audius Discovery Provider + CID Metadata interaction"""
@@ -49,6 +97,25 @@ class CIDMetadataClient:
                 "CIDMetadataClient | couldn't fetch _cnode_endpoints on init"
             )
 
+        # Serve CIDs we have already seen (eg. when re-indexing after a revert)
+        # from cache before going to the gateways
+        use_redis_cache = bool(
+            shared_config
+            and str(
+                shared_config["discprov"].get("enable_cid_metadata_redis_cache", "")
+            ).lower()
+            == "true"
+        )
+        self.metadata_cache = CIDMetadataCache(redis if use_redis_cache else None)
+
+        # Gateway requests all run on one long-lived event loop in a background
+        # thread, sharing a keep-alive connection pool, instead of paying for a
+        # new loop, session and TLS handshakes on every block
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._async_session: Optional[aiohttp.ClientSession] = None
+        self._endpoint_stats: Dict[str, GatewayEndpointStats] = {}
+
     def update_cnode_urls(self, cnode_endpoints):
         if len(cnode_endpoints):
             logger.info(
@@ -56,6 +123,62 @@ class CIDMetadataClient:
             )
             self._cnode_endpoints = cnode_endpoints
 
+    def get_cached_metadata(self, session, cid_type: Dict[str, str]) -> Dict[str, Dict]:
+        """Returns metadata for the CIDs in cid_type that are already cached
+
+        session -- db session used to look up cid_data, None to skip the db
+        cid_type -- dict of cid -> cid type
+        """
+        return self.metadata_cache.get(session, cid_type)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="cid_metadata_client_loop",
+                    daemon=True,
+                )
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _run_in_loop(self, coro):
+        """Schedules a coroutine on the client's background event loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    async def _get_async_session(self) -> aiohttp.ClientSession:
+        # only ever called from the background loop
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=GATEWAY_MAX_CONNECTIONS,
+                limit_per_host=GATEWAY_MAX_CONNECTIONS_PER_HOST,
+                keepalive_timeout=GATEWAY_KEEPALIVE_TIMEOUT_SECONDS,
+            )
+            self._async_session = aiohttp.ClientSession(connector=connector)
+        return self._async_session
+
+    def _get_endpoint_stats(self, gateway_endpoint: str) -> GatewayEndpointStats:
+        if gateway_endpoint not in self._endpoint_stats:
+            self._endpoint_stats[gateway_endpoint] = GatewayEndpointStats()
+        return self._endpoint_stats[gateway_endpoint]
+
+    def _order_gateway_endpoints(self, gateway_endpoints: List[str]) -> List[str]:
+        """Drops endpoints that keep timing out and orders the rest by latency.
+        Falls back to every endpoint if all of them would be dropped."""
+        healthy_endpoints = [
+            endpoint
+            for endpoint in gateway_endpoints
+            if not self._get_endpoint_stats(endpoint).should_skip()
+        ]
+        if not healthy_endpoints:
+            healthy_endpoints = gateway_endpoints
+        return sorted(
+            healthy_endpoints,
+            key=lambda endpoint: self._get_endpoint_stats(endpoint).sort_key(),
+        )
+
     def _get_metadata_from_json(self, default_metadata_fields, resp_json):
         metadata = {}
         for parameter, value in default_metadata_fields.items():
@@ -74,11 +197,15 @@ class CIDMetadataClient:
                     f"CIDMetadataClient | Invalid URL from provided gateway addr - {url}"
                 )
 
+            start_time = time.time()
             async with async_session.get(
                 url, timeout=GET_METADATA_TIMEOUT_SECONDS
             ) as resp:
                 if resp.status == 200:
                     json_resp = await resp.json(content_type=None)
+                    self._get_endpoint_stats(gateway_endpoint).record_success(
+                        time.time() - start_time
+                    )
                     sanitized_data = (
                         json.dumps(json_resp, ensure_ascii=False)
                         .encode("utf-8", "ignore")
@@ -86,11 +213,14 @@ class CIDMetadataClient:
                     )
                     return (multihash, json.loads(sanitized_data))
         except asyncio.TimeoutError:
+            self._get_endpoint_stats(gateway_endpoint).record_failure()
             logger.info(
                 f"CIDMetadataClient | _get_metadata_async TimeoutError fetching gateway address - {url}"
             )
             return None
         except Exception as e:
+            if isinstance(e, aiohttp.ClientConnectionError):
+                self._get_endpoint_stats(gateway_endpoint).record_failure()
             logger.info(f"CIDMetadataClient | _get_metadata_async Exception - {str(e)}")
             return None
 
@@ -104,7 +234,7 @@ class CIDMetadataClient:
             user_replica_set = user_to_replica_set.get(user_id)
             if not user_replica_set:
                 return None
-            return user_replica_set.split(",")
+            return self._order_gateway_endpoints(user_replica_set.split(","))
 
         return self._cnode_endpoints
 
@@ -128,8 +258,9 @@ class CIDMetadataClient:
 
         cid_metadata = {}
 
-        async with aiohttp.ClientSession() as async_session:
-            futures = []
+        async_session = await self._get_async_session()
+        futures: List[asyncio.Future] = []
+        try:
             cid_futures_map: Dict[str, set] = {}
 
             for cid, _ in cids_txhash_set:
@@ -159,7 +290,7 @@ class CIDMetadataClient:
                     try:
                         future_result = await future
                     except asyncio.CancelledError:
-                        pass  # swallow canceled requests
+                        future_result = None  # swallow canceled requests
 
                     if not future_result:
                         continue
@@ -200,6 +331,11 @@ class CIDMetadataClient:
             except Exception as e:
                 logger.info("CIDMetadataClient | Error in fetch cid metadata")
                 raise e
+        finally:
+            # the session outlives this call, so stop any requests still in flight
+            for future in futures:
+                future.cancel()
+        self.metadata_cache.set(cid_metadata, cid_type)
         return cid_metadata
 
     # Used in POA indexing
@@ -212,7 +348,7 @@ class CIDMetadataClient:
         cid_type: Dict[str, str],
         should_fetch_from_replica_set: bool = True,
     ):
-        return asyncio.run(
+        return self._run_in_loop(
             self._fetch_metadata_from_gateway_endpoints(
                 fetched_cids,
                 cids_txhash_set,
@@ -221,6 +357,17 @@ class CIDMetadataClient:
                 cid_type,
                 should_fetch_from_replica_set,
             )
+        ).result()
+
+    async def _async_fetch_metadata_from_gateway_endpoints(
+        self, *args, **kwargs
+    ) -> Dict[str, Dict]:
+        # Callers run their own event loops, hand the fetch to the client's loop
+        # so it shares the pooled session
+        return await asyncio.wrap_future(
+            self._run_in_loop(
+                self._fetch_metadata_from_gateway_endpoints(*args, **kwargs)
+            )
         )
 
     # Used in SOL indexing
@@ -231,13 +378,13 @@ class CIDMetadataClient:
         user_to_replica_set: Dict[int, str],
         cid_type: Dict[str, str],
     ) -> Dict[str, Dict]:
-        cid_metadata: Dict[str, Dict] = {}
+        cid_metadata: Dict[str, Dict] = self.get_cached_metadata(None, cid_type)
 
         # first attempt - fetch all CIDs from replica set
         try:
 
             cid_metadata.update(
-                await self._fetch_metadata_from_gateway_endpoints(
+                await self._async_fetch_metadata_from_gateway_endpoints(
                     cid_metadata.keys(),
                     cids_txhash_set,
                     cid_to_user_id,
@@ -253,7 +400,7 @@ class CIDMetadataClient:
         # second attempt - fetch missing CIDs from other cnodes
         if len(cid_metadata) != len(cids_txhash_set):
             cid_metadata.update(
-                await self._fetch_metadata_from_gateway_endpoints(
+                await self._async_fetch_metadata_from_gateway_endpoints(
                     cid_metadata.keys(),
                     cids_txhash_set,
                     cid_to_user_id,
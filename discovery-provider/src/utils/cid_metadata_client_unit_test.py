@@ -0,0 +1,50 @@
+from src.utils.cid_metadata_client import (
+    GATEWAY_MAX_CONSECUTIVE_FAILURES,
+    CIDMetadataClient,
+)
+
+
+def test_order_gateway_endpoints_by_latency():
+    client = CIDMetadataClient()
+    client._get_endpoint_stats("https://slow.audius.co").record_success(1.5)
+    client._get_endpoint_stats("https://fast.audius.co").record_success(0.1)
+
+    assert client._order_gateway_endpoints(
+        ["https://slow.audius.co", "https://fast.audius.co", "https://new.audius.co"]
+    ) == ["https://new.audius.co", "https://fast.audius.co", "https://slow.audius.co"]
+
+
+def test_order_gateway_endpoints_skips_failing_endpoints():
+    client = CIDMetadataClient()
+    for _ in range(GATEWAY_MAX_CONSECUTIVE_FAILURES):
+        client._get_endpoint_stats("https://down.audius.co").record_failure()
+
+    assert client._order_gateway_endpoints(
+        ["https://down.audius.co", "https://up.audius.co"]
+    ) == ["https://up.audius.co"]
+
+    # a success resets the failure streak
+    client._get_endpoint_stats("https://down.audius.co").record_success(0.2)
+    assert "https://down.audius.co" in client._order_gateway_endpoints(
+        ["https://down.audius.co", "https://up.audius.co"]
+    )
+
+
+def test_order_gateway_endpoints_keeps_all_if_all_failing():
+    client = CIDMetadataClient()
+    endpoints = ["https://a.audius.co", "https://b.audius.co"]
+    for endpoint in endpoints:
+        for _ in range(GATEWAY_MAX_CONSECUTIVE_FAILURES):
+            client._get_endpoint_stats(endpoint).record_failure()
+
+    assert sorted(client._order_gateway_endpoints(endpoints)) == endpoints
+
+
+def test_replica_set_endpoints_are_ordered():
+    client = CIDMetadataClient()
+    for _ in range(GATEWAY_MAX_CONSECUTIVE_FAILURES):
+        client._get_endpoint_stats("https://down.audius.co").record_failure()
+
+    assert client._get_gateway_endpoints(
+        True, 1, {1: "https://down.audius.co,https://up.audius.co"}
+    ) == ["https://up.audius.co"]
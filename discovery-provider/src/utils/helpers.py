@@ -14,7 +14,6 @@ import requests
 from flask import g, request
 from hashids import Hashids
 from jsonformatter import JsonFormatter
-from sqlalchemy import inspect
 from src import exceptions
 from src.solana.solana_transaction_types import (
     ResultMeta,
@@ -22,6 +21,12 @@ from src.solana.solana_transaction_types import (
     TransactionMessageInstruction,
 )
 from src.utils import redis_connection
+from src.utils.model_serializers import (
+    get_model_serializer,
+    serialize_column_rows,
+    serialize_model,
+    serialize_models,
+)
 from src.utils.redis_constants import final_poa_block_redis_key
 
 from . import multihash
@@ -79,10 +84,7 @@ def is_fqdn(endpoint_str):
 
 
 def query_result_to_list(query_result):
-    results = []
-    for row in query_result:
-        results.append(model_to_dictionary(row, None))
-    return results
+    return serialize_models(query_result)
 
 
 def model_to_dictionary(model, exclude_keys=None):
@@ -95,48 +97,23 @@ def model_to_dictionary(model, exclude_keys=None):
     `exclude_keys` property or attribute.
     - Excludes any property or attribute with a leading underscore.
     - Excludes unloaded properties expressed in relationships.
+
+    The keys of each model class are computed once, see
+    `src.utils.model_serializers`.
     """
-    state = inspect(model)
-    # Collect the model members that are unloaded so we do not
-    # unintentionally cause them to load
-    unloaded = state.unloaded
-    model_dict = {}
-
-    columns = model.__table__.columns.keys()
-    relationships = model.__mapper__.relationships.keys()
-    properties = []
-    for key in list(set(dir(model)) - set(columns) - set(relationships)):
-        if hasattr(type(model), key):
-            attr = getattr(type(model), key)
-            if not callable(attr) and isinstance(attr, property):
-                properties.append(key)
-
-    if exclude_keys is None:
-        exclude_keys = []
-    if hasattr(model, "exclude_keys"):
-        exclude_keys.extend(model.exclude_keys)
-
-    assert set(exclude_keys).issubset(set(properties).union(columns))
-
-    for key in columns:
-        if key not in exclude_keys and not key.startswith("_"):
-            model_dict[key] = getattr(model, key)
-
-    for key in properties:
-        if key not in exclude_keys and not key.startswith("_"):
-            model_dict[key] = getattr(model, key)
-
-    for key in relationships:
-        if key not in exclude_keys and not key.startswith("_"):
-            if key in unloaded:
-                continue
-            attr = getattr(model, key)
-            if isinstance(attr, list):
-                model_dict[key] = query_result_to_list(attr)
-            else:
-                model_dict[key] = model_to_dictionary(attr)
-
-    return model_dict
+    return serialize_model(model, exclude_keys)
+
+
+def column_rows_to_list(rows, model):
+    """Converts rows selected as `model_columns(model)` into the dictionaries
+    `query_result_to_list` returns for the model, without building the models.
+    Only supported for models without properties or eagerly loaded relationships."""
+    return serialize_column_rows(rows, model)
+
+
+def model_columns(model):
+    """Returns the columns to select for `column_rows_to_list`"""
+    return get_model_serializer(model).columns
 
 
 # Convert a tuple of model format into the proper model itself represented as a dictionary.
@@ -0,0 +1,146 @@
+from typing import Dict, FrozenSet, Iterable, List, Tuple, Type
+
+from sqlalchemy import inspect
+
+# relationship loading strategies that never load with the parent row
+LAZY_LOADING_STRATEGIES = {"select", "dynamic", "noload", "raise", "raise_on_sql"}
+
+
+class ModelSerializer:
+    """Serializes the rows of a SQLAlchemy model into dictionaries.
+
+    The keys to copy are computed once per model class, following the rules of
+    `helpers.model_to_dictionary`:
+
+    - Includes columns, relationships, and properties decorated with
+    `@property`, in that order.
+    - Excludes the keys in the model's `exclude_keys` attribute and any key
+    with a leading underscore.
+    - Excludes unloaded relationships.
+    """
+
+    def __init__(self, model_class: Type, exclude_keys: Iterable[str] = ()):
+        self.model_class = model_class
+
+        mapper = inspect(model_class)
+        columns = model_class.__table__.columns
+        relationships = mapper.relationships
+        column_keys = columns.keys()
+        relationship_keys = relationships.keys()
+
+        property_keys = []
+        for key in dir(model_class):
+            if key in column_keys or key in relationship_keys:
+                continue
+            attr = getattr(model_class, key, None)
+            if not callable(attr) and isinstance(attr, property):
+                property_keys.append(key)
+
+        exclude_keys = set(exclude_keys)
+        exclude_keys.update(getattr(model_class, "exclude_keys", []))
+        assert exclude_keys.issubset(set(property_keys).union(column_keys))
+        self.exclude_keys: FrozenSet[str] = frozenset(exclude_keys)
+
+        def is_included(key):
+            return key not in exclude_keys and not key.startswith("_")
+
+        self.columns = [column for column in columns if is_included(column.key)]
+        self.column_keys: Tuple[str, ...] = tuple(
+            key for key in column_keys if is_included(key)
+        )
+        self.property_keys: Tuple[str, ...] = tuple(
+            key for key in property_keys if is_included(key)
+        )
+        self.relationship_keys: Tuple[str, ...] = tuple(
+            key for key in relationship_keys if is_included(key)
+        )
+
+        # rows selected as the model's column tuple serialize identically to
+        # the model only when there is nothing but columns to copy
+        self.supports_column_rows = not self.property_keys and all(
+            relationships[key].lazy in LAZY_LOADING_STRATEGIES
+            for key in self.relationship_keys
+        )
+
+        self._excluding: Dict[FrozenSet[str], "ModelSerializer"] = {}
+
+    def excluding(self, exclude_keys: Iterable[str]) -> "ModelSerializer":
+        """Returns the serializer of this model that also excludes `exclude_keys`"""
+        exclude_keys = frozenset(exclude_keys)
+        if exclude_keys.issubset(self.exclude_keys):
+            return self
+        if exclude_keys not in self._excluding:
+            self._excluding[exclude_keys] = ModelSerializer(
+                self.model_class, exclude_keys
+            )
+        return self._excluding[exclude_keys]
+
+    def serialize(self, model) -> Dict:
+        # Loaded column values are read straight from the instance dict,
+        # which is what the attribute descriptors return for them. Expired
+        # or deferred columns go through the descriptors so they still load.
+        instance_dict = model.__dict__
+        try:
+            model_dict = {key: instance_dict[key] for key in self.column_keys}
+        except KeyError:
+            model_dict = {key: getattr(model, key) for key in self.column_keys}
+
+        for key in self.property_keys:
+            model_dict[key] = getattr(model, key)
+
+        if self.relationship_keys:
+            # Skip the relationships that are unloaded so we do not
+            # unintentionally cause them to load
+            unloaded = inspect(model).unloaded
+            for key in self.relationship_keys:
+                if key in unloaded:
+                    continue
+                attr = getattr(model, key)
+                if isinstance(attr, list):
+                    model_dict[key] = serialize_models(attr)
+                else:
+                    model_dict[key] = serialize_model(attr)
+
+        return model_dict
+
+    def serialize_columns(self, row) -> Dict:
+        """Serializes a row selected as `session.query(*serializer.columns)`
+        without constructing the model"""
+        return dict(zip(self.column_keys, row))
+
+
+_serializers: Dict[Type, ModelSerializer] = {}
+
+
+def get_model_serializer(model_class: Type) -> ModelSerializer:
+    """Returns the serializer of a model class, compiling it on first use"""
+    serializer = _serializers.get(model_class)
+    if serializer is None:
+        serializer = _serializers[model_class] = ModelSerializer(model_class)
+    return serializer
+
+
+def serialize_model(model, exclude_keys=None) -> Dict:
+    serializer = get_model_serializer(type(model))
+    if exclude_keys:
+        serializer = serializer.excluding(exclude_keys)
+    return serializer.serialize(model)
+
+
+def serialize_models(models) -> List[Dict]:
+    results = []
+    serializer = None
+    for model in models:
+        if serializer is None or type(model) is not serializer.model_class:
+            serializer = get_model_serializer(type(model))
+        results.append(serializer.serialize(model))
+    return results
+
+
+def serialize_column_rows(rows, model_class: Type) -> List[Dict]:
+    """Serializes rows selected as the columns of `model_class`, see
+    `get_model_serializer(model_class).columns`"""
+    serializer = get_model_serializer(model_class)
+    assert serializer.supports_column_rows
+    column_keys = serializer.column_keys
+    return [dict(zip(column_keys, row)) for row in rows]
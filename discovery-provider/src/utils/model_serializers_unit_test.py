@@ -0,0 +1,74 @@
+from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy.orm import relationship
+from src.models.base import Base
+from src.utils.helpers import model_to_dictionary, query_result_to_list
+from src.utils.model_serializers import get_model_serializer
+
+
+class SerializerChildTest(Base):
+    __tablename__ = "fake_serializer_child"
+    id = Column(Integer, primary_key=True)
+    parent_id = Column(Integer, ForeignKey("fake_serializer_parent.id"))
+    name = Column(String)
+
+
+class SerializerParentTest(Base):
+    __tablename__ = "fake_serializer_parent"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    secret = Column(String)
+    _private = Column(String)
+
+    exclude_keys = ["secret"]
+
+    children = relationship(SerializerChildTest, lazy="joined")
+    lazy_children = relationship(SerializerChildTest, viewonly=True)
+
+    @property
+    def upper_name(self):
+        return self.name.upper()
+
+    @property
+    def _lower_name(self):
+        return self.name.lower()
+
+
+def test_serializer_key_plan():
+    serializer = get_model_serializer(SerializerParentTest)
+    assert serializer.column_keys == ("id", "name")
+    assert serializer.property_keys == ("upper_name",)
+    assert serializer.relationship_keys == ("children", "lazy_children")
+    assert not serializer.supports_column_rows
+    assert get_model_serializer(SerializerParentTest) is serializer
+
+    child_serializer = get_model_serializer(SerializerChildTest)
+    assert child_serializer.supports_column_rows
+    assert child_serializer.serialize_columns((1, 2, "child")) == {
+        "id": 1,
+        "parent_id": 2,
+        "name": "child",
+    }
+
+
+def test_model_to_dictionary():
+    parent = SerializerParentTest(
+        id=1,
+        name="Parent",
+        secret="secret",
+        children=[SerializerChildTest(id=2, parent_id=1, name="child")],
+    )
+
+    # lazy_children was never loaded so it is skipped
+    expected = {
+        "id": 1,
+        "name": "Parent",
+        "upper_name": "PARENT",
+        "children": [{"id": 2, "parent_id": 1, "name": "child"}],
+    }
+    assert model_to_dictionary(parent) == expected
+    assert query_result_to_list([parent, parent]) == [expected, expected]
+    assert model_to_dictionary(parent, ["upper_name"]) == {
+        "id": 1,
+        "name": "Parent",
+        "children": [{"id": 2, "parent_id": 1, "name": "child"}],
+    }
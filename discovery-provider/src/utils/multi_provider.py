@@ -1,5 +1,7 @@
 import random
+from typing import Dict, List
 
+import requests
 from web3.providers import BaseProvider, HTTPProvider
 
 
@@ -21,6 +23,27 @@ class MultiProvider(BaseProvider):
                 continue
         raise Exception("All requests failed")
 
+    def make_batch_request(self, batch: List[Dict]) -> List[Dict]:
+        """
+        Sends a JSON-RPC batch to one provider, trying the others if it fails.
+        Responses are matched to requests by id, callers should check each
+        response for an error.
+        """
+        for provider in random.sample(self.providers, k=len(self.providers)):
+            try:
+                response = requests.post(
+                    provider.endpoint_uri,
+                    json=batch,
+                    **provider.get_request_kwargs(),
+                )
+                response.raise_for_status()
+                responses = response.json()
+                if isinstance(responses, list):
+                    return responses
+            except Exception:
+                continue
+        raise Exception("All batch requests failed")
+
     def isConnected(self):
         return any(provider.isConnected() for provider in self.providers)
 
@@ -98,11 +98,19 @@ class PrometheusMetricNames:
     CELERY_TASK_ACTIVE_DURATION_SECONDS = "celery_task_active_duration_seconds"
     CELERY_TASK_DURATION_SECONDS = "celery_task_duration_seconds"
     CELERY_TASK_LAST_DURATION_SECONDS = "celery_task_last_duration_seconds"
+    CID_METADATA_CACHE_LOOKUPS = "cid_metadata_cache_lookups"
     FLASK_ROUTE_DURATION_SECONDS = "flask_route_duration_seconds"
+    FLASK_ROUTE_HYDRATION_QUERIES = "flask_route_hydration_queries"
     HEALTH_CHECK = "health_check"
+    INDEX_CHALLENGES_EVENTS_PER_SECOND = "index_challenges_events_per_second"
+    INDEX_CHALLENGES_QUEUE_DEPTH_LATEST = "index_challenges_queue_depth_latest"
     INDEX_BLOCKS_DURATION_SECONDS = "index_blocks_duration_seconds"
     INDEX_METRICS_DURATION_SECONDS = "index_metrics_duration_seconds"
     INDEX_TRENDING_DURATION_SECONDS = "index_trending_duration_seconds"
+    INDEX_USER_LISTENING_HISTORY_PLAYS_PER_SECOND = (
+        "index_user_listening_history_plays_per_second"
+    )
+    SOLANA_RPC_REQUEST_DURATION_SECONDS = "solana_rpc_request_duration_seconds"
     UPDATE_AGGREGATE_TABLE_DURATION_SECONDS = "update_aggregate_table_duration_seconds"
     UPDATE_TRACK_IS_AVAILABLE_DURATION_SECONDS = (
         "update_track_is_available_duration_seconds"
@@ -166,6 +174,11 @@ PrometheusRegistry = {
             "success",
         ),
     ),
+    PrometheusMetricNames.CID_METADATA_CACHE_LOOKUPS: Histogram(
+        f"{METRIC_PREFIX}_{PrometheusMetricNames.CID_METADATA_CACHE_LOOKUPS}",
+        "Number of CIDs served by each CID metadata cache tier, or missed",
+        ("tier",),
+    ),
     PrometheusMetricNames.FLASK_ROUTE_DURATION_SECONDS: Histogram(
         f"{METRIC_PREFIX}_{PrometheusMetricNames.FLASK_ROUTE_DURATION_SECONDS}",
         "Runtimes for flask routes",
@@ -174,12 +187,28 @@ PrometheusRegistry = {
             "route",
         ),
     ),
+    PrometheusMetricNames.FLASK_ROUTE_HYDRATION_QUERIES: Histogram(
+        f"{METRIC_PREFIX}_{PrometheusMetricNames.FLASK_ROUTE_HYDRATION_QUERIES}",
+        "Number of queries run to populate user, track and playlist metadata per request",
+        ("route",),
+        buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128),
+    ),
     PrometheusMetricNames.HEALTH_CHECK: Gauge(
         f"{METRIC_PREFIX}_{PrometheusMetricNames.HEALTH_CHECK}",
         "Metrics extracted from our health-checks, using similar keys.",
         ("key",),
         multiprocess_mode="liveall",
     ),
+    PrometheusMetricNames.INDEX_CHALLENGES_EVENTS_PER_SECOND: Histogram(
+        f"{METRIC_PREFIX}_{PrometheusMetricNames.INDEX_CHALLENGES_EVENTS_PER_SECOND}",
+        "Challenge events processed per second by each task run",
+        buckets=(10, 50, 100, 500, 1000, 5000, 10000),
+    ),
+    PrometheusMetricNames.INDEX_CHALLENGES_QUEUE_DEPTH_LATEST: Gauge(
+        f"{METRIC_PREFIX}_{PrometheusMetricNames.INDEX_CHALLENGES_QUEUE_DEPTH_LATEST}",
+        "Challenge events waiting in the Redis queue after the last task run",
+        multiprocess_mode="liveall",
+    ),
     PrometheusMetricNames.INDEX_BLOCKS_DURATION_SECONDS: Histogram(
         f"{METRIC_PREFIX}_{PrometheusMetricNames.INDEX_BLOCKS_DURATION_SECONDS}",
         "Runtimes for src.task.index:index_blocks()",
@@ -194,6 +223,20 @@ PrometheusRegistry = {
         f"{METRIC_PREFIX}_{PrometheusMetricNames.INDEX_TRENDING_DURATION_SECONDS}",
         "Runtimes for src.task.index_trending:index_trending()",
     ),
+    PrometheusMetricNames.INDEX_USER_LISTENING_HISTORY_PLAYS_PER_SECOND: Histogram(
+        f"{METRIC_PREFIX}_{PrometheusMetricNames.INDEX_USER_LISTENING_HISTORY_PLAYS_PER_SECOND}",
+        "Plays merged into user_listening_history per second by each task run",
+        buckets=(10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000),
+    ),
+    PrometheusMetricNames.SOLANA_RPC_REQUEST_DURATION_SECONDS: Histogram(
+        f"{METRIC_PREFIX}_{PrometheusMetricNames.SOLANA_RPC_REQUEST_DURATION_SECONDS}",
+        "Runtimes for requests to each Solana RPC endpoint",
+        (
+            "endpoint",
+            "method",
+            "success",
+        ),
+    ),
     PrometheusMetricNames.UPDATE_AGGREGATE_TABLE_DURATION_SECONDS: Histogram(
         f"{METRIC_PREFIX}_{PrometheusMetricNames.UPDATE_AGGREGATE_TABLE_DURATION_SECONDS}",
         "Runtimes for src.task.aggregates:update_aggregate_table()",
@@ -13,12 +13,21 @@ index_aggregate_user_last_refresh_completion_redis_key = (
 
 trending_tracks_last_completion_redis_key = "trending:tracks:last-completion"
 trending_playlists_last_completion_redis_key = "trending-playlists:last-completion"
+related_artists_fingerprints_redis_key = "related_artists:signature_fingerprints"
+related_artists_last_full_rebuild_redis_key = "related_artists:last_full_rebuild"
 challenges_last_processed_event_redis_key = "challenges:last-processed-event"
 user_balances_refresh_last_completion_redis_key = "user_balances:last-completion"
 latest_legacy_play_db_key = "latest_legacy_play_db_key"
 oldest_unarchived_play_key = "oldest_unarchived_play_key"
 
 index_eth_last_completion_redis_key = "index_eth:last-completion"
+index_sitemaps_last_completion_redis_key = "index_sitemaps:last-completion"
+
+random_tracks_pool_redis_key = "random_tracks:pool"
+random_tracks_pool_checkpoint_redis_key = "random_tracks:pool:checkpoint"
+
+health_snapshot_redis_key = "health:snapshot"
+health_snapshot_refresh_lock_redis_key = "health:snapshot:refresh-lock"
 
 # Solana latest program keys
 latest_sol_play_program_tx_key = "latest_sol_program_tx:play:chain"
@@ -64,4 +73,9 @@ LAST_SEEN_NEW_REACTION_TIME_KEY = "reactions_last_new_reaction_time"
 # Track unavailability worker job keys
 UPDATE_TRACK_IS_AVAILABLE_START_REDIS_KEY = "update_track_is_available:start"
 UPDATE_TRACK_IS_AVAILABLE_FINISH_REDIS_KEY = "update_track_is_available:finish"
-ALL_UNAVAILABLE_TRACKS_REDIS_KEY = "update_track_is_available:unavailable_tracks_all"
+ALL_UNAVAILABLE_TRACKS_REDIS_KEY = (
+    "update_track_is_available:unavailable_tracks_bitset_all"
+)
+UNAVAILABLE_TRACKS_ETAGS_REDIS_KEY = (
+    "update_track_is_available:unavailable_tracks_etags"
+)
@@ -24,6 +24,7 @@ from src.models.metrics.aggregate_monthly_total_users_metrics import (
 from src.models.metrics.aggregate_monthly_unique_users_metrics import (
     AggregateMonthlyUniqueUsersMetric,
 )
+from src.queries.hydration_context import get_request_hydration_query_count
 from src.utils.config import shared_config
 from src.utils.helpers import get_ip
 from src.utils.prometheus_metric import PrometheusMetric, PrometheusMetricNames
@@ -57,6 +58,18 @@ personal_app_metrics = "personal_app_metrics"
 daily_app_metrics = "daily_app_metrics"
 monthly_app_metrics = "monthly_app_metrics"
 
+# Personal route and app metrics are kept in one redis hash per minute,
+# mapping ip or app name to the number of requests:
+# personal_route_metrics:<datetime_format_secondary>
+# They are only read for the last couple of metrics intervals, so expire after that
+personal_metrics_ttl_sec = (METRICS_INTERVAL * 2 + 1) * 60
+
+# Summed unique ips are kept in one HyperLogLog per day and per month:
+# summed_unique_daily_metrics:<day_format>
+# summed_unique_monthly_metrics:<day_format of the first of the month>
+summed_unique_daily_metrics_ttl_sec = 2 * 24 * 60 * 60
+summed_unique_monthly_metrics_ttl_sec = 32 * 24 * 60 * 60
+
 """
 NOTE: if you want to change the time interval to recording metrics,
 change the `datetime_format` and func `get_rounded_date_time` to reflect the interval
@@ -425,21 +438,74 @@ def merge_app_metrics(metrics, end_time, db):
     merge_metrics(metrics, end_time, "app", db)
 
 
-def get_redis_metrics(redis_handle, start_time, metric_type):
-    redis_metrics_str = redis_handle.get(metric_type)
-    metrics = json.loads(redis_metrics_str) if redis_metrics_str else {}
-    if not metrics:
-        return {}
+def get_timestamped_metrics_key(metric_type, timestamp):
+    return f"{metric_type}:{timestamp}"
 
+
+def migrate_legacy_personal_metrics(redis_handle, metric_type):
+    """
+    Folds the json blob of personal metrics written before they moved to per
+    minute hashes into the hashes of the minutes that have not expired yet,
+    and deletes the blob.
+    The blob is read and deleted atomically, so only one caller folds it in.
+    """
+    pipe = redis_handle.pipeline()
+    pipe.get(metric_type)
+    pipe.delete(metric_type)
+    legacy_value, _ = pipe.execute()
+    if not legacy_value:
+        return
+
+    oldest_datetime = datetime.utcnow() - timedelta(seconds=personal_metrics_ttl_sec)
+    pipe = redis_handle.pipeline(transaction=False)
+    for datetime_str, value_counts in json.loads(legacy_value).items():
+        if datetime.strptime(datetime_str, datetime_format_secondary) < oldest_datetime:
+            continue
+        key = get_timestamped_metrics_key(metric_type, datetime_str)
+        for value, count in value_counts.items():
+            pipe.hincrby(key, value, count)
+        pipe.expire(key, personal_metrics_ttl_sec)
+    pipe.execute()
+    logger.info(f"migrated legacy {metric_type} to per minute hashes")
+
+
+def get_redis_metrics(redis_handle, start_time, metric_type):
     # if route metrics, value and count would be an IP and the number of requests from it
     # otherwise, value and count would be an app and the number of requests from it
     result = {}
-    for datetime_str, value_counts in metrics.items():
+
+    def add_value_counts(datetime_str, value_counts):
         datetime_obj = datetime.strptime(datetime_str, datetime_format_secondary)
         if datetime_obj > start_time:
             for value, count in value_counts.items():
                 result[value] = result[value] + count if value in result else count
 
+    migrate_legacy_personal_metrics(redis_handle, metric_type)
+
+    # per minute hashes newer than start_time that have not expired yet
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    bucket_time = max(
+        start_time.replace(second=0, microsecond=0),
+        now - timedelta(seconds=personal_metrics_ttl_sec),
+    )
+    datetime_strs = []
+    while bucket_time <= now:
+        datetime_strs.append(bucket_time.strftime(datetime_format_secondary))
+        bucket_time += timedelta(minutes=1)
+
+    pipe = redis_handle.pipeline(transaction=False)
+    for datetime_str in datetime_strs:
+        pipe.hgetall(get_timestamped_metrics_key(metric_type, datetime_str))
+    for datetime_str, value_counts in zip(datetime_strs, pipe.execute()):
+        if value_counts:
+            add_value_counts(
+                datetime_str,
+                {
+                    value.decode("utf-8"): int(count)
+                    for value, count in value_counts.items()
+                },
+            )
+
     return result
 
 
@@ -451,37 +517,53 @@ def get_redis_app_metrics(start_time):
     return get_redis_metrics(REDIS, start_time, personal_app_metrics)
 
 
-def get_summed_unique_metrics(start_time):
+def migrate_legacy_summed_unique_metrics(redis_handle):
+    """
+    Folds the json lists of ips written before summed unique metrics moved to
+    HyperLogLogs into the per day and per month HyperLogLog keys.
+    PFADD is idempotent, so this is safe to run concurrently or more than once.
+    """
+    legacy_keys = [
+        (summed_unique_daily_metrics, summed_unique_daily_metrics_ttl_sec),
+        (summed_unique_monthly_metrics, summed_unique_monthly_metrics_ttl_sec),
+    ]
+    legacy_values = redis_handle.mget([key for key, _ in legacy_keys])
+    if not any(legacy_values):
+        return
+
+    pipe = redis_handle.pipeline(transaction=False)
+    for (legacy_key, ttl_sec), legacy_value in zip(legacy_keys, legacy_values):
+        if not legacy_value:
+            continue
+        for timestamp, ips in json.loads(legacy_value).items():
+            if not ips:
+                continue
+            key = get_timestamped_metrics_key(legacy_key, timestamp)
+            pipe.pfadd(key, *ips)
+            pipe.expire(key, ttl_sec)
+        pipe.delete(legacy_key)
+    pipe.execute()
+    logger.info("migrated legacy summed unique metrics to HyperLogLogs")
+
+
+def get_redis_summed_unique_metrics(redis_handle, start_time):
     day = start_time.strftime(day_format)
     month = f"{day[:7]}/01"
 
-    summed_unique_daily_metrics_str = REDIS.get(summed_unique_daily_metrics)
-    summed_unique_daily_metrics_obj = (
-        json.loads(summed_unique_daily_metrics_str)
-        if summed_unique_daily_metrics_str
-        else {}
-    )
-    summed_unique_daily_count = (
-        len(summed_unique_daily_metrics_obj[day])
-        if day in summed_unique_daily_metrics_obj
-        else 0
-    )
+    migrate_legacy_summed_unique_metrics(redis_handle)
 
-    summed_unique_monthly_metrics_str = REDIS.get(summed_unique_monthly_metrics)
-    summed_unique_monthly_metrics_obj = (
-        json.loads(summed_unique_monthly_metrics_str)
-        if summed_unique_monthly_metrics_str
-        else {}
-    )
-    summed_unique_monthly_count = (
-        len(summed_unique_monthly_metrics_obj[month])
-        if month in summed_unique_monthly_metrics_obj
-        else 0
-    )
+    pipe = redis_handle.pipeline(transaction=False)
+    pipe.pfcount(get_timestamped_metrics_key(summed_unique_daily_metrics, day))
+    pipe.pfcount(get_timestamped_metrics_key(summed_unique_monthly_metrics, month))
+    summed_unique_daily_count, summed_unique_monthly_count = pipe.execute()
 
     return {"daily": summed_unique_daily_count, "monthly": summed_unique_monthly_count}
 
 
+def get_summed_unique_metrics(start_time):
+    return get_redis_summed_unique_metrics(REDIS, start_time)
+
+
 def get_aggregate_metrics_info():
     info_str = REDIS.get(metrics_visited_nodes)
     return json.loads(info_str) if info_str else {}
@@ -526,96 +608,40 @@ def extract_route_key():
     return (route_key, route)
 
 
-def update_personal_metrics(key, old_timestamp, timestamp, value, metric_type):
-    values_str = REDIS.get(key)
-    values = json.loads(values_str) if values_str else {}
-    if timestamp in values:
-        values[timestamp][value] = (
-            values[timestamp][value] + 1 if value in values[timestamp] else 1
-        )
-    else:
-        values[timestamp] = {value: 1}
+def update_personal_metrics(pipe, timestamp, value, metric_type):
+    key = get_timestamped_metrics_key(metric_type, timestamp)
+    pipe.hincrby(key, value, 1)
+    pipe.expire(key, personal_metrics_ttl_sec)
 
-    # clean up and update cached metrics
-    updated_metrics = {
-        timestamp: metrics
-        for timestamp, metrics in values.items()
-        if timestamp > old_timestamp
-    }
-    if updated_metrics:
-        REDIS.set(key, json.dumps(updated_metrics))
-    logger.debug(f"updated cached personal {metric_type} metrics")
 
-
-def update_summed_unique_metrics(now, ip):
-    thirty_one_days_ago = now - timedelta(days=31)
-    thirty_one_days_ago_str = thirty_one_days_ago.strftime(day_format)
-    yesterday = now - timedelta(days=1)
-    yesterday_str = yesterday.strftime(day_format)
+def update_summed_unique_metrics(pipe, now, ip):
     today_str = now.strftime(day_format)
     this_month_str = f"{today_str[:7]}/01"
 
-    summed_unique_daily_metrics_str = REDIS.get(summed_unique_daily_metrics)
-    summed_unique_daily_metrics_obj = (
-        json.loads(summed_unique_daily_metrics_str)
-        if summed_unique_daily_metrics_str
-        else {}
-    )
-    if today_str not in summed_unique_daily_metrics_obj:
-        summed_unique_daily_metrics_obj[today_str] = [ip]
-    elif ip not in summed_unique_daily_metrics_obj[today_str]:
-        summed_unique_daily_metrics_obj[today_str] = summed_unique_daily_metrics_obj[
-            today_str
-        ] + [ip]
-    summed_unique_daily_metrics_obj = {
-        timestamp: ips
-        for timestamp, ips in summed_unique_daily_metrics_obj.items()
-        if timestamp >= yesterday_str
-    }
-    REDIS.set(summed_unique_daily_metrics, json.dumps(summed_unique_daily_metrics_obj))
+    daily_key = get_timestamped_metrics_key(summed_unique_daily_metrics, today_str)
+    pipe.pfadd(daily_key, ip)
+    pipe.expire(daily_key, summed_unique_daily_metrics_ttl_sec)
 
-    summed_unique_monthly_metrics_str = REDIS.get(summed_unique_monthly_metrics)
-    summed_unique_monthly_metrics_obj = (
-        json.loads(summed_unique_monthly_metrics_str)
-        if summed_unique_monthly_metrics_str
-        else {}
-    )
-    if this_month_str not in summed_unique_monthly_metrics_obj:
-        summed_unique_monthly_metrics_obj[this_month_str] = [ip]
-    elif ip not in summed_unique_monthly_metrics_obj[this_month_str]:
-        summed_unique_monthly_metrics_obj[
-            this_month_str
-        ] = summed_unique_monthly_metrics_obj[this_month_str] + [ip]
-    summed_unique_monthly_metrics_obj = {
-        timestamp: ips
-        for timestamp, ips in summed_unique_monthly_metrics_obj.items()
-        if timestamp >= thirty_one_days_ago_str
-    }
-    REDIS.set(
-        summed_unique_monthly_metrics,
-        json.dumps(summed_unique_monthly_metrics_obj),
+    monthly_key = get_timestamped_metrics_key(
+        summed_unique_monthly_metrics, this_month_str
     )
+    pipe.pfadd(monthly_key, ip)
+    pipe.expire(monthly_key, summed_unique_monthly_metrics_ttl_sec)
 
 
-def record_aggregate_metrics():
-    now = datetime.utcnow()
+def record_aggregate_metrics(pipe, now, ip, application_name):
+    """
+    Queues the commands updating the unique ip and personal route/app metrics
+    for a request onto a redis pipeline
+    """
     timestamp = now.strftime(datetime_format_secondary)
-    old_timestamp = (now - timedelta(minutes=METRICS_INTERVAL * 2)).strftime(
-        datetime_format_secondary
-    )
-    ip = get_request_ip(request)
 
-    update_summed_unique_metrics(now, ip)
+    update_summed_unique_metrics(pipe, now, ip)
 
-    update_personal_metrics(
-        personal_route_metrics, old_timestamp, timestamp, ip, "route"
-    )
+    update_personal_metrics(pipe, timestamp, ip, personal_route_metrics)
 
-    application_name = request.args.get(app_name_param, type=str, default=None)
     if application_name:
-        update_personal_metrics(
-            personal_app_metrics, old_timestamp, timestamp, application_name, "app"
-        )
+        update_personal_metrics(pipe, timestamp, application_name, personal_app_metrics)
 
 
 # Metrics decorator.
@@ -633,11 +659,17 @@ def record_metrics(func):
         try:
             application_key, application_name = extract_app_name_key()
             route_key, route = extract_route_key()
-            REDIS.hincrby(route_key, route, 1)
+
+            # record everything for this request in a single round trip
+            pipe = REDIS.pipeline(transaction=False)
+            pipe.hincrby(route_key, route, 1)
             if application_name:
-                REDIS.hincrby(application_key, application_name, 1)
+                pipe.hincrby(application_key, application_name, 1)
 
-            record_aggregate_metrics()
+            record_aggregate_metrics(
+                pipe, datetime.utcnow(), get_request_ip(request), application_name
+            )
+            pipe.execute()
         except Exception as e:
             logger.error("Error while recording metrics: %s", e.message)
 
@@ -671,6 +703,9 @@ def record_metrics(func):
             route = "/".join(route.split("/")[:3])
 
         metric.save_time({"route": route, "code": str(code)})
+        PrometheusMetric(PrometheusMetricNames.FLASK_ROUTE_HYDRATION_QUERIES).save(
+            get_request_hydration_query_count(), {"route": route}
+        )
 
         return result
 
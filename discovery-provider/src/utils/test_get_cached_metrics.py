@@ -3,9 +3,17 @@ from datetime import datetime, timedelta
 
 from src.utils.redis_metrics import (
     datetime_format_secondary,
+    day_format,
     get_redis_metrics,
+    get_redis_summed_unique_metrics,
+    get_timestamped_metrics_key,
     personal_app_metrics,
+    personal_metrics_ttl_sec,
     personal_route_metrics,
+    record_aggregate_metrics,
+    summed_unique_daily_metrics,
+    summed_unique_monthly_metrics,
+    update_personal_metrics,
 )
 
 now = datetime.utcnow()
@@ -62,3 +70,60 @@ def test_get_cached_app_metrics(redis_mock):
     assert result["some-other-app"] == 2
     assert result["top-app"] == 1
     assert result["some-app"] == 2
+
+
+def test_get_bucketed_route_metrics(redis_mock):
+    # legacy json blob written before the per minute hashes
+    redis_mock.set(
+        personal_route_metrics,
+        json.dumps({recent_time_1.strftime(datetime_format_secondary): {"some-ip": 1}}),
+    )
+    for timestamp, ip in [
+        (old_time, "old-ip"),
+        (recent_time_1, "some-ip"),
+        (recent_time_2, "some-ip"),
+        (recent_time_2, "1.2.3.4"),
+    ]:
+        pipe = redis_mock.pipeline()
+        update_personal_metrics(
+            pipe,
+            timestamp.strftime(datetime_format_secondary),
+            ip,
+            personal_route_metrics,
+        )
+        pipe.execute()
+
+    result = get_redis_metrics(redis_mock, start_time_obj, personal_route_metrics)
+
+    assert result == {"some-ip": 3, "1.2.3.4": 1}
+    # the legacy blob is folded into the expiring hashes once
+    assert redis_mock.get(personal_route_metrics) is None
+    legacy_key = get_timestamped_metrics_key(
+        personal_route_metrics, recent_time_1.strftime(datetime_format_secondary)
+    )
+    assert 0 < redis_mock.ttl(legacy_key) <= personal_metrics_ttl_sec
+    assert (
+        get_redis_metrics(redis_mock, start_time_obj, personal_route_metrics) == result
+    )
+
+
+def test_get_summed_unique_metrics(redis_mock):
+    day = now.strftime(day_format)
+    month = f"{day[:7]}/01"
+    # legacy json lists written before the HyperLogLogs
+    redis_mock.set(summed_unique_daily_metrics, json.dumps({day: ["1.2.3.4"]}))
+    redis_mock.set(summed_unique_monthly_metrics, json.dumps({month: ["1.2.3.4"]}))
+
+    for ip in ["1.2.3.4", "5.6.7.8", "5.6.7.8"]:
+        pipe = redis_mock.pipeline()
+        record_aggregate_metrics(pipe, now, ip, "some-app")
+        pipe.execute()
+
+    result = get_redis_summed_unique_metrics(redis_mock, now)
+
+    assert result == {"daily": 2, "monthly": 2}
+    assert redis_mock.get(summed_unique_daily_metrics) is None
+    assert redis_mock.get(summed_unique_monthly_metrics) is None
+    assert get_redis_metrics(
+        redis_mock, now - timedelta(minutes=1), personal_app_metrics
+    ) == {"some-app": 3}